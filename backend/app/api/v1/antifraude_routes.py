@@ -8,6 +8,7 @@ from app.core.database import get_db
 from app.core.security import get_current_user
 from pydantic import BaseModel
 from prisma import Client
+from app.services.antifraude_score_service import AntifraudeScoreService
 
 router = APIRouter()
 
@@ -46,9 +47,12 @@ async def listar_transacoes_suspeitas(
 ):
     """Listar transações suspeitas para análise"""
     try:
-        # Por enquanto, retorna lista vazia pois não temos tabela de operacoes_antifraude
-        # Implementação básica para evitar erro 404
-        return []
+        # Score pré-calculado em clientes_risco (ORDER BY score DESC no índice)
+        return await AntifraudeScoreService(db).listar_suspeitos(
+            limit=limit,
+            min_score=score_minimo,
+            offset=offset,
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar transações suspeitas: {str(e)}")
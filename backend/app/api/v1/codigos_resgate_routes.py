@@ -5,7 +5,6 @@ from app.core.security import User
 from app.middleware.auth_middleware import require_staff
 from app.middleware.rate_limit import rate_limit_moderate, rate_limit_strict
 from app.repositories.premio_repo_atomic import PremioRepositoryAtomic
-from app.tasks.jornada_tasks import invalidar_codigos_vencidos_jornada
 
 router = APIRouter(prefix="/codigos", tags=["codigos-resgate"])
 
@@ -92,4 +91,7 @@ async def invalidar_codigos_vencidos(
     current_user: User = Depends(require_staff),
     _rate_limit: None = Depends(rate_limit_strict),
 ):
+    # Import local: o modulo de tasks carrega o Celery, que o worker web nao precisa no boot
+    from app.tasks.jornada_tasks import invalidar_codigos_vencidos_jornada
+
     return await invalidar_codigos_vencidos_jornada()
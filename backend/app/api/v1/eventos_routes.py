@@ -0,0 +1,52 @@
+"""
+Stream de eventos (SSE) para a UI da equipe.
+
+Substitui o polling de notificacoes, alertas de checkout e aprovacoes de
+check-in: a aba abre um EventSource e recebe os eventos do seu perfil. Na
+reconexao o navegador reenvia Last-Event-ID e o hub reenvia o que foi perdido.
+"""
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.event_hub import event_hub
+from app.core.security import User
+from app.middleware.auth_middleware import require_staff
+
+
+router = APIRouter(prefix="/eventos", tags=["eventos"])
+
+SSE_RETRY_MS = 5000
+
+
+def _formatar_evento(evento: dict) -> str:
+    dados = json.dumps(evento.get("dados") or {}, default=str)
+    return f"id: {evento['id']}\nevent: {evento.get('tipo') or 'message'}\ndata: {dados}\n\n"
+
+
+@router.get("/stream")
+async def stream_eventos(
+    request: Request,
+    last_event_id: Optional[str] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: User = Depends(require_staff),
+):
+    ultimo_id = last_event_id_header or last_event_id
+
+    async def _gerar():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        async for evento in event_hub.assinar(current_user.perfil, ultimo_id):
+            if await request.is_disconnected():
+                break
+            if evento is None:
+                yield ": ping\n\n"
+                continue
+            yield _formatar_evento(evento)
+
+    return StreamingResponse(
+        _gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -197,14 +197,11 @@ async def verificar_status_locks(
     Para diagnóstico e monitoramento
     """
     try:
-        from app.services.overbooking_service import OverbookingLock
+        from app.core.locks import metricas_lock
         
-        with OverbookingLock._lock:
-            locks_ativos = list(OverbookingLock._locks.keys())
-            
+        # Locks vivem no Redis/Postgres; aqui ficam as metricas de espera deste processo
         return {
-            "locks_ativos": len(locks_ativos),
-            "quartos_bloqueados": locks_ativos,
+            "metricas_por_backend": metricas_lock.snapshot(),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Header
+from fastapi import APIRouter, Depends, HTTPException, Request, Header, Query
 from app.schemas.pagamento_schema import PagamentoCreate, PagamentoResponse, CieloWebhook
 from app.services.pagamento_service import PagamentoService
 from app.services.email_service import EmailService
 from app.services.sms_service import SMSService
-from app.repositories.pagamento_repo import PagamentoRepository
+from app.repositories.pagamento_repo import (
+    PAGAMENTOS_LIMITE_MAXIMO,
+    PAGAMENTOS_LIMITE_PADRAO,
+    PagamentoRepository,
+)
+from app.utils.datetime_utils import LOCAL_TIMEZONE
+from datetime import date, datetime, time, timedelta
 from app.core.database import get_db
 from app.middleware.auth_middleware import get_current_active_user, require_admin_or_manager
 from app.core.security import User
@@ -128,13 +134,43 @@ async def get_pagamento_service() -> PagamentoService:
         ReservaRepository(db)
     )
 
+def _lista_param(valor: Optional[str]) -> Optional[List[str]]:
+    if not valor:
+        return None
+    itens = [item.strip() for item in valor.split(",") if item.strip()]
+    return itens or None
+
+
 @router.get("", response_model=dict)
 async def listar_pagamentos(
+    status: Optional[str] = Query(None, description="Um ou mais status separados por virgula"),
+    metodo: Optional[str] = Query(None, description="Um ou mais metodos separados por virgula"),
+    reserva_id: Optional[int] = Query(None),
+    cliente_id: Optional[int] = Query(None),
+    data_inicio: Optional[date] = Query(None, description="Criados a partir deste dia (horario local)"),
+    data_fim: Optional[date] = Query(None, description="Criados ate este dia, inclusive (horario local)"),
+    cursor: Optional[int] = Query(None, description="proximo_cursor da pagina anterior"),
+    limite: int = Query(PAGAMENTOS_LIMITE_PADRAO, ge=1, le=PAGAMENTOS_LIMITE_MAXIMO),
+    campos: Optional[str] = Query(None, description="Colunas desejadas separadas por virgula"),
+    resumo: bool = Query(True, description="Contagens por status (mesmos filtros)"),
     service: PagamentoService = Depends(get_pagamento_service),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Listar todos os pagamentos - Requer autenticaÃ§Ã£o"""
-    return await service.list_all()
+    """Listar pagamentos com filtros, paginaÃ§Ã£o por cursor e projeÃ§Ã£o - Requer autenticaÃ§Ã£o"""
+    return await service.listar(
+        status=_lista_param(status),
+        metodo=_lista_param(metodo),
+        reserva_id=reserva_id,
+        cliente_id=cliente_id,
+        criado_de=datetime.combine(data_inicio, time.min, tzinfo=LOCAL_TIMEZONE) if data_inicio else None,
+        criado_ate=(
+            datetime.combine(data_fim + timedelta(days=1), time.min, tzinfo=LOCAL_TIMEZONE) if data_fim else None
+        ),
+        cursor=cursor,
+        limite=limite,
+        campos=_lista_param(campos),
+        com_resumo=resumo,
+    )
 
 @router.post("", response_model=PagamentoResponse)
 async def criar_pagamento(
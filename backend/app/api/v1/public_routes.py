@@ -1,15 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, Request, Header
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 from datetime import datetime, date
 from app.utils.datetime_utils import now_utc, to_utc, LOCAL_TIMEZONE
 from app.repositories.quarto_repo import QuartoRepository
-from app.repositories.reserva_repo import ReservaRepository
+from app.repositories.reserva_repo import ReservaConflito, ReservaRepository
 from app.repositories.cliente_repo import ClienteRepository
 from app.repositories.cupom_repo import CupomRepository
 from app.repositories.pontos_repo import PontosRepository
-from app.repositories.tarifa_suite_repo import TarifaSuiteRepository
 from app.core.database import get_db
 import random
 import string
@@ -20,6 +19,11 @@ from app.services.consulta_publica_service import ConsultaPublicaService
 from app.services.cupom_service import CupomService
 from app.services.notification_service import NotificationService
 from app.services.otp_service import OtpService
+from app.services.tarifa_calendario_service import tarifa_calendario
+from app.services.disponibilidade_publica_service import (
+    calcular_disponibilidade_publica,
+    disponibilidade_publica_cache,
+)
 from app.middleware.rate_limit import rate_limit_strict
 from app.middleware.idempotency import check_idempotency, store_idempotency_result
 from app.core.cache import redis_lock
@@ -214,15 +218,15 @@ async def _validar_antibot_publico(request: Request, action_esperada: str) -> No
     await _validar_recaptcha_publico(request, action_esperada)
 
 
-async def _obter_tarifa_diaria(db, tipo_suite: str, data_ref: date) -> float:
-    repo = TarifaSuiteRepository(db)
-    tarifa = await repo.get_tarifa_ativa(tipo_suite, data_ref)
-    if not tarifa:
+async def _cotar_estadia(db, tipo_suite: str, checkin: date, checkout: date) -> dict:
+    calendario = await tarifa_calendario.obter(db)
+    cotacao = calendario.cotar(tipo_suite, checkin, checkout)
+    if not cotacao:
         raise HTTPException(
             status_code=400,
-            detail=f"Tarifa nao cadastrada para a suite {tipo_suite} na data {data_ref}. Cadastre uma tarifa antes de reservar."
+            detail=f"Tarifa nao cadastrada para a suite {tipo_suite} em todas as noites de {checkin} a {checkout}. Cadastre uma tarifa antes de reservar."
         )
-    return float(tarifa.get("preco_diaria", 0.0))
+    return cotacao
 
 def gerar_codigo_reserva():
     """Gerar código único de reserva"""
@@ -365,82 +369,41 @@ async def consultar_por_documento(documento: str):
 
 @router.get("/quartos/disponiveis")
 async def verificar_disponibilidade_quartos(
+    request: Request,
     data_checkin: str = Query(...),
     data_checkout: str = Query(...)
 ):
     """
     Verificar disponibilidade de quartos (API Pública)
     
-    Não requer autenticação - usado para consulta pública
+    Não requer autenticação - usado para consulta pública.
+    Resposta em micro-cache com ETag/Cache-Control para o nginx servir repetições.
     """
     try:
-        db = get_db()
-
-        checkin_date = datetime.strptime(data_checkin, "%Y-%m-%d")
-        checkout_date = datetime.strptime(data_checkout, "%Y-%m-%d")
-        if checkout_date <= checkin_date:
-            raise HTTPException(status_code=400, detail="Data de check-out deve ser posterior ao check-in")
-
-        checkin_local = checkin_date.replace(hour=12, minute=0, second=0, microsecond=0, tzinfo=LOCAL_TIMEZONE)
-        checkout_local = checkout_date.replace(hour=11, minute=0, second=0, microsecond=0, tzinfo=LOCAL_TIMEZONE)
-        checkin_dt = to_utc(checkin_local)
-        checkout_dt = to_utc(checkout_local)
-
-        from app.services.disponibilidade_service import DisponibilidadeService
-        disponibilidade_service = DisponibilidadeService(db)
-        quartos_disponiveis = await disponibilidade_service.listar_quartos_disponiveis(
-            checkin_dt,
-            checkout_dt,
-            None
-        )
-
-        num_diarias = (checkout_date.date() - checkin_date.date()).days
-
-
-        tipos_index = {}
-        for q in quartos_disponiveis:
-            tipo = q.get("tipo_suite")
-            if not tipo:
-                continue
-            tipos_index.setdefault(tipo, []).append({"numero": q.get("numero")})
-
-        tarifa_repo = TarifaSuiteRepository(db)
-        tipos_disponiveis = []
-        total_quartos_disponiveis = 0
-        for tipo, quartos in tipos_index.items():
-            # Tipo sem tarifa ativa apenas nao e ofertado; nao bloqueia os demais
-            tarifa = await tarifa_repo.get_tarifa_ativa(tipo, checkin_date.date())
-            if not tarifa:
-                continue
-            preco_diaria = float(tarifa.get("preco_diaria", 0.0))
-            quantidade = len(quartos)
-            total_quartos_disponiveis += quantidade
-            tipos_disponiveis.append({
-                "tipo": tipo,
-                "preco_diaria": preco_diaria,
-                "preco_total": preco_diaria * num_diarias,
-                "quantidade_disponivel": quantidade,
-                "quartos": quartos
-            })
-
-        tipos_disponiveis.sort(key=lambda x: x["tipo"])
-
-        return {
-            "success": True,
-            "data_checkin": data_checkin,
-            "data_checkout": data_checkout,
-            "num_diarias": num_diarias,
-            "total_quartos_disponiveis": total_quartos_disponiveis,
-            "tipos_disponiveis": tipos_disponiveis
-        }
-
-    except HTTPException:
-        raise
+        checkin_date = datetime.strptime(data_checkin, "%Y-%m-%d").date()
+        checkout_date = datetime.strptime(data_checkout, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(status_code=400, detail="Formato de data inválido. Use YYYY-MM-DD")
+    if checkout_date <= checkin_date:
+        raise HTTPException(status_code=400, detail="Data de check-out deve ser posterior ao check-in")
+
+    try:
+        db = get_db()
+        corpo, etag = await disponibilidade_publica_cache.obter(
+            f"{checkin_date.isoformat()}:{checkout_date.isoformat()}",
+            lambda: calcular_disponibilidade_publica(db, checkin_date, checkout_date),
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao verificar disponibilidade: {str(e)}")
 
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={disponibilidade_publica_cache.ttl_segundos}",
+    }
+    if etag in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=corpo, media_type="application/json", headers=headers)
+
 @router.get("/pontos/{cpf}")
 async def consultar_pontos_cliente(cpf: str):
     """
@@ -646,21 +609,12 @@ async def criar_reserva_publica(
         checkin_dt = to_utc(checkin_local)
         checkout_dt = to_utc(checkout_local)
 
-        from app.services.disponibilidade_service import DisponibilidadeService
-        disponibilidade_service = DisponibilidadeService(db)
-        disponibilidade = await disponibilidade_service.verificar_disponibilidade(
-            reserva_data.quarto_numero,
-            checkin_dt,
-            checkout_dt,
-            None
-        )
-        if not disponibilidade.get("disponivel"):
-            raise HTTPException(status_code=400, detail="Quarto não disponível para o período solicitado")
-
-        valor_diaria = await _obter_tarifa_diaria(db, reserva_data.tipo_suite, checkin_date.date())
+        cotacao = await _cotar_estadia(db, reserva_data.tipo_suite, checkin_date.date(), checkout_date.date())
 
-        num_diarias = (checkout_date.date() - checkin_date.date()).days
-        valor_total_base = float(valor_diaria) * num_diarias
+        num_diarias = cotacao["num_diarias"]
+        valor_diaria = cotacao["preco_diaria"]
+        # Estadia que cruza temporadas soma o preco de cada noite.
+        valor_total_base = cotacao["preco_total"]
 
         from app.schemas.reserva_schema import ReservaCreate
         from app.schemas.quarto_schema import TipoSuite
@@ -682,25 +636,29 @@ async def criar_reserva_publica(
             if not validacao_cupom.get("valido"):
                 raise HTTPException(status_code=400, detail=validacao_cupom.get("mensagem") or "Cupom inválido")
 
-        async with redis_lock(f"quarto:{reserva_data.quarto_numero}", timeout=10):
-            reserva_criada = await reserva_repo.create(
-                ReservaCreate(
-                    cliente_id=cliente["id"],
-                    quarto_numero=reserva_data.quarto_numero,
-                    tipo_suite=tipo_suite,
-                    checkin_previsto=checkin_dt,
-                    checkout_previsto=checkout_dt,
-                    valor_diaria=valor_diaria,
-                    valor_total=valor_total_base,
-                    num_diarias=num_diarias,
-                    origem="SITE",
-                    forma_pagamento=reserva_data.metodo_pagamento,
-                    observacoes=reserva_data.observacoes,
-                    telefone_contato=telefone_limpo,
-                    email_contato=reserva_data.email
-                ),
-                notificar=not bool(cupom_codigo)
-            )
+        # Disponibilidade validada no proprio INSERT; conflito vira 409 com alternativas.
+        try:
+            async with redis_lock(f"quarto:{reserva_data.quarto_numero}", timeout=10):
+                reserva_criada = await reserva_repo.create(
+                    ReservaCreate(
+                        cliente_id=cliente["id"],
+                        quarto_numero=reserva_data.quarto_numero,
+                        tipo_suite=tipo_suite,
+                        checkin_previsto=checkin_dt,
+                        checkout_previsto=checkout_dt,
+                        valor_diaria=valor_diaria,
+                        valor_total=valor_total_base,
+                        num_diarias=num_diarias,
+                        origem="SITE",
+                        forma_pagamento=reserva_data.metodo_pagamento,
+                        observacoes=reserva_data.observacoes,
+                        telefone_contato=telefone_limpo,
+                        email_contato=reserva_data.email
+                    ),
+                    notificar=not bool(cupom_codigo)
+                )
+        except ReservaConflito as e:
+            raise HTTPException(status_code=409, detail=e.detalhes(publico=True))
 
         if cupom_codigo:
             try:
@@ -2,13 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from app.schemas.quarto_schema import QuartoCreate, QuartoUpdate, QuartoResponse, StatusQuarto, TipoSuite
 from app.services.quarto_service import QuartoService
 from app.services.disponibilidade_service import DisponibilidadeService
+from app.services.calendario_service import CalendarioService
 from app.repositories.quarto_repo import QuartoRepository
 from app.core.database import get_db
 from app.middleware.auth_middleware import get_current_active_user, require_admin, require_admin_or_manager
 from app.core.security import User
 
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 router = APIRouter(prefix="/quartos", tags=["quartos"])
 
@@ -46,6 +47,22 @@ async def listar_quartos_disponiveis(service: QuartoService = Depends(get_quarto
     """Listar quartos disponíveis"""
     return await service.get_disponiveis()
 
+@router.get("/calendario", response_model=dict)
+async def obter_calendario_disponibilidade(
+    inicio: date = Query(..., description="Primeira noite (AAAA-MM-DD)"),
+    fim: date = Query(..., description="Dia seguinte à última noite (AAAA-MM-DD)"),
+    tipo: Optional[str] = Query(None, description="Filtrar por tipo de suíte")
+):
+    """
+    Quartos livres por noite e por tipo de suíte no período
+    
+    Usado pela grade mensal do site de reservas e pelo quadro da recepção.
+    """
+    try:
+        return await CalendarioService(get_db()).consultar(inicio, fim, tipo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("", response_model=QuartoResponse)
 async def criar_quarto(
     quarto: QuartoCreate,
@@ -13,7 +13,7 @@ from app.middleware.auth_middleware import get_current_active_user, require_admi
 from app.core.security import User
 from app.middleware.idempotency import check_idempotency, store_idempotency_result
 from app.core.cache import redis_lock
-from app.core.validators import ReservaValidator, QuartoValidator
+from app.core.validators import ReservaValidator
 from app.services.cupom_service import CupomService
 from app.services.notification_service import NotificationService
 from typing import Optional
@@ -47,7 +47,9 @@ async def listar_reservas(
     checkin_inicio: Optional[str] = Query(None, description="Data checkin início (YYYY-MM-DD)"),
     checkin_fim: Optional[str] = Query(None, description="Data checkin fim (YYYY-MM-DD)"),
     limit: Optional[int] = Query(100, description="Limite de resultados"),
-    offset: Optional[int] = Query(0, description="Offset para paginação")
+    offset: Optional[int] = Query(0, description="Offset para paginação"),
+    view: Optional[str] = Query(None, description="Perfil de campos: card, list ou detail (padrão)"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (sobrepõe view)")
 ):
     """Listar todas as reservas - Requer autenticação"""
     return await service.list_all(
@@ -56,7 +58,9 @@ async def listar_reservas(
         checkin_inicio=checkin_inicio,
         checkin_fim=checkin_fim,
         limit=limit,
-        offset=offset
+        offset=offset,
+        view=view,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None
     )
 
 @router.get("/ultimas", response_model=dict)
@@ -194,16 +198,8 @@ async def criar_reserva(
     
     try:
         async with redis_lock(lock_key, timeout=10):
-            # CAMADA 4: Validar disponibilidade do quarto
-            db = get_db()
-            await QuartoValidator.validar_disponibilidade(
-                reserva.quarto_numero,
-                checkin_date,
-                checkout_date,
-                db
-            )
-            
-            # CAMADA 5: Criar reserva
+            # CAMADA 4: Criar reserva (disponibilidade validada no INSERT;
+            # conflito volta 409 com reservas conflitantes e alternativas)
             nova_reserva = await service.create(
                 reserva,
                 criado_por_funcionario_id=current_user.id,
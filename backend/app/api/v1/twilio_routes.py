@@ -11,11 +11,6 @@ from app.core.database import get_db
 from app.services.checkin_cash_approval_service import CheckinCashApprovalService
 from app.services.whatsapp_service import get_whatsapp_service
 
-try:
-    from twilio.request_validator import RequestValidator
-except ImportError:
-    RequestValidator = None
-
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/twilio/whatsapp", tags=["twilio-whatsapp"])
@@ -45,7 +40,12 @@ def _twilio_signature_valida(request: Request, params: dict) -> bool:
     """Valida X-Twilio-Signature. Sem o auth token (ou sem a lib) nao ha como
     validar — retorna False e as acoes CHK nao sao executadas."""
     auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-    if not auth_token or RequestValidator is None:
+    if not auth_token:
+        return False
+    try:
+        # SDK carregado so no primeiro webhook, nao no boot do worker
+        from twilio.request_validator import RequestValidator
+    except ImportError:
         return False
     signature = request.headers.get("X-Twilio-Signature", "")
     if not signature:
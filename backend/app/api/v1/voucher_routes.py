@@ -9,13 +9,6 @@ from datetime import datetime
 from typing import Any, Optional
 from app.utils.datetime_utils import now_utc, to_utc
 from app.core.database import get_db
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch, cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 import io
 import os
 from app.services.voucher_service import (
@@ -432,6 +425,12 @@ async def listar_vouchers(
 @router.get("/{codigo}/pdf")
 async def gerar_pdf_voucher(codigo: str):
     """Gerar PDF do voucher no formato padrao do Hotel Real"""
+    # reportlab so e carregado na primeira geracao de PDF, nao no boot do worker
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 
     db = get_db()
 
@@ -8,7 +8,6 @@ from typing import Optional, Any
 import json
 from contextlib import asynccontextmanager
 import asyncio
-import uuid
 import hashlib
 from functools import wraps
 import os
@@ -136,6 +135,10 @@ class CacheManager:
 # Instância global
 cache = CacheManager()
 
+# Chaves do local_cache compartilhadas entre servicos e repositorios
+# (o repositorio invalida o que o servico cacheia).
+PREMIOS_CATALOGO_CACHE = "jornada:premios_catalogo"
+
 
 def _generate_cache_key(prefix: str, args: tuple, kwargs: dict) -> str:
     """Gerar chave de cache única"""
@@ -208,34 +211,9 @@ async def redis_lock(key: str, timeout: int = 10):
     Raises:
         TimeoutError: Se não conseguir adquirir lock
     """
-    lock_key = f"lock:{key}"
-    lock_value = str(uuid.uuid4())
-    
-    # Tentar adquirir lock
-    acquired = False
-    for _ in range(timeout * 10):  # Tentar por timeout segundos
-        if cache.redis:
-            acquired = await cache.redis.set(
-                lock_key,
-                lock_value,
-                ex=timeout,
-                nx=True  # Set only if not exists
-            )
-            if acquired:
-                break
-        await asyncio.sleep(0.1)
-    
-    if not acquired:
-        raise TimeoutError(f"Não foi possível adquirir lock: {key}")
-    
-    try:
+    # Delega para o lock compartilhado (app.core.locks): espera por pub/sub,
+    # liberacao atomica e, sem Redis, lock local em vez de timeout certo.
+    from app.core.locks import lock_distribuido
+
+    async with lock_distribuido(key, timeout_segundos=timeout, ttl_segundos=timeout):
         yield
-    finally:
-        # Liberar lock apenas se ainda é nosso
-        if cache.redis:
-            try:
-                current = await cache.redis.get(lock_key)
-                if current == lock_value:
-                    await cache.redis.delete(lock_key)
-            except Exception as e:
-                print(f"[LOCK] Erro ao liberar lock {key}: {e}")
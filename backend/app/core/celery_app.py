@@ -12,6 +12,9 @@ celery_app = Celery(
         "app.tasks.relatorio_tasks",
         "app.tasks.limpeza_tasks",
         "app.tasks.jornada_tasks",
+        "app.tasks.calendario_tasks",
+        "app.tasks.pagamento_tasks",
+        "app.tasks.notificacao_tasks",
     ],
 )
 
@@ -46,5 +49,49 @@ celery_app.conf.update(
             "task": "jornada.notificar_premios_proximos",
             "schedule": crontab(minute="0,30"),
         },
+        "jornada-detectar-checkouts-vencidos": {
+            "task": "jornada.detectar_checkouts_vencidos",
+            "schedule": crontab(minute="*"),
+        },
+        "jornada-reconciliar-fila-checkouts": {
+            "task": "jornada.reconciliar_fila_checkouts",
+            "schedule": crontab(minute="*/15"),
+        },
+        "antifraude-recalcular-marcados": {
+            "task": "antifraude.recalcular_marcados",
+            "schedule": crontab(minute="*"),
+        },
+        "antifraude-recalcular-todos": {
+            "task": "antifraude.recalcular_todos",
+            "schedule": crontab(hour=3, minute=30),
+        },
+        "calendario-reconstruir": {
+            "task": "calendario.reconstruir",
+            "schedule": crontab(minute="*/30"),
+        },
+        # Segundos, nao crontab: pagamentos novos sao consultados a cada 15s
+        # (o backoff por idade fica na fila, ver conciliacao_pagamento_service).
+        "pagamentos-conciliar-gateway": {
+            "task": "pagamentos.conciliar_gateway",
+            "schedule": 15.0,
+        },
+        "pagamentos-reconciliar-fila-conciliacao": {
+            "task": "pagamentos.reconciliar_fila_conciliacao",
+            "schedule": crontab(minute="*/10"),
+        },
+        # Toda hora, nao so de madrugada: um hold vencido as 10h nao deve
+        # segurar o quarto ate a noite. No-shows entram na primeira apos 00h.
+        "limpeza-varrer-reservas": {
+            "task": "limpeza.varrer_reservas",
+            "schedule": crontab(minute=10),
+        },
+        "limpeza-aplicar-retencao": {
+            "task": "limpeza.aplicar_retencao",
+            "schedule": crontab(hour=4, minute=15),
+        },
+        "notificacoes-reconciliar-contadores": {
+            "task": "notificacoes.reconciliar_contadores",
+            "schedule": crontab(minute="*/10"),
+        },
     },
 )
@@ -82,9 +82,35 @@ class Settings(BaseSettings):
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", 6379))
 
+    # Lock de reserva por quarto/periodo: "auto" (Redis se conectado, senao
+    # Postgres), "redis" ou "postgres"
+    RESERVA_LOCK_BACKEND: str = os.getenv("RESERVA_LOCK_BACKEND", "auto").strip().lower()
+    RESERVA_LOCK_TIMEOUT_SECONDS: float = float(os.getenv("RESERVA_LOCK_TIMEOUT_SECONDS", "5"))
+    RESERVA_LOCK_TTL_SECONDS: float = float(os.getenv("RESERVA_LOCK_TTL_SECONDS", "15"))
+    RESERVA_LOCK_BALDE_DIAS: int = int(os.getenv("RESERVA_LOCK_BALDE_DIAS", "7"))
+    # INSERT direto deixando a constraint de exclusao (migration 016) arbitrar
+    # a disputa; "false" volta para checagem previa sob o lock acima
+    RESERVA_INSERCAO_OTIMISTA: bool = os.getenv("RESERVA_INSERCAO_OTIMISTA", "true").lower() == "true"
+    # Micro-cache de /public/quartos/disponiveis (derrubado a cada reserva)
+    DISPONIBILIDADE_PUBLICA_TTL_SECONDS: int = int(os.getenv("DISPONIBILIDADE_PUBLICA_TTL_SECONDS", "10"))
+
+    # Aquecimento do worker antes de receber trafego (app/core/warmup.py)
+    WARMUP_BLOQUEANTE: bool = os.getenv("WARMUP_BLOQUEANTE", "true").lower() == "true"
+    WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+    WARMUP_DB_TENTATIVAS: int = int(os.getenv("WARMUP_DB_TENTATIVAS", "5"))
+
+    # Middlewares opcionais (app/middlewares/pilha.py)
+    AUDIT_LOGGING_ENABLED: bool = os.getenv("AUDIT_LOGGING_ENABLED", "false").lower() == "true"
+    IDEMPOTENCY_MIDDLEWARE_ENABLED: bool = os.getenv("IDEMPOTENCY_MIDDLEWARE_ENABLED", "false").lower() == "true"
+
     # Celery
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/1")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/2")
+    # Retencao (app/services/retencao_service.py): arquivos .jsonl.gz das linhas arquivadas.
+    # Tem dados pessoais: nunca dentro de media/ (servido sem autenticacao em /media).
+    RETENCAO_ARQUIVO_DIR: str = os.getenv("RETENCAO_ARQUIVO_DIR", "arquivo")
+    # Varredura de reservas (app/services/limpeza_reservas_service.py): idade do hold nao pago
+    RESERVA_HOLD_PRAZO_HORAS: int = int(os.getenv("RESERVA_HOLD_PRAZO_HORAS", "24"))
     
     # Cookie Configuration
     COOKIE_NAME: str = os.getenv("COOKIE_NAME", "hotel_auth_token")
@@ -42,6 +42,11 @@ def _positive_int(value: str) -> Optional[int]:
     return parsed if parsed >= 1 else None
 
 
+def prisma_connection_limit() -> int:
+    """Tamanho do pool do query engine deste processo (teto de PRISMA_CONNECTION_LIMIT)."""
+    return _get_int_env("PRISMA_CONNECTION_LIMIT", DEFAULT_PRISMA_CONNECTION_LIMIT)
+
+
 def configure_prisma_url(
     url: str,
     application_name: Optional[str] = None,
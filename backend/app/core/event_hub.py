@@ -0,0 +1,244 @@
+"""
+Hub de eventos para a UI da equipe (SSE).
+
+Publicacao: cada evento entra no Redis Stream do perfil de destino
+(`eventos:perfil:{PERFIL}`, limitado a EVENTOS_STREAM_MAXLEN entradas) e e
+anunciado no canal pub/sub de mesmo nome. Cada worker do gunicorn mantem UMA
+assinatura pub/sub (PSUBSCRIBE) enquanto tiver conexoes SSE abertas e
+distribui os eventos para elas em memoria; o numero de conexoes Redis nao
+cresce com o numero de abas.
+
+Reconexao: o id do evento e o id do Stream. O EventSource reenvia o ultimo id
+em Last-Event-ID e o hub reenvia (XREAD) o que a aba perdeu. Se a assinatura
+pub/sub cair ou a fila de uma conexao lotar, a conexao e encerrada e o
+navegador reconecta pelo mesmo caminho, sem perder eventos.
+
+Publicar nunca levanta excecao: evento perdido so atrasa a UI ate o proximo
+polling de seguranca, nao pode derrubar uma reserva ou um check-in.
+"""
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import redis.asyncio as redis
+
+from app.core.cache import cache
+
+
+EVENTOS_PREFIXO = "eventos:perfil:"
+EVENTOS_STREAM_MAXLEN = 500
+EVENTOS_REPLAY_MAX = 200
+EVENTOS_FILA_MAX = 100
+EVENTOS_HEARTBEAT_SEGUNDOS = 15
+
+# Destino padrao: toda a equipe (mesma semantica de notificacoes.perfil NULL).
+PERFIS_EQUIPE = ("ADMIN", "GERENTE", "RECEPCAO")
+# RECEPCIONISTA e o alias legado de RECEPCAO (ver notificacao_repo).
+_PERFIL_ALIASES = {"RECEPCIONISTA": "RECEPCAO"}
+
+# Sinal interno para encerrar uma conexao (fila lotada / pub/sub reiniciado).
+_ENCERRAR = object()
+
+
+def normalizar_perfil(perfil: Any) -> str:
+    texto = str(getattr(perfil, "value", perfil) or "").strip().upper()
+    return _PERFIL_ALIASES.get(texto, texto)
+
+
+def perfis_destino(perfis: Union[None, str, Iterable[str]]) -> List[str]:
+    """Aceita None (toda a equipe), lista ou o formato "ADMIN,RECEPCAO" de notificacoes."""
+    if not perfis:
+        return list(PERFIS_EQUIPE)
+    if isinstance(perfis, str):
+        perfis = perfis.split(",")
+    destino: List[str] = []
+    for perfil in perfis:
+        normalizado = normalizar_perfil(perfil)
+        if normalizado and normalizado not in destino:
+            destino.append(normalizado)
+    return destino or list(PERFIS_EQUIPE)
+
+
+def _id_tupla(evento_id: Optional[str]) -> Optional[Tuple[int, int]]:
+    try:
+        ms, seq = str(evento_id).split("-", 1)
+        return int(ms), int(seq)
+    except (TypeError, ValueError):
+        return None
+
+
+class EventHub:
+    def __init__(self):
+        self._assinantes: Dict[str, Set[asyncio.Queue]] = {}
+        self._ouvinte: Optional[asyncio.Task] = None
+        self._redis_proprio: Optional[redis.Redis] = None
+
+    def _redis(self) -> redis.Redis:
+        # Na API usa a conexao do CacheManager; no worker Celery (onde o cache
+        # nao e conectado) abre um client proprio na primeira publicacao.
+        if cache.redis is not None:
+            return cache.redis
+        if self._redis_proprio is None:
+            self._redis_proprio = redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                encoding="utf-8",
+                decode_responses=True,
+                socket_timeout=3,
+                socket_connect_timeout=3,
+            )
+        return self._redis_proprio
+
+    async def publicar(
+        self,
+        tipo: str,
+        dados: Optional[Dict[str, Any]] = None,
+        perfis: Union[None, str, Iterable[str]] = None,
+    ) -> None:
+        try:
+            cliente = self._redis()
+            corpo = json.dumps({"tipo": tipo, "dados": dados or {}}, default=str)
+            for perfil in perfis_destino(perfis):
+                canal = f"{EVENTOS_PREFIXO}{perfil}"
+                evento_id = await cliente.xadd(
+                    canal, {"evento": corpo}, maxlen=EVENTOS_STREAM_MAXLEN, approximate=True
+                )
+                await cliente.publish(canal, json.dumps({"id": evento_id, "evento": corpo}))
+        except Exception as exc:
+            print(f"[EVENTOS] Falha ao publicar {tipo}: {exc}")
+
+    async def assinar(
+        self,
+        perfil: Any,
+        ultimo_id: Optional[str] = None,
+        heartbeat_segundos: float = EVENTOS_HEARTBEAT_SEGUNDOS,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Eventos do perfil a partir de `ultimo_id`; rende None a cada heartbeat."""
+        perfil = normalizar_perfil(perfil)
+        fila: asyncio.Queue = asyncio.Queue(maxsize=EVENTOS_FILA_MAX)
+        # Registra a fila antes do replay: o que chegar durante o XREAD fica
+        # enfileirado e e descartado abaixo se ja tiver sido reenviado.
+        self._assinantes.setdefault(perfil, set()).add(fila)
+        self._garantir_ouvinte()
+        try:
+            entregue = _id_tupla(ultimo_id)
+            if entregue:
+                for evento in await self._replay(perfil, ultimo_id):
+                    entregue = _id_tupla(evento["id"])
+                    yield evento
+
+            while True:
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=heartbeat_segundos)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if evento is _ENCERRAR:
+                    return
+                evento_id = _id_tupla(evento["id"])
+                if entregue and evento_id and evento_id <= entregue:
+                    continue
+                entregue = evento_id or entregue
+                yield evento
+        finally:
+            assinantes = self._assinantes.get(perfil)
+            if assinantes is not None:
+                assinantes.discard(fila)
+                if not assinantes:
+                    self._assinantes.pop(perfil, None)
+
+    async def _replay(self, perfil: str, ultimo_id: str) -> List[Dict[str, Any]]:
+        try:
+            resposta = await self._redis().xread(
+                {f"{EVENTOS_PREFIXO}{perfil}": ultimo_id}, count=EVENTOS_REPLAY_MAX
+            )
+        except Exception as exc:
+            print(f"[EVENTOS] Replay indisponivel para {perfil}: {exc}")
+            return []
+        eventos = []
+        for _canal, entradas in resposta or []:
+            for evento_id, campos in entradas:
+                evento = self._decodificar(evento_id, campos.get("evento"))
+                if evento:
+                    eventos.append(evento)
+        return eventos
+
+    @staticmethod
+    def _decodificar(evento_id: str, corpo: Optional[str]) -> Optional[Dict[str, Any]]:
+        try:
+            conteudo = json.loads(corpo or "")
+        except (TypeError, ValueError):
+            return None
+        return {"id": evento_id, "tipo": conteudo.get("tipo"), "dados": conteudo.get("dados") or {}}
+
+    def _garantir_ouvinte(self) -> None:
+        if self._ouvinte is None or self._ouvinte.done():
+            self._ouvinte = asyncio.create_task(self._ouvir())
+
+    async def _ouvir(self) -> None:
+        # Uma assinatura por worker, so enquanto houver conexoes abertas.
+        while self._assinantes:
+            pubsub = None
+            try:
+                pubsub = self._redis().pubsub()
+                await pubsub.psubscribe(f"{EVENTOS_PREFIXO}*")
+                while self._assinantes:
+                    mensagem = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if mensagem:
+                        self._despachar(mensagem)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[EVENTOS] Assinatura pub/sub caiu: {exc}")
+                # Eventos publicados enquanto a assinatura estava fora nao
+                # chegaram; encerra as conexoes para que reconectem com replay.
+                self._encerrar_todas()
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def _despachar(self, mensagem: Dict[str, Any]) -> None:
+        canal = mensagem.get("channel") or ""
+        perfil = canal[len(EVENTOS_PREFIXO):] if canal.startswith(EVENTOS_PREFIXO) else None
+        filas = self._assinantes.get(perfil) if perfil else None
+        if not filas:
+            return
+        try:
+            envelope = json.loads(mensagem.get("data") or "")
+        except (TypeError, ValueError):
+            return
+        evento = self._decodificar(envelope.get("id"), envelope.get("evento"))
+        if not evento:
+            return
+        for fila in list(filas):
+            try:
+                fila.put_nowait(evento)
+            except asyncio.QueueFull:
+                self._encerrar_fila(fila)
+
+    @staticmethod
+    def _encerrar_fila(fila: asyncio.Queue) -> None:
+        while not fila.empty():
+            fila.get_nowait()
+        fila.put_nowait(_ENCERRAR)
+
+    def _encerrar_todas(self) -> None:
+        for filas in self._assinantes.values():
+            for fila in list(filas):
+                self._encerrar_fila(fila)
+
+
+# Instância global
+event_hub = EventHub()
+
+
+async def publicar_evento(
+    tipo: str,
+    dados: Optional[Dict[str, Any]] = None,
+    perfis: Union[None, str, Iterable[str]] = None,
+) -> None:
+    await event_hub.publicar(tipo, dados, perfis)
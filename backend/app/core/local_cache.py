@@ -0,0 +1,98 @@
+"""
+Cache em memoria (por worker) para dados de referencia versionados.
+
+Niveis, configuracoes e catalogos mudam raramente mas eram relidos do banco a
+cada request. Cada entrada guarda a versao com que foi carregada; a versao
+oficial fica no Redis (INCR em cada escrita), entao uma invalidacao feita em
+um worker derruba o cache de todos. A versao remota e consultada no maximo a
+cada `checagem_versao_segundos` para nao trocar uma ida ao banco por uma ida
+ao Redis em toda leitura. Sem Redis, vale apenas o TTL.
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.cache import cache
+
+
+DEFAULT_LOCAL_CACHE_TTL_SECONDS = 300
+DEFAULT_VERSION_CHECK_SECONDS = 5
+
+
+class _Entrada:
+    __slots__ = ("valor", "versao", "carregado_em", "ttl")
+
+    def __init__(self, valor: Any, versao: Optional[str], ttl: int):
+        self.valor = valor
+        self.versao = versao
+        self.carregado_em = time.monotonic()
+        self.ttl = ttl
+
+
+class LocalVersionedCache:
+    def __init__(
+        self,
+        ttl_segundos: int = DEFAULT_LOCAL_CACHE_TTL_SECONDS,
+        checagem_versao_segundos: float = DEFAULT_VERSION_CHECK_SECONDS,
+    ):
+        self.ttl_segundos = ttl_segundos
+        self.checagem_versao_segundos = checagem_versao_segundos
+        self._entradas: Dict[str, _Entrada] = {}
+        self._versoes: Dict[str, Optional[str]] = {}
+        self._versao_checada_em: Dict[str, float] = {}
+
+    @staticmethod
+    def _versao_key(nome: str) -> str:
+        return f"local-cache:{nome}:versao"
+
+    async def _versao_atual(self, nome: str) -> Optional[str]:
+        agora = time.monotonic()
+        checada_em = self._versao_checada_em.get(nome)
+        if checada_em is not None and (agora - checada_em) < self.checagem_versao_segundos:
+            return self._versoes.get(nome)
+
+        versao = self._versoes.get(nome)
+        if cache.redis is not None:
+            try:
+                versao = await cache.redis.get(self._versao_key(nome))
+            except Exception as exc:
+                print(f"[LOCAL CACHE] Versao de {nome} indisponivel: {exc}")
+        self._versoes[nome] = versao
+        self._versao_checada_em[nome] = agora
+        return versao
+
+    async def get_or_load(
+        self,
+        nome: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+    ) -> Any:
+        versao = await self._versao_atual(nome)
+        entrada = self._entradas.get(nome)
+        if (
+            entrada is not None
+            and entrada.versao == versao
+            and (time.monotonic() - entrada.carregado_em) < entrada.ttl
+        ):
+            return entrada.valor
+
+        valor = await loader()
+        self._entradas[nome] = _Entrada(valor, versao, ttl if ttl is not None else self.ttl_segundos)
+        return valor
+
+    async def invalidate(self, *nomes: str) -> None:
+        """Derruba as entradas neste worker e, via Redis, nos demais."""
+        for nome in nomes:
+            self._entradas.pop(nome, None)
+            nova_versao = await cache.incr(self._versao_key(nome))
+            if nova_versao:
+                self._versoes[nome] = str(nova_versao)
+                self._versao_checada_em[nome] = time.monotonic()
+
+    def clear(self) -> None:
+        self._entradas.clear()
+        self._versoes.clear()
+        self._versao_checada_em.clear()
+
+
+# Instância global
+local_cache = LocalVersionedCache()
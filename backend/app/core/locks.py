@@ -0,0 +1,359 @@
+"""
+Lock distribuido assincrono compartilhado pelo backend (Redis).
+
+- Aquisicao: SET NX PX com um token aleatorio por dono, num script Lua que ja
+  devolve o PTTL de quem segura o lock quando ele esta ocupado.
+- Espera sem polling: quem libera publica em LOCK_CANAL_PREFIXO + chave e cada
+  worker mantem UMA assinatura (PSUBSCRIBE) enquanto houver alguem esperando,
+  acordando os waiters locais daquela chave. Um dono que morre nao publica
+  nada, entao cada espera e limitada pelo PTTL restante: quando o lease
+  expira a proxima tentativa ja consegue.
+- Liberacao: compare-and-delete + PUBLISH atomicos (Lua).
+- Lease: com `renovar=True` uma task estende o PX a cada ttl/3 enquanto o dono
+  segura o lock (finalizacao TEF pode demorar mais que o TTL). Se a renovacao
+  encontra o lock com outro dono, `LockAdquirido.perdido` vira True.
+- Sem Redis: asyncio.Lock local por chave num WeakValueDictionary (a entrada
+  some quando ninguem mais usa a chave), valendo so para o processo.
+- Metricas por nome de lock, por processo: espera, tempo de posse, timeouts,
+  falhas e leases perdidos.
+
+`executar_uma_vez` e o guard entre workers (startup): so o primeiro dentro do
+TTL executa. O lock de quarto/periodo das reservas (multiplas chaves com
+fencing, ver reserva_lock_service) usa a mesma espera e as mesmas metricas.
+"""
+import asyncio
+import secrets
+import time
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.cache import cache
+
+
+LOCK_PREFIXO = "lock:"
+LOCK_CANAL_PREFIXO = "lock:liberado:"
+# Espera acima disso vira log/metrica: indica disputa real pela mesma chave.
+LOCK_ESPERA_LENTA_MS = 1000
+# Rede de seguranca de cada espera com a assinatura ativa (aviso perdido).
+LOCK_ESPERA_MAXIMA_SEGUNDOS = 2.0
+# Sem assinatura (subindo, caiu ou Redis sem pub/sub) a espera e curta.
+LOCK_ESPERA_SEM_AVISO_SEGUNDOS = 0.1
+
+# KEYS[1] = chave; ARGV = token, ttl_ms. {1, 0} adquirido / {0, pttl} ocupado.
+_ADQUIRIR_LUA = """
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+  return {1, 0}
+end
+return {0, redis.call('pttl', KEYS[1])}
+"""
+
+# KEYS[1] = chave; ARGV = token, canal
+_LIBERAR_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  redis.call('del', KEYS[1])
+  redis.call('publish', ARGV[2], '1')
+  return 1
+end
+return 0
+"""
+
+# KEYS[1] = chave; ARGV = token, ttl_ms
+_RENOVAR_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LockTimeout(TimeoutError):
+    """Outro dono segura a chave alem do tempo de espera."""
+
+
+def canal_liberacao(chave_redis: str) -> str:
+    return f"{LOCK_CANAL_PREFIXO}{chave_redis}"
+
+
+class MetricasLock:
+    """Espera e posse por nome de lock (ou backend), por processo."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self._por_nome: Dict[str, Dict[str, float]] = {}
+
+    def _dados(self, nome: str) -> Dict[str, float]:
+        return self._por_nome.setdefault(nome, {
+            "adquiridos": 0,
+            "timeouts": 0,
+            "falhas": 0,
+            "ocupados": 0,
+            "espera_total_ms": 0.0,
+            "espera_max_ms": 0.0,
+            "esperas_lentas": 0,
+            "liberados": 0,
+            "posse_total_ms": 0.0,
+            "posse_max_ms": 0.0,
+            "leases_perdidos": 0,
+        })
+
+    def registrar(self, nome: str, espera_ms: float, resultado: str) -> None:
+        dados = self._dados(nome)
+        dados[resultado] += 1
+        dados["espera_total_ms"] += espera_ms
+        dados["espera_max_ms"] = max(dados["espera_max_ms"], espera_ms)
+        if espera_ms >= LOCK_ESPERA_LENTA_MS:
+            dados["esperas_lentas"] += 1
+
+    def registrar_posse(self, nome: str, posse_ms: float, perdido: bool = False) -> None:
+        dados = self._dados(nome)
+        dados["liberados"] += 1
+        dados["posse_total_ms"] += posse_ms
+        dados["posse_max_ms"] = max(dados["posse_max_ms"], posse_ms)
+        if perdido:
+            dados["leases_perdidos"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        resumo = {}
+        for nome, dados in self._por_nome.items():
+            tentativas = dados["adquiridos"] + dados["timeouts"] + dados["falhas"]
+            resumo[nome] = {
+                **dados,
+                "espera_media_ms": round(dados["espera_total_ms"] / tentativas, 2) if tentativas else 0.0,
+                "posse_media_ms": (
+                    round(dados["posse_total_ms"] / dados["liberados"], 2) if dados["liberados"] else 0.0
+                ),
+            }
+        return resumo
+
+
+metricas_lock = MetricasLock()
+
+
+class _OuvinteLiberacao:
+    """Uma assinatura pub/sub por worker, viva so enquanto ha waiters."""
+
+    def __init__(self):
+        self._esperas: Dict[str, Set[asyncio.Event]] = {}
+        self._tarefa: Optional[asyncio.Task] = None
+        self._falhou_em = 0.0
+        self.ativo = False
+
+    def registrar(self, chaves: Iterable[str]) -> asyncio.Event:
+        # Registra antes de tentar adquirir: uma liberacao entre a tentativa
+        # e o wait ja deixa o evento setado.
+        evento = asyncio.Event()
+        for chave in chaves:
+            self._esperas.setdefault(chave, set()).add(evento)
+        self._garantir()
+        return evento
+
+    def remover(self, chaves: Iterable[str], evento: asyncio.Event) -> None:
+        for chave in chaves:
+            eventos = self._esperas.get(chave)
+            if eventos is not None:
+                eventos.discard(evento)
+                if not eventos:
+                    self._esperas.pop(chave, None)
+
+    def avisar(self, chave: str) -> None:
+        for evento in list(self._esperas.get(chave, ())):
+            evento.set()
+
+    def _garantir(self) -> None:
+        if (
+            self._tarefa is not None
+            and not self._tarefa.done()
+            and self._tarefa.get_loop() is asyncio.get_running_loop()
+        ):
+            return
+        # Redis sem pub/sub: nao tenta reassinar a cada espera.
+        if time.monotonic() - self._falhou_em < 1.0:
+            return
+        self._tarefa = asyncio.create_task(self._ouvir())
+
+    async def _ouvir(self) -> None:
+        pubsub = None
+        try:
+            pubsub = cache.redis.pubsub()
+            await pubsub.psubscribe(f"{LOCK_CANAL_PREFIXO}*")
+            self.ativo = True
+            while self._esperas:
+                mensagem = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not mensagem:
+                    continue
+                canal = mensagem.get("channel") or ""
+                if isinstance(canal, bytes):
+                    canal = canal.decode()
+                if canal.startswith(LOCK_CANAL_PREFIXO):
+                    self.avisar(canal[len(LOCK_CANAL_PREFIXO):])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self._falhou_em = time.monotonic()
+            print(f"[LOCK] Assinatura de liberacoes indisponivel, waiters reconferem por tempo: {exc}")
+        finally:
+            self.ativo = False
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+ouvinte_liberacao = _OuvinteLiberacao()
+
+
+async def aguardar_liberacao(evento: asyncio.Event, limite: float, pttl_ms: Optional[int] = None) -> None:
+    """Dorme ate o aviso de liberacao, o fim do lease de quem segura ou o limite."""
+    teto = LOCK_ESPERA_MAXIMA_SEGUNDOS if ouvinte_liberacao.ativo else LOCK_ESPERA_SEM_AVISO_SEGUNDOS
+    espera = min(teto, max(0.0, limite - time.monotonic()))
+    if pttl_ms is not None and pttl_ms >= 0:
+        espera = min(espera, pttl_ms / 1000 + 0.005)
+    try:
+        await asyncio.wait_for(evento.wait(), timeout=espera)
+    except asyncio.TimeoutError:
+        pass
+    evento.clear()
+
+
+@dataclass
+class LockAdquirido:
+    chave: str
+    backend: str
+    token: Optional[str] = None
+    espera_ms: float = 0.0
+    perdido: bool = False
+
+
+_LOCKS_LOCAIS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _nome_metrica(chave: str) -> str:
+    return chave.split(":", 1)[0]
+
+
+@asynccontextmanager
+async def lock_distribuido(
+    chave: str,
+    timeout_segundos: float = 10.0,
+    ttl_segundos: float = 30.0,
+    renovar: bool = False,
+    nome: Optional[str] = None,
+) -> AsyncIterator[LockAdquirido]:
+    """
+    Exclusao mutua entre workers na chave `lock:{chave}`.
+
+    Levanta LockTimeout se nao adquirir em `timeout_segundos`. `ttl_segundos`
+    e o lease; com `renovar` ele e estendido enquanto o bloco roda.
+    """
+    nome = nome or _nome_metrica(chave)
+    inicio = time.monotonic()
+    if cache.redis is None:
+        lock, local = await _adquirir_local(chave, nome, inicio, timeout_segundos)
+        try:
+            yield lock
+        finally:
+            local.release()
+            metricas_lock.registrar_posse(nome, (time.monotonic() - inicio) * 1000 - lock.espera_ms)
+        return
+
+    chave_redis = f"{LOCK_PREFIXO}{chave}"
+    token = secrets.token_hex(16)
+    ttl_ms = max(1, int(ttl_segundos * 1000))
+    limite = inicio + timeout_segundos
+    evento: Optional[asyncio.Event] = None
+    try:
+        while True:
+            adquirido, pttl = await cache.redis.eval(_ADQUIRIR_LUA, 1, chave_redis, token, ttl_ms)
+            if int(adquirido):
+                break
+            if time.monotonic() >= limite:
+                metricas_lock.registrar(nome, (time.monotonic() - inicio) * 1000, "timeouts")
+                raise LockTimeout(f"Nao foi possivel adquirir lock: {chave}")
+            if evento is None:
+                # Registrado antes da proxima tentativa: liberacao nenhuma escapa.
+                evento = ouvinte_liberacao.registrar([chave_redis])
+                continue
+            await aguardar_liberacao(evento, limite, int(pttl))
+    finally:
+        if evento is not None:
+            ouvinte_liberacao.remover([chave_redis], evento)
+
+    lock = LockAdquirido(chave=chave, backend="redis", token=token, espera_ms=(time.monotonic() - inicio) * 1000)
+    metricas_lock.registrar(nome, lock.espera_ms, "adquiridos")
+    if lock.espera_ms >= LOCK_ESPERA_LENTA_MS:
+        print(f"[LOCK] {chave} aguardou {lock.espera_ms:.0f}ms")
+
+    renovacao = asyncio.create_task(_renovar(lock, chave_redis, ttl_ms)) if renovar else None
+    adquirido_em = time.monotonic()
+    try:
+        yield lock
+    finally:
+        if renovacao is not None:
+            renovacao.cancel()
+        try:
+            liberado = await cache.redis.eval(_LIBERAR_LUA, 1, chave_redis, token, canal_liberacao(chave_redis))
+            if not int(liberado or 0):
+                lock.perdido = True
+                print(f"[LOCK] Lease de {chave} expirou antes da liberacao")
+            # Waiters deste processo nao precisam esperar o pub/sub.
+            ouvinte_liberacao.avisar(chave_redis)
+        except Exception as exc:
+            print(f"[LOCK] Erro ao liberar {chave}: {exc}")
+        metricas_lock.registrar_posse(nome, (time.monotonic() - adquirido_em) * 1000, lock.perdido)
+
+
+async def _adquirir_local(
+    chave: str, nome: str, inicio: float, timeout_segundos: float
+) -> Tuple[LockAdquirido, asyncio.Lock]:
+    # O dono guarda a referencia forte; o WeakValueDictionary so compartilha.
+    local = _LOCKS_LOCAIS.get(chave)
+    if local is None:
+        local = asyncio.Lock()
+        _LOCKS_LOCAIS[chave] = local
+    try:
+        await asyncio.wait_for(local.acquire(), timeout=timeout_segundos)
+    except asyncio.TimeoutError:
+        metricas_lock.registrar(nome, (time.monotonic() - inicio) * 1000, "timeouts")
+        raise LockTimeout(f"Nao foi possivel adquirir lock: {chave}") from None
+    lock = LockAdquirido(chave=chave, backend="local", espera_ms=(time.monotonic() - inicio) * 1000)
+    metricas_lock.registrar(nome, lock.espera_ms, "adquiridos")
+    return lock, local
+
+
+async def _renovar(lock: LockAdquirido, chave_redis: str, ttl_ms: int) -> None:
+    intervalo = ttl_ms / 3000
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            renovado = await cache.redis.eval(_RENOVAR_LUA, 1, chave_redis, lock.token, ttl_ms)
+        except Exception as exc:
+            # Falha transitoria: o lease ainda vale ate o PX atual; tenta de novo.
+            print(f"[LOCK] Erro ao renovar {lock.chave}: {exc}")
+            continue
+        if not int(renovado or 0):
+            lock.perdido = True
+            print(f"[LOCK] Lease de {lock.chave} perdido durante a execucao")
+            return
+
+
+async def executar_uma_vez(chave: str, ttl_segundos: int, nome: Optional[str] = None) -> bool:
+    """
+    Guard entre workers: True so para o primeiro que chegar dentro do TTL.
+    Sem Redis (ou com erro) devolve True: cada processo executa, como antes.
+    """
+    nome = nome or _nome_metrica(chave)
+    if cache.redis is None:
+        return True
+    try:
+        primeiro = bool(await cache.redis.set(chave, "1", ex=max(1, int(ttl_segundos)), nx=True))
+    except Exception as exc:
+        metricas_lock.registrar(nome, 0.0, "falhas")
+        print(f"[LOCK] Guard {chave} indisponivel ({exc}); prosseguindo")
+        return True
+    metricas_lock.registrar(nome, 0.0, "adquiridos" if primeiro else "ocupados")
+    return primeiro
@@ -10,6 +10,15 @@ from datetime import datetime
 # SYS-001 FIX: Usar estados consistentes com enums.py
 
 from app.schemas.status_enums import StatusReserva, StatusPagamento
+from app.core.transicoes_reserva import (
+    CANCELAR_RESERVA,
+    CONFIRMAR_PAGAMENTO,
+    GUARDAS,
+    REALIZAR_CHECKIN,
+    grupo_pagamento,
+    mudanca_permitida,
+    validar_transicao,
+)
 
 # Estados de reserva aceitos. O banco ainda possui valores legados e novos.
 ESTADOS_RESERVA = {
@@ -58,30 +67,8 @@ ESTADOS_HOSPEDAGEM = {
 
 # ============= VALIDADORES DE TRANSIÇÃO =============
 
-def _normalizar_reserva_status(status: str) -> str:
-    status = (status or "").upper().strip()
-    if status in {"PENDENTE", "PENDENTE_PAGAMENTO", "AGUARDANDO_PAGAMENTO"}:
-        return "PENDENTE"
-    if status in {"CONFIRMADA", "PAGA_APROVADA", "CHECKIN_LIBERADO", "CONFIRMADO"}:
-        return "CONFIRMADA"
-    if status in {"HOSPEDADO", "CHECKIN_REALIZADO", "CHECKED_IN"}:
-        return "HOSPEDADO"
-    if status in {"CHECKED_OUT", "CHECKOUT_REALIZADO", "FINALIZADA"}:
-        return "CHECKED_OUT"
-    if status in {"CANCELADO", "CANCELADA", "NO_SHOW"}:
-        return "CANCELADO"
-    return status
-
-
-def _normalizar_pagamento_status(status: str) -> str:
-    status = (status or "").upper().strip()
-    if status in {"CONFIRMADO", "PAGO", "APROVADO", "APPROVED", "CAPTURED", "AUTHORIZED"}:
-        return "CONFIRMADO"
-    if status in {"NEGADO", "RECUSADO", "FAILED", "FALHOU"}:
-        return "NEGADO"
-    if status in {"CANCELADO", "ESTORNADO"}:
-        return "ESTORNADO"
-    return status or "PENDENTE"
+# Transicoes da reserva: tabela compilada em app/core/transicoes_reserva.py.
+_normalizar_pagamento_status = grupo_pagamento
 
 
 class ReservaStateValidator:
@@ -96,13 +83,10 @@ class ReservaStateValidator:
         
         SYS-001 FIX: Regra atualizada para estados consistentes
         """
-        if _normalizar_reserva_status(status_reserva) != "PENDENTE":
-            return False, f"Reserva deve estar PENDENTE (atual: {status_reserva})"
-        
-        if _normalizar_pagamento_status(status_pagamento) != "CONFIRMADO":
-            return False, f"Pagamento deve estar CONFIRMADO antes de confirmar (atual: {status_pagamento})"
-        
-        return True, ""
+        pode, motivo = validar_transicao(
+            status_reserva, CONFIRMAR_PAGAMENTO, {"status_pagamento": status_pagamento}
+        )
+        return pode, "" if pode else motivo
     
     @staticmethod
     def pode_cancelar(status_reserva: str, status_hospedagem: str) -> Tuple[bool, str]:
@@ -111,39 +95,20 @@ class ReservaStateValidator:
         
         SYS-001 FIX: Regra atualizada para estados consistentes
         """
-        status_reserva_norm = _normalizar_reserva_status(status_reserva)
-        if status_reserva_norm == "CANCELADO":
-            return False, "Reserva já está cancelada"
-        
-        if status_reserva_norm == "CHECKED_OUT":
-            return False, "Não pode cancelar reserva que já fez check-out"
-        
-        if status_hospedagem in ["CHECKOUT_REALIZADO", "ENCERRADA"]:
-            return False, f"Não pode cancelar após checkout (hospedagem: {status_hospedagem})"
-        
-        return True, ""
+        pode, motivo = validar_transicao(
+            status_reserva, CANCELAR_RESERVA, {"status_hospedagem": status_hospedagem}
+        )
+        return pode, "" if pode else motivo
     
     @staticmethod
     def validar_transicao(status_atual: str, status_novo: str) -> Tuple[bool, str]:
         """
         SYS-001 FIX: Valida transições usando estados consistentes com enums.py
         """
-        status_atual_norm = _normalizar_reserva_status(status_atual)
-        status_novo_norm = _normalizar_reserva_status(status_novo)
-
         if status_novo not in ESTADOS_RESERVA:
             return False, f"Status inválido: {status_novo}"
         
-        # SYS-001 FIX: Transições válidas baseadas no fluxo real
-        transicoes_validas = {
-            "PENDENTE": ["CONFIRMADA", "CANCELADO"],
-            "CONFIRMADA": ["HOSPEDADO", "CANCELADO"],
-            "HOSPEDADO": ["CHECKED_OUT", "CANCELADO"],
-            "CHECKED_OUT": [],  # Estado final
-            "CANCELADO": []     # Estado final
-        }
-        
-        if status_novo_norm not in transicoes_validas.get(status_atual_norm, []):
+        if not mudanca_permitida(status_atual, status_novo):
             return False, f"Transição inválida: {status_atual} → {status_novo}"
         
         return True, ""
@@ -209,17 +174,13 @@ class HospedagemStateValidator:
         
         REGRA CRÍTICA: Check-in depende de 3 estados independentes
         """
-        # 1. Reserva deve estar confirmada (SYS-001 FIX)
-        if _normalizar_reserva_status(status_reserva) != "CONFIRMADA":
-            return False, f"❌ Reserva deve estar CONFIRMADA (atual: {status_reserva})"
-        
-        # 2. Pagamento deve estar confirmado (SYS-001 FIX)
-        if _normalizar_pagamento_status(status_pagamento) != "CONFIRMADO":
-            return False, f"❌ Pagamento deve estar CONFIRMADO (atual: {status_pagamento})"
-        
-        # 3. Hospedagem não pode ter sido iniciada
-        if status_hospedagem != "NAO_INICIADA":
-            return False, f"❌ Check-in já foi realizado (hospedagem: {status_hospedagem})"
+        pode, motivo = validar_transicao(
+            status_reserva,
+            REALIZAR_CHECKIN,
+            {"status_pagamento": status_pagamento, "status_hospedagem": status_hospedagem},
+        )
+        if not pode:
+            return False, f"❌ {motivo}"
         
         return True, "✅ Check-in pode ser realizado"
     
@@ -231,8 +192,9 @@ class HospedagemStateValidator:
         REGRA CRÍTICA: Checkout depende APENAS da hospedagem
         ⚠️ NÃO depende de pagamento (já foi pago antes)
         """
-        if status_hospedagem != "CHECKIN_REALIZADO":
-            return False, f"❌ Check-in deve ter sido realizado (atual: {status_hospedagem})"
+        motivo = GUARDAS["checkin_realizado"]({"status_hospedagem": status_hospedagem})
+        if motivo:
+            return False, f"❌ {motivo}"
         
         return True, "✅ Checkout pode ser realizado"
     
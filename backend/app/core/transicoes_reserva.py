@@ -0,0 +1,282 @@
+"""
+Tabela de transicoes da reserva, compilada no import.
+
+Fonte unica das transicoes usadas por state_validators, unified_state_validator,
+status_enums e StateMachineService. A definicao legivel (_DEFINICAO) vira:
+
+- _INDICE_ESTADO: status do banco (legados e novos) -> indice do estado canonico;
+- _DESTINO: matriz densa estado x evento -> indice do destino (-1 = proibido);
+- _GUARDAS: mesma forma, com os ids das guardas da celula;
+- _MOTIVOS: mensagem de recusa estrutural por estado x evento.
+
+Validar uma transicao e um lookup em dict + dois indices de tupla. As guardas
+(regras que dependem de pagamento, hospedagem, datas) so rodam quando a
+celula permite a transicao e o caller passa um contexto; a primeira que
+falha interrompe. Em `validar_lote` cada reserva custa um lookup; as
+guardas so rodam para as que a tabela ja permite.
+"""
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.utils.datetime_utils import now_utc, to_local
+
+
+# Eventos (mesmos valores de TransicaoEstado em state_machine_service)
+CONFIRMAR_PAGAMENTO = "CONFIRMAR_PAGAMENTO"
+REALIZAR_CHECKIN = "REALIZAR_CHECKIN"
+REALIZAR_CHECKOUT = "REALIZAR_CHECKOUT"
+CANCELAR_RESERVA = "CANCELAR_RESERVA"
+MARCAR_NO_SHOW = "MARCAR_NO_SHOW"
+EVENTOS = (CONFIRMAR_PAGAMENTO, REALIZAR_CHECKIN, REALIZAR_CHECKOUT, CANCELAR_RESERVA, MARCAR_NO_SHOW)
+
+# estado -> evento -> (destino, guardas)
+_DEFINICAO = {
+    "PENDENTE": {
+        CONFIRMAR_PAGAMENTO: ("CONFIRMADA", ("pagamento_aprovado",)),
+        CANCELAR_RESERVA: ("CANCELADO", ("hospedagem_nao_encerrada",)),
+        MARCAR_NO_SHOW: ("NO_SHOW", ("prazo_checkin_expirado",)),
+    },
+    "CONFIRMADA": {
+        REALIZAR_CHECKIN: ("HOSPEDADO", ("pagamento_aprovado", "hospedagem_nao_iniciada")),
+        CANCELAR_RESERVA: ("CANCELADO", ("hospedagem_nao_encerrada",)),
+        MARCAR_NO_SHOW: ("NO_SHOW", ("prazo_checkin_expirado", "hospedagem_nao_iniciada")),
+    },
+    "HOSPEDADO": {
+        REALIZAR_CHECKOUT: ("CHECKED_OUT", ("checkin_realizado",)),
+        CANCELAR_RESERVA: ("CANCELADO", ("hospedagem_nao_encerrada",)),
+    },
+    "CHECKED_OUT": {},
+    "CANCELADO": {},
+    "NO_SHOW": {},
+}
+
+# Status persistidos (legados e novos) -> estado canonico
+_ALIASES = {
+    "PENDENTE": (
+        "PENDENTE", "PENDENTE_PAGAMENTO", "AGUARDANDO_PAGAMENTO", "AGUARDANDO_COMPROVANTE",
+        "EM_ANALISE", "PAGA_REJEITADA",
+    ),
+    "CONFIRMADA": ("CONFIRMADA", "CONFIRMADO", "PAGA_APROVADA", "CHECKIN_LIBERADO"),
+    "HOSPEDADO": ("HOSPEDADO", "CHECKIN_REALIZADO", "CHECKED_IN"),
+    "CHECKED_OUT": ("CHECKED_OUT", "CHECKOUT_REALIZADO", "FINALIZADA"),
+    "CANCELADO": ("CANCELADO", "CANCELADA"),
+    "NO_SHOW": ("NO_SHOW",),
+}
+
+_MOTIVO_PADRAO = "Transicao {evento} nao permitida a partir de {status}"
+_MOTIVOS_EVENTO = {
+    CONFIRMAR_PAGAMENTO: {None: "Reserva deve estar PENDENTE (atual: {status})"},
+    REALIZAR_CHECKIN: {None: "Reserva deve estar CONFIRMADA (atual: {status})"},
+    REALIZAR_CHECKOUT: {None: "Reserva deve estar HOSPEDADO (atual: {status})"},
+    CANCELAR_RESERVA: {
+        None: "Reserva nao pode ser cancelada (atual: {status})",
+        "CANCELADO": "Reserva já está cancelada",
+        "NO_SHOW": "Reserva já está cancelada",
+        "CHECKED_OUT": "Não pode cancelar reserva que já fez check-out",
+    },
+    MARCAR_NO_SHOW: {None: "No-show so se aplica a reserva pendente ou confirmada (atual: {status})"},
+}
+
+
+# ============= GUARDAS =============
+
+_GRUPOS_PAGAMENTO = {
+    "CONFIRMADO": ("CONFIRMADO", "PAGO", "APROVADO", "APPROVED", "CAPTURED", "AUTHORIZED"),
+    "NEGADO": ("NEGADO", "RECUSADO", "FAILED", "FALHOU"),
+    "ESTORNADO": ("CANCELADO", "ESTORNADO"),
+}
+_GRUPO_PAGAMENTO = MappingProxyType({
+    alias: grupo for grupo, aliases in _GRUPOS_PAGAMENTO.items() for alias in aliases
+})
+
+
+def grupo_pagamento(status: Optional[str]) -> str:
+    """CONFIRMADO / NEGADO / ESTORNADO / PENDENTE (ou o proprio status, se desconhecido)."""
+    status = (status or "").upper().strip()
+    return _GRUPO_PAGAMENTO.get(status, status or "PENDENTE")
+
+
+def _pagamento_aprovado(ctx: Mapping[str, Any]) -> Optional[str]:
+    status = ctx.get("status_pagamento")
+    if grupo_pagamento(status) != "CONFIRMADO":
+        return f"Pagamento deve estar CONFIRMADO (atual: {status})"
+    return None
+
+
+def _hospedagem_nao_iniciada(ctx: Mapping[str, Any]) -> Optional[str]:
+    status = ctx.get("status_hospedagem") or "NAO_INICIADA"
+    if status != "NAO_INICIADA":
+        return f"Check-in já foi realizado (hospedagem: {status})"
+    return None
+
+
+def _checkin_realizado(ctx: Mapping[str, Any]) -> Optional[str]:
+    status = ctx.get("status_hospedagem")
+    if status != "CHECKIN_REALIZADO":
+        return f"Check-in deve ter sido realizado (atual: {status})"
+    return None
+
+
+def _hospedagem_nao_encerrada(ctx: Mapping[str, Any]) -> Optional[str]:
+    status = ctx.get("status_hospedagem")
+    if status in ("CHECKOUT_REALIZADO", "ENCERRADA"):
+        return f"Não pode cancelar após checkout (hospedagem: {status})"
+    return None
+
+
+def _prazo_checkin_expirado(ctx: Mapping[str, Any]) -> Optional[str]:
+    checkin = to_local(ctx.get("checkin_previsto"))
+    if checkin is None:
+        return "Check-in previsto desconhecido"
+    # Prazo: fim do dia (horario do hotel) do check-in previsto.
+    limite = checkin.replace(hour=23, minute=59, second=0, microsecond=0)
+    if (ctx.get("agora") or now_utc()) < limite:
+        return f"Muito cedo para no-show. Aguarde até {limite.strftime('%d/%m/%Y %H:%M')}"
+    return None
+
+
+GUARDAS: Mapping[str, Callable[[Mapping[str, Any]], Optional[str]]] = MappingProxyType({
+    "pagamento_aprovado": _pagamento_aprovado,
+    "hospedagem_nao_iniciada": _hospedagem_nao_iniciada,
+    "checkin_realizado": _checkin_realizado,
+    "hospedagem_nao_encerrada": _hospedagem_nao_encerrada,
+    "prazo_checkin_expirado": _prazo_checkin_expirado,
+})
+
+
+# ============= COMPILACAO =============
+
+def _compilar():
+    estados = tuple(_DEFINICAO)
+    idx_estado = {estado: i for i, estado in enumerate(estados)}
+    idx_evento = {evento: j for j, evento in enumerate(EVENTOS)}
+    indice = {alias: idx_estado[estado] for estado, aliases in _ALIASES.items() for alias in aliases}
+
+    destino, guardas, motivos = [], [], []
+    for estado in estados:
+        celulas = _DEFINICAO[estado]
+        desconhecidos = set(celulas) - set(EVENTOS)
+        faltando = [g for _, gs in celulas.values() for g in gs if g not in GUARDAS]
+        if desconhecidos or faltando:
+            raise RuntimeError(f"Tabela de transicoes invalida em {estado}: {desconhecidos or faltando}")
+        destino.append(tuple(idx_estado[celulas[e][0]] if e in celulas else -1 for e in EVENTOS))
+        guardas.append(tuple(celulas[e][1] if e in celulas else () for e in EVENTOS))
+        motivos.append(tuple(
+            _MOTIVOS_EVENTO.get(e, {}).get(estado) or _MOTIVOS_EVENTO.get(e, {}).get(None) or _MOTIVO_PADRAO
+            for e in EVENTOS
+        ))
+
+    alcancaveis = tuple(frozenset(d for d in linha if d >= 0) for linha in destino)
+    return (
+        estados,
+        MappingProxyType(indice),
+        MappingProxyType(idx_evento),
+        tuple(destino),
+        tuple(guardas),
+        tuple(motivos),
+        alcancaveis,
+    )
+
+
+ESTADOS, _INDICE_ESTADO, _INDICE_EVENTO, _DESTINO, _GUARDAS, _MOTIVOS, _ALCANCAVEIS = _compilar()
+ESTADOS_FINAIS = frozenset(ESTADOS[i] for i, destinos in enumerate(_ALCANCAVEIS) if not destinos)
+
+
+# ============= CONSULTA =============
+
+def indice_estado(status: Optional[str]) -> int:
+    """Indice do estado canonico; -1 para status desconhecido."""
+    return _INDICE_ESTADO.get((status or "").upper().strip(), -1)
+
+
+def estado_canonico(status: Optional[str]) -> Optional[str]:
+    i = indice_estado(status)
+    return ESTADOS[i] if i >= 0 else None
+
+
+def proximo_estado(status: Optional[str], evento: str) -> Optional[str]:
+    """Destino do evento a partir do status, sem guardas; None se proibido."""
+    i, j = indice_estado(status), _INDICE_EVENTO.get(evento, -1)
+    if i < 0 or j < 0:
+        return None
+    destino = _DESTINO[i][j]
+    return ESTADOS[destino] if destino >= 0 else None
+
+
+def mudanca_permitida(status_atual: Optional[str], status_novo: Optional[str]) -> bool:
+    """Algum evento leva status_atual a status_novo."""
+    i, k = indice_estado(status_atual), indice_estado(status_novo)
+    return i >= 0 and k >= 0 and k in _ALCANCAVEIS[i]
+
+
+def eventos_disponiveis(status: Optional[str]) -> List[Tuple[str, str, Tuple[str, ...]]]:
+    """(evento, destino, guardas) permitidos pela tabela, sem avaliar guardas."""
+    i = indice_estado(status)
+    if i < 0:
+        return []
+    return [
+        (evento, ESTADOS[_DESTINO[i][j]], _GUARDAS[i][j])
+        for j, evento in enumerate(EVENTOS)
+        if _DESTINO[i][j] >= 0
+    ]
+
+
+def _avaliar(i: int, j: int, status: Optional[str], evento: str, contexto: Optional[Mapping[str, Any]]) -> Tuple[bool, str]:
+    destino = _DESTINO[i][j] if i >= 0 else -1
+    if destino < 0:
+        motivo = _MOTIVOS[i][j] if i >= 0 else (
+            _MOTIVOS_EVENTO.get(evento, {}).get(None) or _MOTIVO_PADRAO
+        )
+        return False, motivo.format(status=status, evento=evento)
+    if contexto is not None:
+        for guarda in _GUARDAS[i][j]:
+            motivo = GUARDAS[guarda](contexto)
+            if motivo:
+                return False, motivo
+    return True, ESTADOS[destino]
+
+
+def validar_transicao(
+    status: Optional[str], evento: str, contexto: Optional[Mapping[str, Any]] = None
+) -> Tuple[bool, str]:
+    """
+    (True, estado destino) ou (False, motivo).
+
+    Sem `contexto` so a tabela e consultada; com ele as guardas da celula
+    rodam em ordem (status_pagamento, status_hospedagem, checkin_previsto, agora).
+    """
+    j = _INDICE_EVENTO.get(evento, -1)
+    if j < 0:
+        raise ValueError(f"Evento de reserva desconhecido: {evento}")
+    return _avaliar(indice_estado(status), j, status, evento, contexto)
+
+
+def validar_lote(
+    reservas: Iterable[Mapping[str, Any]],
+    evento: str,
+    avaliar_guardas: bool = True,
+    agora: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Valida o mesmo evento para muitas reservas (dicts com id, status e o
+    contexto das guardas). Reservas cujo estado nao permite o evento nem
+    chegam as guardas.
+    """
+    j = _INDICE_EVENTO.get(evento, -1)
+    if j < 0:
+        raise ValueError(f"Evento de reserva desconhecido: {evento}")
+    agora = agora or now_utc()
+    validas: List[Any] = []
+    invalidas: Dict[Any, str] = {}
+    destinos: Dict[Any, str] = {}
+    for reserva in reservas:
+        status = reserva.get("status") or reserva.get("status_reserva")
+        contexto = {"agora": agora, **reserva} if avaliar_guardas else None
+        ok, resultado = _avaliar(indice_estado(status), j, status, evento, contexto)
+        if ok:
+            validas.append(reserva.get("id"))
+            destinos[reserva.get("id")] = resultado
+        else:
+            invalidas[reserva.get("id")] = resultado
+    return {"evento": evento, "validas": validas, "destinos": destinos, "invalidas": invalidas}
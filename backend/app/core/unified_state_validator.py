@@ -11,6 +11,7 @@ from app.schemas.status_enums import (
     StatusReserva, StatusPagamento, StatusHospedagem,
     pode_fazer_checkin, pode_fazer_checkout, pode_confirmar_reserva
 )
+from app.core.transicoes_reserva import CANCELAR_RESERVA, validar_transicao
 from app.utils.datetime_utils import now_utc
 
 
@@ -224,12 +225,13 @@ class UnifiedStateValidator:
         """Validar se pode cancelar reserva"""
         status_reserva = reserva.get('status')
         
-        if status_reserva == StatusReserva.CANCELADO.value:
-            return False, "Reserva já cancelada"
-        
         if status_reserva == StatusReserva.NO_SHOW.value:
             return False, "Cliente não compareceu"
         
+        pode, motivo = validar_transicao(status_reserva, CANCELAR_RESERVA)
+        if not pode:
+            return False, motivo
+        
         # Verificar se já fez check-in
         if pagamentos:
             for pagamento in pagamentos:
@@ -0,0 +1,172 @@
+"""
+Aquecimento do worker antes de receber trafego.
+
+Roda no startup (lifespan) de cada worker do gunicorn/uvicorn, em fases:
+
+1. conexao:   Prisma (com retentativas e jitter, para os workers de um deploy
+              nao baterem juntos no connect_timeout com o Postgres carregado)
+              e Redis;
+2. pool:      abre as PRISMA_CONNECTION_LIMIT conexoes do query engine com
+              consultas simultaneas, em vez de abri-las no primeiro pico;
+3. caches:    quartos (calendario de ocupacao), tarifas, niveis/configuracoes
+              e catalogo de premios da jornada; as consultas quentes ficam
+              preparadas nas conexoes recem-abertas;
+4. pronto:    so entao /health responde 200.
+
+Falha em pool/caches nao impede o worker de subir (os caches carregam sob
+demanda), so fica registrada em /health. Falha de conexao com o banco
+interrompe o startup, como antes.
+
+Com WARMUP_BLOQUEANTE (padrao) o startup espera o aquecimento e o uvicorn so
+abre o socket depois dele; sem ele o aquecimento roda em background e /health
+responde 503 ate terminar, para o balanceador nao mandar trafego.
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.locks import executar_uma_vez
+
+
+WARMUP_ESPERA_MAX_SEGUNDOS = 8.0
+
+FASE_INICIANDO = "iniciando"
+FASE_AQUECENDO = "aquecendo"
+FASE_PRONTO = "pronto"
+FASE_FALHOU = "falhou"
+
+
+class EstadoWorker:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.fase = FASE_INICIANDO
+        self.etapas: Dict[str, Dict[str, Any]] = {}
+        self.iniciado_em = time.monotonic()
+        self.pronto_em: Optional[float] = None
+
+    @property
+    def pronto(self) -> bool:
+        return self.fase == FASE_PRONTO
+
+    def registrar(self, etapa: str, inicio: float, erro: Optional[BaseException] = None) -> None:
+        self.etapas[etapa] = {
+            "ok": erro is None,
+            "ms": round((time.monotonic() - inicio) * 1000, 1),
+            **({"erro": str(erro) or type(erro).__name__} if erro is not None else {}),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        fim = self.pronto_em or time.monotonic()
+        return {
+            "pid": os.getpid(),
+            "fase": self.fase,
+            "aquecimento_ms": round((fim - self.iniciado_em) * 1000, 1),
+            "etapas": dict(self.etapas),
+        }
+
+
+estado_worker = EstadoWorker()
+
+
+async def _etapa(nome: str, executar: Callable[[], Awaitable[Any]], obrigatoria: bool = False) -> None:
+    inicio = time.monotonic()
+    try:
+        await executar()
+    except Exception as exc:
+        estado_worker.registrar(nome, inicio, exc)
+        print(f"[WARMUP] Etapa {nome} falhou: {exc}")
+        if obrigatoria:
+            raise
+        return
+    estado_worker.registrar(nome, inicio)
+
+
+async def _conectar_banco(db) -> None:
+    from app.core.database import init_db
+
+    tentativas = max(1, settings.WARMUP_DB_TENTATIVAS)
+    for tentativa in range(1, tentativas + 1):
+        try:
+            if not db.is_connected():
+                await init_db()
+            return
+        except Exception as exc:
+            if tentativa == tentativas:
+                raise
+            espera = min(WARMUP_ESPERA_MAX_SEGUNDOS, 0.5 * 2 ** (tentativa - 1)) + random.uniform(0, 0.5)
+            print(f"[WARMUP] Conexao Prisma falhou ({exc}); tentativa {tentativa + 1} em {espera:.1f}s")
+            await asyncio.sleep(espera)
+
+
+async def _aquecer_pool(db) -> None:
+    from app.core.database import prisma_connection_limit
+
+    # Consultas simultaneas obrigam o engine a abrir todas as conexoes do pool.
+    await asyncio.gather(*(db.query_raw("SELECT 1") for _ in range(prisma_connection_limit())))
+
+
+async def _aquecer_quartos(db) -> None:
+    from app.services.calendario_service import CalendarioService
+    from app.utils.datetime_utils import now_local
+
+    # Com Redis o calendario e compartilhado e so um worker reconstroi;
+    # os demais apenas leem, sem reconstruir se o lider ainda nao terminou.
+    # Sem Redis cada worker monta o proprio.
+    reconstruir = await executar_uma_vez("calendario:startup-guard", 60)
+    service = CalendarioService(db)
+    if reconstruir:
+        print(f"[CALENDARIO] Reconstruido no startup: {await service.reconstruir()}")
+    hoje = now_local().date()
+    await service.consultar(hoje, hoje + timedelta(days=1), reconstruir_ausente=False)
+
+
+async def _aquecer_tarifas(db) -> None:
+    from app.services.tarifa_calendario_service import tarifa_calendario
+
+    await tarifa_calendario.obter(db)
+
+
+async def _aquecer_jornada(db) -> None:
+    from app.services.jornada_service import JornadaService
+
+    await JornadaService(db).aquecer_cache()
+
+
+async def _aquecer_referencias(db) -> None:
+    await _etapa("pool", lambda: _aquecer_pool(db))
+    await _etapa("quartos", lambda: _aquecer_quartos(db))
+    await _etapa("tarifas", lambda: _aquecer_tarifas(db))
+    await _etapa("niveis_premios", lambda: _aquecer_jornada(db))
+
+
+async def aquecer_worker(db) -> Dict[str, Any]:
+    """Executa as fases de aquecimento e marca o worker como pronto."""
+    estado_worker.reset()
+    estado_worker.fase = FASE_AQUECENDO
+    try:
+        await _etapa("banco", lambda: _conectar_banco(db), obrigatoria=True)
+    except Exception:
+        estado_worker.fase = FASE_FALHOU
+        raise
+    await _etapa("redis", cache.connect)
+
+    inicio = time.monotonic()
+    try:
+        await asyncio.wait_for(_aquecer_referencias(db), timeout=settings.WARMUP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError as exc:
+        # Caches que faltaram carregam sob demanda; nao seguramos o worker.
+        estado_worker.registrar("timeout", inicio, exc)
+        print(f"[WARMUP] Aquecimento excedeu {settings.WARMUP_TIMEOUT_SECONDS}s; liberando o worker")
+
+    estado_worker.fase = FASE_PRONTO
+    estado_worker.pronto_em = time.monotonic()
+    resumo = estado_worker.snapshot()
+    print(f"[WARMUP] Worker {resumo['pid']} pronto em {resumo['aquecimento_ms']} ms: {resumo['etapas']}")
+    return resumo
@@ -1,11 +1,9 @@
-import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from app.core.config import settings
-from app.core.database import init_db, disconnect_db
+from app.core.database import disconnect_db, get_db
 from app.utils.validation_errors import sanitize_validation_errors
 from app.api.v1 import (
     cliente_routes,
@@ -20,6 +18,7 @@ from app.api.v1 import (
     cielo_routes,
     funcionario_routes,
     dashboard_routes,
+    eventos_routes,
     notificacao_routes,
     antifraude_routes,
     auditoria_routes,
@@ -27,11 +26,6 @@ from app.api.v1 import (
     pagamento_manual_routes,
     premios_routes,
     tarifas_routes,
-    consumo_routes,
-    cancelamento_routes,
-    operacional_routes,
-    state_machine_routes,
-    overbooking_routes,
     comprovante_routes,
     cupom_routes,
     admin_coupon_routes,
@@ -44,6 +38,8 @@ from app.api.v1 import (
     checkin_cash_approval_routes,
     twilio_routes,
 )
+# consumo, cancelamento, operacional, state_machine e overbooking (desativados
+# abaixo) nao sao importados: puxavam SQLAlchemy inteiro para o boot do worker.
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -87,8 +83,8 @@ app.mount("/media", StaticFiles(directory="media"), name="media")
 import os
 # from app.middleware.ngrok_cors import DynamicCORSMiddleware
 
-# Security Headers Middleware
-from app.middlewares.security_headers import add_security_headers
+# Pilha de middlewares (ASGI puro): security headers, CORS, auditoria, idempotencia
+from app.middlewares.pilha import instalar_middlewares
 
 # Obter origens CORS básicas do ambiente
 cors_origins_str = os.getenv("CORS_ORIGINS", "http://localhost:8080")
@@ -104,20 +100,17 @@ print(f"[CORS] Origens base: {base_origins}")
 print(f"[CORS] Usando CORS padrão (debug)")
 
 # Temporariamente usar CORS padrão para evitar o erro
-app.add_middleware(
-    CORSMiddleware,
+instalar_middlewares(
+    app,
     allow_origins=allow_origins,
     allow_credentials=allow_credentials,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    auditoria=settings.AUDIT_LOGGING_ENABLED,
+    idempotencia=settings.IDEMPOTENCY_MIDDLEWARE_ENABLED,
 )
 
 # Usar middleware personalizado que suporta ngrok dinamicamente
 # app.add_middleware(DynamicCORSMiddleware, base_origins=base_origins)
 
-# Security Headers Middleware
-app.middleware("http")(add_security_headers)
-
 # Include API Routes
 app.include_router(cliente_routes.router, prefix="/api/v1")
 app.include_router(reserva_routes.router, prefix="/api/v1")
@@ -132,6 +125,7 @@ app.include_router(cielo_routes.router, prefix="/api/v1")
 app.include_router(funcionario_routes.router, prefix="/api/v1")
 app.include_router(dashboard_routes.router, prefix="/api/v1")
 app.include_router(notificacao_routes.router, prefix="/api/v1")
+app.include_router(eventos_routes.router, prefix="/api/v1")
 app.include_router(antifraude_routes.router, prefix="/api/v1")
 app.include_router(checkin_routes.router, prefix="/api/v1")
 app.include_router(pagamento_manual_routes.router, prefix="/api/v1")
@@ -157,37 +151,46 @@ app.include_router(twilio_routes.router, prefix="/api/v1")
 
 @app.on_event("startup")
 async def startup_event():
+    import asyncio
+    from app.core.warmup import aquecer_worker
+
     os.makedirs("media/avatars", exist_ok=True)
-    await init_db()
-    # Inicializar cache Redis
-    from app.core.cache import cache
-    await cache.connect()
-    if settings.TEF_AUTO_RESOLVE_PENDING:
-        try:
-            import asyncio
-            from app.services.tef_service import TefService
-
-            async def _resolver():
-                # startup_event roda em CADA worker do gunicorn; sem este guard
-                # os 4 workers chamam o agente ao mesmo tempo e derrubam a
-                # sessao um do outro (agente so suporta uma sessao por vez).
-                try:
-                    if cache.redis is not None:
-                        primeiro = await cache.redis.set(
-                            "tef:pendencias:startup-guard", "1", ex=120, nx=True
-                        )
-                        if not primeiro:
-                            print("[TEF] Pendencias da abertura ja tratadas por outro worker")
-                            return
-                except Exception as exc:
-                    print(f"[TEF] Guard de startup indisponivel ({exc}); prosseguindo")
-
-                resultado = await TefService().resolver_pendencias(confirmar=settings.TEF_AUTO_RESOLVE_PENDING_CONFIRM)
-                print(f"[TEF] Pendencias resolvidas: {resultado}")
 
+    async def _resolver():
+        # startup_event roda em CADA worker do gunicorn; sem este guard
+        # os 4 workers chamam o agente ao mesmo tempo e derrubam a
+        # sessao um do outro (agente so suporta uma sessao por vez).
+        from app.core.locks import executar_uma_vez
+
+        if not await executar_uma_vez("tef:pendencias:startup-guard", 120):
+            print("[TEF] Pendencias da abertura ja tratadas por outro worker")
+            return
+
+        from app.services.tef_service import TefService
+        resultado = await TefService().resolver_pendencias(confirmar=settings.TEF_AUTO_RESOLVE_PENDING_CONFIRM)
+        print(f"[TEF] Pendencias resolvidas: {resultado}")
+
+    def _tarefas_de_abertura():
+        # So depois do aquecimento: nao disputam conexoes com ele.
+        if settings.TEF_AUTO_RESOLVE_PENDING:
             asyncio.create_task(_resolver())
+
+    if settings.WARMUP_BLOQUEANTE:
+        # Conexao, pool e caches prontos antes do uvicorn abrir o socket.
+        await aquecer_worker(get_db())
+        _tarefas_de_abertura()
+        return
+
+    async def _aquecer_em_background():
+        # /health responde 503 ate aqui terminar.
+        try:
+            await aquecer_worker(get_db())
         except Exception as exc:
-            print(f"[TEF] Falha ao agendar resolucao de pendencias: {exc}")
+            print(f"[WARMUP] Falha no aquecimento: {exc}")
+            return
+        _tarefas_de_abertura()
+
+    asyncio.create_task(_aquecer_em_background())
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -209,11 +212,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
+    # Readiness: 503 enquanto o worker aquece, para nao receber trafego frio.
+    from app.core.warmup import estado_worker
+
+    corpo = {
+        "status": "healthy" if estado_worker.pronto else "warming_up",
         "version": settings.VERSION,
-        "environment": settings.ENVIRONMENT
+        "environment": settings.ENVIRONMENT,
+        "worker": estado_worker.snapshot(),
     }
+    if not estado_worker.pronto:
+        return JSONResponse(status_code=503, content=corpo)
+    return corpo
+
+@app.get("/health/live")
+async def liveness_check():
+    return {"status": "alive"}
 
 @app.get("/test")
 async def test_endpoint():
@@ -240,4 +254,5 @@ async def api_info():
     }
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
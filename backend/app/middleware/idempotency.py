@@ -3,91 +3,110 @@ Middleware de Idempotência
 Garante que operações críticas não sejam duplicadas mesmo com retry/timeout
 """
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from typing import Optional
 import json
 from app.core.cache import cache
 
 
-class IdempotencyMiddleware(BaseHTTPMiddleware):
+class IdempotencyMiddleware:
     """
-    Middleware que implementa idempotência usando Redis
+    Middleware que implementa idempotência usando Redis (ASGI puro)
     
     Funciona verificando o header Idempotency-Key:
     - Se key já existe no cache: retorna resposta cacheada
     - Se key não existe: processa normalmente e cacheia resultado
     
+    O corpo segue para o cliente à medida que é gerado (streaming preservado);
+    só é acumulado em paralelo quando há key e a resposta é 2xx.
+    
     TTL padrão: 24 horas
     """
     
-    def __init__(self, app, ttl: int = 86400):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, ttl: int = 86400):
+        self.app = app
         self.ttl = ttl  # 24 horas padrão
         
         # Métodos que devem usar idempotência
-        self.idempotent_methods = ["POST", "PUT", "PATCH"]
+        self.idempotent_methods = frozenset({"POST", "PUT", "PATCH"})
         
         # Rotas que DEVEM ter idempotency key
-        self.required_routes = [
+        self.required_routes = (
             "/api/v1/pagamentos",  # CRÍTICO: pagamentos
-        ]
+        )
         
         # Rotas que PODEM ter idempotency key (opcional mas recomendado)
-        self.optional_routes = [
+        self.optional_routes = (
             "/api/v1/reservas",
             "/api/v1/pontos/ajustar",
-        ]
+        )
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Processar requisição com verificação de idempotência"""
         
         # Verificar se método deve usar idempotência
-        if request.method not in self.idempotent_methods:
-            return await call_next(request)
+        if scope["type"] != "http" or scope["method"] not in self.idempotent_methods:
+            await self.app(scope, receive, send)
+            return
         
         # Obter idempotency key do header
-        idempotency_key = request.headers.get("Idempotency-Key")
-        
-        # Verificar se rota requer idempotency key
-        path = request.url.path
-        is_required = any(path.startswith(route) for route in self.required_routes)
-        is_optional = any(path.startswith(route) for route in self.optional_routes)
+        idempotency_key = None
+        for nome, valor in scope.get("headers", ()):
+            if nome == b"idempotency-key":
+                idempotency_key = valor.decode("latin-1")
+                break
         
         # Se rota requer mas não tem key, retornar erro
-        if is_required and not idempotency_key:
-            return JSONResponse(
+        if not idempotency_key and scope["path"].startswith(self.required_routes):
+            response = JSONResponse(
                 status_code=400,
                 content={
                     "detail": "Idempotency-Key é obrigatório para esta operação",
                     "error_code": "IDEMPOTENCY_KEY_REQUIRED"
                 }
             )
+            await response(scope, receive, send)
+            return
         
         # Se não tem key, processar normalmente
         if not idempotency_key:
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         # Verificar se já foi processado
         cached_response = await self._get_cached_response(idempotency_key)
         if cached_response:
             print(f"[IDEMPOTENCY] Cache hit: {idempotency_key}")
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=cached_response["status_code"],
                 content=cached_response["body"],
                 headers=cached_response.get("headers", {})
             )
+            await response(scope, receive, send)
+            return
         
         # Processar requisição
         print(f"[IDEMPOTENCY] Cache miss: {idempotency_key}")
-        response = await call_next(request)
+        status_code = 0
+        headers = []
+        partes = []
         
-        # Cachear apenas respostas de sucesso (2xx)
-        if 200 <= response.status_code < 300:
-            await self._cache_response(idempotency_key, response)
+        async def send_cacheando(message: Message) -> None:
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = message.get("headers", [])
+            elif message["type"] == "http.response.body" and 200 <= status_code < 300:
+                # Cachear apenas respostas de sucesso (2xx)
+                partes.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await send(message)
+                    await self._cache_response(idempotency_key, status_code, headers, b"".join(partes))
+                    return
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_cacheando)
     
     async def _get_cached_response(self, key: str) -> Optional[dict]:
         """Buscar resposta cacheada"""
@@ -98,25 +117,24 @@ class IdempotencyMiddleware(BaseHTTPMiddleware):
             print(f"[IDEMPOTENCY] Erro ao buscar cache: {e}")
             return None
     
-    async def _cache_response(self, key: str, response: Response):
+    async def _cache_response(self, key: str, status_code: int, headers, body: bytes):
         """Cachear resposta"""
         try:
-            # Ler body da resposta
-            body = b""
-            async for chunk in response.body_iterator:
-                body += chunk
-            
             # Decodificar body
             try:
                 body_json = json.loads(body.decode())
-            except:
-                body_json = body.decode()
+            except Exception:
+                body_json = body.decode(errors="replace")
             
-            # Preparar dados para cache
+            # Tamanho e tipo sao recalculados pelo JSONResponse na reexecucao
             cache_data = {
-                "status_code": response.status_code,
+                "status_code": status_code,
                 "body": body_json,
-                "headers": dict(response.headers)
+                "headers": {
+                    nome.decode("latin-1"): valor.decode("latin-1")
+                    for nome, valor in headers
+                    if nome not in (b"content-length", b"content-type")
+                }
             }
             
             # Armazenar no cache
@@ -128,16 +146,8 @@ class IdempotencyMiddleware(BaseHTTPMiddleware):
             
             print(f"[IDEMPOTENCY] Resposta cacheada: {key}")
             
-            # Recriar response com body
-            response.body_iterator = self._create_body_iterator(body)
-            
         except Exception as e:
             print(f"[IDEMPOTENCY] Erro ao cachear resposta: {e}")
-    
-    @staticmethod
-    async def _create_body_iterator(body: bytes):
-        """Criar iterador de body"""
-        yield body
 
 
 async def check_idempotency(key: str) -> Optional[dict]:
@@ -1,23 +1,48 @@
 import time
-from fastapi import Request
 
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-async def audit_logging(request: Request, call_next):
-    start = time.time()
-    client_ip = request.client.host
-    method = request.method
-    path = request.url.path
-    ua = request.headers.get("user-agent", "Unknown")[:80]
 
-    print(f"[SECURITY] {method} {path} from {client_ip} - {ua}")
+AUDIT_SLOW_REQUEST_SECONDS = 5.0
 
-    response = await call_next(request)
-    elapsed = time.time() - start
 
-    if response.status_code >= 400:
-        print(f"[SECURITY ALERT] {method} {path} - {response.status_code} - IP {client_ip}")
+class AuditLoggingMiddleware:
+    """Loga cada request, respostas >= 400 e requests lentos (ASGI puro)."""
 
-    if elapsed > 5.0:
-        print(f"[SECURITY] Slow request: {method} {path} - {elapsed:.2f}s")
+    def __init__(self, app: ASGIApp, lento_segundos: float = AUDIT_SLOW_REQUEST_SECONDS):
+        self.app = app
+        self.lento_segundos = lento_segundos
 
-    return response
\ No newline at end of file
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        method = scope["method"]
+        path = scope["path"]
+        ua = "Unknown"
+        for nome, valor in scope.get("headers", ()):
+            if nome == b"user-agent":
+                ua = valor.decode("latin-1")[:80]
+                break
+
+        print(f"[SECURITY] {method} {path} from {client_ip} - {ua}")
+        status_code = 500
+
+        async def send_auditado(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_auditado)
+        finally:
+            elapsed = time.perf_counter() - start
+            if status_code >= 400:
+                print(f"[SECURITY ALERT] {method} {path} - {status_code} - IP {client_ip}")
+            if elapsed > self.lento_segundos:
+                print(f"[SECURITY] Slow request: {method} {path} - {elapsed:.2f}s")
@@ -0,0 +1,42 @@
+"""
+Pilha de middlewares HTTP da API, toda em ASGI puro.
+
+`@app.middleware("http")` e subclasses de BaseHTTPMiddleware criam uma task e
+um stream de memoria extras por request e quebram respostas em streaming.
+Aqui cada camada so envolve `send`, e a ordem fica num lugar so
+(de fora para dentro):
+
+    auditoria (opcional) -> security headers -> CORS -> idempotencia (opcional) -> rotas
+
+O CORS fica por fora da idempotencia para que respostas reaproveitadas do
+cache tambem recebam os headers de CORS.
+"""
+from typing import List
+
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middlewares.audit_logging import AuditLoggingMiddleware
+from app.middlewares.security_headers import SecurityHeadersMiddleware
+
+
+def instalar_middlewares(
+    app,
+    allow_origins: List[str],
+    allow_credentials: bool,
+    auditoria: bool = False,
+    idempotencia: bool = False,
+) -> None:
+    # Starlette empilha ao contrario: o ultimo adicionado e o mais externo.
+    if idempotencia:
+        app.add_middleware(IdempotencyMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allow_origins,
+        allow_credentials=allow_credentials,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(SecurityHeadersMiddleware)
+    if auditoria:
+        app.add_middleware(AuditLoggingMiddleware)
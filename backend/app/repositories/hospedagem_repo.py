@@ -142,6 +142,9 @@ class HospedagemRepository:
         from app.services.notification_service import NotificationService
         await NotificationService.notificar_checkin_realizado(self.db, reserva)
 
+        from app.services.checkout_alert_service import agendar_checkout
+        await agendar_checkout(reserva_id, getattr(reserva, "checkoutPrevisto", None))
+
         # WhatsApp ao hotel com dados do check-in
         try:
             from app.services.whatsapp_service import get_whatsapp_service
@@ -314,6 +317,9 @@ class HospedagemRepository:
         from app.services.notification_service import NotificationService
         await NotificationService.notificar_checkout_realizado(self.db, reserva)
 
+        from app.services.checkout_alert_service import remover_checkout
+        await remover_checkout(reserva_id)
+
         try:
             reserva_cliente = await self.db.reserva.find_unique(
                 where={"id": reserva_id},
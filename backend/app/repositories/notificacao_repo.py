@@ -1,17 +1,12 @@
-from typing import List, Optional, Set
+from typing import List, Optional
 from datetime import datetime, timedelta
+from app.services.notificacao_contador_service import (
+    ajustar_nao_lidas,
+    contar_nao_lidas_cache,
+    expandir_perfil as _expand_perfil,
+)
 from app.utils.datetime_utils import now_utc
 
-# RECEPCIONISTA e RECEPCAO são aliases do mesmo perfil no sistema
-_PERFIL_ALIASES = {
-    "RECEPCIONISTA": {"RECEPCAO"},
-    "RECEPCAO": {"RECEPCIONISTA"},
-}
-
-def _expand_perfil(perfil: str) -> Set[str]:
-    """Retorna o perfil e seus aliases para queries inclusivas."""
-    return {perfil} | _PERFIL_ALIASES.get(perfil, set())
-
 class NotificacaoRepository:
     def __init__(self, db):
         self.db = db
@@ -36,6 +31,8 @@ class NotificacaoRepository:
         data_clean = {k: v for k, v in data_clean.items() if v is not None}
         
         notificacao = await self.db.notificacao.create(data=data_clean)
+        if not notificacao.lida:
+            await ajustar_nao_lidas(notificacao.perfil, 1)
         return self._serialize(notificacao)
     
     async def get_by_id(self, notificacao_id: int) -> Optional[dict]:
@@ -84,7 +81,11 @@ class NotificacaoRepository:
         return [self._serialize(notif) for notif in notificacoes]
     
     async def count_nao_lidas(self, usuario_id: int, perfil: Optional[str] = None) -> int:
-        """Contar notificações não lidas"""
+        """Contar notificações não lidas (contadores do Redis; banco se ainda não reconciliados)"""
+        em_cache = await contar_nao_lidas_cache(perfil)
+        if em_cache is not None:
+            return em_cache
+
         where_conditions = {"lida": False}
 
         or_conditions = []
@@ -99,17 +100,19 @@ class NotificacaoRepository:
         if or_conditions:
             where_conditions["OR"] = or_conditions
 
-        notificacoes = await self.db.notificacao.find_many(where=where_conditions)
-        return len(notificacoes)
+        return await self.db.notificacao.count(where=where_conditions)
 
     async def mark_as_read(self, notificacao_id: int) -> bool:
         """Marcar notificação como lida"""
         notificacao = await self.db.notificacao.find_unique(where={"id": notificacao_id})
         if notificacao and not notificacao.lida:
-            await self.db.notificacao.update(
-                where={"id": notificacao_id},
+            # Condicional em lida: dois cliques simultâneos descontam uma vez só
+            alteradas = await self.db.notificacao.update_many(
+                where={"id": notificacao_id, "lida": False},
                 data={"lida": True}
             )
+            if alteradas:
+                await ajustar_nao_lidas(notificacao.perfil, -alteradas)
             return True
         return False
 
@@ -132,14 +135,20 @@ class NotificacaoRepository:
         # Buscar todas as notificações não lidas
         notificacoes = await self.db.notificacao.find_many(where=where_conditions)
         
-        # Atualizar em lote
-        count = 0
+        # Atualizar em lote, um UPDATE por perfil de destino para descontar
+        # exatamente o que mudou em cada contador
+        ids_por_perfil = {}
         for notif in notificacoes:
-            await self.db.notificacao.update(
-                where={"id": notif.id},
+            ids_por_perfil.setdefault(notif.perfil, []).append(notif.id)
+        
+        count = 0
+        for perfil_destino, ids in ids_por_perfil.items():
+            alteradas = await self.db.notificacao.update_many(
+                where={"id": {"in": ids}, "lida": False},
                 data={"lida": True}
             )
-            count += 1
+            await ajustar_nao_lidas(perfil_destino, -alteradas)
+            count += alteradas
         
         return count
     
@@ -147,26 +156,20 @@ class NotificacaoRepository:
         """Deletar notificações lidas antigas"""
         data_limite = now_utc() - timedelta(days=dias)
         
-        # Buscar notificações antigas para deletar
-        notificacoes = await self.db.notificacao.find_many(
+        # Um DELETE so (o job de retencao faz o mesmo em lotes, ver retencao_service)
+        return await self.db.notificacao.delete_many(
             where={
                 "lida": True,
                 "dataCriacao": {"lt": data_limite}
             }
         )
-        
-        # Deletar uma por uma (Prisma não tem bulk delete direto)
-        count = 0
-        for notif in notificacoes:
-            await self.db.notificacao.delete(where={"id": notif.id})
-            count += 1
-        
-        return count
     
     async def delete_by_id(self, notificacao_id: int) -> bool:
         """Deletar notificação específica"""
         try:
-            await self.db.notificacao.delete(where={"id": notificacao_id})
+            notificacao = await self.db.notificacao.delete(where={"id": notificacao_id})
+            if notificacao and not notificacao.lida:
+                await ajustar_nao_lidas(notificacao.perfil, -1)
             return True
         except:
             return False
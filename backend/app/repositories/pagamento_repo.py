@@ -2,6 +2,8 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 from prisma import Client
 from app.schemas.pagamento_schema import PagamentoCreate, PagamentoResponse, CieloWebhook
+from app.services.antifraude_score_service import marcar_cliente_para_reanalise
+from app.services.conciliacao_pagamento_service import atualizar_fila_conciliacao
 from app.services.notification_service import NotificationService
 from app.services.whatsapp_service import get_whatsapp_service
 from app.utils.datetime_utils import to_utc, now_utc
@@ -9,6 +11,40 @@ import uuid
 from pathlib import Path
 from prisma.errors import UniqueViolationError
 
+PAGAMENTOS_LIMITE_PADRAO = 50
+PAGAMENTOS_LIMITE_MAXIMO = 200
+
+# Campos da listagem: nome na API -> (expressao SQL, relacao que exige JOIN)
+CAMPOS_LISTAGEM_PAGAMENTO: Dict[str, tuple] = {
+    "id": ("p.id", None),
+    "reserva_id": ("p.reserva_id", None),
+    "cliente_id": ("p.cliente_id", None),
+    "status": ("p.status_pagamento", None),
+    "valor": ("p.valor::float8", None),
+    "metodo": ("p.metodo", None),
+    "parcelas": ("p.parcelas", None),
+    "cielo_payment_id": ("p.cielo_payment_id", None),
+    "cartao_final": ("p.cartao_ultimos4", None),
+    "cartao_bandeira": ("p.cartao_bandeira", None),
+    "url_pagamento": ("p.url_pagamento", None),
+    "data_criacao": ("p.created_at", None),
+    "reserva_codigo": ("r.codigo_reserva", "reserva"),
+    "quarto_numero": ("r.quarto_numero", "reserva"),
+    "cliente_nome": ('c."nomeCompleto"', "cliente"),
+    "cliente_email": ("c.email", "cliente"),
+    "risk_score": (
+        "(SELECT oa.risk_score FROM operacoes_antifraude oa"
+        " WHERE oa.pagamento_id = p.id ORDER BY oa.created_at DESC LIMIT 1)",
+        None,
+    ),
+}
+CAMPOS_LISTAGEM_PADRAO = ("id", "reserva_id", "cliente_id", "status", "valor", "metodo", "data_criacao")
+_JOINS_LISTAGEM_PAGAMENTO = {
+    "cliente": "LEFT JOIN clientes c ON c.id = p.cliente_id",
+    "reserva": "LEFT JOIN reservas r ON r.id = p.reserva_id",
+}
+
+
 class PagamentoRepository:
     def __init__(self, db: Client):
         self.db = db
@@ -183,18 +219,120 @@ class PagamentoRepository:
 
         return self._serialize_pagamento(pago_com_relacoes or novo_pagamento)
 
-    async def list_all(self) -> List[Dict[str, Any]]:
-        """Listar todos os pagamentos com dados relacionados"""
-        registros = await self.db.pagamento.find_many(
-            order={"id": "desc"},
-            include={
-                "cliente": True,
-                "reserva": True,
-                "operacoesAntifraude": True,
-                "comprovantes": True
-            }
+    async def listar(
+        self,
+        status: Optional[List[str]] = None,
+        metodo: Optional[List[str]] = None,
+        reserva_id: Optional[int] = None,
+        cliente_id: Optional[int] = None,
+        criado_de: Optional[datetime] = None,
+        criado_ate: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        limite: int = PAGAMENTOS_LIMITE_PADRAO,
+        campos: Optional[List[str]] = None,
+        com_resumo: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Listagem paginada por id (keyset, mais recentes primeiro) e projetada:
+        so as colunas pedidas em `campos`, com JOIN apenas quando um campo de
+        reserva/cliente e pedido. O resumo por status sai de um GROUP BY com os
+        mesmos filtros, sem trazer as linhas.
+        """
+        campos = list(dict.fromkeys(campos or CAMPOS_LISTAGEM_PADRAO))
+        invalidos = [c for c in campos if c not in CAMPOS_LISTAGEM_PAGAMENTO]
+        if invalidos:
+            raise ValueError(f"Campos invalidos: {', '.join(invalidos)}")
+        if "id" not in campos:
+            campos.insert(0, "id")
+
+        conditions: List[str] = []
+        params: List[Any] = []
+        if status:
+            params.append([s.strip().upper() for s in status if s.strip()])
+            conditions.append(f"p.status_pagamento = ANY(${len(params)}::text[])")
+        if metodo:
+            params.append([m.strip().lower() for m in metodo if m.strip()])
+            conditions.append(f"p.metodo = ANY(${len(params)}::text[])")
+        if reserva_id is not None:
+            params.append(int(reserva_id))
+            conditions.append(f"p.reserva_id = ${len(params)}")
+        if cliente_id is not None:
+            params.append(int(cliente_id))
+            conditions.append(f"p.cliente_id = ${len(params)}")
+        if criado_de is not None:
+            params.append(criado_de)
+            conditions.append(f"p.created_at >= ${len(params)}::timestamptz")
+        if criado_ate is not None:
+            params.append(criado_ate)
+            conditions.append(f"p.created_at < ${len(params)}::timestamptz")
+
+        filtros_sql = " AND ".join(conditions) if conditions else "TRUE"
+        filtros_params = list(params)
+
+        pagina_conditions = list(conditions)
+        if cursor is not None:
+            params.append(int(cursor))
+            pagina_conditions.append(f"p.id < ${len(params)}")
+        limite = max(1, min(int(limite or PAGAMENTOS_LIMITE_PADRAO), PAGAMENTOS_LIMITE_MAXIMO))
+        # Uma linha a mais so para saber se ha proxima pagina.
+        params.append(limite + 1)
+
+        relacoes = {CAMPOS_LISTAGEM_PAGAMENTO[c][1] for c in campos} - {None}
+        select_sql = ",\n                ".join(
+            f"{CAMPOS_LISTAGEM_PAGAMENTO[c][0]} AS {c}" for c in campos
         )
-        return [self._serialize_pagamento(p) for p in registros]
+        joins_sql = "\n            ".join(_JOINS_LISTAGEM_PAGAMENTO[r] for r in sorted(relacoes))
+        pagina_sql = " AND ".join(pagina_conditions) if pagina_conditions else "TRUE"
+
+        rows = await self.db.query_raw(
+            f"""
+            SELECT
+                {select_sql}
+            FROM pagamentos p
+            {joins_sql}
+            WHERE {pagina_sql}
+            ORDER BY p.id DESC
+            LIMIT ${len(params)}
+            """,
+            *params,
+        )
+        tem_mais = len(rows) > limite
+        rows = rows[:limite]
+        pagamentos = [
+            {c: (row.get(c).isoformat() if hasattr(row.get(c), "isoformat") else row.get(c)) for c in campos}
+            for row in rows
+        ]
+
+        resultado: Dict[str, Any] = {
+            "pagamentos": pagamentos,
+            "proximo_cursor": int(rows[-1]["id"]) if tem_mais and rows else None,
+        }
+        if com_resumo:
+            resultado["resumo"] = await self._resumo_listagem(filtros_sql, filtros_params)
+        return resultado
+
+    async def _resumo_listagem(self, filtros_sql: str, params: List[Any]) -> Dict[str, Any]:
+        rows = await self.db.query_raw(
+            f"""
+            SELECT
+                p.status_pagamento AS status,
+                COUNT(*)::int AS quantidade,
+                COALESCE(SUM(p.valor), 0)::float8 AS valor
+            FROM pagamentos p
+            WHERE {filtros_sql}
+            GROUP BY p.status_pagamento
+            """,
+            *params,
+        )
+        por_status = {
+            row["status"]: {"quantidade": int(row["quantidade"]), "valor": float(row["valor"] or 0)}
+            for row in rows
+        }
+        return {
+            "total": sum(s["quantidade"] for s in por_status.values()),
+            "valor_total": round(sum(s["valor"] for s in por_status.values()), 2),
+            "por_status": por_status,
+        }
     
     async def get_by_id(self, pagamento_id: int) -> Dict[str, Any]:
         """Obter pagamento por ID com dados relacionados"""
@@ -389,8 +527,13 @@ class PagamentoRepository:
             where={"id": pagamento_id},
             data=update_data
         )
+        if status_atualizado == "FALHOU":
+            await marcar_cliente_para_reanalise(pagamento.clienteId)
 
         pagamento_base = await self.db.pagamento.find_unique(where={"id": pagamento_id})
+        # PIX/cartao pendente na Cielo entra na fila do worker de conciliacao;
+        # status final tira da fila.
+        await atualizar_fila_conciliacao(pagamento_base)
         if (
             pagamento_base and
             (pagamento_base.metodo == "tef" or tef_cupom_cliente or tef_cupom_estabelecimento or tef_autorizacao)
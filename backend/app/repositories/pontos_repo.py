@@ -4,6 +4,7 @@ from datetime import datetime, timedelta, timezone
 from prisma import Client
 from fastapi import HTTPException
 from app.utils.datetime_utils import to_utc
+from app.services.saldo_snapshot_service import SaldoSnapshotService, invalidar_snapshot_saldo
 from app.schemas.pontos_schema import (
     AjustarPontosRequest, SaldoResponse, TransacaoResponse,
     HistoricoTransacao, HistoricoResponse
@@ -12,6 +13,15 @@ from app.schemas.pontos_schema import (
 # Constantes de segurança
 MAX_PONTOS_POR_TRANSACAO = 1000
 MIN_PONTOS_POR_TRANSACAO = -1000
+# Liberacao/estorno em lote (jobs Celery): linhas reivindicadas por transacao
+# e teto de linhas por execucao.
+LOTE_LIBERACAO_PADRAO = 200
+MAX_LIBERACOES_POR_EXECUCAO = 5000
+# Creditos fora do saldo acumulados no snapshot de usuarios_pontos.
+COLUNAS_TOTAL_POR_STATUS = {
+    "pendente": "pontos_pendentes",
+    "bloqueado": "pontos_bloqueados",
+}
 ORIGENS_IDEMPOTENTES_POR_RESERVA = {
     "CHECKOUT",
     "BONUS_CUPOM",
@@ -39,23 +49,18 @@ class PontosRepository:
                 "saldo": 0
             }
         
-        usuario_pontos = await self.db.usuariopontos.find_first(
-            where={"clienteId": cliente_id}
-        )
-        
-        if not usuario_pontos:
-            # Criar registro se não existir (cliente já validado)
-            usuario_pontos = await self.db.usuariopontos.create(
-                data={
-                    "clienteId": cliente_id,
-                    "saldo": 0
-                }
-            )
+        # Leitura pura do snapshot: a linha de usuarios_pontos e criada por
+        # quem credita/debita, nunca por uma consulta de saldo. Sem linha
+        # ainda, usuario_pontos_id e 0 (SaldoResponse.usuario_pontos_id e int).
+        snapshot = await SaldoSnapshotService(self.db).obter(cliente_id)
         
         return {
             "success": True,
-            "saldo": usuario_pontos.saldo,
-            "usuario_pontos_id": usuario_pontos.id,
+            "saldo": snapshot["saldo"],
+            "usuario_pontos_id": snapshot["usuario_pontos_id"] or 0,
+            "pontos_nivel": snapshot["pontos_nivel"],
+            "pendentes": snapshot["pendentes"],
+            "bloqueados": snapshot["bloqueados"],
             "cliente_nome": cliente.nomeCompleto
         }
     
@@ -202,6 +207,8 @@ class PontosRepository:
             _tx: transação Prisma já aberta pelo chamador (ex.: para manter um
                 lock/consulta anterior atômico junto com esta escrita). Se
                 None, abre e comita sua própria transação como de costume.
+                Com _tx o snapshot de saldo NAO e invalidado aqui: quem abriu
+                a transação invalida depois do commit.
         """
         # VALIDAÇÃO DE SEGURANÇA: Limites de pontos
         if pontos == 0:
@@ -315,6 +322,19 @@ class PontosRepository:
                     pontos_nivel_posterior,
                     usuario_pontos_id,
                 )
+            elif status_norm in COLUNAS_TOTAL_POR_STATUS and pontos > 0:
+                # Credito que ainda nao virou saldo: entra no total
+                # pendente/bloqueado do snapshot, na mesma transacao.
+                coluna_total = COLUNAS_TOTAL_POR_STATUS[status_norm]
+                await transaction.execute_raw(
+                    f"""
+                    UPDATE usuarios_pontos
+                    SET {coluna_total} = COALESCE({coluna_total}, 0) + $1, updated_at = NOW()
+                    WHERE id = $2
+                    """,
+                    pontos,
+                    usuario_pontos_id,
+                )
 
             transacao_data = {
                 "clienteId": cliente_id,
@@ -347,10 +367,15 @@ class PontosRepository:
             }
 
         if _tx is not None:
+            # Invalidar antes do commit deixaria uma leitura concorrente
+            # recolocar o saldo antigo no cache pelo TTL inteiro.
             return await _executar(_tx)
 
         async with self.db.tx() as transaction:
-            return await _executar(transaction)
+            resultado = await _executar(transaction)
+
+        await invalidar_snapshot_saldo(cliente_id)
+        return resultado
 
     @staticmethod
     def _extrair_pontos_n_metadata(metadata_raw: Any, default: int) -> int:
@@ -373,132 +398,195 @@ class PontosRepository:
                 return default
         return default
 
+    async def _travar_saldos(self, transaction, usuario_pontos_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Trava os saldos do lote sempre em ordem de id (sem deadlock entre workers)."""
+        ids = sorted(set(usuario_pontos_ids))
+        if not ids:
+            return {}
+        placeholders = ", ".join(f"${i}" for i in range(1, len(ids) + 1))
+        rows = await transaction.query_raw(
+            f"""
+            SELECT id, saldo, pontos_nivel
+            FROM usuarios_pontos
+            WHERE id IN ({placeholders})
+            ORDER BY id
+            FOR UPDATE
+            """,
+            *ids,
+        )
+        return {int(row["id"]): row for row in rows}
+
+    @staticmethod
+    async def _atualizar_status_em_lote(transaction, transacao_ids: List[int], status: str) -> None:
+        if not transacao_ids:
+            return
+        placeholders = ", ".join(f"${i}" for i in range(2, len(transacao_ids) + 2))
+        await transaction.execute_raw(
+            f"""
+            UPDATE transacoes_pontos
+            SET status = $1
+            WHERE id IN ({placeholders})
+            """,
+            status,
+            *transacao_ids,
+        )
+
+    @staticmethod
+    async def _aplicar_lote(
+        transaction,
+        status_final: str,
+        deltas: Dict[int, Dict[str, int]],
+        aplicadas: List[Dict[str, Any]],
+    ) -> None:
+        """Um UPDATE de saldo para todos os clientes do lote e um para as transacoes."""
+        if not aplicadas:
+            return
+
+        valores_saldo = []
+        params_saldo: List[Any] = []
+        for usuario_pontos_id, delta in deltas.items():
+            base = len(params_saldo)
+            valores_saldo.append(f"(${base + 1}::int, ${base + 2}::int, ${base + 3}::int, ${base + 4}::int)")
+            params_saldo.extend([
+                usuario_pontos_id,
+                delta["saldo"],
+                delta["pontos_nivel"],
+                delta.get("pendentes", 0),
+            ])
+        await transaction.execute_raw(
+            f"""
+            UPDATE usuarios_pontos AS up
+            SET saldo = up.saldo + v.delta_saldo,
+                pontos_nivel = COALESCE(up.pontos_nivel, 0) + v.delta_nivel,
+                pontos_pendentes = GREATEST(COALESCE(up.pontos_pendentes, 0) + v.delta_pendentes, 0),
+                updated_at = NOW()
+            FROM (VALUES {", ".join(valores_saldo)}) AS v(id, delta_saldo, delta_nivel, delta_pendentes)
+            WHERE up.id = v.id
+            """,
+            *params_saldo,
+        )
+
+        valores_transacao = []
+        params_transacao: List[Any] = [status_final]
+        for aplicada in aplicadas:
+            base = len(params_transacao)
+            valores_transacao.append(f"(${base + 1}::int, ${base + 2}::int, ${base + 3}::int)")
+            params_transacao.extend([
+                aplicada["transacao_id"],
+                aplicada["saldo_anterior"],
+                aplicada["saldo_posterior"],
+            ])
+        await transaction.execute_raw(
+            f"""
+            UPDATE transacoes_pontos AS tp
+            SET status = $1,
+                saldo_anterior = v.saldo_anterior,
+                saldo_posterior = v.saldo_posterior
+            FROM (VALUES {", ".join(valores_transacao)}) AS v(id, saldo_anterior, saldo_posterior)
+            WHERE tp.id = v.id
+            """,
+            *params_transacao,
+        )
+
     async def liberar_pontos_pendentes(
         self,
         limit: int = 100,
         agora: Optional[datetime] = None,
+        tamanho_lote: int = LOTE_LIBERACAO_PADRAO,
     ) -> Dict[str, Any]:
-        """Liberar transacoes pendentes cujo liberar_em ja venceu."""
+        """Liberar transacoes pendentes cujo liberar_em ja venceu.
+
+        Processa em lotes: cada lote reivindica as transacoes com
+        FOR UPDATE SKIP LOCKED (varios workers Celery drenam a fila sem
+        disputar as mesmas linhas), agrega os creditos por usuarios_pontos e
+        aplica um unico UPDATE de saldo por lote.
+        """
         agora_ref = agora or datetime.now(timezone.utc)
-        limite = max(1, min(int(limit or 100), 500))
-
-        pendentes = await self.db.query_raw(
-            """
-            SELECT id
-            FROM transacoes_pontos
-            WHERE status = 'pendente'
-              AND liberar_em IS NOT NULL
-              AND liberar_em <= $1::timestamptz
-            ORDER BY liberar_em ASC, id ASC
-            LIMIT $2
-            """,
-            agora_ref,
-            limite,
-        )
+        limite = max(1, min(int(limit or 100), MAX_LIBERACOES_POR_EXECUCAO))
+        lote = max(1, min(int(tamanho_lote or LOTE_LIBERACAO_PADRAO), limite))
 
         liberadas: List[Dict[str, Any]] = []
-        for row in pendentes:
-            transacao_id = int(row["id"])
+        processadas = 0
+        ultimo_id = 0
+        while processadas < limite:
             async with self.db.tx() as transaction:
-                locked_rows = await transaction.query_raw(
+                # Creditos sem usuarios_pontos (ainda dentro das 24h) continuam
+                # 'pendente'; o cursor por id evita reivindica-los de novo na
+                # mesma execucao e deixar as linhas validas seguintes de fora.
+                reivindicadas = await transaction.query_raw(
                     """
-                    SELECT *
+                    SELECT id, cliente_id, usuario_pontos_id, reserva_id, origem,
+                           pontos, metadata, created_at
                     FROM transacoes_pontos
-                    WHERE id = $1
-                    FOR UPDATE
+                    WHERE status = 'pendente'
+                      AND liberar_em IS NOT NULL
+                      AND liberar_em <= $1::timestamptz
+                      AND id > $3
+                    ORDER BY id ASC
+                    LIMIT $2
+                    FOR UPDATE SKIP LOCKED
                     """,
-                    transacao_id,
+                    agora_ref,
+                    min(lote, limite - processadas),
+                    ultimo_id,
                 )
-                if not locked_rows:
-                    continue
-
-                transacao = locked_rows[0]
-                if (transacao.get("status") or "").lower() != "pendente":
-                    continue
-
-                liberar_em = to_utc(transacao.get("liberar_em"))
-                if liberar_em and liberar_em > agora_ref:
-                    continue
-
-                pontos = int(transacao.get("pontos") or 0)
-                if pontos <= 0:
-                    await transaction.execute_raw(
-                        """
-                        UPDATE transacoes_pontos
-                        SET status = 'bloqueado'
-                        WHERE id = $1
-                        """,
-                        transacao_id,
-                    )
-                    continue
-
-                usuario_pontos_id = int(transacao["usuario_pontos_id"])
-                usuario_rows = await transaction.query_raw(
-                    """
-                    SELECT *
-                    FROM usuarios_pontos
-                    WHERE id = $1
-                    FOR UPDATE
-                    """,
-                    usuario_pontos_id,
+                if not reivindicadas:
+                    break
+                processadas += len(reivindicadas)
+                ultimo_id = max(int(t["id"]) for t in reivindicadas)
+
+                sem_credito = [int(t["id"]) for t in reivindicadas if int(t.get("pontos") or 0) <= 0]
+                creditos = [t for t in reivindicadas if int(t.get("pontos") or 0) > 0]
+                saldos = await self._travar_saldos(
+                    transaction, [int(t["usuario_pontos_id"]) for t in creditos]
                 )
-                if not usuario_rows:
-                    # Teto INTERNO de 24h (prazo publico prometido ao cliente e
-                    # 48h): se em 24h de retentativas ainda nao da pra resolver
-                    # (inconsistencia de dados), escalona para "falha" — assim
-                    # sobra 24h de margem para tratamento manual antes de
-                    # estourar o prazo comunicado. Nunca expor as 24h ao cliente.
-                    criado_em = to_utc(transacao.get("created_at"))
-                    if criado_em and (agora_ref - criado_em) > timedelta(hours=24):
-                        await transaction.execute_raw(
-                            """
-                            UPDATE transacoes_pontos
-                            SET status = 'falha'
-                            WHERE id = $1
-                            """,
-                            transacao_id,
-                        )
-                    continue
-
-                saldo_anterior = int(usuario_rows[0]["saldo"] or 0)
-                saldo_posterior = saldo_anterior + pontos
-                pontos_nivel_anterior = int(usuario_rows[0].get("pontos_nivel") or 0)
-                pontos_n_credito = self._extrair_pontos_n_metadata(transacao.get("metadata"), default=pontos)
-                pontos_nivel_posterior = pontos_nivel_anterior + max(0, pontos_n_credito)
 
-                await transaction.execute_raw(
-                    """
-                    UPDATE usuarios_pontos
-                    SET saldo = $1, pontos_nivel = $2, updated_at = NOW()
-                    WHERE id = $3
-                    """,
-                    saldo_posterior,
-                    pontos_nivel_posterior,
-                    usuario_pontos_id,
-                )
-                await transaction.execute_raw(
-                    """
-                    UPDATE transacoes_pontos
-                    SET status = 'liberado',
-                        saldo_anterior = $1,
-                        saldo_posterior = $2
-                    WHERE id = $3
-                    """,
-                    saldo_anterior,
-                    saldo_posterior,
-                    transacao_id,
-                )
-
-                liberadas.append({
-                    "transacao_id": transacao_id,
-                    "cliente_id": int(transacao["cliente_id"]),
-                    "reserva_id": transacao.get("reserva_id"),
-                    "origem": transacao.get("origem"),
-                    "metadata": transacao.get("metadata"),
-                    "pontos": pontos,
-                    "saldo_anterior": saldo_anterior,
-                    "saldo_posterior": saldo_posterior,
-                })
+                falhas: List[int] = []
+                deltas: Dict[int, Dict[str, int]] = {}
+                aplicadas: List[Dict[str, Any]] = []
+                for transacao in creditos:
+                    transacao_id = int(transacao["id"])
+                    usuario_pontos_id = int(transacao["usuario_pontos_id"])
+                    saldo_row = saldos.get(usuario_pontos_id)
+                    if saldo_row is None:
+                        # Teto INTERNO de 24h (prazo publico prometido ao cliente e
+                        # 48h): se em 24h de retentativas ainda nao da pra resolver
+                        # (inconsistencia de dados), escalona para "falha" — assim
+                        # sobra 24h de margem para tratamento manual antes de
+                        # estourar o prazo comunicado. Nunca expor as 24h ao cliente.
+                        criado_em = to_utc(transacao.get("created_at"))
+                        if criado_em and (agora_ref - criado_em) > timedelta(hours=24):
+                            falhas.append(transacao_id)
+                        continue
+
+                    pontos = int(transacao["pontos"])
+                    pontos_n_credito = self._extrair_pontos_n_metadata(transacao.get("metadata"), default=pontos)
+                    delta = deltas.setdefault(usuario_pontos_id, {"saldo": 0, "pontos_nivel": 0, "pendentes": 0})
+                    saldo_anterior = int(saldo_row["saldo"] or 0) + delta["saldo"]
+                    saldo_posterior = saldo_anterior + pontos
+                    delta["saldo"] += pontos
+                    delta["pontos_nivel"] += max(0, pontos_n_credito)
+                    delta["pendentes"] -= pontos
+
+                    aplicadas.append({
+                        "transacao_id": transacao_id,
+                        "cliente_id": int(transacao["cliente_id"]),
+                        "reserva_id": transacao.get("reserva_id"),
+                        "origem": transacao.get("origem"),
+                        "metadata": transacao.get("metadata"),
+                        "pontos": pontos,
+                        "saldo_anterior": saldo_anterior,
+                        "saldo_posterior": saldo_posterior,
+                    })
+
+                await self._atualizar_status_em_lote(transaction, sem_credito, "bloqueado")
+                await self._atualizar_status_em_lote(transaction, falhas, "falha")
+                await self._aplicar_lote(transaction, "liberado", deltas, aplicadas)
+
+            liberadas.extend(aplicadas)
+            await invalidar_snapshot_saldo(*(a["cliente_id"] for a in aplicadas))
+            if len(reivindicadas) < lote:
+                break
 
         for liberada in liberadas:
             await self._notificar_pontos_liberados(liberada)
@@ -510,6 +598,7 @@ class PontosRepository:
         limit: int = 100,
         agora: Optional[datetime] = None,
         prazo_falha: timedelta = timedelta(days=30),
+        tamanho_lote: int = LOTE_LIBERACAO_PADRAO,
     ) -> Dict[str, Any]:
         """Reprocessa ESTORNOs que nao puderam ser aplicados na hora do
         cancelamento (saldo insuficiente porque o cliente ja resgatou os
@@ -519,102 +608,83 @@ class PontosRepository:
         de liberacao -- o estorno so fica aplicavel quando o cliente
         acumular saldo suficiente de novo. Por isso o teto antes de desistir
         e marcar como 'falha' (revisao manual) e bem maior: 30 dias.
+
+        Usa o mesmo processamento em lotes com SKIP LOCKED da liberacao;
+        dentro do lote os estornos de um cliente sao aplicados em ordem de
+        criacao enquanto houver saldo.
         """
         agora_ref = agora or datetime.now(timezone.utc)
-        limite = max(1, min(int(limit or 100), 500))
-
-        pendentes = await self.db.query_raw(
-            """
-            SELECT id
-            FROM transacoes_pontos
-            WHERE tipo = 'ESTORNO'
-              AND status = 'pendente'
-            ORDER BY created_at ASC, id ASC
-            LIMIT $1
-            """,
-            limite,
-        )
+        limite = max(1, min(int(limit or 100), MAX_LIBERACOES_POR_EXECUCAO))
+        lote = max(1, min(int(tamanho_lote or LOTE_LIBERACAO_PADRAO), limite))
 
         aplicados: List[Dict[str, Any]] = []
-        for row in pendentes:
-            transacao_id = int(row["id"])
+        processados = 0
+        ultimo_id = 0
+        while processados < limite:
             async with self.db.tx() as transaction:
-                locked_rows = await transaction.query_raw(
+                # Estornos sem saldo continuam 'pendente'; o cursor por id evita
+                # reivindicar as mesmas linhas de novo na mesma execucao.
+                reivindicados = await transaction.query_raw(
                     """
-                    SELECT *
+                    SELECT id, cliente_id, usuario_pontos_id, reserva_id, pontos, created_at
                     FROM transacoes_pontos
-                    WHERE id = $1
-                    FOR UPDATE
+                    WHERE tipo = 'ESTORNO'
+                      AND status = 'pendente'
+                      AND id > $1
+                    ORDER BY id ASC
+                    LIMIT $2
+                    FOR UPDATE SKIP LOCKED
                     """,
-                    transacao_id,
+                    ultimo_id,
+                    min(lote, limite - processados),
                 )
-                if not locked_rows:
-                    continue
+                if not reivindicados:
+                    break
+                processados += len(reivindicados)
+                ultimo_id = max(int(t["id"]) for t in reivindicados)
 
-                transacao = locked_rows[0]
-                if (transacao.get("status") or "").lower() != "pendente":
-                    continue
-
-                pontos = int(transacao.get("pontos") or 0)
-                usuario_pontos_id = int(transacao["usuario_pontos_id"])
-                usuario_rows = await transaction.query_raw(
-                    """
-                    SELECT *
-                    FROM usuarios_pontos
-                    WHERE id = $1
-                    FOR UPDATE
-                    """,
-                    usuario_pontos_id,
-                )
-                if not usuario_rows:
-                    continue
-
-                saldo_anterior = int(usuario_rows[0]["saldo"] or 0)
-                saldo_posterior = saldo_anterior + pontos
-
-                if saldo_posterior < 0:
-                    criado_em = to_utc(transacao.get("created_at"))
-                    if criado_em and (agora_ref - criado_em) > prazo_falha:
-                        await transaction.execute_raw(
-                            """
-                            UPDATE transacoes_pontos
-                            SET status = 'falha'
-                            WHERE id = $1
-                            """,
-                            transacao_id,
-                        )
-                    continue
-
-                await transaction.execute_raw(
-                    """
-                    UPDATE usuarios_pontos
-                    SET saldo = $1, updated_at = NOW()
-                    WHERE id = $2
-                    """,
-                    saldo_posterior,
-                    usuario_pontos_id,
-                )
-                await transaction.execute_raw(
-                    """
-                    UPDATE transacoes_pontos
-                    SET status = 'estornado',
-                        saldo_anterior = $1,
-                        saldo_posterior = $2
-                    WHERE id = $3
-                    """,
-                    saldo_anterior,
-                    saldo_posterior,
-                    transacao_id,
+                saldos = await self._travar_saldos(
+                    transaction, [int(t["usuario_pontos_id"]) for t in reivindicados]
                 )
 
-                aplicados.append({
-                    "transacao_id": transacao_id,
-                    "cliente_id": int(transacao["cliente_id"]),
-                    "reserva_id": transacao.get("reserva_id"),
-                    "pontos": pontos,
-                    "saldo_anterior": saldo_anterior,
-                    "saldo_posterior": saldo_posterior,
-                })
+                falhas: List[int] = []
+                deltas: Dict[int, Dict[str, int]] = {}
+                aplicados_lote: List[Dict[str, Any]] = []
+                for transacao in reivindicados:
+                    usuario_pontos_id = int(transacao["usuario_pontos_id"])
+                    saldo_row = saldos.get(usuario_pontos_id)
+                    if saldo_row is None:
+                        continue
+
+                    pontos = int(transacao.get("pontos") or 0)
+                    delta = deltas.get(usuario_pontos_id, {"saldo": 0, "pontos_nivel": 0})
+                    saldo_anterior = int(saldo_row["saldo"] or 0) + delta["saldo"]
+                    saldo_posterior = saldo_anterior + pontos
+
+                    if saldo_posterior < 0:
+                        criado_em = to_utc(transacao.get("created_at"))
+                        if criado_em and (agora_ref - criado_em) > prazo_falha:
+                            falhas.append(int(transacao["id"]))
+                        continue
+
+                    delta["saldo"] += pontos
+                    deltas[usuario_pontos_id] = delta
+                    aplicados_lote.append({
+                        "transacao_id": int(transacao["id"]),
+                        "cliente_id": int(transacao["cliente_id"]),
+                        "reserva_id": transacao.get("reserva_id"),
+                        "pontos": pontos,
+                        "saldo_anterior": saldo_anterior,
+                        "saldo_posterior": saldo_posterior,
+                    })
+
+                await self._atualizar_status_em_lote(transaction, falhas, "falha")
+                await self._aplicar_lote(transaction, "estornado", deltas, aplicados_lote)
+
+            aplicados.extend(aplicados_lote)
+            await invalidar_snapshot_saldo(*(a["cliente_id"] for a in aplicados_lote))
+            if len(reivindicados) < lote:
+                break
 
         return {"success": True, "total_aplicados": len(aplicados), "transacoes": aplicados}
 
@@ -12,6 +12,8 @@ from app.schemas.pontos_schema import (
 )
 import logging
 
+from app.services.saldo_snapshot_service import SaldoSnapshotService, invalidar_snapshot_saldo
+
 # Constantes de segurança
 MAX_PONTOS_POR_TRANSACAO = 1000
 MIN_PONTOS_POR_TRANSACAO = -1000
@@ -42,23 +44,13 @@ class PontosRepositoryAtomic:
                 "saldo": 0
             }
         
-        usuario_pontos = await self.db.usuariopontos.find_first(
-            where={"clienteId": cliente_id}
-        )
-        
-        if not usuario_pontos:
-            # Criar registro se não existir (cliente já validado)
-            usuario_pontos = await self.db.usuariopontos.create(
-                data={
-                    "clienteId": cliente_id,
-                    "saldo": 0
-                }
-            )
+        snapshot = await SaldoSnapshotService(self.db).obter(cliente_id)
         
         return {
             "success": True,
-            "saldo": usuario_pontos.saldo,
-            "usuario_pontos_id": usuario_pontos.id,
+            "saldo": snapshot["saldo"],
+            # 0 sem linha de usuarios_pontos (SaldoResponse.usuario_pontos_id e int)
+            "usuario_pontos_id": snapshot["usuario_pontos_id"] or 0,
             "cliente_nome": cliente.nomeCompleto
         }
     
@@ -166,12 +158,15 @@ class PontosRepositoryAtomic:
             )
             
             # Commit automático ao sair do bloco 'async with'
-            return {
+            resultado = {
                 "success": True,
                 "transacao_id": transacao.id,
                 "novo_saldo": novo_saldo,
                 "saldo_anterior": saldo_anterior
             }
+
+        await invalidar_snapshot_saldo(request.cliente_id)
+        return resultado
     
     async def criar_transacao_pontos_atomic(
         self,
@@ -268,13 +263,16 @@ class PontosRepositoryAtomic:
                 f"Saldo: {saldo_anterior} → {saldo_posterior}"
             )
             
-            return {
+            resultado = {
                 "success": True,
                 "transacao_id": transacao.id,
                 "saldo_anterior": saldo_anterior,
                 "saldo_posterior": saldo_posterior,
                 "pontos": pontos
             }
+
+        await invalidar_snapshot_saldo(cliente_id)
+        return resultado
     
     async def get_historico(self, cliente_id: int, limit: int = 20) -> Dict[str, Any]:
         """Obter histórico de transações com relacionamentos"""
@@ -3,6 +3,8 @@ Repositório para gerenciamento de prêmios do sistema de fidelidade.
 """
 from typing import Dict, Any, List, Optional
 from prisma import Client
+from app.core.cache import PREMIOS_CATALOGO_CACHE
+from app.core.local_cache import local_cache
 from app.utils.datetime_utils import now_utc
 
 CODIGO_STATUS_USED = "used"
@@ -50,6 +52,7 @@ class PremioRepository:
                 "imagemUrl": data.get("imagem_url")
             }
         )
+        await local_cache.invalidate(PREMIOS_CATALOGO_CACHE)
         return self._serialize(premio)
     
     async def update(self, premio_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -85,6 +88,7 @@ class PremioRepository:
             where={"id": premio_id},
             data=update_data
         )
+        await local_cache.invalidate(PREMIOS_CATALOGO_CACHE)
         return self._serialize(premio_atualizado)
     
     async def delete(self, premio_id: int) -> bool:
@@ -97,6 +101,7 @@ class PremioRepository:
             where={"id": premio_id},
             data={"ativo": False}
         )
+        await local_cache.invalidate(PREMIOS_CATALOGO_CACHE)
         return True
     
     async def resgatar(
@@ -1,8 +1,9 @@
 """
 Repositorio de premios com transacoes atomicas.
 
-O resgate usa lock pessimista para proteger saldo, estoque e uso unico do
-codigo de resgate.
+O resgate usa lock pessimista para proteger saldo e uso unico do codigo de
+resgate. O estoque e reservado com um UPDATE condicional curto, fora da
+transacao de debito, e devolvido se o resgate nao se concretizar.
 """
 
 import json
@@ -14,6 +15,9 @@ from typing import Any, Dict, List, Optional
 from prisma import Client
 from prisma.errors import UniqueViolationError
 
+from app.core.cache import PREMIOS_CATALOGO_CACHE
+from app.core.local_cache import local_cache
+from app.services.saldo_snapshot_service import invalidar_snapshot_saldo
 from app.utils.datetime_utils import now_utc, to_utc
 
 security_logger = logging.getLogger("security")
@@ -70,6 +74,7 @@ class PremioRepositoryAtomic:
                 "imagemUrl": data.get("imagem_url"),
             }
         )
+        await local_cache.invalidate(PREMIOS_CATALOGO_CACHE)
         return self._serialize(premio)
 
     async def update(self, premio_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -104,6 +109,7 @@ class PremioRepositoryAtomic:
             where={"id": premio_id},
             data=update_data,
         )
+        await local_cache.invalidate(PREMIOS_CATALOGO_CACHE)
         return self._serialize(premio_atualizado)
 
     async def delete(self, premio_id: int) -> bool:
@@ -111,6 +117,7 @@ class PremioRepositoryAtomic:
         if not premio:
             return False
         await self.db.premio.update(where={"id": premio_id}, data={"ativo": False})
+        await local_cache.invalidate(PREMIOS_CATALOGO_CACHE)
         return True
 
     async def resgatar_atomic(
@@ -148,7 +155,7 @@ class PremioRepositoryAtomic:
             # Duas requisicoes com a mesma idempotency_key correram e uma
             # ganhou a corrida na constraint unica -- devolve o resgate dela
             # em vez de propagar o erro (a transacao perdedora ja fez
-            # rollback completo do debito de saldo/estoque desta tentativa).
+            # rollback do debito de saldo e devolveu a unidade de estoque).
             if idempotency_key:
                 existente = await self._buscar_resgate_por_idempotency_key(self.db, idempotency_key)
                 if existente:
@@ -162,62 +169,124 @@ class PremioRepositoryAtomic:
         funcionario_id: Optional[int],
         idempotency_key: Optional[str],
     ) -> Dict[str, Any]:
-        cliente_nome = "Cliente"
-        cliente_telefone = None
-        cliente_endereco = None
-        codigo_resgate = None
-        premio_nome = None
-        custo = 0
+        # Leituras sem lock: cliente, premio e categoria nao mudam de forma
+        # relevante durante o resgate e nao precisam serializar ninguem.
+        cliente_raw = await self.db.query_raw(
+            'SELECT id, "nomeCompleto", telefone, "enderecoCompleto" FROM clientes WHERE id = $1',
+            cliente_id,
+        )
+        if not cliente_raw:
+            return {"success": False, "error": "Cliente nao encontrado"}
+
+        cliente_dados = cliente_raw[0]
+        cliente_nome = cliente_dados.get("nomeCompleto") or "Cliente"
+
+        premio_raw = await self.db.query_raw("SELECT * FROM premios WHERE id = $1", premio_id)
+        if not premio_raw:
+            return {"success": False, "error": "Premio nao encontrado"}
+
+        premio_data = premio_raw[0]
+        if not premio_data["ativo"]:
+            return {"success": False, "error": "Premio nao esta ativo"}
+
+        estoque_controlado = premio_data.get("estoque") is not None
+        if estoque_controlado and int(premio_data["estoque"]) <= 0:
+            return self._falha_sem_estoque(premio_id, cliente_id)
+
+        categoria_nome = premio_data.get("categoria")
+        categoria_id = premio_data.get("categoria_id")
+        if categoria_id:
+            categoria_raw = await self.db.query_raw(
+                "SELECT nome FROM categorias_premios WHERE id = $1",
+                int(categoria_id),
+            )
+            if categoria_raw:
+                categoria_nome = categoria_raw[0].get("nome") or categoria_nome
 
-        async with self.db.tx() as transaction:
-            cliente_raw = await transaction.query_raw(
-                'SELECT id, "nomeCompleto", telefone, "enderecoCompleto" FROM clientes WHERE id = $1',
-                cliente_id,
+        # Reserva de estoque: um UPDATE condicional em autocommit. O lock da
+        # linha do premio dura so esse statement, em vez da transacao inteira
+        # de resgate; resgates concorrentes do mesmo premio deixam de
+        # serializar. Se o restante falhar, a unidade e devolvida.
+        if estoque_controlado and not await self._reservar_estoque(premio_id):
+            return self._falha_sem_estoque(premio_id, cliente_id)
+
+        try:
+            result = await self._debitar_e_emitir_codigo(
+                premio_data=premio_data,
+                categoria_nome=categoria_nome,
+                cliente_id=cliente_id,
+                cliente_nome=cliente_nome,
+                funcionario_id=funcionario_id,
+                idempotency_key=idempotency_key,
             )
-            if not cliente_raw:
-                return {"success": False, "error": "Cliente nao encontrado"}
+        except Exception:
+            if estoque_controlado:
+                await self._devolver_estoque(premio_id)
+            raise
 
-            cliente_dados = cliente_raw[0]
-            cliente_nome = cliente_dados.get("nomeCompleto") or "Cliente"
-            cliente_telefone = cliente_dados.get("telefone")
-            cliente_endereco = cliente_dados.get("enderecoCompleto")
+        if not result.get("success"):
+            if estoque_controlado:
+                await self._devolver_estoque(premio_id)
+            return result
+
+        await invalidar_snapshot_saldo(cliente_id)
+        await self._notificar_resgate(
+            result,
+            cliente_nome=cliente_nome,
+            cliente_telefone=cliente_dados.get("telefone"),
+            cliente_endereco=cliente_dados.get("enderecoCompleto"),
+        )
+        return result
 
-            premio_raw = await transaction.query_raw(
+    async def _reservar_estoque(self, premio_id: int) -> bool:
+        reservado = await self.db.query_raw(
+            """
+            UPDATE premios
+            SET estoque = estoque - 1, updated_at = NOW()
+            WHERE id = $1 AND ativo = TRUE AND estoque > 0
+            RETURNING estoque
+            """,
+            premio_id,
+        )
+        return bool(reservado)
+
+    async def _devolver_estoque(self, premio_id: int) -> None:
+        try:
+            await self.db.execute_raw(
                 """
-                SELECT *
-                FROM premios
-                WHERE id = $1
-                FOR UPDATE
+                UPDATE premios
+                SET estoque = estoque + 1, updated_at = NOW()
+                WHERE id = $1 AND estoque IS NOT NULL
                 """,
                 premio_id,
             )
-            if not premio_raw:
-                return {"success": False, "error": "Premio nao encontrado"}
+        except Exception as exc:
+            security_logger.error(
+                f"Falha ao devolver estoque reservado - Premio: {premio_id}: {exc}"
+            )
 
-            premio_data = premio_raw[0]
-            if not premio_data["ativo"]:
-                return {"success": False, "error": "Premio nao esta ativo"}
+    @staticmethod
+    def _falha_sem_estoque(premio_id: int, cliente_id: int) -> Dict[str, Any]:
+        security_logger.warning(
+            "Tentativa de resgate com estoque esgotado - "
+            f"Premio: {premio_id}, Cliente: {cliente_id}"
+        )
+        return {"success": False, "error": "Premio sem estoque disponivel"}
 
-            estoque_atual = premio_data.get("estoque")
-            if estoque_atual is not None and int(estoque_atual) <= 0:
-                security_logger.warning(
-                    "Tentativa de resgate com estoque esgotado - "
-                    f"Premio: {premio_id}, Cliente: {cliente_id}"
-                )
-                return {"success": False, "error": "Premio sem estoque disponivel"}
-
-            custo = int(premio_data["preco_em_pontos"])
-            premio_nome = premio_data["nome"]
-            categoria_nome = premio_data.get("categoria")
-            categoria_id = premio_data.get("categoria_id")
-            if categoria_id:
-                categoria_raw = await transaction.query_raw(
-                    "SELECT nome FROM categorias_premios WHERE id = $1",
-                    int(categoria_id),
-                )
-                if categoria_raw:
-                    categoria_nome = categoria_raw[0].get("nome") or categoria_nome
+    async def _debitar_e_emitir_codigo(
+        self,
+        premio_data: Dict[str, Any],
+        categoria_nome: Optional[str],
+        cliente_id: int,
+        cliente_nome: str,
+        funcionario_id: Optional[int],
+        idempotency_key: Optional[str],
+    ) -> Dict[str, Any]:
+        premio_id = int(premio_data["id"])
+        custo = int(premio_data["preco_em_pontos"])
+        premio_nome = premio_data["nome"]
 
+        async with self.db.tx() as transaction:
             usuario_pontos_raw = await transaction.query_raw(
                 """
                 SELECT *
@@ -275,22 +344,6 @@ class PremioRepositoryAtomic:
                 }
             )
 
-            if estoque_atual is not None:
-                await transaction.execute_raw(
-                    """
-                    UPDATE premios
-                    SET estoque = estoque - 1, updated_at = NOW()
-                    WHERE id = $1 AND estoque > 0
-                    """,
-                    premio_id,
-                )
-                estoque_verificacao = await transaction.query_raw(
-                    "SELECT estoque FROM premios WHERE id = $1",
-                    premio_id,
-                )
-                if estoque_verificacao and int(estoque_verificacao[0]["estoque"]) < 0:
-                    raise Exception("Estoque ficou negativo durante o processamento")
-
             codigo_resgate = await self._gerar_codigo_resgate(transaction)
             expira_em = now_utc() + timedelta(days=30)
 
@@ -340,7 +393,7 @@ class PremioRepositoryAtomic:
                 f"Pontos: {custo}, Saldo: {saldo_atual} -> {novo_saldo}, Codigo: {codigo_resgate}"
             )
 
-            result = {
+            return {
                 "success": True,
                 "resgate_id": resgate.id,
                 "status": RESGATE_STATUS_AGUARDANDO_USO,
@@ -362,6 +415,16 @@ class PremioRepositoryAtomic:
                 "mensagem": "Experiencia confirmada com sucesso.",
             }
 
+    async def _notificar_resgate(
+        self,
+        result: Dict[str, Any],
+        cliente_nome: str,
+        cliente_telefone: Optional[str],
+        cliente_endereco: Optional[str],
+    ) -> None:
+        premio_nome = result["premio"]["nome"]
+        codigo_resgate = result.get("codigo_resgate")
+        custo = result.get("pontos_usados")
         try:
             from app.services.whatsapp_service import get_whatsapp_service
 
@@ -398,8 +461,6 @@ class PremioRepositoryAtomic:
         except Exception as exc:
             security_logger.error(f"Erro ao enviar notificacao WhatsApp: {exc}")
 
-        return result
-
     async def obter_codigo_resgate(self, codigo_resgate: str) -> Dict[str, Any]:
         codigo = self._normalizar_codigo(codigo_resgate)
         if not codigo:
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from prisma import Client
 from app.schemas.quarto_schema import QuartoCreate, QuartoUpdate, QuartoResponse, StatusQuarto, TipoSuite
 from app.utils.datetime_utils import now_utc
+from app.services.calendario_service import atualizar_calendario_quartos
 
 
 class QuartoRepository:
@@ -63,6 +64,7 @@ class QuartoRepository:
                 "status": quarto.status
             }
         )
+        await atualizar_calendario_quartos(self.db, novo_quarto.numero)
         
         return self._serialize_quarto(novo_quarto)
     
@@ -92,7 +94,9 @@ class QuartoRepository:
             data=update_data
         )
         
-        updated_quarto = await self.db.quarto.find_unique(where={"numero": numero})
+        numero_atual = update_data.get("numero", numero)
+        await atualizar_calendario_quartos(self.db, numero, numero_atual)
+        updated_quarto = await self.db.quarto.find_unique(where={"numero": numero_atual})
         return self._serialize_quarto(updated_quarto)
     
     async def update_status(self, numero: str, status: StatusQuarto) -> Dict[str, Any]:
@@ -105,6 +109,7 @@ class QuartoRepository:
             where={"numero": numero},
             data={"status": status}
         )
+        await atualizar_calendario_quartos(self.db, numero)
         
         updated_quarto = await self.db.quarto.find_unique(where={"numero": numero})
         return self._serialize_quarto(updated_quarto)
@@ -131,6 +136,7 @@ class QuartoRepository:
         
         # Se não houver restrições, deleta o quarto
         await self.db.quarto.delete(where={"numero": numero})
+        await atualizar_calendario_quartos(self.db, numero)
         
         return {
             "success": True,
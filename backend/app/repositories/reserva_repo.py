@@ -1,13 +1,21 @@
 ﻿from typing import Dict, Any, List
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
 from datetime import datetime, date
 from typing import Optional
 from fastapi import HTTPException
 from app.schemas.reserva_schema import ReservaCreate, ReservaResponse
 from app.repositories.tarifa_suite_repo import TarifaSuiteRepository
+from app.core.config import settings
 from app.core.validators import ReservaValidator
 from prisma import Client
 from prisma.errors import UniqueViolationError
+from app.core.event_hub import event_hub
+from app.services.antifraude_score_service import marcar_cliente_para_reanalise
+from app.services.calendario_service import atualizar_calendario_quartos
+from app.services.checkout_alert_service import agendar_checkout, remover_checkout
 from app.services.notification_service import NotificationService
+from app.services.reserva_lock_service import ReservaLockService, ReservaLockTimeout
 from app.services.whatsapp_service import get_whatsapp_service
 import secrets
 import re
@@ -17,6 +25,110 @@ STATUS_RESERVA_HOSPEDADO = {"HOSPEDADO", "CHECKIN_REALIZADO", "CHECKED_IN"}
 STATUS_RESERVA_FINALIZADO = {"CHECKED_OUT", "CHECKOUT_REALIZADO", "FINALIZADA"}
 STATUS_RESERVA_CANCELADO = {"CANCELADO", "CANCELADA", "NO_SHOW"}
 STATUS_PAGAMENTO_APROVADO = {"PAGO", "APROVADO", "CONFIRMADO", "CAPTURED", "AUTHORIZED"}
+RESERVA_LOCK_EXPIRADO_MSG = (
+    "A reserva demorou mais que o esperado e a trava do quarto expirou. Tente novamente."
+)
+
+# Perfis de serializacao (?view=): cada tela recebe so os campos que renderiza
+# e o include do Prisma acompanha os campos pedidos. Fora do detalhe a
+# hospedagem vem resumida (sem assinaturas nem checkin/checkout_dados).
+CAMPOS_RESERVA_CARD = (
+    "id", "codigo_reserva", "cliente_id", "cliente_nome", "quarto_numero", "tipo_suite",
+    "checkin_previsto", "checkout_previsto", "valor_total", "status",
+)
+CAMPOS_RESERVA = CAMPOS_RESERVA_CARD + (
+    "checkin_realizado", "checkout_realizado", "valor_diaria", "num_diarias", "origem",
+    "responsavel_nome", "forma_pagamento", "observacoes", "telefone_contato", "email_contato",
+    "criado_por_funcionario_id", "tarifa_suite_id", "valor_desconto", "valor_total_com_desconto",
+    "pagamentos", "hospedagem", "cupom_uso", "created_at", "updated_at",
+)
+RESERVA_VIEWS = {"card": CAMPOS_RESERVA_CARD, "list": CAMPOS_RESERVA, "detail": CAMPOS_RESERVA}
+RESERVA_VIEW_PADRAO = "detail"
+_INCLUDE_CUPOM_USO = {"cupomUso": {"include": {"cupom": True}}}
+_INCLUDE_POR_CAMPO_RESERVA = {
+    "pagamentos": {"pagamentos": True},
+    "cupom_uso": _INCLUDE_CUPOM_USO,
+    "valor_desconto": _INCLUDE_CUPOM_USO,
+    "valor_total_com_desconto": _INCLUDE_CUPOM_USO,
+    "telefone_contato": {"cliente": True},
+    "email_contato": {"cliente": True},
+}
+
+
+def _violou_exclusao_periodo(exc: Exception) -> bool:
+    return "reservas_quarto_periodo_no_overlap" in str(exc)
+
+
+def _quarto_acabou_de_ser_reservado(quarto_numero: str) -> str:
+    return (
+        f"Quarto {quarto_numero} acabou de ser reservado por outra "
+        f"pessoa para este periodo. Atualize a disponibilidade e escolha "
+        f"outro quarto ou periodo."
+    )
+
+CONFLITO_CLIENTE_RESERVA_ATIVA = "CLIENTE_COM_RESERVA_ATIVA"
+CONFLITO_QUARTO_INDISPONIVEL = "QUARTO_INDISPONIVEL"
+CONFLITO_QUARTO_RESERVADO_AGORA = "QUARTO_RESERVADO_AGORA"
+
+
+class ReservaConflito(ValueError):
+    """Reserva recusada por conflito de periodo; as rotas devolvem 409 com `detalhes()`."""
+
+    def __init__(
+        self,
+        codigo: str,
+        mensagem: str,
+        motivo: str = None,
+        conflitos: List[Dict[str, Any]] = None,
+        alternativas: List[Dict[str, Any]] = None,
+    ):
+        super().__init__(mensagem)
+        self.codigo = codigo
+        self.motivo = motivo or mensagem
+        self.conflitos = conflitos or []
+        self.alternativas = alternativas or []
+
+    def detalhes(self, publico: bool = False) -> Dict[str, Any]:
+        # Na API publica nao vao codigos nem nomes de outros hospedes.
+        if publico:
+            return {"codigo": self.codigo, "mensagem": self.motivo, "alternativas": self.alternativas}
+        return {
+            "codigo": self.codigo,
+            "mensagem": str(self),
+            "motivo": self.motivo,
+            "conflitos": self.conflitos,
+            "alternativas": self.alternativas,
+        }
+
+
+def _conflito_cliente(reserva_ativa) -> ReservaConflito:
+    from app.utils.datetime_utils import to_utc, now_utc
+
+    dias_restantes = (to_utc(reserva_ativa.checkinPrevisto).date() - now_utc().date()).days
+    linhas = [
+        "Cliente ja possui reserva ativa neste periodo.",
+        f"Reserva {reserva_ativa.codigoReserva} - quarto {reserva_ativa.quartoNumero} "
+        f"({reserva_ativa.checkinPrevisto.strftime('%d/%m/%Y')} a "
+        f"{reserva_ativa.checkoutPrevisto.strftime('%d/%m/%Y')}, {reserva_ativa.statusReserva})",
+    ]
+    if dias_restantes > 0:
+        linhas.append("Para uma nova reserva, conclua o check-out ou cancele a reserva atual.")
+    else:
+        linhas.append("Entre em contato com a recepcao para assistencia.")
+    return ReservaConflito(
+        CONFLITO_CLIENTE_RESERVA_ATIVA,
+        "\n".join(linhas),
+        motivo="Cliente ja possui reserva ativa neste periodo",
+        conflitos=[{
+            "reserva_id": reserva_ativa.id,
+            "codigo": reserva_ativa.codigoReserva,
+            "quarto": reserva_ativa.quartoNumero,
+            "checkin": reserva_ativa.checkinPrevisto.isoformat(),
+            "checkout": reserva_ativa.checkoutPrevisto.isoformat(),
+            "status": reserva_ativa.statusReserva,
+        }],
+    )
+
 
 class ReservaRepository:
     def __init__(self, db: Client):
@@ -81,6 +193,21 @@ class ReservaRepository:
         if reserva:
             await self._notificar_whatsapp_reserva(reserva, evento, detalhe=detalhe)
 
+    async def _publicar_evento_reserva(self, tipo: str, reserva: Dict[str, Any]) -> None:
+        # Toda mudanca de reserva altera as features antifraude do cliente
+        # e a ocupacao do quarto no calendario.
+        await marcar_cliente_para_reanalise(reserva.get("cliente_id"))
+        await atualizar_calendario_quartos(self.db, reserva.get("quarto_numero"))
+        await event_hub.publicar(
+            tipo,
+            {
+                "id": reserva.get("id"),
+                "codigo": reserva.get("codigo_reserva"),
+                "status": reserva.get("status"),
+                "quarto": reserva.get("quarto_numero"),
+            },
+        )
+
     def _default_include(self) -> Dict[str, Any]:
         return {
             "cliente": True,
@@ -89,12 +216,78 @@ class ReservaRepository:
             "cupomUso": {"include": {"cupom": True}},
         }
 
+    def _resolver_view(self, view: Optional[str], fields: Optional[List[str]]) -> tuple:
+        """Campos a serializar e se a hospedagem vem completa, a partir de view/fields."""
+        view = (view or RESERVA_VIEW_PADRAO).strip().lower()
+        if view not in RESERVA_VIEWS:
+            raise ValueError(f"View invalida: {view}. Use {', '.join(RESERVA_VIEWS)}")
+        campos = RESERVA_VIEWS[view]
+        if fields:
+            invalidos = [f for f in fields if f not in CAMPOS_RESERVA]
+            if invalidos:
+                raise ValueError(f"Campos invalidos: {', '.join(invalidos)}")
+            campos = tuple(dict.fromkeys(["id", *fields]))
+        return campos, view == "detail"
+
+    def _include_para_campos(self, campos, hospedagem_completa: bool) -> Dict[str, Any]:
+        include: Dict[str, Any] = {}
+        for campo in campos:
+            include.update(_INCLUDE_POR_CAMPO_RESERVA.get(campo, {}))
+        if hospedagem_completa and "hospedagem" in campos:
+            include["hospedagem"] = True
+        return include
+
+    async def _hospedagens_resumidas(self, reserva_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Hospedagem sem as colunas pesadas (assinaturas e JSON de checkin/checkout)."""
+        if not reserva_ids:
+            return {}
+        rows = await self.db.query_raw(
+            """
+            SELECT
+                reserva_id,
+                id,
+                status_hospedagem,
+                checkin_realizado_em,
+                checkout_realizado_em,
+                checkin_realizado_por,
+                checkout_realizado_por,
+                created_at
+            FROM hospedagens
+            WHERE reserva_id = ANY($1::int[])
+            """,
+            reserva_ids,
+        )
+        return {
+            int(row["reserva_id"]): {
+                "id": row.get("id"),
+                "status_hospedagem": row.get("status_hospedagem"),
+                "data_checkin": row.get("checkin_realizado_em"),
+                "data_checkout": row.get("checkout_realizado_em"),
+                "checkin_realizado_por": row.get("checkin_realizado_por"),
+                "checkout_realizado_por": row.get("checkout_realizado_por"),
+                "created_at": row.get("created_at"),
+            }
+            for row in rows
+        }
+
     def _calcular_valor_total_model(self, reserva) -> float:
         valor_total_salvo = getattr(reserva, "valorTotal", None)
         if valor_total_salvo is not None:
             return float(valor_total_salvo)
         return float(getattr(reserva, "valorDiaria", 0) or 0) * int(getattr(reserva, "numDiarias", 0) or 0)
 
+    @asynccontextmanager
+    async def _lock_quarto_periodo(self, quarto_id: int, checkin, checkout):
+        """Serializa criacao/alteracao de reservas que disputam o mesmo quarto/periodo."""
+        try:
+            async with ReservaLockService(self.db).bloquear(quarto_id, checkin, checkout) as lock:
+                yield lock
+        except ReservaLockTimeout:
+            raise ValueError(
+                "Outra reserva para este quarto/periodo esta sendo registrada agora. "
+                "Aguarde alguns segundos e tente novamente."
+            )
+
     async def _obter_valor_total_devido(self, reserva_id: int, reserva=None) -> float:
         valor_bruto = self._calcular_valor_total_model(reserva) if reserva else 0.0
         cupom_uso = await self.db.cupomuso.find_first(where={"reservaId": reserva_id})
@@ -145,9 +338,17 @@ class ReservaRepository:
         checkin_fim: str = None,
         limit: int = 100,
         offset: int = 0,
-        order_by: str = None
+        order_by: str = None,
+        view: str = None,
+        fields: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Listar todas as reservas com filtros e busca"""
+        """
+        Listar todas as reservas com filtros e busca.
+
+        `view` (card, list, detail) ou `fields` definem os campos serializados;
+        so as relacoes usadas por esses campos entram no include.
+        """
+        campos, hospedagem_completa = self._resolver_view(view, fields)
         where_conditions = {}
         
         # Filtro de busca (nome cliente ou nÃºmero quarto)
@@ -193,14 +394,26 @@ class ReservaRepository:
         # Buscar registros com paginaÃ§Ã£o - P0-002: Incluir pagamentos e hospedagem
         registros = await self.db.reserva.find_many(
             where=where_conditions if where_conditions else None,
-            include=self._default_include(),
+            include=self._include_para_campos(campos, hospedagem_completa) or None,
             order=order_clause,
             skip=offset,
             take=limit
         )
+
+        if hospedagem_completa:
+            reservas = [self._serialize_reserva(r) for r in registros]
+        else:
+            hospedagens = (
+                await self._hospedagens_resumidas([r.id for r in registros]) if "hospedagem" in campos else {}
+            )
+            reservas = [
+                {**self._serialize_reserva(r), "hospedagem": hospedagens.get(r.id)} for r in registros
+            ]
+        if campos != CAMPOS_RESERVA:
+            reservas = [{campo: reserva[campo] for campo in campos} for reserva in reservas]
         
         return {
-            "reservas": [self._serialize_reserva(r) for r in registros],
+            "reservas": reservas,
             "total": total,
             "limit": limit,
             "offset": offset
@@ -212,99 +425,186 @@ class ReservaRepository:
         notificar: bool = True,
         criado_por_funcionario_id: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """Criar nova reserva com validaÃ§Ãµes"""
-        # Verificar se cliente existe
-        cliente = await self.db.cliente.find_unique(where={"id": reserva.cliente_id})
-        if not cliente:
-            raise ValueError("Cliente nÃ£o encontrado")
+        """
+        Criar nova reserva.
 
-        # VALIDAÃ‡ÃƒO: Verificar se cliente jÃ¡ tem reservas ativas
-        reservas_ativas = await self.db.reserva.find_many(
-            where={
-                "clienteId": reserva.cliente_id,
-                "statusReserva": {"in": ["PENDENTE", "CONFIRMADA", "HOSPEDADO"]}
-            }
+        Cliente, reservas ativas do cliente, tarifa e quarto sao lidos em
+        paralelo (uma ida ao banco de latencia). A validacao de periodo e o
+        proprio INSERT (constraint de exclusao, migration 016); conflitos e
+        alternativas so sao carregados na falha e sobem como ReservaConflito.
+        """
+        if reserva.checkout_previsto <= reserva.checkin_previsto:
+            raise ValueError("Data de check-out deve ser posterior ao check-in")
+
+        # return_exceptions: os erros sobem na mesma ordem da validacao sequencial.
+        cliente, reservas_ativas, tarifa, quarto = await asyncio.gather(
+            self.db.cliente.find_unique(where={"id": reserva.cliente_id}),
+            self.db.reserva.find_many(
+                where={
+                    "clienteId": reserva.cliente_id,
+                    "statusReserva": {"in": ["PENDENTE", "CONFIRMADA", "HOSPEDADO"]},
+                }
+            ),
+            self._obter_tarifa_diaria(reserva.tipo_suite, reserva.checkin_previsto),
+            self.db.quarto.find_unique(where={"numero": reserva.quarto_numero}),
+            return_exceptions=True,
         )
-        
-        if reservas_ativas:
-            # Verificar se hÃ¡ conflito de datas
-            for reserva_ativa in reservas_ativas:
-                # Se a reserva ativa estiver no mesmo perÃ­odo ou sobrepor o novo perÃ­odo
-                if (reserva.checkin_previsto.date() <= reserva_ativa.checkoutPrevisto.date() and 
+        for resultado in (cliente, reservas_ativas, tarifa, quarto):
+            if isinstance(resultado, BaseException):
+                raise resultado
+
+        if not cliente:
+            raise ValueError("Cliente nÃ£o encontrado")
+        for reserva_ativa in reservas_ativas:
+            if (reserva.checkin_previsto.date() <= reserva_ativa.checkoutPrevisto.date() and
                     reserva.checkout_previsto.date() >= reserva_ativa.checkinPrevisto.date()):
-                    
-                    # Calcular dias restantes da reserva ativa
-                    from app.utils.datetime_utils import to_utc, now_utc
-                    checkout_previsto_utc = to_utc(reserva_ativa.checkinPrevisto)
-                    dias_restantes = (checkout_previsto_utc.date() - now_utc().date()).days
-                    
-                    msg_erro = f"âŒ CLIENTE JÃ POSSUI RESERVA ATIVA!"
-                    msg_erro += f"\n\nðŸ“‹ Reserva existente: {reserva_ativa.codigoReserva}"
-                    msg_erro += f"\n  â€¢ Quarto: {reserva_ativa.quartoNumero}"
-                    msg_erro += f"\n  â€¢ Check-in: {reserva_ativa.checkinPrevisto.strftime('%d/%m/%Y')}"
-                    msg_erro += f"\n  â€¢ Check-out: {reserva_ativa.checkoutPrevisto.strftime('%d/%m/%Y')}"
-                    msg_erro += f"\n  â€¢ Status: {reserva_ativa.statusReserva}"
-                    
-                    if dias_restantes > 0:
-                        msg_erro += f"\n\nâš ï¸ Para fazer uma nova reserva, vocÃª deve:"
-                        msg_erro += f"\n  1. Aguardar o check-in da reserva atual"
-                        msg_erro += f"\n  2. Fazer check-out da reserva atual"
-                        msg_erro += f"\n  3. Cancelar a reserva atual (se permitido)"
-                    else:
-                        msg_erro += f"\n\nðŸ“ž Entre em contato com a recepÃ§Ã£o para assistÃªncia."
-                    
-                    raise ValueError(msg_erro)
-
-        valor_diaria, tarifa_suite_id = await self._obter_tarifa_diaria(
-            reserva.tipo_suite,
-            reserva.checkin_previsto,
-        )
+                raise _conflito_cliente(reserva_ativa)
 
-        quarto = await self.db.quarto.find_unique(where={"numero": reserva.quarto_numero})
+        valor_diaria, tarifa_suite_id = tarifa
         if not quarto:
             raise ValueError("Quarto nÃ£o encontrado")
+        if quarto.status in ("BLOQUEADO", "MANUTENCAO", "INATIVO"):
+            raise await self._conflito_quarto(
+                reserva,
+                quarto,
+                {"disponivel": False, "motivo": f"Quarto esta {quarto.status.lower()}", "conflitos": []},
+            )
+
+        dados_insercao = (reserva, cliente, quarto, valor_diaria, tarifa_suite_id, criado_por_funcionario_id)
+        if settings.RESERVA_INSERCAO_OTIMISTA:
+            # Insert direto: a constraint de exclusao (migration 016) arbitra a
+            # disputa e os detalhes do conflito so sao carregados na falha.
+            try:
+                nova_reserva = await self._inserir_reserva(*dados_insercao)
+            except Exception as exc:
+                if not _violou_exclusao_periodo(exc):
+                    raise
+                raise await self._conflito_quarto(reserva, quarto)
+        else:
+            async with self._lock_quarto_periodo(quarto.id, reserva.checkin_previsto, reserva.checkout_previsto) as lock:
+                # Checagem e INSERT na conexao do lock (transacao no backend Postgres)
+                from app.services.disponibilidade_service import DisponibilidadeService
+                resultado = await DisponibilidadeService(lock.db).verificar_disponibilidade(
+                    reserva.quarto_numero,
+                    reserva.checkin_previsto,
+                    reserva.checkout_previsto,
+                    quarto=quarto,
+                )
+                if not resultado["disponivel"]:
+                    raise await self._conflito_quarto(reserva, quarto, resultado)
+
+                if not lock.ainda_valido():
+                    raise ValueError(RESERVA_LOCK_EXPIRADO_MSG)
+
+                try:
+                    nova_reserva = await self._inserir_reserva(*dados_insercao, conexao=lock.db)
+                except Exception as exc:
+                    # Corrida real de disponibilidade: dois processos passaram na
+                    # checagem, mas a constraint de exclusao (migration 016) so
+                    # deixa um vencer. Sem este tratamento o perdedor recebia 500.
+                    if _violou_exclusao_periodo(exc):
+                        raise await self._conflito_quarto(reserva, quarto, {"disponivel": True})
+                    raise
+
+        if not nova_reserva:
+            raise ValueError("NÃ£o foi possÃ­vel gerar um cÃ³digo de reserva Ãºnico")
         
-        if quarto.status in ("BLOQUEADO", "MANUTENCAO"):
-            raise ValueError(f"âŒ Quarto {reserva.quarto_numero} estÃ¡ {quarto.status.lower()} e nÃ£o pode ser reservado")
-        
-        # VALIDAÃ‡ÃƒO CRÃTICA: Verificar disponibilidade usando DisponibilidadeService
+        # Criar notificaÃ§Ã£o de nova reserva
+        if notificar:
+            reserva_notificacao = await self.db.reserva.find_unique(
+                where={"id": nova_reserva.id},
+                include=self._default_include(),
+            )
+            # O alerta WhatsApp para o admin ja acontece dentro de
+            # notificar_nova_reserva (garantido para todo caller, nao so este).
+            await NotificationService.notificar_nova_reserva(self.db, reserva_notificacao or nova_reserva)
+
+        try:
+            from app.services.indicacao_service import IndicacaoService
+            await IndicacaoService(self.db).registrar_reserva_realizada(nova_reserva.id)
+        except Exception as e:
+            print(f"[CONVITE REAL] Erro ao registrar reserva realizada: {e}")
+
+        resultado = self._serialize_reserva(nova_reserva)
+        await self._publicar_evento_reserva("reserva.criada", resultado)
+        return resultado
+    
+    async def _conflito_quarto(
+        self, reserva: ReservaCreate, quarto, resultado: Optional[Dict[str, Any]] = None
+    ) -> "ReservaConflito":
+        """Conflitos do quarto e alternativas do mesmo tipo de suite, consultados em paralelo."""
         from app.services.disponibilidade_service import DisponibilidadeService
-        disponibilidade_service = DisponibilidadeService(self.db)
-        
-        resultado = await disponibilidade_service.verificar_disponibilidade(
-            reserva.quarto_numero,
+
+        disponibilidade = DisponibilidadeService(self.db)
+        alternativas_pendentes = disponibilidade.sugerir_quartos_alternativos(
+            reserva.tipo_suite,
             reserva.checkin_previsto,
-            reserva.checkout_previsto
+            reserva.checkout_previsto,
+            limite=3
         )
-        
-        if not resultado["disponivel"]:
-            # Sugerir quartos alternativos
-            alternativas = await disponibilidade_service.sugerir_quartos_alternativos(
-                reserva.tipo_suite,
-                reserva.checkin_previsto,
-                reserva.checkout_previsto,
-                limite=3
+        if resultado is None:
+            resultado, alternativas = await asyncio.gather(
+                disponibilidade.verificar_disponibilidade(
+                    reserva.quarto_numero,
+                    reserva.checkin_previsto,
+                    reserva.checkout_previsto,
+                    quarto=quarto,
+                ),
+                alternativas_pendentes,
             )
-            
-            msg_erro = f"âŒ QUARTO INDISPONÃVEL! {resultado['motivo']}"
-            
-            if resultado["conflitos"]:
-                msg_erro += f"\n\nðŸ“‹ Conflitos encontrados:"
-                for conflito in resultado["conflitos"]:
-                    msg_erro += f"\n  â€¢ Reserva {conflito['codigo']} - {conflito['cliente']}"
-                    msg_erro += f"\n    Check-in: {conflito['checkin'][:10]} | Check-out: {conflito['checkout'][:10]}"
-            
-            if alternativas:
-                msg_erro += f"\n\nðŸ’¡ Quartos {reserva.tipo_suite} disponÃ­veis no perÃ­odo:"
-                for alt in alternativas:
-                    msg_erro += f"\n  â€¢ Quarto {alt['numero']}"
-            else:
-                msg_erro += f"\n\nâš ï¸ Nenhum quarto {reserva.tipo_suite} disponÃ­vel neste perÃ­odo"
-            
-            raise ValueError(msg_erro)
-        
+        else:
+            alternativas = await alternativas_pendentes
+
+        alternativas = [{"numero": alt["numero"], "tipo_suite": alt["tipo_suite"]} for alt in alternativas]
+        if resultado["disponivel"]:
+            # A reserva conflitante saiu (ou entrou) entre o INSERT e a consulta.
+            return ReservaConflito(
+                CONFLITO_QUARTO_RESERVADO_AGORA,
+                _quarto_acabou_de_ser_reservado(reserva.quarto_numero),
+                motivo="Quarto reservado por outra pessoa neste instante",
+                alternativas=alternativas,
+            )
+
+        linhas = [f"Quarto {reserva.quarto_numero} indisponivel: {resultado['motivo']}."]
+        for conflito in resultado["conflitos"]:
+            linhas.append(
+                f"Reserva {conflito['codigo']} - {conflito['cliente']} "
+                f"({conflito['checkin'][:10]} a {conflito['checkout'][:10]})"
+            )
+        if alternativas:
+            linhas.append(f"Quartos {reserva.tipo_suite} disponiveis no periodo: " + ", ".join(
+                f"Quarto {alt['numero']}" for alt in alternativas
+            ))
+        else:
+            linhas.append(f"Nenhum quarto {reserva.tipo_suite} disponivel neste periodo.")
+        return ReservaConflito(
+            CONFLITO_QUARTO_INDISPONIVEL,
+            "\n".join(linhas),
+            motivo=resultado["motivo"],
+            conflitos=resultado["conflitos"],
+            alternativas=alternativas,
+        )
+
+    async def _inserir_reserva(
+        self,
+        reserva: ReservaCreate,
+        cliente,
+        quarto,
+        valor_diaria,
+        tarifa_suite_id,
+        criado_por_funcionario_id: Optional[int],
+        conexao=None,
+    ):
+        """INSERT com retry so para colisao de codigo; a violacao de periodo sobe para o caller.
+
+        `conexao` e a transacao do lock de quarto/periodo, quando houver.
+        """
         from app.utils.datetime_utils import now_utc
-        
+
+        conexao = conexao if conexao is not None else self.db
+        # Dentro de transacao a colisao abortaria tudo: cada tentativa num savepoint.
+        em_transacao = conexao is not self.db
+
         # Gerar cÃ³digo Ãºnico com retry (evita colisÃµes em concorrÃªncia)
         tentativa = 0
         nova_reserva = None
@@ -312,8 +612,10 @@ class ReservaRepository:
             tentativa += 1
             codigo_reserva = f"RCF-{now_utc().strftime('%Y%m')}-{secrets.token_hex(3).upper()}"
 
+            if em_transacao:
+                await conexao.execute_raw("SAVEPOINT reserva_codigo")
             try:
-                nova_reserva = await self.db.reserva.create(
+                nova_reserva = await conexao.reserva.create(
                     data={
                         "codigoReserva": codigo_reserva,
                         "clienteId": reserva.cliente_id,
@@ -340,39 +642,11 @@ class ReservaRepository:
                 break
             except UniqueViolationError:
                 nova_reserva = None
-            except Exception as exc:
-                # Corrida real de disponibilidade: dois processos passaram na
-                # checagem, mas a constraint de exclusao (migration 016) so
-                # deixa um vencer. Sem este tratamento o perdedor recebia 500.
-                if "reservas_quarto_periodo_no_overlap" in str(exc):
-                    raise ValueError(
-                        f"Quarto {reserva.quarto_numero} acabou de ser reservado por outra "
-                        f"pessoa para este periodo. Atualize a disponibilidade e escolha "
-                        f"outro quarto ou periodo."
-                    )
-                raise
+                if em_transacao:
+                    await conexao.execute_raw("ROLLBACK TO SAVEPOINT reserva_codigo")
 
-        if not nova_reserva:
-            raise ValueError("NÃ£o foi possÃ­vel gerar um cÃ³digo de reserva Ãºnico")
-        
-        # Criar notificaÃ§Ã£o de nova reserva
-        if notificar:
-            reserva_notificacao = await self.db.reserva.find_unique(
-                where={"id": nova_reserva.id},
-                include=self._default_include(),
-            )
-            # O alerta WhatsApp para o admin ja acontece dentro de
-            # notificar_nova_reserva (garantido para todo caller, nao so este).
-            await NotificationService.notificar_nova_reserva(self.db, reserva_notificacao or nova_reserva)
+        return nova_reserva
 
-        try:
-            from app.services.indicacao_service import IndicacaoService
-            await IndicacaoService(self.db).registrar_reserva_realizada(nova_reserva.id)
-        except Exception as e:
-            print(f"[CONVITE REAL] Erro ao registrar reserva realizada: {e}")
-
-        return self._serialize_reserva(nova_reserva)
-    
     async def get_by_id(self, reserva_id: int) -> Dict[str, Any]:
         """Obter reserva por ID com todos os dados relacionados"""
         # Buscar reserva com pagamentos incluÃ­dos
@@ -452,7 +726,10 @@ class ReservaRepository:
         await NotificationService.notificar_checkin_realizado(self.db, updated_reserva)
         await self._notificar_whatsapp_reserva(updated_reserva, "check-in realizado")
         
-        return self._serialize_reserva(updated_reserva)
+        await agendar_checkout(reserva_id, getattr(updated_reserva, "checkoutPrevisto", None))
+        resultado = self._serialize_reserva(updated_reserva)
+        await self._publicar_evento_reserva("reserva.checkin", resultado)
+        return resultado
     
     async def checkout(self, reserva_id: int) -> Dict[str, Any]:
         """Realizar check-out da reserva"""
@@ -583,6 +860,8 @@ class ReservaRepository:
         resultado["pontos_bonus_promo"] = pontos_bonus_promo if pontos_bonus_promo > 0 else 0
         resultado["pontos_convite_real"] = pontos_indicacao if pontos_indicacao > 0 else 0
         
+        await remover_checkout(reserva_id)
+        await self._publicar_evento_reserva("reserva.checkout", resultado)
         return resultado
     
     async def cancelar(self, reserva_id: int) -> Dict[str, Any]:
@@ -717,6 +996,8 @@ class ReservaRepository:
         }
         resultado["estorno_pontos"] = estorno_pontos
 
+        await remover_checkout(reserva_id)
+        await self._publicar_evento_reserva("reserva.cancelada", resultado)
         return resultado
     
     async def _pode_processar_estorno(self, pagamento) -> Dict[str, Any]:
@@ -1024,34 +1305,48 @@ class ReservaRepository:
         if novo_checkin and novo_checkout and novo_checkout <= novo_checkin:
             raise ValueError("Data de check-out deve ser posterior ao check-in")
 
-        if any(campo in update_data for campo in ("quartoNumero", "checkinPrevisto", "checkoutPrevisto")):
-            from app.services.disponibilidade_service import DisponibilidadeService
-            disponibilidade = await DisponibilidadeService(self.db).verificar_disponibilidade(
-                novo_quarto_numero,
-                novo_checkin,
-                novo_checkout,
-                reserva_id_excluir=reserva_id,
-            )
-            if not disponibilidade.get("disponivel"):
-                raise ValueError(disponibilidade.get("motivo") or "Quarto nÃ£o disponÃ­vel para o perÃ­odo")
-        
         quarto_antigo = getattr(reserva, "quartoNumero", None)
 
-        # Atualizar reserva
-        try:
-            await self.db.reserva.update(
-                where={"id": reserva_id},
-                data=update_data
-            )
-        except Exception as exc:
-            # Mesma protecao do create: a constraint de exclusao e o arbitro
-            # final quando a troca de quarto/datas colide com outra reserva.
-            if "reservas_quarto_periodo_no_overlap" in str(exc):
-                raise ValueError(
-                    "O quarto/periodo escolhido acabou de ser ocupado por outra reserva. "
-                    "Atualize a disponibilidade e tente novamente."
+        async with AsyncExitStack() as pilha:
+            conexao = self.db
+            if any(campo in update_data for campo in ("quartoNumero", "checkinPrevisto", "checkoutPrevisto")):
+                # Mesmo lock do create para o quarto/periodo de destino
+                lock = await pilha.enter_async_context(
+                    self._lock_quarto_periodo(
+                        update_data.get("quartoId", reserva.quartoId),
+                        novo_checkin,
+                        novo_checkout,
+                    )
+                )
+                # Checagem e UPDATE na conexao do lock (transacao no backend Postgres)
+                conexao = lock.db
+                from app.services.disponibilidade_service import DisponibilidadeService
+                disponibilidade = await DisponibilidadeService(conexao).verificar_disponibilidade(
+                    novo_quarto_numero,
+                    novo_checkin,
+                    novo_checkout,
+                    reserva_id_excluir=reserva_id,
                 )
-            raise
+                if not disponibilidade.get("disponivel"):
+                    raise ValueError(disponibilidade.get("motivo") or "Quarto nÃ£o disponÃ­vel para o perÃ­odo")
+                if not lock.ainda_valido():
+                    raise ValueError(RESERVA_LOCK_EXPIRADO_MSG)
+
+            # Atualizar reserva
+            try:
+                await conexao.reserva.update(
+                    where={"id": reserva_id},
+                    data=update_data
+                )
+            except Exception as exc:
+                # Mesma protecao do create: a constraint de exclusao e o arbitro
+                # final quando a troca de quarto/datas colide com outra reserva.
+                if "reservas_quarto_periodo_no_overlap" in str(exc):
+                    raise ValueError(
+                        "O quarto/periodo escolhido acabou de ser ocupado por outra reserva. "
+                        "Atualize a disponibilidade e tente novamente."
+                    )
+                raise
         
         updated_reserva = await self.db.reserva.find_unique(where={"id": reserva_id}, include=self._default_include())
         if update_data:
@@ -1060,6 +1355,8 @@ class ReservaRepository:
                 await self._notificar_whatsapp_reserva(updated_reserva, "quarto alterado", detalhe=detalhe)
             else:
                 await self._notificar_whatsapp_reserva(updated_reserva, "atualizada")
+        if any(campo in update_data for campo in ("quartoNumero", "checkinPrevisto", "checkoutPrevisto")):
+            await atualizar_calendario_quartos(self.db, quarto_antigo, novo_quarto_numero)
         return self._serialize_reserva(updated_reserva)
     
     def _serialize_reserva(self, reserva) -> Dict[str, Any]:
@@ -3,6 +3,8 @@ from typing import Any, Dict, List, Optional
 
 from prisma import Client
 
+from app.services.tarifa_calendario_service import tarifa_calendario
+
 
 def _date_to_db_datetime(d: date) -> datetime:
     return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
@@ -106,6 +108,7 @@ class TarifaSuiteRepository:
 
     async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
         tarifa = await self.db.tarifasuite.create(data=self._normalize_write_data(data))
+        await tarifa_calendario.invalidar()
         return self._serialize(tarifa)
 
     async def update(self, tarifa_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -114,6 +117,7 @@ class TarifaSuiteRepository:
                 where={"id": tarifa_id},
                 data=self._normalize_write_data(data),
             )
+            await tarifa_calendario.invalidar()
             return self._serialize(tarifa)
         except Exception:
             return None
@@ -121,6 +125,7 @@ class TarifaSuiteRepository:
     async def soft_delete(self, tarifa_id: int) -> bool:
         try:
             await self.db.tarifasuite.update(where={"id": tarifa_id}, data={"ativo": False})
+            await tarifa_calendario.invalidar()
             return True
         except Exception:
             return False
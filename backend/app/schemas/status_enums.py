@@ -156,24 +156,22 @@ def pode_fazer_checkin(status_reserva: str, status_pagamento: str, status_hosped
     """
     Valida se pode fazer check-in
     
-    Regras:
-    1. Reserva deve estar CONFIRMADA
-    2. Pagamento deve estar PAGO
+    Regras (tabela em app/core/transicoes_reserva.py):
+    1. Reserva deve estar CONFIRMADA (ou alias legado)
+    2. Pagamento deve estar PAGO/CONFIRMADO/APROVADO
     3. Hospedagem deve estar NAO_INICIADA
     
     Returns:
         (pode_fazer, motivo_se_nao_pode)
     """
-    if status_reserva != StatusReserva.CONFIRMADA.value:
-        return False, f"Reserva deve estar CONFIRMADA (atual: {status_reserva})"
-    
-    if status_pagamento != StatusPagamento.PAGO.value:
-        return False, f"Pagamento deve estar PAGO (atual: {status_pagamento})"
-    
-    if status_hospedagem != StatusHospedagem.NAO_INICIADA.value:
-        return False, f"Hospedagem já foi iniciada (atual: {status_hospedagem})"
-    
-    return True, ""
+    from app.core.transicoes_reserva import REALIZAR_CHECKIN, validar_transicao
+
+    pode, motivo = validar_transicao(
+        status_reserva,
+        REALIZAR_CHECKIN,
+        {"status_pagamento": status_pagamento, "status_hospedagem": status_hospedagem},
+    )
+    return pode, "" if pode else motivo
 
 
 def pode_fazer_checkout(status_hospedagem: str) -> tuple[bool, str]:
@@ -196,17 +194,16 @@ def pode_confirmar_reserva(status_reserva: str, status_pagamento: str) -> tuple[
     """
     Valida se pode confirmar reserva
     
-    Regras:
-    1. Reserva deve estar AGUARDANDO_PAGAMENTO
-    2. Pagamento deve estar PAGO
+    Regras (tabela em app/core/transicoes_reserva.py):
+    1. Reserva deve estar pendente (PENDENTE/AGUARDANDO_PAGAMENTO/...)
+    2. Pagamento deve estar PAGO/CONFIRMADO/APROVADO
     
     Returns:
         (pode_fazer, motivo_se_nao_pode)
     """
-    if status_reserva != StatusReserva.AGUARDANDO_PAGAMENTO.value:
-        return False, f"Reserva já foi confirmada ou cancelada (atual: {status_reserva})"
-    
-    if status_pagamento != StatusPagamento.PAGO.value:
-        return False, f"Pagamento deve estar PAGO antes de confirmar (atual: {status_pagamento})"
-    
-    return True, ""
+    from app.core.transicoes_reserva import CONFIRMAR_PAGAMENTO, validar_transicao
+
+    pode, motivo = validar_transicao(
+        status_reserva, CONFIRMAR_PAGAMENTO, {"status_pagamento": status_pagamento}
+    )
+    return pode, "" if pode else motivo
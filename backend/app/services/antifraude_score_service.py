@@ -0,0 +1,306 @@
+"""
+Motor de score antifraude em lote.
+
+As features das regras (reservas em 7 dias, total e cancelamentos, pagamentos
+recusados, cancelamentos consecutivos) sao calculadas para um lote de clientes
+em UMA consulta agregada, pontuadas em memoria por `pontuar_features` e
+gravadas em clientes_risco (migration 036). A lista de suspeitos le a tabela
+pelo indice de score.
+
+Atualizacao incremental: eventos de reserva e de pagamento recusado marcam o
+cliente em ANTIFRAUDE_REANALISE_KEY (SET no Redis) e a task
+antifraude.recalcular_marcados recalcula so esses clientes. O recalculo
+completo diario envelhece a janela de 7 dias e cobre eventos perdidos.
+"""
+import json
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.cache import cache
+from app.utils.datetime_utils import now_utc
+
+
+ANTIFRAUDE_REANALISE_KEY = "antifraude:reanalise"
+ANTIFRAUDE_LOTE = 1000
+
+# Regras (FASE 1 - motor de regras simples)
+MAX_RESERVAS_7_DIAS = 3
+TAXA_CANCELAMENTO_ALTA = 50  # 50%
+MAX_PAGAMENTOS_RECUSADOS = 2
+CANCELAMENTOS_CONSECUTIVOS_ALERTA = 2
+JANELA_CANCELAMENTOS_CONSECUTIVOS = 3
+
+STATUS_RESERVA_CANCELADA = ("CANCELADO", "CANCELADA")
+# PagamentoRepository.update_status grava RECUSADO/NEGADO/FAILED como FALHOU;
+# os valores crus continuam aqui para registros antigos.
+STATUS_PAGAMENTO_RECUSADO = ("FALHOU", "RECUSADO", "NEGADO", "REJECTED", "CANCELADO")
+
+
+def classificar_risco(score: int) -> str:
+    if score >= 70:
+        return "ALTO"
+    if score >= 40:
+        return "MÉDIO"
+    return "BAIXO"
+
+
+def pontuar_features(features: Dict[str, Any]) -> Dict[str, Any]:
+    """Aplica as regras sobre as features de um cliente (sem I/O)."""
+    score = 0
+    alertas: List[str] = []
+
+    reservas_recentes = int(features.get("reservas_7_dias") or 0)
+    if reservas_recentes > MAX_RESERVAS_7_DIAS:
+        score += 30
+        alertas.append(f"⚠️ Muitas reservas recentes: {reservas_recentes} em 7 dias")
+
+    total_reservas = int(features.get("total_reservas") or 0)
+    reservas_canceladas = int(features.get("reservas_canceladas") or 0)
+    taxa_cancelamento = (reservas_canceladas / total_reservas) * 100 if total_reservas > 0 else 0
+    if taxa_cancelamento > TAXA_CANCELAMENTO_ALTA:
+        score += 40
+        alertas.append(f"🚨 Alta taxa de cancelamento: {taxa_cancelamento:.1f}%")
+
+    pagamentos_recusados = int(features.get("pagamentos_recusados") or 0)
+    if pagamentos_recusados > MAX_PAGAMENTOS_RECUSADOS:
+        score += 30
+        alertas.append(f"💳 Múltiplos pagamentos recusados: {pagamentos_recusados}")
+
+    # ultimas_canceladas: reservas mais recentes primeiro (True = cancelada)
+    cancelamentos_consecutivos = 0
+    for cancelada in features.get("ultimas_canceladas") or []:
+        if not cancelada:
+            break
+        cancelamentos_consecutivos += 1
+    if cancelamentos_consecutivos >= CANCELAMENTOS_CONSECUTIVOS_ALERTA:
+        score += 25
+        alertas.append(f"📉 {cancelamentos_consecutivos} cancelamentos consecutivos")
+
+    return {
+        "cliente_id": int(features["cliente_id"]),
+        "documento": features.get("documento"),
+        "risco": classificar_risco(score),
+        "score": score,
+        "alertas": alertas,
+        "total_reservas": total_reservas,
+        "reservas_canceladas": reservas_canceladas,
+        "reservas_recentes": reservas_recentes,
+        "pagamentos_recusados": pagamentos_recusados,
+        "taxa_cancelamento": round(taxa_cancelamento, 1),
+        "cancelamentos_consecutivos": cancelamentos_consecutivos,
+    }
+
+
+async def marcar_cliente_para_reanalise(*cliente_ids: Optional[int]) -> None:
+    ids = [str(int(c)) for c in cliente_ids if c]
+    if cache.redis is None or not ids:
+        return
+    try:
+        await cache.redis.sadd(ANTIFRAUDE_REANALISE_KEY, *ids)
+    except Exception as exc:
+        print(f"[ANTIFRAUDE] Erro ao marcar clientes {ids} para reanalise: {exc}")
+
+
+class AntifraudeScoreService:
+    def __init__(self, db):
+        self.db = db
+
+    async def calcular(self, cliente_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Features + score de um lote de clientes, sem gravar."""
+        ids = [int(c) for c in cliente_ids]
+        if not ids:
+            return []
+        rows = await self.db.query_raw(
+            """
+            WITH alvo AS (
+                SELECT c.id, c.documento
+                FROM clientes c
+                WHERE c.id = ANY($1::int[])
+            ),
+            reservas_cliente AS (
+                SELECT
+                    r.cliente_id,
+                    r.created_at,
+                    r.status_reserva = ANY($4::text[]) AS cancelada,
+                    ROW_NUMBER() OVER (PARTITION BY r.cliente_id ORDER BY r.created_at DESC) AS posicao
+                FROM reservas r
+                JOIN alvo a ON a.id = r.cliente_id
+            ),
+            reservas_agg AS (
+                SELECT
+                    cliente_id,
+                    COUNT(*) AS total_reservas,
+                    COUNT(*) FILTER (WHERE created_at >= $2::timestamptz) AS reservas_7_dias,
+                    COUNT(*) FILTER (WHERE cancelada) AS reservas_canceladas,
+                    ARRAY_AGG(cancelada ORDER BY posicao) FILTER (WHERE posicao <= $3) AS ultimas_canceladas
+                FROM reservas_cliente
+                GROUP BY cliente_id
+            ),
+            pagamentos_agg AS (
+                SELECT p.cliente_id, COUNT(*) AS pagamentos_recusados
+                FROM pagamentos p
+                JOIN alvo a ON a.id = p.cliente_id
+                WHERE p.status_pagamento = ANY($5::text[])
+                GROUP BY p.cliente_id
+            )
+            SELECT
+                a.id AS cliente_id,
+                a.documento,
+                COALESCE(ra.total_reservas, 0) AS total_reservas,
+                COALESCE(ra.reservas_7_dias, 0) AS reservas_7_dias,
+                COALESCE(ra.reservas_canceladas, 0) AS reservas_canceladas,
+                COALESCE(ra.ultimas_canceladas, ARRAY[]::boolean[]) AS ultimas_canceladas,
+                COALESCE(pa.pagamentos_recusados, 0) AS pagamentos_recusados
+            FROM alvo a
+            LEFT JOIN reservas_agg ra ON ra.cliente_id = a.id
+            LEFT JOIN pagamentos_agg pa ON pa.cliente_id = a.id
+            """,
+            ids,
+            now_utc() - timedelta(days=7),
+            JANELA_CANCELAMENTOS_CONSECUTIVOS,
+            list(STATUS_RESERVA_CANCELADA),
+            list(STATUS_PAGAMENTO_RECUSADO),
+        )
+        return [pontuar_features(row) for row in rows]
+
+    async def atualizar(self, cliente_ids: Iterable[int]) -> int:
+        """Recalcula e grava (upsert) o score de um lote de clientes."""
+        analises = await self.calcular(cliente_ids)
+        if not analises:
+            return 0
+
+        valores = []
+        params: List[Any] = []
+        for analise in analises:
+            base = len(params)
+            valores.append(
+                f"(${base + 1}::int, ${base + 2}::int, ${base + 3}::int, ${base + 4}::int, "
+                f"${base + 5}::int, ${base + 6}::int, ${base + 7}::int, ${base + 8}::varchar, ${base + 9}::jsonb)"
+            )
+            params.extend([
+                analise["cliente_id"],
+                analise["reservas_recentes"],
+                analise["total_reservas"],
+                analise["reservas_canceladas"],
+                analise["pagamentos_recusados"],
+                analise["cancelamentos_consecutivos"],
+                analise["score"],
+                analise["risco"],
+                json.dumps(analise["alertas"], ensure_ascii=False),
+            ])
+        await self.db.execute_raw(
+            f"""
+            INSERT INTO clientes_risco (
+                cliente_id, reservas_7_dias, total_reservas, reservas_canceladas,
+                pagamentos_recusados, cancelamentos_consecutivos, score, risco, alertas, atualizado_em
+            )
+            SELECT v.*, NOW()
+            FROM (VALUES {", ".join(valores)}) AS v(
+                cliente_id, reservas_7_dias, total_reservas, reservas_canceladas,
+                pagamentos_recusados, cancelamentos_consecutivos, score, risco, alertas
+            )
+            ON CONFLICT (cliente_id) DO UPDATE SET
+                reservas_7_dias = EXCLUDED.reservas_7_dias,
+                total_reservas = EXCLUDED.total_reservas,
+                reservas_canceladas = EXCLUDED.reservas_canceladas,
+                pagamentos_recusados = EXCLUDED.pagamentos_recusados,
+                cancelamentos_consecutivos = EXCLUDED.cancelamentos_consecutivos,
+                score = EXCLUDED.score,
+                risco = EXCLUDED.risco,
+                alertas = EXCLUDED.alertas,
+                atualizado_em = EXCLUDED.atualizado_em
+            """,
+            *params,
+        )
+        return len(analises)
+
+    async def recalcular_marcados(self, limite: int = ANTIFRAUDE_LOTE) -> Dict[str, Any]:
+        if cache.redis is None:
+            return {"success": False, "atualizados": 0, "motivo": "redis_indisponivel"}
+        marcados = await cache.redis.spop(ANTIFRAUDE_REANALISE_KEY, limite)
+        ids = [int(c) for c in marcados or []]
+        try:
+            atualizados = await self.atualizar(ids)
+        except Exception:
+            # Devolve os ids para a proxima execucao nao perder a reanalise.
+            await marcar_cliente_para_reanalise(*ids)
+            raise
+        return {"success": True, "atualizados": atualizados}
+
+    async def recalcular_todos(self, lote: int = ANTIFRAUDE_LOTE) -> Dict[str, Any]:
+        """Recalculo completo em lotes por id (keyset), sem carregar todos os clientes."""
+        ultimo_id = 0
+        atualizados = 0
+        while True:
+            rows = await self.db.query_raw(
+                "SELECT id FROM clientes WHERE id > $1 ORDER BY id LIMIT $2",
+                ultimo_id,
+                lote,
+            )
+            if not rows:
+                break
+            ids = [int(row["id"]) for row in rows]
+            atualizados += await self.atualizar(ids)
+            ultimo_id = ids[-1]
+            if len(ids) < lote:
+                break
+        return {"success": True, "atualizados": atualizados}
+
+    async def listar_suspeitos(self, limit: int = 50, min_score: int = 40, offset: int = 0) -> List[Dict[str, Any]]:
+        rows = await self.db.query_raw(
+            """
+            SELECT cr.*, c.documento
+            FROM clientes_risco cr
+            JOIN clientes c ON c.id = cr.cliente_id
+            WHERE cr.score >= $1
+            ORDER BY cr.score DESC, cr.cliente_id
+            LIMIT $2 OFFSET $3
+            """,
+            int(min_score),
+            int(limit),
+            int(offset),
+        )
+        return [self._serializar(row) for row in rows]
+
+    async def contar_suspeitos(self, min_score: int = 40) -> int:
+        rows = await self.db.query_raw(
+            "SELECT COUNT(*) AS total FROM clientes_risco WHERE score >= $1",
+            int(min_score),
+        )
+        return int(rows[0]["total"]) if rows else 0
+
+    async def estatisticas(self) -> Dict[str, Any]:
+        rows = await self.db.query_raw(
+            """
+            SELECT
+                COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE risco = 'ALTO') AS alto,
+                COUNT(*) FILTER (WHERE risco = 'MÉDIO') AS medio,
+                COUNT(*) FILTER (WHERE risco = 'BAIXO') AS baixo,
+                COALESCE(AVG(score) FILTER (WHERE score > 0), 0) AS score_medio
+            FROM clientes_risco
+            """
+        )
+        return rows[0] if rows else {}
+
+    @staticmethod
+    def _serializar(row: Dict[str, Any]) -> Dict[str, Any]:
+        alertas = row.get("alertas") or []
+        if isinstance(alertas, str):
+            alertas = json.loads(alertas)
+        total_reservas = int(row.get("total_reservas") or 0)
+        reservas_canceladas = int(row.get("reservas_canceladas") or 0)
+        return {
+            "success": True,
+            "cliente_id": int(row["cliente_id"]),
+            "documento": row.get("documento"),
+            "risco": row.get("risco"),
+            "score": int(row.get("score") or 0),
+            "alertas": alertas,
+            "total_reservas": total_reservas,
+            "reservas_canceladas": reservas_canceladas,
+            "reservas_recentes": int(row.get("reservas_7_dias") or 0),
+            "pagamentos_recusados": int(row.get("pagamentos_recusados") or 0),
+            "taxa_cancelamento": round(reservas_canceladas / total_reservas * 100, 1) if total_reservas else 0,
+            "cancelamentos_consecutivos": int(row.get("cancelamentos_consecutivos") or 0),
+        }
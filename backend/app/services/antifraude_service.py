@@ -14,9 +14,14 @@ CLASSIFICAÇÃO DE RISCO:
 - BAIXO: score < 40
 - MÉDIO: score 40-69
 - ALTO: score >= 70
+
+As regras e o cálculo em lote ficam em antifraude_score_service; a lista de
+suspeitos e as estatísticas leem o score pré-calculado em clientes_risco.
 """
 
 from app.core.database import db
+from app.services import antifraude_score_service as regras
+from app.services.antifraude_score_service import AntifraudeScoreService
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
@@ -25,9 +30,9 @@ class AntifraaudeService:
     """Serviço de análise de risco e detecção de fraudes"""
     
     # Thresholds (limites) para regras
-    MAX_RESERVAS_7_DIAS = 3
-    TAXA_CANCELAMENTO_ALTA = 50  # 50%
-    MAX_PAGAMENTOS_RECUSADOS = 2
+    MAX_RESERVAS_7_DIAS = regras.MAX_RESERVAS_7_DIAS
+    TAXA_CANCELAMENTO_ALTA = regras.TAXA_CANCELAMENTO_ALTA
+    MAX_PAGAMENTOS_RECUSADOS = regras.MAX_PAGAMENTOS_RECUSADOS
     MULTIPLICADOR_VALOR_SUSPEITO = 3  # 3x a média
     
     @staticmethod
@@ -51,115 +56,16 @@ class AntifraaudeService:
             }
         """
         try:
-            # Buscar cliente
-            cliente = await db.cliente.find_unique(where={"id": cliente_id})
+            # Features de todas as regras em uma única consulta agregada
+            analises = await AntifraudeScoreService(db).calcular([cliente_id])
             
-            if not cliente:
+            if not analises:
                 return {
                     "success": False,
                     "error": "Cliente não encontrado"
                 }
             
-            risco_score = 0
-            alertas = []
-            
-            # REGRA 1: Muitas reservas em curto período
-            from app.utils.datetime_utils import now_utc
-            sete_dias_atras = now_utc() - timedelta(days=7)
-            reservas_recentes = await db.reserva.count(
-                where={
-                    "clienteId": cliente_id,
-                    "createdAt": {"gte": sete_dias_atras}
-                }
-            )
-            
-            if reservas_recentes > AntifraaudeService.MAX_RESERVAS_7_DIAS:
-                risco_score += 30
-                alertas.append(f"⚠️ Muitas reservas recentes: {reservas_recentes} em 7 dias")
-            
-            # REGRA 2: Taxa de cancelamento
-            total_reservas = await db.reserva.count(
-                where={"clienteId": cliente_id}
-            )
-            
-            reservas_canceladas = await db.reserva.count(
-                where={
-                    "clienteId": cliente_id,
-                    "status": "CANCELADO"
-                }
-            )
-            
-            if total_reservas > 0:
-                taxa_cancelamento = (reservas_canceladas / total_reservas) * 100
-                
-                if taxa_cancelamento > AntifraaudeService.TAXA_CANCELAMENTO_ALTA:
-                    risco_score += 40
-                    alertas.append(f"🚨 Alta taxa de cancelamento: {taxa_cancelamento:.1f}%")
-            else:
-                taxa_cancelamento = 0
-            
-            # REGRA 3: Pagamentos recusados
-            # Buscar pagamentos via reservas do cliente
-            reservas_cliente = await db.reserva.find_many(
-                where={"clienteId": cliente_id}
-            )
-            
-            reserva_ids = [r.id for r in reservas_cliente]
-            
-            if reserva_ids:
-                pagamentos_recusados = await db.pagamento.count(
-                    where={
-                        "reservaId": {"in": reserva_ids},
-                        "status": {"in": ["RECUSADO", "REJECTED", "CANCELADO"]}
-                    }
-                )
-            else:
-                pagamentos_recusados = 0
-            
-            if pagamentos_recusados > AntifraaudeService.MAX_PAGAMENTOS_RECUSADOS:
-                risco_score += 30
-                alertas.append(f"💳 Múltiplos pagamentos recusados: {pagamentos_recusados}")
-            
-            # REGRA 4: Reservas consecutivas canceladas
-            ultimas_reservas = await db.reserva.find_many(
-                where={"clienteId": cliente_id},
-                order={"createdAt": "desc"},
-                take=3
-            )
-            
-            cancelamentos_consecutivos = 0
-            for reserva in ultimas_reservas:
-                if reserva.status == "CANCELADO":
-                    cancelamentos_consecutivos += 1
-                else:
-                    break
-            
-            if cancelamentos_consecutivos >= 2:
-                risco_score += 25
-                alertas.append(f"📉 {cancelamentos_consecutivos} cancelamentos consecutivos")
-            
-            # Classificar risco
-            if risco_score >= 70:
-                risco = "ALTO"
-            elif risco_score >= 40:
-                risco = "MÉDIO"
-            else:
-                risco = "BAIXO"
-            
-            return {
-                "success": True,
-                "cliente_id": cliente_id,
-                "documento": cliente.documento,
-                "risco": risco,
-                "score": risco_score,
-                "alertas": alertas,
-                "total_reservas": total_reservas,
-                "reservas_canceladas": reservas_canceladas,
-                "reservas_recentes": reservas_recentes,
-                "pagamentos_recusados": pagamentos_recusados,
-                "taxa_cancelamento": round(taxa_cancelamento, 1) if total_reservas > 0 else 0,
-                "cancelamentos_consecutivos": cancelamentos_consecutivos
-            }
+            return {"success": True, **analises[0]}
             
         except Exception as e:
             return {
@@ -180,25 +86,15 @@ class AntifraaudeService:
             Lista de clientes suspeitos ordenados por score (maior primeiro)
         """
         try:
-            # Buscar todos os clientes
-            clientes = await db.cliente.find_many()
-            
-            transacoes_suspeitas = []
-            
-            for cliente in clientes:
-                # Analisar cada cliente
-                analise = await AntifraaudeService.analisar_cliente(cliente.id)
-                
-                if analise.get("success") and analise.get("score", 0) >= min_score:
-                    transacoes_suspeitas.append(analise)
-            
-            # Ordenar por score (maior primeiro)
-            transacoes_suspeitas.sort(key=lambda x: x.get("score", 0), reverse=True)
+            # Score pré-calculado (clientes_risco), já ordenado pelo índice
+            service = AntifraudeScoreService(db)
+            transacoes_suspeitas = await service.listar_suspeitos(limit=limit, min_score=min_score)
+            total = await service.contar_suspeitos(min_score=min_score)
             
             return {
                 "success": True,
-                "total": len(transacoes_suspeitas),
-                "transacoes": transacoes_suspeitas[:limit],
+                "total": total,
+                "transacoes": transacoes_suspeitas,
                 "criterio": f"Score >= {min_score}"
             }
             
@@ -299,33 +195,22 @@ class AntifraaudeService:
             Estatísticas agregadas de todas as análises
         """
         try:
-            # Buscar todas as transações suspeitas
-            transacoes = await AntifraaudeService.listar_transacoes_suspeitas(limit=1000, min_score=0)
-            
-            if not transacoes["success"]:
-                return transacoes
-            
-            todas = transacoes["transacoes"]
-            
-            # Contar por nível de risco
-            alto = len([t for t in todas if t["risco"] == "ALTO"])
-            medio = len([t for t in todas if t["risco"] == "MÉDIO"])
-            baixo = len([t for t in todas if t["risco"] == "BAIXO"])
-            
-            # Score médio
-            scores = [t["score"] for t in todas if t.get("score")]
-            score_medio = sum(scores) / len(scores) if scores else 0
+            stats = await AntifraudeScoreService(db).estatisticas()
+            total = int(stats.get("total") or 0)
+            alto = int(stats.get("alto") or 0)
+            medio = int(stats.get("medio") or 0)
+            baixo = int(stats.get("baixo") or 0)
             
             return {
                 "success": True,
-                "total_clientes_analisados": len(todas),
+                "total_clientes_analisados": total,
                 "risco_alto": alto,
                 "risco_medio": medio,
                 "risco_baixo": baixo,
-                "score_medio": round(score_medio, 1),
-                "percentual_alto": round((alto / len(todas) * 100) if todas else 0, 1),
-                "percentual_medio": round((medio / len(todas) * 100) if todas else 0, 1),
-                "percentual_baixo": round((baixo / len(todas) * 100) if todas else 0, 1)
+                "score_medio": round(float(stats.get("score_medio") or 0), 1),
+                "percentual_alto": round((alto / total * 100) if total else 0, 1),
+                "percentual_medio": round((medio / total * 100) if total else 0, 1),
+                "percentual_baixo": round((baixo / total * 100) if total else 0, 1)
             }
             
         except Exception as e:
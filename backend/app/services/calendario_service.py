@@ -0,0 +1,257 @@
+"""
+Calendario de disponibilidade do hotel inteiro (grade mensal).
+
+Cada quarto guarda um bitset de ocupacao, um bit por noite a partir de `base`
+(ordinal da data local em que foi calculado) ate CALENDARIO_HORIZONTE_DIAS a
+frente. Os bitsets ficam num HASH do Redis (CALENDARIO_KEY, numero -> JSON),
+compartilhado por todos os workers; sem Redis ficam em memoria no processo.
+
+O calendario e reconstruido no startup e pela task agendada, e cada mudanca
+de reserva ou de quarto recalcula so os quartos envolvidos
+(`atualizar_calendario_quartos`). A reconstrucao grava tambem o campo
+CALENDARIO_CONSTRUIDO no HASH: sem quartos o calendario fica "construido e
+vazio" e a consulta nao reconstroi de novo a cada chamada. A consulta le o HASH uma vez e conta os
+quartos livres por noite somando os bitsets com um contador bit a bit (um
+"plano" por bit da contagem), sem iterar quarto x noite.
+
+Noite = data local do check-in ate a vespera do check-out, entao check-out e
+novo check-in no mesmo dia nao conflitam (mesma regra da migration 016).
+"""
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.cache import cache
+from app.services.disponibilidade_service import (
+    STATUS_QUARTO_BLOQUEIA_DISPONIBILIDADE,
+    STATUS_RESERVA_BLOQUEIA_DISPONIBILIDADE,
+)
+from app.utils.datetime_utils import LOCAL_TIMEZONE, now_local, to_local
+
+
+CALENDARIO_KEY = "calendario:quartos"
+# Campo sentinela no HASH (nao e numero de quarto): data da ultima reconstrucao.
+CALENDARIO_CONSTRUIDO = "_construido"
+CALENDARIO_HORIZONTE_DIAS = 730
+CALENDARIO_CONSULTA_MAX_DIAS = 366
+
+# Fallback sem Redis: mesmo formato do HASH, por processo.
+_calendario_local: Dict[str, str] = {}
+
+
+def _hoje() -> date:
+    return now_local().date()
+
+
+def _data_local(valor: Any) -> Optional[date]:
+    if isinstance(valor, date) and not isinstance(valor, datetime):
+        return valor
+    local = to_local(valor)
+    return local.date() if local else None
+
+
+def marcar_noites(ocupado: int, base: int, checkin: Any, checkout: Any) -> int:
+    """Liga os bits das noites [checkin, checkout) dentro do horizonte."""
+    inicio = _data_local(checkin)
+    fim = _data_local(checkout)
+    if not inicio or not fim:
+        return ocupado
+    primeira = inicio.toordinal() - base
+    ultima = max(fim.toordinal(), inicio.toordinal() + 1) - base
+    primeira, ultima = max(primeira, 0), min(ultima, CALENDARIO_HORIZONTE_DIAS)
+    if ultima <= primeira:
+        return ocupado
+    return ocupado | (((1 << (ultima - primeira)) - 1) << primeira)
+
+
+def contar_por_noite(bitsets: Iterable[int], noites: int) -> List[int]:
+    """
+    Soma bitsets coluna a coluna: resultado[n] = quantos bitsets tem o bit n.
+    planos[k] guarda o bit k da contagem de todas as noites ao mesmo tempo.
+    """
+    planos: List[int] = []
+    for bits in bitsets:
+        vai_um = bits
+        for k in range(len(planos)):
+            planos[k], vai_um = planos[k] ^ vai_um, planos[k] & vai_um
+            if not vai_um:
+                break
+        if vai_um:
+            planos.append(vai_um)
+    return [
+        sum(((plano >> noite) & 1) << k for k, plano in enumerate(planos))
+        for noite in range(noites)
+    ]
+
+
+def _livres_no_periodo(entrada: Dict[str, Any], inicio: int, noites: int) -> int:
+    ocupado = int(entrada["ocupado"], 16)
+    deslocamento = inicio - int(entrada["base"])
+    ocupado = ocupado >> deslocamento if deslocamento >= 0 else ocupado << -deslocamento
+    return ~ocupado & ((1 << noites) - 1)
+
+
+class CalendarioService:
+    def __init__(self, db):
+        self.db = db
+
+    async def reconstruir(self) -> Dict[str, Any]:
+        entradas = await self._calcular_entradas(None)
+        await _gravar_entradas(entradas, substituir=True)
+        return {"success": True, "quartos": len(entradas)}
+
+    async def atualizar_quartos(self, numeros: Iterable[str]) -> None:
+        numeros = sorted({str(n) for n in numeros if n})
+        if not numeros:
+            return
+        entradas = await self._calcular_entradas(numeros)
+        await _gravar_entradas(entradas, substituir=False)
+        # Quarto excluido: some do calendario.
+        removidos = [n for n in numeros if n not in entradas]
+        if removidos:
+            await _remover_entradas(removidos)
+
+    async def consultar(
+        self,
+        inicio: date,
+        fim: date,
+        tipo: Optional[str] = None,
+        reconstruir_ausente: bool = True,
+    ) -> Dict[str, Any]:
+        """`reconstruir_ausente=False`: calendario nunca construido conta como vazio."""
+        hoje = _hoje()
+        inicio = max(inicio, hoje)
+        fim = min(fim, hoje + timedelta(days=CALENDARIO_HORIZONTE_DIAS))
+        if fim <= inicio:
+            return {"inicio": inicio.isoformat(), "fim": inicio.isoformat(), "quartos_por_tipo": {}, "dias": []}
+        if (fim - inicio).days > CALENDARIO_CONSULTA_MAX_DIAS:
+            raise ValueError(f"Periodo maximo do calendario: {CALENDARIO_CONSULTA_MAX_DIAS} dias")
+
+        entradas = await _ler_entradas()
+        if entradas is None and reconstruir_ausente:
+            await self.reconstruir()
+            entradas = await _ler_entradas()
+
+        noites = (fim - inicio).days
+        livres_por_tipo: Dict[str, List[int]] = {}
+        for entrada in (entradas or {}).values():
+            if entrada.get("status") in STATUS_QUARTO_BLOQUEIA_DISPONIBILIDADE:
+                continue
+            if tipo and entrada.get("tipo") != tipo:
+                continue
+            livres_por_tipo.setdefault(entrada.get("tipo"), []).append(
+                _livres_no_periodo(entrada, inicio.toordinal(), noites)
+            )
+
+        contagens = {t: contar_por_noite(bitsets, noites) for t, bitsets in sorted(livres_por_tipo.items())}
+        dias = []
+        for noite in range(noites):
+            livres = {t: contagem[noite] for t, contagem in contagens.items()}
+            dias.append({
+                "data": (inicio + timedelta(days=noite)).isoformat(),
+                "livres": livres,
+                "total_livres": sum(livres.values()),
+            })
+
+        return {
+            "inicio": inicio.isoformat(),
+            "fim": fim.isoformat(),
+            "quartos_por_tipo": {t: len(b) for t, b in sorted(livres_por_tipo.items())},
+            "dias": dias,
+        }
+
+    async def _calcular_entradas(self, numeros: Optional[List[str]]) -> Dict[str, str]:
+        base = _hoje()
+        horizonte = base + timedelta(days=CALENDARIO_HORIZONTE_DIAS)
+        rows = await self.db.query_raw(
+            """
+            SELECT
+                q.numero,
+                q.tipo_suite,
+                q.status,
+                r.checkin_previsto,
+                r.checkout_previsto
+            FROM quartos q
+            LEFT JOIN reservas r
+              ON r.quarto_numero = q.numero
+             AND r.status_reserva = ANY($2::text[])
+             AND r.checkout_previsto > $3::timestamptz
+             AND r.checkin_previsto < $4::timestamptz
+            WHERE $1::text[] IS NULL OR q.numero = ANY($1::text[])
+            """,
+            numeros,
+            STATUS_RESERVA_BLOQUEIA_DISPONIBILIDADE,
+            datetime.combine(base, datetime.min.time(), tzinfo=LOCAL_TIMEZONE),
+            datetime.combine(horizonte, datetime.min.time(), tzinfo=LOCAL_TIMEZONE),
+        )
+
+        quartos: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            numero = str(row["numero"])
+            quarto = quartos.setdefault(numero, {
+                "tipo": row.get("tipo_suite"),
+                "status": row.get("status"),
+                "base": base.toordinal(),
+                "ocupado": 0,
+            })
+            if row.get("checkin_previsto") and row.get("checkout_previsto"):
+                quarto["ocupado"] = marcar_noites(
+                    quarto["ocupado"], quarto["base"], row["checkin_previsto"], row["checkout_previsto"]
+                )
+
+        return {
+            numero: json.dumps({**quarto, "ocupado": format(quarto["ocupado"], "x")})
+            for numero, quarto in quartos.items()
+        }
+
+
+async def _ler_entradas() -> Optional[Dict[str, Dict[str, Any]]]:
+    """None se o calendario nunca foi construido (HASH sem o sentinela)."""
+    brutas: Dict[str, str] = dict(_calendario_local)
+    if cache.redis is not None:
+        try:
+            brutas = await cache.redis.hgetall(CALENDARIO_KEY) or {}
+        except Exception as exc:
+            print(f"[CALENDARIO] Erro ao ler bitsets: {exc}")
+    if CALENDARIO_CONSTRUIDO not in brutas:
+        return None
+    return {
+        numero: json.loads(valor)
+        for numero, valor in brutas.items()
+        if numero != CALENDARIO_CONSTRUIDO
+    }
+
+
+async def _gravar_entradas(entradas: Dict[str, str], substituir: bool) -> None:
+    if substituir:
+        # Sempre ha o que gravar, mesmo sem quartos: o sentinela marca a construcao.
+        entradas = {**entradas, CALENDARIO_CONSTRUIDO: _hoje().isoformat()}
+    if cache.redis is None:
+        if substituir:
+            _calendario_local.clear()
+        _calendario_local.update(entradas)
+        return
+    if substituir:
+        antigos = set(await cache.redis.hkeys(CALENDARIO_KEY) or []) - set(entradas)
+        if antigos:
+            await cache.redis.hdel(CALENDARIO_KEY, *antigos)
+    if entradas:
+        await cache.redis.hset(CALENDARIO_KEY, mapping=entradas)
+
+
+async def _remover_entradas(numeros: List[str]) -> None:
+    for numero in numeros:
+        _calendario_local.pop(numero, None)
+    if cache.redis is not None:
+        await cache.redis.hdel(CALENDARIO_KEY, *numeros)
+
+
+async def atualizar_calendario_quartos(db, *numeros: Optional[str]) -> None:
+    """Chamado apos mudancas de reserva/quarto; nunca interrompe a operacao."""
+    try:
+        await CalendarioService(db).atualizar_quartos(numeros)
+    except Exception as exc:
+        print(f"[CALENDARIO] Erro ao atualizar quartos {numeros}: {exc}")
+    # Toda mudanca de ocupacao passa por aqui; derruba o micro-cache publico.
+    from app.services.disponibilidade_publica_service import invalidar_disponibilidade_publica
+    await invalidar_disponibilidade_publica()
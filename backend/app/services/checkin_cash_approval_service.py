@@ -9,6 +9,7 @@ from typing import Any, Dict, Optional
 from fastapi import HTTPException
 from prisma import Json as PrismaJson
 
+from app.core.event_hub import event_hub
 from app.services.whatsapp_service import get_whatsapp_service
 from app.utils.datetime_utils import format_local, now_utc, to_utc
 
@@ -178,6 +179,15 @@ class CheckinCashApprovalService:
                 "whatsapp_gerente_success": bool(whatsapp_gerente.get("success")),
             },
         )
+        await event_hub.publicar(
+            "checkin_cash.solicitado",
+            {
+                "approval_id": approval.id,
+                "approval_code": codigo,
+                "reservation_id": int(reservation_id),
+                "expires_at": expira_em.isoformat(),
+            },
+        )
 
         return {
             "success": True,
@@ -352,6 +362,10 @@ class CheckinCashApprovalService:
                     "funcionario_id": funcionario_id,
                 }),
             )
+        await event_hub.publicar(
+            "checkin_cash.aprovado",
+            {"approval_code": codigo, "reservation_id": reserva_id},
+        )
 
         return {
             "success": True,
@@ -448,6 +462,10 @@ class CheckinCashApprovalService:
                     "motivo": motivo,
                 }),
             )
+        await event_hub.publicar(
+            "checkin_cash.recusado",
+            {"approval_code": codigo, "reservation_id": reserva_id},
+        )
 
         return {
             "success": True,
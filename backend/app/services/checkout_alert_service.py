@@ -1,7 +1,85 @@
-from typing import Any, Dict, List
+"""
+Alertas de check-out pendente.
 
+Deteccao por eventos: o check-in agenda a reserva numa fila ordenada por
+checkout_previsto (ZSET CHECKOUT_FILA_KEY, score = epoch) e o check-out /
+cancelamento a remove. O detector agendado (Celery) retira da fila as
+reservas vencidas; o ZREM e o "claim", entao cada alerta dispara uma unica vez
+mesmo com varios workers. O alerta disparado fica em CHECKOUT_ALERTAS_KEY
+(HASH reserva_id -> payload) ate a recepcao marcar como visto, e a listagem so
+le esse hash.
+
+`reconciliar_fila` reagenda hospedagens que ficaram fora da fila (check-in por
+outro caminho, Redis reiniciado). Sem Redis a listagem volta para a consulta
+direta no banco.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.cache import cache
+from app.core.event_hub import event_hub
+from app.services.notificacao_contador_service import descontar_lidas
 from app.services.notification_service import NotificationService
-from app.utils.datetime_utils import now_utc
+from app.utils.datetime_utils import now_utc, to_utc
+
+
+CHECKOUT_FILA_KEY = "checkout:fila"
+CHECKOUT_ALERTAS_KEY = "checkout:alertas"
+CHECKOUT_DETECTOR_LOTE = 100
+
+
+def _epoch(valor: Any) -> Optional[float]:
+    if isinstance(valor, str):
+        try:
+            valor = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(valor, datetime):
+        return None
+    return to_utc(valor).timestamp()
+
+
+async def agendar_checkout(reserva_id: int, checkout_previsto: Any) -> None:
+    """Chamado no check-in: coloca a reserva na fila de check-outs previstos."""
+    score = _epoch(checkout_previsto)
+    if cache.redis is None or not reserva_id or score is None:
+        return
+    try:
+        await cache.redis.zadd(CHECKOUT_FILA_KEY, {str(int(reserva_id)): score})
+    except Exception as exc:
+        print(f"[CHECKOUT ALERTA] Erro ao agendar reserva {reserva_id}: {exc}")
+
+
+async def remover_checkout(*reserva_ids: Optional[int]) -> None:
+    """Chamado no check-out/cancelamento: tira a reserva da fila e dos alertas."""
+    ids = [str(int(r)) for r in reserva_ids if r]
+    if cache.redis is None or not ids:
+        return
+    try:
+        await cache.redis.zrem(CHECKOUT_FILA_KEY, *ids)
+        await cache.redis.hdel(CHECKOUT_ALERTAS_KEY, *ids)
+    except Exception as exc:
+        print(f"[CHECKOUT ALERTA] Erro ao remover reservas {ids}: {exc}")
+
+
+def _montar_alerta(row: Dict[str, Any], notificacao_id: Optional[int]) -> Dict[str, Any]:
+    checkout_at = row.get("checkout_previsto")
+    checkout_iso = checkout_at.isoformat() if hasattr(checkout_at, "isoformat") else checkout_at
+    return {
+        "notification_id": int(notificacao_id) if notificacao_id else None,
+        "reservation_id": int(row["id"]),
+        "codigo_reserva": row.get("codigo_reserva"),
+        "room": row.get("quarto_numero"),
+        "room_number": row.get("quarto_numero"),
+        "guest_name": row.get("cliente_nome"),
+        "checkout_at": checkout_iso,
+        "checkout_previsto": checkout_iso,
+        "viewed": False,
+        "alert_sound": True,
+        "alert_visual": True,
+        "message": f"CHECKOUT - Quarto {row.get('quarto_numero')}",
+    }
 
 
 class CheckoutAlertService:
@@ -10,6 +88,127 @@ class CheckoutAlertService:
 
     async def listar_pendentes(self, limit: int = 20) -> Dict[str, Any]:
         limite = max(1, min(int(limit or 20), 100))
+        if cache.redis is None:
+            return await self._listar_pendentes_banco(limite)
+        try:
+            valores = await cache.redis.hvals(CHECKOUT_ALERTAS_KEY)
+        except Exception as exc:
+            print(f"[CHECKOUT ALERTA] Hash de alertas indisponivel, consultando banco: {exc}")
+            return await self._listar_pendentes_banco(limite)
+
+        alerts = [json.loads(valor) for valor in valores or []]
+        alerts.sort(key=lambda alert: alert.get("checkout_at") or "")
+        alerts = alerts[:limite]
+        return {"success": True, "alerts": alerts, "total": len(alerts)}
+
+    async def detectar_vencidos(self, limite: int = CHECKOUT_DETECTOR_LOTE) -> Dict[str, Any]:
+        """Dispara os alertas das reservas cuja hora de check-out ja passou."""
+        if cache.redis is None:
+            return {"success": False, "disparados": 0, "motivo": "redis_indisponivel"}
+
+        vencidos = await cache.redis.zrangebyscore(
+            CHECKOUT_FILA_KEY, "-inf", now_utc().timestamp(), start=0, num=limite
+        )
+        reivindicados: List[int] = []
+        for membro in vencidos or []:
+            # Quem remove da fila e quem dispara o alerta.
+            if await cache.redis.zrem(CHECKOUT_FILA_KEY, membro):
+                reivindicados.append(int(membro))
+        if not reivindicados:
+            return {"success": True, "disparados": 0}
+
+        rows = await self._carregar_hospedados(reivindicados)
+        disparados = 0
+        for row in rows:
+            if row.get("visto"):
+                continue
+            notificacao_id = row.get("notificacao_id")
+            if not notificacao_id:
+                notificacao = await NotificationService.notificar_checkout_pendente(self.db, row)
+                notificacao_id = notificacao.get("id") if notificacao else None
+            alert = _montar_alerta(row, notificacao_id)
+            await cache.redis.hset(CHECKOUT_ALERTAS_KEY, str(alert["reservation_id"]), json.dumps(alert))
+            await event_hub.publicar("checkout_alerta.pendente", alert)
+            disparados += 1
+
+        return {"success": True, "disparados": disparados}
+
+    async def reconciliar_fila(self) -> Dict[str, Any]:
+        """Reagenda hospedagens em andamento que nao estao na fila nem alertadas."""
+        if cache.redis is None:
+            return {"success": False, "agendados": 0, "motivo": "redis_indisponivel"}
+
+        rows = await self.db.query_raw(
+            """
+            SELECT r.id, r.checkout_previsto
+            FROM reservas r
+            LEFT JOIN hospedagens h ON h.reserva_id = r.id
+            WHERE r.checkout_real IS NULL
+              AND r.checkout_previsto IS NOT NULL
+              AND COALESCE(h.status_hospedagem, r.status_reserva) IN (
+                'CHECKIN_REALIZADO',
+                'HOSPEDADO',
+                'CHECKIN',
+                'EM_ANDAMENTO'
+              )
+              AND NOT EXISTS (
+                SELECT 1
+                FROM notificacoes nx
+                WHERE nx.reserva_id = r.id
+                  AND nx.categoria = 'checkout_pendente'
+                  AND nx.lida = TRUE
+              )
+            """
+        )
+        alertados = set(await cache.redis.hkeys(CHECKOUT_ALERTAS_KEY) or [])
+        agenda = {
+            str(int(row["id"])): _epoch(row.get("checkout_previsto"))
+            for row in rows
+            if str(int(row["id"])) not in alertados
+        }
+        agenda = {membro: score for membro, score in agenda.items() if score is not None}
+        if agenda:
+            await cache.redis.zadd(CHECKOUT_FILA_KEY, agenda)
+        return {"success": True, "agendados": len(agenda)}
+
+    async def _carregar_hospedados(self, reserva_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        return await self.db.query_raw(
+            """
+            SELECT
+                r.id,
+                r.codigo_reserva,
+                r.cliente_nome,
+                r.quarto_numero,
+                r.checkout_previsto,
+                n.id AS notificacao_id,
+                EXISTS (
+                    SELECT 1
+                    FROM notificacoes nx
+                    WHERE nx.reserva_id = r.id
+                      AND nx.categoria = 'checkout_pendente'
+                      AND nx.lida = TRUE
+                ) AS visto
+            FROM reservas r
+            LEFT JOIN hospedagens h ON h.reserva_id = r.id
+            LEFT JOIN notificacoes n
+              ON n.reserva_id = r.id
+             AND n.categoria = 'checkout_pendente'
+             AND n.lida = FALSE
+            WHERE r.id = ANY($1::int[])
+              AND r.checkout_real IS NULL
+              AND COALESCE(h.status_hospedagem, r.status_reserva) IN (
+                'CHECKIN_REALIZADO',
+                'HOSPEDADO',
+                'CHECKIN',
+                'EM_ANDAMENTO'
+              )
+            ORDER BY r.checkout_previsto ASC
+            """,
+            list(reserva_ids),
+        )
+
+    async def _listar_pendentes_banco(self, limite: int) -> Dict[str, Any]:
+        # Caminho sem Redis: consulta direta, criando a notificacao na hora.
         rows = await self.db.query_raw(
             """
             SELECT
@@ -50,27 +249,21 @@ class CheckoutAlertService:
         )
 
         alerts: List[Dict[str, Any]] = []
+        novos: List[Dict[str, Any]] = []
         for row in rows:
             notificacao_id = row.get("notificacao_id")
-            if not notificacao_id:
+            novo = not notificacao_id
+            if novo:
                 notificacao = await NotificationService.notificar_checkout_pendente(self.db, row)
                 notificacao_id = notificacao.get("id") if notificacao else None
-            checkout_at = row.get("checkout_previsto")
-            checkout_iso = checkout_at.isoformat() if hasattr(checkout_at, "isoformat") else checkout_at
-            alerts.append({
-                "notification_id": int(notificacao_id) if notificacao_id else None,
-                "reservation_id": int(row["id"]),
-                "codigo_reserva": row.get("codigo_reserva"),
-                "room": row.get("quarto_numero"),
-                "room_number": row.get("quarto_numero"),
-                "guest_name": row.get("cliente_nome"),
-                "checkout_at": checkout_iso,
-                "checkout_previsto": checkout_iso,
-                "viewed": False,
-                "alert_sound": True,
-                "alert_visual": True,
-                "message": f"CHECKOUT - Quarto {row.get('quarto_numero')}",
-            })
+            alerts.append(_montar_alerta(row, notificacao_id))
+            if novo:
+                novos.append(alerts[-1])
+
+        # So alertas recem-criados viram evento; os ja notificados a equipe
+        # recebeu quando foram criados.
+        for alert in novos:
+            await event_hub.publicar("checkout_alerta.pendente", alert)
 
         return {"success": True, "alerts": alerts, "total": len(alerts)}
 
@@ -82,14 +275,21 @@ class CheckoutAlertService:
             WHERE reserva_id = $1
               AND categoria = 'checkout_pendente'
               AND lida = FALSE
-            RETURNING id
+            RETURNING id, perfil
             """,
             int(reservation_id),
         )
+        await descontar_lidas(rows)
+        if cache.redis is not None:
+            try:
+                await cache.redis.hdel(CHECKOUT_ALERTAS_KEY, str(int(reservation_id)))
+            except Exception as exc:
+                print(f"[CHECKOUT ALERTA] Erro ao remover alerta {reservation_id}: {exc}")
+        if rows:
+            await event_hub.publicar("checkout_alerta.visto", {"reservation_id": int(reservation_id)})
         return {
             "success": True,
             "reservation_id": int(reservation_id),
             "viewed": True,
             "notifications_marked": len(rows),
         }
-
@@ -0,0 +1,261 @@
+"""
+Conciliacao de pagamentos pendentes no gateway (PIX e cartao Cielo).
+
+Fila indexada: ZSET CONCILIACAO_FILA_KEY com membro = pagamento_id e
+score = epoch da proxima consulta. `PagamentoRepository.update_status` agenda o
+pagamento quando ele fica pendente com um PaymentId/txid da Cielo e o remove
+quando chega a um status final (webhook, confirmacao manual, conciliacao).
+
+O worker agendado (Celery) retira da fila os pagamentos vencidos (o ZREM e o
+"claim", como na fila de check-outs), consulta a Cielo em lotes com
+concorrencia limitada e aplica a transicao por `update_status`, publicando
+`pagamento.conciliado`. O que continua pendente volta para a fila com intervalo
+crescente conforme a idade do pagamento; passado CONCILIACAO_IDADE_MAXIMA o
+pagamento sai da fila (PIX expirado / cobranca abandonada).
+
+`reconciliar_fila` reagenda pendentes que ficaram fora da fila (Redis
+reiniciado, worker morto entre o claim e a consulta). Em sandbox a consulta da
+Cielo e simulada (sempre "pago"), entao o worker nao roda.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.cache import cache
+from app.core.event_hub import event_hub
+from app.utils.datetime_utils import now_utc, to_utc
+
+
+CONCILIACAO_FILA_KEY = "pagamentos:conciliacao:fila"
+CONCILIACAO_LOTE = 50
+CONCILIACAO_CONCORRENCIA = 8
+CONCILIACAO_IDADE_MAXIMA = timedelta(hours=48)
+CONCILIACAO_METODOS = {"pix", "credit_card", "debit_card"}
+CONCILIACAO_STATUS_PENDENTES = {"PENDENTE", "PROCESSANDO", "AGUARDANDO_PAGAMENTO"}
+
+# (idade maxima do pagamento, intervalo entre consultas)
+CONCILIACAO_BACKOFF = (
+    (timedelta(minutes=5), timedelta(seconds=15)),
+    (timedelta(minutes=30), timedelta(minutes=1)),
+    (timedelta(hours=2), timedelta(minutes=5)),
+    (timedelta(hours=24), timedelta(minutes=30)),
+)
+CONCILIACAO_INTERVALO_MAXIMO = timedelta(hours=2)
+
+# Status da Cielo (Payment.Status) -> status do pagamento; ausentes seguem pendentes
+# (0 NotFinished, 1 Authorized ainda sem captura, 12 Pending, 20 Scheduled). So a
+# captura confirma a reserva, como em verificar_status_pix.
+STATUS_CIELO_PAGAMENTO = {
+    2: "APROVADO",   # PaymentConfirmed
+    3: "RECUSADO",   # Denied
+    10: "CANCELADO",  # Voided
+    11: "ESTORNADO",  # Refunded
+    13: "RECUSADO",  # Aborted
+}
+
+
+def status_cielo(resposta: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Payment.Status do GET /1/sales/{PaymentId}; o mock do sandbox usa a chave plana."""
+    if not resposta or not resposta.get("success"):
+        return None
+    dados = resposta.get("data") or {}
+    pagamento = dados.get("Payment") or {}
+    return pagamento.get("Status", dados.get("Status"))
+
+
+def intervalo_conciliacao(criado_em: Optional[datetime], agora: Optional[datetime] = None) -> Optional[timedelta]:
+    """Intervalo ate a proxima consulta; None quando o pagamento e velho demais."""
+    agora = agora or now_utc()
+    idade = agora - to_utc(criado_em) if criado_em else timedelta(0)
+    if idade >= CONCILIACAO_IDADE_MAXIMA:
+        return None
+    for limite, intervalo in CONCILIACAO_BACKOFF:
+        if idade < limite:
+            return intervalo
+    return CONCILIACAO_INTERVALO_MAXIMO
+
+
+def _criado_em(valor: Any) -> Optional[datetime]:
+    if isinstance(valor, str):
+        try:
+            return datetime.fromisoformat(valor.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return valor if isinstance(valor, datetime) else None
+
+
+async def atualizar_fila_conciliacao(pagamento) -> None:
+    """Chamado em update_status: agenda pendentes do gateway e remove os finalizados."""
+    if cache.redis is None or pagamento is None:
+        return
+    membro = str(int(pagamento.id))
+    pendente = (
+        getattr(pagamento, "statusPagamento", None) in CONCILIACAO_STATUS_PENDENTES
+        and getattr(pagamento, "metodo", None) in CONCILIACAO_METODOS
+        and getattr(pagamento, "cieloPaymentId", None)
+    )
+    try:
+        if not pendente:
+            await cache.redis.zrem(CONCILIACAO_FILA_KEY, membro)
+            return
+        intervalo = intervalo_conciliacao(getattr(pagamento, "createdAt", None))
+        if intervalo is not None:
+            await cache.redis.zadd(CONCILIACAO_FILA_KEY, {membro: (now_utc() + intervalo).timestamp()})
+    except Exception as exc:
+        print(f"[CONCILIACAO] Erro ao atualizar fila para pagamento {membro}: {exc}")
+
+
+class ConciliacaoPagamentoService:
+    def __init__(self, db, cielo_api=None, pagamento_repo=None, reserva_repo=None):
+        from app.repositories.pagamento_repo import PagamentoRepository
+        from app.repositories.reserva_repo import ReservaRepository
+
+        self.db = db
+        self._cielo_api = cielo_api
+        self.pagamento_repo = pagamento_repo or PagamentoRepository(db)
+        self.reserva_repo = reserva_repo or ReservaRepository(db)
+
+    @property
+    def cielo_api(self):
+        if self._cielo_api is None:
+            from app.services.cielo_service import CieloAPI
+
+            self._cielo_api = CieloAPI()
+        return self._cielo_api
+
+    async def processar(
+        self, limite: int = CONCILIACAO_LOTE, concorrencia: int = CONCILIACAO_CONCORRENCIA
+    ) -> Dict[str, Any]:
+        """Consulta na Cielo os pagamentos vencidos da fila e aplica as transicoes."""
+        if cache.redis is None:
+            return {"success": False, "consultados": 0, "motivo": "redis_indisponivel"}
+        if self.cielo_api.mode == "sandbox":
+            return {"success": False, "consultados": 0, "motivo": "sandbox"}
+
+        vencidos = await cache.redis.zrangebyscore(
+            CONCILIACAO_FILA_KEY, "-inf", now_utc().timestamp(), start=0, num=limite
+        )
+        reivindicados: List[int] = []
+        for membro in vencidos or []:
+            # Quem remove da fila e quem consulta; os demais workers pulam.
+            if await cache.redis.zrem(CONCILIACAO_FILA_KEY, membro):
+                reivindicados.append(int(membro))
+        if not reivindicados:
+            return {"success": True, "consultados": 0, "atualizados": 0, "reagendados": 0, "descartados": 0}
+
+        pagamentos = await self._carregar_pendentes(reivindicados)
+        semaforo = asyncio.Semaphore(max(1, concorrencia))
+
+        async def _consultar(pagamento: Dict[str, Any]) -> str:
+            async with semaforo:
+                return await self._conciliar(pagamento)
+
+        resultados = await asyncio.gather(*(_consultar(p) for p in pagamentos))
+        return {
+            "success": True,
+            "consultados": len(pagamentos),
+            "atualizados": resultados.count("atualizado"),
+            "reagendados": resultados.count("reagendado"),
+            "descartados": resultados.count("descartado"),
+        }
+
+    async def reconciliar_fila(self) -> Dict[str, Any]:
+        """Reagenda pendentes do gateway que nao estao na fila."""
+        if cache.redis is None:
+            return {"success": False, "agendados": 0, "motivo": "redis_indisponivel"}
+
+        rows = await self.db.query_raw(
+            """
+            SELECT p.id, p.created_at
+            FROM pagamentos p
+            WHERE p.status_pagamento = ANY($1::text[])
+              AND p.metodo = ANY($2::text[])
+              AND p.cielo_payment_id IS NOT NULL
+              AND p.created_at >= $3::timestamptz
+            """,
+            sorted(CONCILIACAO_STATUS_PENDENTES),
+            sorted(CONCILIACAO_METODOS),
+            now_utc() - CONCILIACAO_IDADE_MAXIMA,
+        )
+        agora = now_utc()
+        agenda: Dict[str, float] = {}
+        for row in rows:
+            intervalo = intervalo_conciliacao(_criado_em(row.get("created_at")), agora)
+            if intervalo is not None:
+                agenda[str(int(row["id"]))] = (agora + intervalo).timestamp()
+        if agenda:
+            # NX: nao adianta a consulta de quem ja esta agendado.
+            await cache.redis.zadd(CONCILIACAO_FILA_KEY, agenda, nx=True)
+        return {"success": True, "agendados": len(agenda)}
+
+    async def _carregar_pendentes(self, pagamento_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        # Webhook ou confirmacao manual podem ter finalizado o pagamento depois
+        # do agendamento; esses ficam de fora (e ja sairam da fila).
+        return await self.db.query_raw(
+            """
+            SELECT
+                p.id,
+                p.reserva_id,
+                p.metodo,
+                p.status_pagamento,
+                p.cielo_payment_id,
+                p.created_at
+            FROM pagamentos p
+            WHERE p.id = ANY($1::int[])
+              AND p.status_pagamento = ANY($2::text[])
+              AND p.cielo_payment_id IS NOT NULL
+            """,
+            list(pagamento_ids),
+            sorted(CONCILIACAO_STATUS_PENDENTES),
+        )
+
+    async def _conciliar(self, pagamento: Dict[str, Any]) -> str:
+        pagamento_id = int(pagamento["id"])
+        try:
+            # consultar_pagamento usa requests (bloqueante): fora do event loop.
+            resposta = await asyncio.to_thread(self.cielo_api.consultar_pagamento, pagamento["cielo_payment_id"])
+        except Exception as exc:
+            print(f"[CONCILIACAO] Falha ao consultar pagamento {pagamento_id}: {exc}")
+            resposta = None
+
+        novo_status = STATUS_CIELO_PAGAMENTO.get(status_cielo(resposta))
+        if novo_status is None:
+            return await self._reagendar(pagamento)
+
+        try:
+            await self.pagamento_repo.update_status(pagamento_id, novo_status)
+        except Exception as exc:
+            print(f"[CONCILIACAO] Falha ao aplicar {novo_status} no pagamento {pagamento_id}: {exc}")
+            return await self._reagendar(pagamento)
+
+        if novo_status == "APROVADO" and pagamento.get("reserva_id"):
+            await self._confirmar_reserva(int(pagamento["reserva_id"]))
+        await event_hub.publicar(
+            "pagamento.conciliado",
+            {
+                "id": pagamento_id,
+                "reserva_id": pagamento.get("reserva_id"),
+                "metodo": pagamento.get("metodo"),
+                "status_anterior": pagamento.get("status_pagamento"),
+                "status": novo_status,
+            },
+        )
+        print(f"[CONCILIACAO] Pagamento {pagamento_id}: {pagamento.get('status_pagamento')} -> {novo_status}")
+        return "atualizado"
+
+    async def _reagendar(self, pagamento: Dict[str, Any]) -> str:
+        intervalo = intervalo_conciliacao(_criado_em(pagamento.get("created_at")))
+        if intervalo is None:
+            print(f"[CONCILIACAO] Pagamento {pagamento['id']} segue pendente apos {CONCILIACAO_IDADE_MAXIMA}; saindo da fila")
+            return "descartado"
+        await cache.redis.zadd(
+            CONCILIACAO_FILA_KEY, {str(int(pagamento["id"])): (now_utc() + intervalo).timestamp()}
+        )
+        return "reagendado"
+
+    async def _confirmar_reserva(self, reserva_id: int) -> None:
+        # Mesmo efeito do PIX/cartao aprovado no fluxo sincrono (confirmar gera o voucher).
+        try:
+            await self.reserva_repo.confirmar(reserva_id)
+        except Exception as exc:
+            print(f"[CONCILIACAO] Erro ao confirmar reserva {reserva_id}: {exc}")
@@ -0,0 +1,228 @@
+"""
+Disponibilidade publica (/public/quartos/disponiveis) com micro-cache.
+
+A rota e aberta, entao picos de campanha e bots repetem a mesma consulta
+(checkin, checkout) muitas vezes por segundo. O resultado ja serializado fica:
+
+- num dict por worker, por DISPONIBILIDADE_PUBLICA_TTL_SECONDS;
+- no Redis (SETEX), compartilhado pelos workers, pelo mesmo TTL.
+
+Consultas iguais simultaneas no mesmo worker esperam uma unica Future
+(single-flight). Entre workers, quem perde o SET NX da chave de calculo
+espera o resultado do vencedor aparecer no Redis em vez de ir ao banco;
+se demorar, calcula por conta propria.
+
+As chaves incluem a versao da disponibilidade (INCR a cada mudanca de
+ocupacao, via `atualizar_calendario_quartos`) e a versao das tarifas, entao
+uma reserva nova derruba o cache de todos os workers em ate
+DISPONIBILIDADE_PUBLICA_CHECAGEM_VERSAO_SEGUNDOS.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.services.disponibilidade_service import DisponibilidadeService
+from app.services.tarifa_calendario_service import TARIFA_CALENDARIO_VERSAO_KEY, tarifa_calendario
+from app.utils.datetime_utils import LOCAL_TIMEZONE, to_utc
+
+
+DISPONIBILIDADE_PUBLICA_VERSAO_KEY = "disponibilidade:publica:versao"
+DISPONIBILIDADE_PUBLICA_PREFIXO = "disponibilidade:publica"
+DISPONIBILIDADE_PUBLICA_CHECAGEM_VERSAO_SEGUNDOS = 1.0
+DISPONIBILIDADE_PUBLICA_CALCULO_SEGUNDOS = 5
+DISPONIBILIDADE_PUBLICA_ESPERA_SEGUNDOS = 2.0
+DISPONIBILIDADE_PUBLICA_ESPERA_INTERVALO = 0.05
+DISPONIBILIDADE_PUBLICA_MAX_ENTRADAS = 512
+
+
+def _serializar(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _etag(corpo: str) -> str:
+    return '"' + hashlib.sha1(corpo.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+class DisponibilidadePublicaCache:
+    def __init__(self, ttl_segundos: Optional[int] = None):
+        self.ttl_segundos = ttl_segundos or settings.DISPONIBILIDADE_PUBLICA_TTL_SECONDS
+        # chave -> (expira_em monotonic, corpo JSON, etag)
+        self._local: Dict[str, Tuple[float, str, str]] = {}
+        self._em_voo: Dict[str, "asyncio.Future[Tuple[str, str]]"] = {}
+        self._versao = "0.0"
+        self._versao_checada_em: Optional[float] = None
+
+    async def _versao_atual(self) -> str:
+        agora = time.monotonic()
+        if (
+            self._versao_checada_em is not None
+            and (agora - self._versao_checada_em) < DISPONIBILIDADE_PUBLICA_CHECAGEM_VERSAO_SEGUNDOS
+        ):
+            return self._versao
+        if cache.redis is not None:
+            try:
+                disponibilidade, tarifas = await cache.redis.mget(
+                    DISPONIBILIDADE_PUBLICA_VERSAO_KEY, TARIFA_CALENDARIO_VERSAO_KEY
+                )
+                self._versao = f"{disponibilidade or 0}.{tarifas or 0}"
+            except Exception as exc:
+                print(f"[DISPONIBILIDADE PUBLICA] Versao indisponivel: {exc}")
+        self._versao_checada_em = agora
+        return self._versao
+
+    async def obter(self, consulta: str, loader: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[str, str]:
+        """Retorna (corpo JSON, ETag) da consulta normalizada `consulta`."""
+        chave = f"{DISPONIBILIDADE_PUBLICA_PREFIXO}:{await self._versao_atual()}:{consulta}"
+        entrada = self._local.get(chave)
+        if entrada is not None and entrada[0] > time.monotonic():
+            return entrada[1], entrada[2]
+
+        tarefa = self._em_voo.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(self._carregar(chave, loader))
+            self._em_voo[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_voo.pop(chave, None))
+        # shield: cliente que desconecta nao cancela o calculo dos demais
+        return await asyncio.shield(tarefa)
+
+    async def _carregar(self, chave: str, loader) -> Tuple[str, str]:
+        corpo = await self._ler_redis(chave)
+        if corpo is None:
+            corpo = await self._calcular_coordenado(chave, loader)
+        etag = _etag(corpo)
+        self._podar()
+        self._local[chave] = (time.monotonic() + self.ttl_segundos, corpo, etag)
+        return corpo, etag
+
+    async def _ler_redis(self, chave: str) -> Optional[str]:
+        if cache.redis is None:
+            return None
+        try:
+            return await cache.redis.get(chave)
+        except Exception as exc:
+            print(f"[DISPONIBILIDADE PUBLICA] Erro ao ler cache: {exc}")
+            return None
+
+    async def _calcular_coordenado(self, chave: str, loader) -> str:
+        if cache.redis is None:
+            return _serializar(await loader())
+
+        chave_calculo = f"{chave}:calculo"
+        try:
+            lider = await cache.redis.set(chave_calculo, "1", ex=DISPONIBILIDADE_PUBLICA_CALCULO_SEGUNDOS, nx=True)
+        except Exception as exc:
+            print(f"[DISPONIBILIDADE PUBLICA] Erro na coordenacao: {exc}")
+            return _serializar(await loader())
+
+        if not lider:
+            # Outro worker ja esta consultando o banco para esta chave.
+            limite = time.monotonic() + DISPONIBILIDADE_PUBLICA_ESPERA_SEGUNDOS
+            while time.monotonic() < limite:
+                await asyncio.sleep(DISPONIBILIDADE_PUBLICA_ESPERA_INTERVALO)
+                corpo = await self._ler_redis(chave)
+                if corpo is not None:
+                    return corpo
+
+        try:
+            corpo = _serializar(await loader())
+            try:
+                await cache.redis.set(chave, corpo, ex=self.ttl_segundos)
+            except Exception as exc:
+                print(f"[DISPONIBILIDADE PUBLICA] Erro ao gravar cache: {exc}")
+            return corpo
+        finally:
+            if lider:
+                try:
+                    await cache.redis.delete(chave_calculo)
+                except Exception:
+                    pass
+
+    def _podar(self) -> None:
+        if len(self._local) < DISPONIBILIDADE_PUBLICA_MAX_ENTRADAS:
+            return
+        agora = time.monotonic()
+        for chave in [c for c, e in self._local.items() if e[0] <= agora]:
+            del self._local[chave]
+        if len(self._local) >= DISPONIBILIDADE_PUBLICA_MAX_ENTRADAS:
+            self._local.clear()
+
+    async def invalidar(self) -> None:
+        self._local.clear()
+        nova_versao = await cache.incr(DISPONIBILIDADE_PUBLICA_VERSAO_KEY)
+        # Forca reler as versoes (inclusive a de tarifas) na proxima consulta.
+        self._versao_checada_em = None
+        if not nova_versao:
+            self._versao = f"{time.monotonic_ns()}.local"
+            self._versao_checada_em = time.monotonic()
+
+
+disponibilidade_publica_cache = DisponibilidadePublicaCache()
+
+
+async def invalidar_disponibilidade_publica() -> None:
+    """Chamado apos mudancas de ocupacao; nunca interrompe a operacao."""
+    try:
+        await disponibilidade_publica_cache.invalidar()
+    except Exception as exc:
+        print(f"[DISPONIBILIDADE PUBLICA] Erro ao invalidar cache: {exc}")
+
+
+async def calcular_disponibilidade_publica(db, checkin: date, checkout: date) -> Dict[str, Any]:
+    """Quartos livres por tipo com a cotacao de cada noite (sem cache)."""
+    checkin_local = datetime(checkin.year, checkin.month, checkin.day, 12, 0, tzinfo=LOCAL_TIMEZONE)
+    checkout_local = datetime(checkout.year, checkout.month, checkout.day, 11, 0, tzinfo=LOCAL_TIMEZONE)
+
+    quartos_disponiveis = await DisponibilidadeService(db).listar_quartos_disponiveis(
+        to_utc(checkin_local),
+        to_utc(checkout_local),
+        None
+    )
+
+    tipos_index: Dict[str, list] = {}
+    for q in quartos_disponiveis:
+        tipo = q.get("tipo_suite")
+        if not tipo:
+            continue
+        tipos_index.setdefault(tipo, []).append({"numero": q.get("numero")})
+
+    calendario = await tarifa_calendario.obter(db)
+    tipos_disponiveis = []
+    total_quartos_disponiveis = 0
+    for tipo, quartos in tipos_index.items():
+        # Tipo sem tarifa ativa em alguma noite apenas nao e ofertado; nao bloqueia os demais
+        cotacao = calendario.cotar(tipo, checkin, checkout)
+        if not cotacao:
+            continue
+        quantidade = len(quartos)
+        total_quartos_disponiveis += quantidade
+        tipos_disponiveis.append({
+            "tipo": tipo,
+            "preco_diaria": cotacao["preco_diaria"],
+            "preco_total": cotacao["preco_total"],
+            "precos_noites": [
+                {
+                    "data": noite["data"].isoformat(),
+                    "preco_diaria": noite["preco_diaria"],
+                    "temporada": noite["temporada"],
+                }
+                for noite in cotacao["noites"]
+            ],
+            "quantidade_disponivel": quantidade,
+            "quartos": quartos
+        })
+
+    tipos_disponiveis.sort(key=lambda x: x["tipo"])
+
+    return {
+        "success": True,
+        "data_checkin": checkin.isoformat(),
+        "data_checkout": checkout.isoformat(),
+        "num_diarias": (checkout - checkin).days,
+        "total_quartos_disponiveis": total_quartos_disponiveis,
+        "tipos_disponiveis": tipos_disponiveis
+    }
@@ -63,7 +63,9 @@ class DisponibilidadeService:
         checkin: datetime,
         checkout: datetime,
         reserva_id_excluir: int = None,
+        quarto=None,
     ) -> Dict[str, Any]:
+        """`quarto` ja carregado pelo caller evita buscar o quarto de novo."""
         if checkout <= checkin:
             return {
                 "disponivel": False,
@@ -71,7 +73,8 @@ class DisponibilidadeService:
                 "conflitos": [],
             }
 
-        quarto = await self.db.quarto.find_unique(where={"numero": quarto_numero})
+        if quarto is None:
+            quarto = await self.db.quarto.find_unique(where={"numero": quarto_numero})
         if not quarto:
             return {
                 "disponivel": False,
@@ -12,6 +12,7 @@ from app.repositories.indicacao_repo import (
     normalizar_documento,
 )
 from app.services.programa_pontos_service import ProgramaPontosService
+from app.services.saldo_snapshot_service import SaldoSnapshotService, invalidar_snapshot_saldo
 from app.utils.datetime_utils import now_utc
 
 
@@ -381,7 +382,7 @@ class IndicacaoService:
                 indicacao_id,
             )
 
-            return {
+            resultado = {
                 "success": True,
                 "creditado": True,
                 "indicacao_id": indicacao_id,
@@ -391,6 +392,9 @@ class IndicacaoService:
                 "saldo_posterior": saldo_posterior,
             }
 
+        await invalidar_snapshot_saldo(cliente_indicador_id)
+        return resultado
+
     async def obter_status_cliente(self, cliente_id: int) -> Dict[str, Any]:
         cliente = await self.db.cliente.find_unique(where={"id": cliente_id})
         if not cliente:
@@ -470,10 +474,8 @@ class IndicacaoService:
         return await self.db.cliente.find_unique(where={"id": int(rows[0]["id"])})
 
     async def _obter_saldo(self, cliente_id: int) -> int:
-        usuario_pontos = await self.db.usuariopontos.find_unique(where={"clienteId": cliente_id})
-        if not usuario_pontos:
-            return 0
-        return int(getattr(usuario_pontos, "saldo", 0) or 0)
+        snapshot = await SaldoSnapshotService(self.db).obter(cliente_id)
+        return snapshot["saldo"]
 
     async def _obter_proximo_premio(self, saldo_atual: int) -> Optional[Dict[str, Any]]:
         premio = await self.db.premio.find_first(
@@ -1,9 +1,14 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import os
+from typing import Any, Awaitable, Dict, List, Optional
 
 from fastapi import HTTPException
 
+from app.core.cache import PREMIOS_CATALOGO_CACHE
+from app.core.local_cache import local_cache
 from app.core.validators import ClienteValidator
 from app.services.real_points_service import RealPointsService
+from app.services.saldo_snapshot_service import SaldoSnapshotService
 
 
 NIVEIS_PADRAO = [
@@ -12,6 +17,20 @@ NIVEIS_PADRAO = [
     {"codigo": 2, "nome": "REAL", "pontos_minimos": 90, "ordem": 2},
 ]
 
+# Dados de referencia servidos do cache local (ver app/core/local_cache.py).
+NIVEIS_CACHE = "jornada:niveis"
+CONFIGURACOES_CACHE = "jornada:configuracoes"
+BENEFICIOS_CACHE = "jornada:beneficios"
+# O catalogo expoe estoque; TTL curto para refletir resgates de outros workers.
+PREMIOS_CATALOGO_TTL_SEGUNDOS = 60
+
+# Consultas simultaneas por dashboard. O pool do Prisma tem poucas conexoes
+# por worker (PRISMA_CONNECTION_LIMIT); um dashboard nao pode ocupar todas.
+try:
+    DASHBOARD_MAX_CONSULTAS_SIMULTANEAS = max(1, int(os.getenv("JORNADA_DASHBOARD_MAX_CONSULTAS", "3")))
+except ValueError:
+    DASHBOARD_MAX_CONSULTAS_SIMULTANEAS = 3
+
 
 class JornadaService:
     def __init__(self, db):
@@ -77,20 +96,47 @@ class JornadaService:
         )
         return await self.montar_dashboard_jornada(int(cliente["id"]))
 
+    async def _reunir(self, *consultas: Awaitable[Any]) -> List[Any]:
+        """asyncio.gather limitado a DASHBOARD_MAX_CONSULTAS_SIMULTANEAS."""
+        limite = asyncio.Semaphore(DASHBOARD_MAX_CONSULTAS_SIMULTANEAS)
+
+        async def _com_limite(consulta: Awaitable[Any]) -> Any:
+            async with limite:
+                return await consulta
+
+        return list(await asyncio.gather(*(_com_limite(c) for c in consultas)))
+
     async def montar_dashboard_jornada(self, cliente_id: int) -> Dict[str, Any]:
-        cliente = await self._buscar_cliente_por_id(cliente_id)
+        # Leituras independentes em paralelo; niveis e catalogo de premios
+        # normalmente saem do cache local sem ir ao banco.
+        (
+            cliente,
+            snapshot,
+            _niveis,
+            _catalogo,
+            historico_pontos,
+            historico_resgates,
+        ) = await self._reunir(
+            self._buscar_cliente_por_id(cliente_id),
+            SaldoSnapshotService(self.db).obter(cliente_id),
+            self._obter_niveis(),
+            self._catalogo_premios(),
+            self._historico_pontos(cliente_id, limit=5),
+            self._historico_resgates(cliente_id, limit=5),
+        )
         if not cliente:
             raise HTTPException(status_code=404, detail="Cliente nao encontrado")
 
-        saldo = await self._saldo_cliente(cliente_id)
-        pendentes = await self._somar_transacoes(cliente_id, "pendente")
-        bloqueados = await self._somar_transacoes(cliente_id, "bloqueado")
+        saldo = snapshot["saldo"]
+        pendentes = snapshot["pendentes"]
+        bloqueados = snapshot["bloqueados"]
 
         nivel_atual, proximo_nivel, progresso = await self._calcular_progresso_nivel(saldo)
-        beneficios_ativos = await self.listar_beneficios(cliente_id, apenas_ativos=True)
+        beneficios_atual, beneficios_proximo = await self._reunir(
+            self._beneficios_do_nivel(nivel_atual, apenas_ativos=True),
+            self._beneficios_do_nivel(proximo_nivel, apenas_ativos=True),
+        )
         premios = await self._listar_premios_disponiveis(saldo)
-        historico_pontos = await self._historico_pontos(cliente_id, limit=5)
-        historico_resgates = await self._historico_resgates(cliente_id, limit=5)
 
         total_premios = len(premios)
         alcancados = len([premio for premio in premios if saldo >= int(premio["custo_pontos"])])
@@ -128,8 +174,8 @@ class JornadaService:
                 "alcancados": alcancados,
                 "total": total_premios,
             },
-            "beneficios_ativos": beneficios_ativos["beneficios_ativos"],
-            "beneficios_proximo_nivel": beneficios_ativos["beneficios_proximo_nivel"],
+            "beneficios_ativos": beneficios_atual,
+            "beneficios_proximo_nivel": beneficios_proximo,
             "premios_disponiveis": premios,
             "historico_resumido": {
                 "pontos": historico_pontos,
@@ -181,7 +227,17 @@ class JornadaService:
             ),
         }
 
+    async def aquecer_cache(self) -> None:
+        """Carrega no cache local tudo que as telas da jornada leem (warm-up do worker)."""
+        await self._obter_configuracoes()
+        await self._obter_niveis()
+        await self._catalogo_premios()
+        await local_cache.get_or_load(BENEFICIOS_CACHE, self._carregar_beneficios)
+
     async def _obter_configuracoes(self) -> Dict[str, Any]:
+        return await local_cache.get_or_load(CONFIGURACOES_CACHE, self._carregar_configuracoes)
+
+    async def _carregar_configuracoes(self) -> Dict[str, Any]:
         try:
             rows = await self.db.query_raw(
                 """
@@ -196,6 +252,10 @@ class JornadaService:
         return {row["chave"]: row.get("valor_json") for row in rows}
 
     async def _obter_niveis(self) -> List[Dict[str, Any]]:
+        niveis = await local_cache.get_or_load(NIVEIS_CACHE, self._carregar_niveis)
+        return [dict(nivel) for nivel in niveis]
+
+    async def _carregar_niveis(self) -> List[Dict[str, Any]]:
         try:
             rows = await self.db.query_raw(
                 """
@@ -249,33 +309,18 @@ class JornadaService:
         return atual, proximo, progresso
 
     async def _saldo_cliente(self, cliente_id: int) -> int:
-        rows = await self.db.query_raw(
-            """
-            SELECT COALESCE(saldo, 0) AS saldo
-            FROM usuarios_pontos
-            WHERE cliente_id = $1
-            LIMIT 1
-            """,
-            cliente_id,
-        )
-        return int(rows[0]["saldo"] or 0) if rows else 0
-
-    async def _somar_transacoes(self, cliente_id: int, status: str) -> int:
-        rows = await self.db.query_raw(
-            """
-            SELECT COALESCE(SUM(pontos), 0) AS total
-            FROM transacoes_pontos
-            WHERE cliente_id = $1
-              AND status = $2
-              AND pontos > 0
-            """,
-            cliente_id,
-            status,
+        snapshot = await SaldoSnapshotService(self.db).obter(cliente_id)
+        return snapshot["saldo"]
+
+    async def _catalogo_premios(self) -> List[Dict[str, Any]]:
+        return await local_cache.get_or_load(
+            PREMIOS_CATALOGO_CACHE,
+            self._carregar_catalogo_premios,
+            ttl=PREMIOS_CATALOGO_TTL_SEGUNDOS,
         )
-        return int(rows[0]["total"] or 0) if rows else 0
 
-    async def _listar_premios_disponiveis(self, saldo: int) -> List[Dict[str, Any]]:
-        rows = await self.db.query_raw(
+    async def _carregar_catalogo_premios(self) -> List[Dict[str, Any]]:
+        return await self.db.query_raw(
             """
             SELECT p.id,
                    p.nome,
@@ -290,6 +335,9 @@ class JornadaService:
             ORDER BY p.preco_em_pontos ASC, p.id ASC
             """
         )
+
+    async def _listar_premios_disponiveis(self, saldo: int) -> List[Dict[str, Any]]:
+        rows = await self._catalogo_premios()
         return [
             {
                 "id": int(row["id"]),
@@ -308,17 +356,7 @@ class JornadaService:
         if not nivel or not nivel.get("id"):
             return []
 
-        where_ativo = "AND ativo = TRUE" if apenas_ativos else ""
-        rows = await self.db.query_raw(
-            f"""
-            SELECT id, titulo, descricao, ativo
-            FROM beneficios_nivel
-            WHERE nivel_id = $1
-            {where_ativo}
-            ORDER BY id ASC
-            """,
-            int(nivel["id"]),
-        )
+        beneficios = await local_cache.get_or_load(BENEFICIOS_CACHE, self._carregar_beneficios)
         return [
             {
                 "id": int(row["id"]),
@@ -326,9 +364,21 @@ class JornadaService:
                 "descricao": row.get("descricao"),
                 "ativo": bool(row.get("ativo")),
             }
-            for row in rows
+            for row in beneficios
+            if int(row.get("nivel_id") or 0) == int(nivel["id"])
+            and (bool(row.get("ativo")) or not apenas_ativos)
         ]
 
+    async def _carregar_beneficios(self) -> List[Dict[str, Any]]:
+        # Tabela pequena: carrega todos os niveis de uma vez e filtra em memoria.
+        return await self.db.query_raw(
+            """
+            SELECT id, nivel_id, titulo, descricao, ativo
+            FROM beneficios_nivel
+            ORDER BY id ASC
+            """
+        )
+
     async def _historico_pontos(self, cliente_id: int, limit: int) -> List[Dict[str, Any]]:
         rows = await self.db.query_raw(
             """
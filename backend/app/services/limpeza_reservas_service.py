@@ -0,0 +1,264 @@
+"""
+Varredura de reservas mortas: holds nao pagos vencidos e no-shows.
+
+Reservas PENDENTE/AGUARDANDO_PAGAMENTO continuam em
+STATUS_RESERVA_BLOQUEIA_DISPONIBILIDADE ate alguem cancelar; sem a varredura
+um hold abandonado segura o quarto indefinidamente. O worker agendado (Celery)
+processa em lotes:
+
+- cada lote reivindica as reservas candidatas com FOR UPDATE SKIP LOCKED
+  (varios workers drenam sem disputar as mesmas linhas; quem esta sendo
+  pago/cancelado na API no mesmo instante fica para a proxima execucao);
+- as candidatas passam por `validar_lote` da tabela de transicoes (estado +
+  guardas: prazo de no-show, hospedagem nao iniciada);
+- um UPDATE por destino e um INSERT de notificacoes para o lote inteiro
+  (fan-out com chave por reserva), na mesma transacao.
+
+Hold vencido: status de hold criado ha mais de RESERVA_HOLD_PRAZO_HORAS
+(settings) ou com check-in previsto ja passado, sem pagamento aprovado nem
+pagamento de gateway ainda em conciliacao (pendente ha menos de
+CONCILIACAO_IDADE_MAXIMA; todo pagamento nasce PENDENTE, e um PIX gerado e
+abandonado fica assim para sempre) -> CANCELADO. Nunca expiram sozinhos:
+EM_ANALISE (comprovante aguardando o admin), reserva com CHK de check-in em
+dinheiro pendente (o pagamento `na_chegada` so vira CONFIRMADA depois da
+aprovacao do gerente) e reserva com forma de pagamento no balcao/na chegada.
+
+No-show: reserva confirmada cujo dia do check-in ja terminou sem check-in ->
+NO_SHOW.
+
+Depois do commit de cada lote: calendario/disponibilidade publica dos quartos,
+fila de check-outs, reanalise antifraude e um evento `reservas.varridas`.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.event_hub import event_hub
+from app.core.transicoes_reserva import CANCELAR_RESERVA, MARCAR_NO_SHOW, validar_lote
+from app.services.antifraude_score_service import marcar_cliente_para_reanalise
+from app.services.calendario_service import atualizar_calendario_quartos
+from app.services.checkout_alert_service import remover_checkout
+from app.services.checkin_cash_approval_service import APPROVAL_STATUS_PENDING
+from app.services.conciliacao_pagamento_service import (
+    CONCILIACAO_IDADE_MAXIMA,
+    CONCILIACAO_METODOS,
+    CONCILIACAO_STATUS_PENDENTES,
+)
+from app.services.notificacao_fanout_service import (
+    NotificacaoEvento,
+    anunciar_notificacoes,
+    chave_evento,
+    inserir_notificacoes,
+)
+from app.utils.datetime_utils import now_utc
+
+
+audit_logger = logging.getLogger("audit")
+
+LIMPEZA_LOTE = 200
+LIMPEZA_MAX_POR_EXECUCAO = 5000
+
+STATUS_HOLD_EXPIRAVEL = (
+    "PENDENTE",
+    "PENDENTE_PAGAMENTO",
+    "AGUARDANDO_PAGAMENTO",
+    "AGUARDANDO_COMPROVANTE",
+    "PAGA_REJEITADA",
+)
+STATUS_NO_SHOW_CANDIDATO = ("CONFIRMADA", "CONFIRMADO", "PAGA_APROVADA", "CHECKIN_LIBERADO")
+STATUS_PAGAMENTO_APROVADO = ("PAGO", "APROVADO", "CONFIRMADO", "CAPTURED", "AUTHORIZED")
+# Pagamento no hotel (PagamentoCreate normaliza dinheiro/cash -> na_chegada)
+FORMAS_PAGAMENTO_NA_CHEGADA = ("na_chegada", "na chegada", "balcao", "balcão", "dinheiro", "cash")
+
+# tipo da candidata -> (evento, categoria/titulo da notificacao)
+_ACOES = {
+    "hold": (CANCELAR_RESERVA, "reserva_expirada", "Reserva expirada sem pagamento"),
+    "no_show": (MARCAR_NO_SHOW, "reserva_no_show", "No-show registrado"),
+}
+
+
+class LimpezaReservasService:
+    def __init__(self, db):
+        self.db = db
+
+    async def varrer(
+        self,
+        limite: int = LIMPEZA_MAX_POR_EXECUCAO,
+        tamanho_lote: int = LIMPEZA_LOTE,
+        agora: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Expira holds vencidos e marca no-shows; devolve as contagens."""
+        agora = agora or now_utc()
+        limite = max(1, min(int(limite or LIMPEZA_MAX_POR_EXECUCAO), LIMPEZA_MAX_POR_EXECUCAO))
+        lote = max(1, min(int(tamanho_lote or LIMPEZA_LOTE), limite))
+
+        totais = {"avaliadas": 0, "expiradas": 0, "no_show": 0, "ignoradas": 0, "quartos_liberados": 0}
+        ultimo_id = 0
+        while totais["avaliadas"] < limite:
+            async with self.db.tx() as transaction:
+                candidatas = await self._reivindicar(
+                    transaction, ultimo_id, min(lote, limite - totais["avaliadas"]), agora
+                )
+                if not candidatas:
+                    break
+                # Cursor por id: candidatas recusadas pelas guardas (ex.: dia do
+                # check-in ainda nao terminou) nao voltam na mesma execucao.
+                ultimo_id = max(int(c["id"]) for c in candidatas)
+                totais["avaliadas"] += len(candidatas)
+                aplicadas, notificacoes = await self._aplicar_lote(transaction, candidatas, agora)
+
+            totais["expiradas"] += len(aplicadas["hold"])
+            totais["no_show"] += len(aplicadas["no_show"])
+            totais["ignoradas"] += len(candidatas) - len(aplicadas["hold"]) - len(aplicadas["no_show"])
+            totais["quartos_liberados"] += await self._pos_lote(aplicadas, notificacoes)
+            if len(candidatas) < lote:
+                break
+
+        print(
+            f"[LIMPEZA] {totais['avaliadas']} candidatas: {totais['expiradas']} holds expirados, "
+            f"{totais['no_show']} no-shows, {totais['ignoradas']} ignoradas"
+        )
+        return {"success": True, **totais}
+
+    async def _reivindicar(self, transaction, ultimo_id: int, quantidade: int, agora: datetime) -> List[Dict[str, Any]]:
+        return await transaction.query_raw(
+            """
+            SELECT
+                r.id,
+                r.codigo_reserva,
+                r.cliente_id,
+                r.cliente_nome,
+                r.quarto_numero,
+                r.status_reserva AS status,
+                r.checkin_previsto,
+                h.status_hospedagem,
+                CASE WHEN r.status_reserva = ANY($2::text[]) THEN 'hold' ELSE 'no_show' END AS tipo
+            FROM reservas r
+            LEFT JOIN hospedagens h ON h.reserva_id = r.id
+            WHERE r.id > $1
+              AND (
+                (
+                    r.status_reserva = ANY($2::text[])
+                    AND (r.created_at <= $3::timestamptz OR r.checkin_previsto <= $4::timestamptz)
+                    AND LOWER(COALESCE(r.forma_pagamento, '')) <> ALL($7::text[])
+                    AND NOT EXISTS (
+                        SELECT 1
+                        FROM pagamentos p
+                        WHERE p.reserva_id = r.id
+                          AND (
+                            p.status_pagamento = ANY($5::text[])
+                            OR (
+                                p.status_pagamento = ANY($10::text[])
+                                AND p.metodo = ANY($11::text[])
+                                AND p.created_at >= $12::timestamptz
+                            )
+                          )
+                    )
+                    AND NOT EXISTS (
+                        SELECT 1
+                        FROM checkin_cash_approvals ca
+                        WHERE ca.reserva_id = r.id
+                          AND ca.status = $8
+                    )
+                )
+                OR (r.status_reserva = ANY($6::text[]) AND r.checkin_previsto <= $4::timestamptz)
+              )
+            ORDER BY r.id ASC
+            LIMIT $9
+            FOR UPDATE OF r SKIP LOCKED
+            """,
+            ultimo_id,
+            list(STATUS_HOLD_EXPIRAVEL),
+            agora - timedelta(hours=settings.RESERVA_HOLD_PRAZO_HORAS),
+            agora,
+            list(STATUS_PAGAMENTO_APROVADO),
+            list(STATUS_NO_SHOW_CANDIDATO),
+            list(FORMAS_PAGAMENTO_NA_CHEGADA),
+            APPROVAL_STATUS_PENDING,
+            quantidade,
+            # PIX/cartao pendente ainda na janela da conciliacao
+            sorted(CONCILIACAO_STATUS_PENDENTES),
+            sorted(CONCILIACAO_METODOS),
+            agora - CONCILIACAO_IDADE_MAXIMA,
+        )
+
+    async def _aplicar_lote(
+        self, transaction, candidatas: List[Dict[str, Any]], agora: datetime
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        aplicadas: Dict[str, List[Dict[str, Any]]] = {tipo: [] for tipo in _ACOES}
+        notificacoes: List[NotificacaoEvento] = []
+        for tipo, (evento, categoria, titulo) in _ACOES.items():
+            do_tipo = [c for c in candidatas if c.get("tipo") == tipo]
+            if not do_tipo:
+                continue
+            resultado = validar_lote(do_tipo, evento, agora=agora)
+            validas = set(resultado["validas"])
+            por_destino: Dict[str, List[int]] = {}
+            for candidata in do_tipo:
+                if candidata["id"] not in validas:
+                    continue
+                aplicadas[tipo].append(candidata)
+                por_destino.setdefault(resultado["destinos"][candidata["id"]], []).append(int(candidata["id"]))
+                reserva_id = int(candidata["id"])
+                notificacoes.append(NotificacaoEvento(
+                    titulo=titulo,
+                    mensagem=(
+                        f"Reserva {candidata.get('codigo_reserva')} | Quarto {candidata.get('quarto_numero')} | "
+                        f"{candidata.get('cliente_nome') or 'Cliente'}"
+                    ),
+                    tipo="warning",
+                    categoria=categoria,
+                    perfil="RECEPCAO",
+                    url_acao=f"/reservas?id={reserva_id}",
+                    reserva_id=reserva_id,
+                    chave=chave_evento(categoria, reserva_id, "RECEPCAO"),
+                ))
+            for destino, ids in por_destino.items():
+                await transaction.execute_raw(
+                    """
+                    UPDATE reservas
+                    SET status_reserva = $1, updated_at = $2::timestamptz
+                    WHERE id = ANY($3::int[])
+                    """,
+                    destino,
+                    agora,
+                    ids,
+                )
+
+        gravadas = await inserir_notificacoes(transaction, notificacoes, agora=agora)
+        return aplicadas, gravadas["novas"]
+
+    async def _pos_lote(
+        self, aplicadas: Dict[str, List[Dict[str, Any]]], notificacoes: List[Dict[str, Any]]
+    ) -> int:
+        reservas = aplicadas["hold"] + aplicadas["no_show"]
+        if not reservas:
+            return 0
+        quartos = sorted({r.get("quarto_numero") for r in reservas if r.get("quarto_numero")})
+        await atualizar_calendario_quartos(self.db, *quartos)
+        await remover_checkout(*(r["id"] for r in aplicadas["no_show"]))
+        await marcar_cliente_para_reanalise(*{r.get("cliente_id") for r in reservas})
+        # Contadores de nao lidas; a UI ja recebe o `reservas.varridas`.
+        await anunciar_notificacoes(notificacoes, publicar=False)
+
+        dados = {tipo: _resumo(itens) for tipo, itens in aplicadas.items()}
+        audit_logger.info(
+            "AUDITORIA: Sistema expirou reservas %s e marcou no-show em %s",
+            [r["id"] for r in dados["hold"]],
+            [r["id"] for r in dados["no_show"]],
+        )
+        await event_hub.publicar("reservas.varridas", {"expiradas": dados["hold"], "no_show": dados["no_show"]})
+        return len(quartos)
+
+
+def _resumo(reservas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": int(r["id"]),
+            "codigo": r.get("codigo_reserva"),
+            "status_anterior": r.get("status"),
+            "quarto": r.get("quarto_numero"),
+        }
+        for r in reservas
+    ]
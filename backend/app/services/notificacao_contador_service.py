@@ -0,0 +1,139 @@
+"""
+Contadores de notificacoes nao lidas no Redis.
+
+As notificacoes sao por perfil (campo `perfil`: um perfil, varios separados
+por virgula, ou NULL para todos) e `lida` e global. O HASH NAO_LIDAS_KEY guarda
+um contador por valor distinto de `perfil` (NULL vira NAO_LIDAS_TODOS); sao
+poucos campos. A contagem de um usuario soma os campos visiveis ao perfil dele
+com a mesma regra do filtro do repositorio (igual ou contem, com aliases), entao
+o sino custa um HGETALL de um hash pequeno em vez de um COUNT em notificacoes.
+
+Quem muda `lida` ou cria/apaga notificacao ajusta o campo com HINCRBY
+(NotificacaoRepository, CheckoutAlertService.marcar_visto, a varredura de
+reservas). O que passa por fora (retencao apagando nao lidas, SQL manual) e
+corrigido por `reconciliar_contadores`, agendado no Celery: recalcula com um
+GROUP BY, compara com o hash lido logo depois e aplica so a diferenca
+(HINCRBY novo - anterior, num script Lua). Ajustes que chegam durante a
+reconciliacao continuam valendo; trocar o hash inteiro os apagaria ate a
+proxima execucao. Sem o campo NAO_LIDAS_PRONTO
+(Redis reiniciado, antes da primeira reconciliacao) a leitura devolve None e o
+repositorio conta no banco.
+"""
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.cache import cache
+
+
+NAO_LIDAS_KEY = "notificacoes:nao_lidas"
+NAO_LIDAS_TODOS = "*"
+NAO_LIDAS_PRONTO = "__pronto__"
+
+# KEYS[1] = hash; ARGV = campo pronto, depois pares (destino, correcao).
+# Campo que zera sai do hash (HINCRBY recria quando preciso).
+_CORRIGIR_LUA = """
+for i = 2, #ARGV, 2 do
+  if redis.call('hincrby', KEYS[1], ARGV[i], ARGV[i + 1]) == 0 then
+    redis.call('hdel', KEYS[1], ARGV[i])
+  end
+end
+redis.call('hset', KEYS[1], ARGV[1], 1)
+return 1
+"""
+
+# RECEPCIONISTA e RECEPCAO sao aliases do mesmo perfil no sistema
+_PERFIL_ALIASES = {
+    "RECEPCIONISTA": {"RECEPCAO"},
+    "RECEPCAO": {"RECEPCIONISTA"},
+}
+
+
+def expandir_perfil(perfil: str) -> Set[str]:
+    """Retorna o perfil e seus aliases para queries inclusivas."""
+    return {perfil} | _PERFIL_ALIASES.get(perfil, set())
+
+
+def destino_contador(perfil: Optional[str]) -> str:
+    return perfil if perfil else NAO_LIDAS_TODOS
+
+
+def destino_visivel(destino: str, perfil: Optional[str]) -> bool:
+    """Mesma regra de NotificacaoRepository.get_by_user/count_nao_lidas."""
+    if destino == NAO_LIDAS_TODOS:
+        return True
+    if not perfil:
+        return False
+    return any(p in destino for p in expandir_perfil(perfil))
+
+
+async def ajustar_nao_lidas(perfil: Optional[str], delta: int) -> None:
+    if cache.redis is None or not delta:
+        return
+    try:
+        await cache.redis.hincrby(NAO_LIDAS_KEY, destino_contador(perfil), int(delta))
+    except Exception as exc:
+        print(f"[NOTIFICAÇÃO] Erro ao ajustar contador de nao lidas ({perfil}): {exc}")
+
+
+async def ajustar_nao_lidas_por_perfil(deltas: Dict[Optional[str], int]) -> None:
+    for perfil, delta in deltas.items():
+        await ajustar_nao_lidas(perfil, delta)
+
+
+async def contar_nao_lidas_cache(perfil: Optional[str]) -> Optional[int]:
+    """Contagem pelo hash; None quando os contadores ainda nao foram reconciliados."""
+    if cache.redis is None:
+        return None
+    try:
+        contadores = await cache.redis.hgetall(NAO_LIDAS_KEY) or {}
+    except Exception as exc:
+        print(f"[NOTIFICAÇÃO] Erro ao ler contadores de nao lidas: {exc}")
+        return None
+    if NAO_LIDAS_PRONTO not in contadores:
+        return None
+    return sum(
+        max(0, int(valor))
+        for destino, valor in contadores.items()
+        if destino != NAO_LIDAS_PRONTO and destino_visivel(destino, perfil)
+    )
+
+
+async def descontar_lidas(rows: Iterable[Dict]) -> None:
+    """Para UPDATE ... SET lida = TRUE RETURNING perfil feitos fora do repositorio."""
+    deltas: Dict[Optional[str], int] = {}
+    for row in rows:
+        deltas[row.get("perfil")] = deltas.get(row.get("perfil"), 0) - 1
+    await ajustar_nao_lidas_por_perfil(deltas)
+
+
+async def reconciliar_contadores(db) -> Dict[str, object]:
+    """Recalcula os contadores no banco e corrige o hash pela diferenca."""
+    if cache.redis is None:
+        return {"success": False, "motivo": "redis_indisponivel"}
+
+    rows = await db.query_raw(
+        """
+        SELECT COALESCE(perfil, $1) AS destino, COUNT(*)::int AS total
+        FROM notificacoes
+        WHERE lida = FALSE
+        GROUP BY 1
+        """,
+        NAO_LIDAS_TODOS,
+    )
+    contadores = {str(row["destino"]): int(row["total"]) for row in rows}
+    # Lido logo apos o GROUP BY: o que mudar daqui em diante entra por HINCRBY
+    # e sobrevive, porque a correcao e relativa.
+    anteriores = await cache.redis.hgetall(NAO_LIDAS_KEY) or {}
+    correcoes = {
+        destino: contadores.get(destino, 0) - int(anteriores.get(destino, 0))
+        for destino in set(contadores) | set(anteriores)
+        if destino != NAO_LIDAS_PRONTO
+    }
+    divergentes = sorted(destino for destino, correcao in correcoes.items() if correcao)
+
+    argumentos = [NAO_LIDAS_PRONTO]
+    for destino in divergentes:
+        argumentos.extend([destino, correcoes[destino]])
+    await cache.redis.eval(_CORRIGIR_LUA, 1, NAO_LIDAS_KEY, *argumentos)
+    if divergentes and NAO_LIDAS_PRONTO in anteriores:
+        print(f"[NOTIFICAÇÃO] Contadores de nao lidas corrigidos: {divergentes}")
+    return {"success": True, "destinos": len(contadores), "corrigidos": divergentes}
@@ -0,0 +1,191 @@
+"""
+Fan-out de notificacoes de evento (nova reserva, pagamento, check-out...).
+
+Um evento vira N linhas em `notificacoes` (uma por perfil destino) gravadas
+em um unico INSERT ... SELECT FROM unnest(...) ON CONFLICT (chave_evento) DO
+NOTHING. A chave "<evento>:<referencia>|<perfil>" tem indice unico (migration
+038): reprocessamento/retry do mesmo evento nao duplica nada e nao precisa da
+consulta de existencia que cada notificar_* fazia antes. As chaves que
+conflitaram sao relidas num SELECT separado (`existentes`), para quem precisa
+do id da notificacao anterior.
+
+Depois do INSERT, as linhas novas ajustam os contadores de nao lidas e viram
+`notificacao.criada` no event hub. Canais externos (email/WhatsApp) nao rodam
+no request: `enfileirar_entrega` manda um job Celery por evento
+(notificacoes.entregar_evento); se o broker nao responder, a entrega roda
+inline como antes.
+"""
+import asyncio
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.core.event_hub import event_hub
+from app.services.notificacao_contador_service import ajustar_nao_lidas_por_perfil
+from app.utils.datetime_utils import now_utc
+
+
+ENTREGA_TASK = "notificacoes.entregar_evento"
+
+
+@dataclass(frozen=True)
+class NotificacaoEvento:
+    titulo: str
+    mensagem: str
+    tipo: str = "info"
+    categoria: str = "sistema"
+    perfil: Optional[str] = None
+    url_acao: Optional[str] = None
+    reserva_id: Optional[int] = None
+    pagamento_id: Optional[int] = None
+    # None: sem idempotencia (a linha sempre entra)
+    chave: Optional[str] = None
+
+
+def chave_evento(evento: str, referencia: Optional[int], perfil: Optional[str]) -> Optional[str]:
+    if referencia is None:
+        return None
+    return f"{evento}:{referencia}|{perfil or '*'}"
+
+
+def _serializar(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Mesmo formato de NotificacaoRepository._serialize."""
+    criada = row.get("data_criacao")
+    return {
+        "id": row.get("id"),
+        "titulo": row.get("titulo"),
+        "mensagem": row.get("mensagem"),
+        "tipo": row.get("tipo"),
+        "categoria": row.get("categoria"),
+        "perfil": row.get("perfil"),
+        "lida": row.get("lida"),
+        "reserva_id": row.get("reserva_id"),
+        "pagamento_id": row.get("pagamento_id"),
+        "url_acao": row.get("url_acao"),
+        "created_at": criada.isoformat() if hasattr(criada, "isoformat") else criada,
+        "lida_at": None,
+    }
+
+
+async def inserir_notificacoes(
+    db,
+    notificacoes: Sequence[NotificacaoEvento],
+    agora: Optional[datetime] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Um INSERT para todas as linhas; devolve as novas e as que ja existiam.
+
+    Aceita uma transacao (`db.tx()`); nesse caso quem chama anuncia as novas
+    depois do commit.
+    """
+    if not notificacoes:
+        return {"novas": [], "existentes": []}
+    rows = await db.query_raw(
+        """
+        INSERT INTO notificacoes
+            (chave_evento, titulo, mensagem, tipo, categoria, perfil, lida, data_criacao,
+             "urlAcao", reserva_id, pagamento_id)
+        SELECT chave_evento, titulo, mensagem, tipo, categoria, perfil, FALSE, $1::timestamptz,
+               url_acao, reserva_id, pagamento_id
+        FROM unnest(
+            $2::text[], $3::text[], $4::text[], $5::text[], $6::text[],
+            $7::text[], $8::text[], $9::int[], $10::int[]
+        ) AS t(chave_evento, titulo, mensagem, tipo, categoria, perfil, url_acao, reserva_id, pagamento_id)
+        ON CONFLICT (chave_evento) DO NOTHING
+        RETURNING id, chave_evento, titulo, mensagem, tipo, categoria, perfil, lida, data_criacao,
+                  "urlAcao" AS url_acao, reserva_id, pagamento_id
+        """,
+        agora or now_utc(),
+        [n.chave for n in notificacoes],
+        [n.titulo for n in notificacoes],
+        [n.mensagem for n in notificacoes],
+        [n.tipo for n in notificacoes],
+        [n.categoria for n in notificacoes],
+        [n.perfil for n in notificacoes],
+        [n.url_acao for n in notificacoes],
+        [n.reserva_id for n in notificacoes],
+        [n.pagamento_id for n in notificacoes],
+    )
+    novas = list(rows or [])
+    inseridas = {row.get("chave_evento") for row in novas}
+    conflitos = [n.chave for n in notificacoes if n.chave is not None and n.chave not in inseridas]
+    existentes: List[Dict[str, Any]] = []
+    if conflitos:
+        # Comando separado: o snapshot do INSERT nao enxerga a linha de um
+        # concorrente que commitou durante o conflito; este SELECT enxerga.
+        existentes = await db.query_raw(
+            """
+            SELECT id, chave_evento, titulo, mensagem, tipo, categoria, perfil, lida, data_criacao,
+                   "urlAcao" AS url_acao, reserva_id, pagamento_id
+            FROM notificacoes
+            WHERE chave_evento = ANY($1::text[])
+            ORDER BY id
+            """,
+            conflitos,
+        )
+    return {
+        "novas": [_serializar(row) for row in novas],
+        "existentes": [_serializar(row) for row in existentes or []],
+    }
+
+
+async def anunciar_notificacoes(novas: Sequence[Dict[str, Any]], publicar: bool = True) -> None:
+    """Contadores de nao lidas e `notificacao.criada` das linhas recem-gravadas."""
+    deltas: Dict[Optional[str], int] = {}
+    for notificacao in novas:
+        deltas[notificacao.get("perfil")] = deltas.get(notificacao.get("perfil"), 0) + 1
+    await ajustar_nao_lidas_por_perfil(deltas)
+    if not publicar:
+        return
+    for notificacao in novas:
+        await event_hub.publicar(
+            "notificacao.criada",
+            {
+                "id": notificacao.get("id"),
+                "titulo": notificacao.get("titulo"),
+                "tipo": notificacao.get("tipo"),
+                "categoria": notificacao.get("categoria"),
+                "reserva_id": notificacao.get("reserva_id"),
+            },
+            perfis=notificacao.get("perfil"),
+        )
+
+
+async def notificar_evento(
+    db,
+    evento: str,
+    referencia: Optional[int],
+    destinos: Sequence[NotificacaoEvento],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Grava as notificacoes do evento (uma por perfil) e anuncia as novas."""
+    notificacoes = [replace(d, chave=chave_evento(evento, referencia, d.perfil)) for d in destinos]
+    resultado = await inserir_notificacoes(db, notificacoes)
+    await anunciar_notificacoes(resultado["novas"])
+    if resultado["novas"]:
+        print(f"[NOTIFICAÇÃO] {evento}:{referencia} -> {len(resultado['novas'])} notificacoes")
+    return resultado
+
+
+async def enfileirar_entrega(
+    evento: str,
+    dados: Dict[str, Any],
+    inline: Callable[[], Awaitable[Any]],
+) -> bool:
+    """Um job Celery por evento; sem broker a entrega roda aqui (`inline`).
+
+    `dados` vai serializado em JSON para o worker.
+    """
+    try:
+        from app.core.celery_app import celery_app
+
+        # send_task e sincrono (publica no broker): fora do event loop.
+        await asyncio.to_thread(
+            celery_app.send_task, ENTREGA_TASK, kwargs={"evento": evento, "dados": dados}, retry=False
+        )
+        return True
+    except Exception as exc:
+        print(f"[NOTIFICAÇÃO] Fila indisponivel para {evento}, entregando no request: {exc}")
+    try:
+        await inline()
+    except Exception as exc:
+        print(f"[NOTIFICAÇÃO] Erro na entrega de {evento}: {exc}")
+    return False
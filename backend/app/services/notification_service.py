@@ -6,9 +6,15 @@ Gerencia a criação automática de notificações para eventos do sistema
 import json
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
+from app.core.event_hub import event_hub
 from app.repositories.notificacao_repo import NotificacaoRepository
 from app.utils.datetime_utils import now_utc
 from app.services.email_service import EmailService
+from app.services.notificacao_fanout_service import (
+    NotificacaoEvento,
+    enfileirar_entrega,
+    notificar_evento,
+)
 from app.services.whatsapp_service import get_whatsapp_service
 
 
@@ -64,28 +70,36 @@ class NotificationService:
             notificacao = await self.repo.create(notificacao_data)
             
             print(f"[NOTIFICAÇÃO] Criada: {titulo} (ID: {notificacao['id']})")
+            await event_hub.publicar(
+                "notificacao.criada",
+                {
+                    "id": notificacao.get("id"),
+                    "titulo": titulo,
+                    "tipo": tipo,
+                    "categoria": categoria,
+                    "reserva_id": reserva_id,
+                },
+                perfis=perfil,
+            )
             return notificacao
             
         except Exception as e:
             print(f"[NOTIFICAÇÃO] Erro ao criar: {e}")
             return None
     
-    async def existe_notificacao_categoria_reserva(
-        self,
-        categoria: str,
-        reserva_id: Optional[int] = None,
-        url_acao: Optional[str] = None,
-    ) -> bool:
+    @staticmethod
+    async def _notificar_evento(
+        db,
+        evento: str,
+        referencia: Optional[int],
+        destinos: List[NotificacaoEvento],
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Fan-out do evento; como criar_notificacao, falha aqui nao derruba o chamador."""
         try:
-            where: Dict[str, Any] = {"categoria": categoria}
-            if reserva_id is not None:
-                where["reservaId"] = reserva_id
-            if url_acao is not None:
-                where["urlAcao"] = url_acao
-            existente = await self.db.notificacao.find_first(where=where)
-            return existente is not None
-        except Exception:
-            return False
+            return await notificar_evento(db, evento, referencia, destinos)
+        except Exception as e:
+            print(f"[NOTIFICAÇÃO] Erro ao gravar {evento}: {e}")
+            return None
 
     async def registrar_log_jornada(
         self,
@@ -159,12 +173,6 @@ class NotificationService:
                 print("[NOTIFICAÇÃO] Erro: ID da reserva não encontrado")
                 return
 
-            # Idempotencia: evita reenviar WhatsApp/email/notificacao se esta
-            # reserva ja foi notificada antes (reprocessamento, retry, etc.)
-            if await service.existe_notificacao_categoria_reserva("reserva", reserva_id=reserva_id):
-                print(f"[NOTIFICAÇÃO] Reserva #{reserva_id} ja notificada, ignorando reenvio")
-                return
-
             # Obter dados básicos com fallback para nomes de campos alternativos
             cliente_nome = _get(reserva, "clienteNome") or _get(reserva, "cliente_nome")
             quarto_numero = _get(reserva, "quartoNumero") or _get(reserva, "quarto_numero")
@@ -218,112 +226,71 @@ class NotificationService:
             if checkin_str:
                 detalhes += f" | Check-in: {checkin_str}"
             
-            # Criar notificação global para ADMIN e RECEPCAO
-            await service.criar_notificacao(
-                titulo=mensagem,
-                mensagem=detalhes,
-                tipo="info",
-                categoria="reserva",
-                perfil="ADMIN,RECEPCAO",  # Perfis que receberão a notificação
-                reserva_id=reserva_id,
-                url_acao=f"/reservas/{reserva_id}",
-                dados_adicionais={
-                    "codigo_reserva": codigo_reserva,
-                    "quarto_numero": quarto_numero,
-                    "checkin_previsto": checkin_str,
-                    "valor_total": valor_total,
-                    "cliente_nome": cliente_nome
-                }
-            )
-            
-            # Notificação adicional para reservas de alto valor (acima de R$ 2.000,00)
-            if valor_total > 2000:
-                await service.criar_notificacao(
-                    titulo="💰 Reserva de Alto Valor",
-                    mensagem=f"Reserva #{reserva_id} - R$ {valor_total:,.2f}",
-                    tipo="warning",
-                    categoria="financeiro",
-                    perfil="ADMIN,FINANCEIRO",
+            # Notificação global para ADMIN e RECEPCAO e, acima de R$ 2.000,00,
+            # a de alto valor para ADMIN e FINANCEIRO: um INSERT so.
+            destinos = [
+                NotificacaoEvento(
+                    titulo=mensagem,
+                    mensagem=detalhes,
+                    tipo="info",
+                    categoria="reserva",
+                    perfil="ADMIN,RECEPCAO",
                     reserva_id=reserva_id,
                     url_acao=f"/reservas/{reserva_id}",
-                    dados_adicionais={
-                        "codigo_reserva": codigo_reserva,
-                        "valor_total": valor_total,
-                        "cliente_nome": cliente_nome,
-                        "quarto_numero": quarto_numero
-                    }
                 )
-
-            # Email operacional para a empresa quando houver nova reserva
-            cliente_email_data = None
-            try:
-                cliente_id = _get(reserva, "clienteId") or _get(reserva, "cliente_id")
-                if cliente_id:
-                    cliente = await db.cliente.find_unique(where={"id": int(cliente_id)})
-                    if cliente:
-                        cliente_email_data = {
-                            "nome_completo": getattr(cliente, "nomeCompleto", None),
-                            "documento": getattr(cliente, "documento", None),
-                            "email": getattr(cliente, "email", None),
-                            "telefone": getattr(cliente, "telefone", None),
-                        }
-
-                email_service = EmailService()
-                await email_service.enviar_notificacao_nova_reserva(
-                    {
-                        "id": reserva_id,
-                        "codigo_reserva": codigo_reserva,
-                        "cliente_nome": cliente_nome,
-                        "quarto_numero": quarto_numero,
-                        "tipo_suite": _get(reserva, "tipoSuite") or _get(reserva, "tipo_suite"),
-                        "checkin_previsto": checkin_str,
-                        "checkout_previsto": _get(reserva, "checkoutPrevisto") or _get(reserva, "checkout_previsto"),
-                        "valor_total": valor_total,
-                        "status": _get(reserva, "statusReserva") or _get(reserva, "status") or "PENDENTE",
-                    },
-                    cliente_email_data,
+            ]
+            if valor_total > 2000:
+                destinos.append(
+                    NotificacaoEvento(
+                        titulo="💰 Reserva de Alto Valor",
+                        mensagem=f"Reserva #{reserva_id} - R$ {valor_total:,.2f}",
+                        tipo="warning",
+                        categoria="financeiro",
+                        perfil="ADMIN,FINANCEIRO",
+                        reserva_id=reserva_id,
+                        url_acao=f"/reservas/{reserva_id}",
+                    )
                 )
-            except Exception as email_error:
-                print(f"[EMAIL] Erro ao notificar nova reserva por email: {email_error}")
+            resultado = await NotificationService._notificar_evento(db, "reserva.nova", reserva_id, destinos)
 
-            # WhatsApp de confirmacao ao cliente
-            try:
-                cliente_telefone = (cliente_email_data or {}).get("telefone")
-                checkout_previsto = _get(reserva, "checkoutPrevisto") or _get(reserva, "checkout_previsto")
-                checkout_str = ""
-                if checkout_previsto:
-                    try:
-                        checkout_str = checkout_previsto.strftime("%d/%m/%Y")
-                    except (AttributeError, ValueError):
-                        checkout_str = str(checkout_previsto)[:10]
-                tipo_suite = _get(reserva, "tipoSuite") or _get(reserva, "tipo_suite")
-                await get_whatsapp_service().enviar_confirmacao_reserva_cliente(
-                    cliente_telefone=cliente_telefone,
-                    codigo_reserva=codigo_reserva,
-                    checkin=checkin_str or "-",
-                    checkout=checkout_str or "-",
-                    tipo_suite=tipo_suite,
-                    valor_total=float(valor_total or 0),
-                )
-            except Exception as wa_error:
-                print(f"[WHATSAPP] Erro ao notificar cliente sobre nova reserva: {wa_error}")
+            # Idempotencia: reprocessamento/retry cai no ON CONFLICT da chave do
+            # evento e nao reenvia WhatsApp/email.
+            if resultado and resultado["existentes"] and not resultado["novas"]:
+                print(f"[NOTIFICAÇÃO] Reserva #{reserva_id} ja notificada, ignorando reenvio")
+                return
+
+            checkout_previsto = _get(reserva, "checkoutPrevisto") or _get(reserva, "checkout_previsto")
+            checkout_str = ""
+            if checkout_previsto:
+                try:
+                    checkout_str = checkout_previsto.strftime("%d/%m/%Y")
+                except (AttributeError, ValueError):
+                    checkout_str = str(checkout_previsto)[:10]
 
-            # WhatsApp de alerta para o(s) numero(s) do hotel/admin.
-            # Fica aqui (e nao em cada chamador) para garantir que todo fluxo
+            # Email e WhatsApp (cliente e admin) saem em um job do worker.
+            # Ficam aqui (e nao em cada chamador) para garantir que todo fluxo
             # que notifica o cliente tambem avisa o admin, sem depender de
             # cada caller lembrar de parear as duas chamadas.
-            try:
-                await get_whatsapp_service().enviar_notificacao_nova_reserva_admin(
-                    codigo_reserva=codigo_reserva,
-                    cliente_nome=cliente_nome,
-                    quarto_numero=quarto_numero,
-                    tipo_suite=tipo_suite,
-                    checkin_previsto=checkin_str or "-",
-                    checkout_previsto=checkout_str or "-",
-                    valor_total=float(valor_total or 0),
-                )
-            except Exception as wa_admin_error:
-                print(f"[WHATSAPP] Erro ao notificar admin sobre nova reserva: {wa_admin_error}")
+            dados = {
+                "reserva_id": int(reserva_id),
+                "cliente_id": _get(reserva, "clienteId") or _get(reserva, "cliente_id"),
+                "codigo_reserva": codigo_reserva,
+                "cliente_nome": cliente_nome,
+                "quarto_numero": quarto_numero,
+                "tipo_suite": _get(reserva, "tipoSuite") or _get(reserva, "tipo_suite"),
+                "checkin": checkin_str,
+                "checkout": checkout_str,
+                "checkout_previsto": (
+                    checkout_previsto.isoformat() if hasattr(checkout_previsto, "isoformat") else checkout_previsto
+                ),
+                "valor_total": float(valor_total or 0),
+                "status": _get(reserva, "statusReserva") or _get(reserva, "status") or "PENDENTE",
+            }
+            await enfileirar_entrega(
+                "reserva.nova",
+                dados,
+                lambda: NotificationService.entregar_evento(db, "reserva.nova", dados),
+            )
 
             print(f"[NOTIFICAÇÃO] Notificação de nova reserva #{reserva_id} criada com sucesso")
             
@@ -343,11 +310,83 @@ class NotificationService:
                 )
             except Exception as inner_e:
                 print(f"[NOTIFICAÇÃO] Falha ao notificar sobre erro: {str(inner_e)}")
-    
+
     @staticmethod
-    async def notificar_checkin_realizado(db, reserva):
-        service = NotificationService(db)
+    async def entregar_evento(db, evento: str, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """Canais externos de um evento ja gravado (task notificacoes.entregar_evento)."""
+        entregas = {
+            "reserva.nova": NotificationService._entregar_nova_reserva,
+        }
+        entrega = entregas.get(evento)
+        if entrega is None:
+            print(f"[NOTIFICAÇÃO] Evento sem entrega registrada: {evento}")
+            return {"success": False, "evento": evento}
+        await entrega(db, dados)
+        return {"success": True, "evento": evento}
+
+    @staticmethod
+    async def _entregar_nova_reserva(db, dados: Dict[str, Any]) -> None:
+        # Email operacional para a empresa quando houver nova reserva
+        cliente_email_data = None
+        try:
+            cliente_id = dados.get("cliente_id")
+            if cliente_id:
+                cliente = await db.cliente.find_unique(where={"id": int(cliente_id)})
+                if cliente:
+                    cliente_email_data = {
+                        "nome_completo": getattr(cliente, "nomeCompleto", None),
+                        "documento": getattr(cliente, "documento", None),
+                        "email": getattr(cliente, "email", None),
+                        "telefone": getattr(cliente, "telefone", None),
+                    }
+
+            email_service = EmailService()
+            await email_service.enviar_notificacao_nova_reserva(
+                {
+                    "id": dados.get("reserva_id"),
+                    "codigo_reserva": dados.get("codigo_reserva"),
+                    "cliente_nome": dados.get("cliente_nome"),
+                    "quarto_numero": dados.get("quarto_numero"),
+                    "tipo_suite": dados.get("tipo_suite"),
+                    "checkin_previsto": dados.get("checkin"),
+                    "checkout_previsto": dados.get("checkout_previsto"),
+                    "valor_total": dados.get("valor_total"),
+                    "status": dados.get("status"),
+                },
+                cliente_email_data,
+            )
+        except Exception as email_error:
+            print(f"[EMAIL] Erro ao notificar nova reserva por email: {email_error}")
+
+        # WhatsApp de confirmacao ao cliente
+        try:
+            await get_whatsapp_service().enviar_confirmacao_reserva_cliente(
+                cliente_telefone=(cliente_email_data or {}).get("telefone"),
+                codigo_reserva=dados.get("codigo_reserva"),
+                checkin=dados.get("checkin") or "-",
+                checkout=dados.get("checkout") or "-",
+                tipo_suite=dados.get("tipo_suite"),
+                valor_total=float(dados.get("valor_total") or 0),
+            )
+        except Exception as wa_error:
+            print(f"[WHATSAPP] Erro ao notificar cliente sobre nova reserva: {wa_error}")
 
+        # WhatsApp de alerta para o(s) numero(s) do hotel/admin.
+        try:
+            await get_whatsapp_service().enviar_notificacao_nova_reserva_admin(
+                codigo_reserva=dados.get("codigo_reserva"),
+                cliente_nome=dados.get("cliente_nome"),
+                quarto_numero=dados.get("quarto_numero"),
+                tipo_suite=dados.get("tipo_suite"),
+                checkin_previsto=dados.get("checkin") or "-",
+                checkout_previsto=dados.get("checkout") or "-",
+                valor_total=float(dados.get("valor_total") or 0),
+            )
+        except Exception as wa_admin_error:
+            print(f"[WHATSAPP] Erro ao notificar admin sobre nova reserva: {wa_admin_error}")
+
+    @staticmethod
+    async def notificar_checkin_realizado(db, reserva):
         def _get(obj, key, default=None):
             if obj is None:
                 return default
@@ -365,19 +404,19 @@ class NotificationService:
             quarto = _get(reserva, "quarto")
             quarto_numero = _get(quarto, "numero")
 
-        await service.criar_notificacao(
-            titulo="✅ Check-in Realizado",
-            mensagem=f"Cliente: {cliente_nome} | Quarto: {quarto_numero}",
-            tipo="success",
-            categoria="reserva",
-            perfil="RECEPCAO",
-            reserva_id=reserva_id,
-        )
+        await NotificationService._notificar_evento(db, "reserva.checkin", reserva_id, [
+            NotificacaoEvento(
+                titulo="✅ Check-in Realizado",
+                mensagem=f"Cliente: {cliente_nome} | Quarto: {quarto_numero}",
+                tipo="success",
+                categoria="reserva",
+                perfil="RECEPCAO",
+                reserva_id=reserva_id,
+            )
+        ])
     
     @staticmethod
     async def notificar_checkout_realizado(db, reserva):
-        service = NotificationService(db)
-
         def _get(obj, key, default=None):
             if obj is None:
                 return default
@@ -395,14 +434,16 @@ class NotificationService:
             quarto = _get(reserva, "quarto")
             quarto_numero = _get(quarto, "numero")
 
-        await service.criar_notificacao(
-            titulo="🚪 Check-out Realizado",
-            mensagem=f"Cliente: {cliente_nome} | Quarto: {quarto_numero}",
-            tipo="info",
-            categoria="reserva",
-            perfil="RECEPCAO",
-            reserva_id=reserva_id,
-        )
+        await NotificationService._notificar_evento(db, "reserva.checkout", reserva_id, [
+            NotificacaoEvento(
+                titulo="🚪 Check-out Realizado",
+                mensagem=f"Cliente: {cliente_nome} | Quarto: {quarto_numero}",
+                tipo="info",
+                categoria="reserva",
+                perfil="RECEPCAO",
+                reserva_id=reserva_id,
+            )
+        ])
 
     @staticmethod
     async def notificar_premio_proximo(db, cliente_id: int, reserva_id: Optional[int] = None):
@@ -512,33 +553,31 @@ class NotificationService:
         # tabela `notificacoes` esteja indisponivel/dessincronizada. Por isso
         # qualquer falha aqui e engolida (igual `criar_notificacao` ja faz),
         # para nao derrubar o endpoint que apenas lista os check-outs vencidos.
+        # Uma por reserva: a chave do evento devolve a notificacao ja criada
+        # (lida ou nao) em vez de duplicar.
         try:
-            service = NotificationService(db)
             reserva_id = int(reserva_row["id"])
-            existente = await db.notificacao.find_first(
-                where={"categoria": "checkout_pendente", "reservaId": reserva_id, "lida": False}
-            )
-            if existente:
-                return service.repo._serialize(existente)
             quarto = reserva_row.get("quarto_numero")
             cliente = reserva_row.get("cliente_nome") or "Cliente"
-            return await service.criar_notificacao(
-                titulo="Check-out pendente",
-                mensagem=f"Quarto {quarto} | {cliente}",
-                tipo="warning",
-                categoria="checkout_pendente",
-                perfil="RECEPCAO",
-                reserva_id=reserva_id,
-                url_acao=f"/reservas?id={reserva_id}",
-            )
+            resultado = await notificar_evento(db, "reserva.checkout_pendente", reserva_id, [
+                NotificacaoEvento(
+                    titulo="Check-out pendente",
+                    mensagem=f"Quarto {quarto} | {cliente}",
+                    tipo="warning",
+                    categoria="checkout_pendente",
+                    perfil="RECEPCAO",
+                    reserva_id=reserva_id,
+                    url_acao=f"/reservas?id={reserva_id}",
+                )
+            ])
+            notificacoes = resultado["novas"] or resultado["existentes"]
+            return notificacoes[0] if notificacoes else None
         except Exception as e:
             print(f"[NOTIFICAÇÃO] Erro ao notificar check-out pendente: {e}")
             return None
     
     @staticmethod
     async def notificar_reserva_cancelada(db, reserva):
-        service = NotificationService(db)
-
         def _get(obj, key, default=None):
             if obj is None:
                 return default
@@ -553,21 +592,21 @@ class NotificationService:
             cliente = _get(reserva, "cliente")
             cliente_nome = _get(cliente, "nome_completo") or _get(cliente, "nomeCompleto")
 
-        await service.criar_notificacao(
-            titulo="❌ Reserva Cancelada",
-            mensagem=f"Reserva {codigo_reserva} - Cliente: {cliente_nome}",
-            tipo="warning",
-            categoria="reserva",
-            perfil="RECEPCAO",
-            reserva_id=reserva_id,
-        )
+        await NotificationService._notificar_evento(db, "reserva.cancelada", reserva_id, [
+            NotificacaoEvento(
+                titulo="❌ Reserva Cancelada",
+                mensagem=f"Reserva {codigo_reserva} - Cliente: {cliente_nome}",
+                tipo="warning",
+                categoria="reserva",
+                perfil="RECEPCAO",
+                reserva_id=reserva_id,
+            )
+        ])
     
     # ==================== PAGAMENTOS ====================
     
     @staticmethod
     async def notificar_pagamento_aprovado(db, pagamento, reserva):
-        service = NotificationService(db)
-
         def _get(obj, key, default=None):
             if obj is None:
                 return default
@@ -584,20 +623,20 @@ class NotificationService:
         except Exception:
             valor_fmt = str(valor)
 
-        await service.criar_notificacao(
-            titulo="💳 Pagamento Aprovado",
-            mensagem=f"R$ {valor_fmt} - Reserva {codigo_reserva}",
-            tipo="success",
-            categoria="pagamento",
-            perfil="ADMIN",
-            pagamento_id=pagamento_id,
-            reserva_id=reserva_id,
-        )
+        await NotificationService._notificar_evento(db, "pagamento.aprovado", pagamento_id, [
+            NotificacaoEvento(
+                titulo="💳 Pagamento Aprovado",
+                mensagem=f"R$ {valor_fmt} - Reserva {codigo_reserva}",
+                tipo="success",
+                categoria="pagamento",
+                perfil="ADMIN",
+                pagamento_id=pagamento_id,
+                reserva_id=reserva_id,
+            )
+        ])
     
     @staticmethod
     async def notificar_pagamento_recusado(db, pagamento, reserva):
-        service = NotificationService(db)
-
         def _get(obj, key, default=None):
             if obj is None:
                 return default
@@ -614,29 +653,28 @@ class NotificationService:
         except Exception:
             valor_fmt = str(valor)
 
-        await service.criar_notificacao(
-            titulo="❌ Pagamento Recusado",
-            mensagem=f"R$ {valor_fmt} - Reserva {codigo_reserva} - AÇÃO NECESSÁRIA",
-            tipo="critical",
-            categoria="pagamento",
-            perfil="ADMIN",
-            pagamento_id=pagamento_id,
-            reserva_id=reserva_id,
-        )
-
-        await service.criar_notificacao(
-            titulo="⚠️ Problema no Pagamento",
-            mensagem=f"Reserva {codigo_reserva} - Pagamento recusado",
-            tipo="warning",
-            categoria="pagamento",
-            perfil="RECEPCAO",
-            reserva_id=reserva_id,
-        )
+        await NotificationService._notificar_evento(db, "pagamento.recusado", pagamento_id, [
+            NotificacaoEvento(
+                titulo="❌ Pagamento Recusado",
+                mensagem=f"R$ {valor_fmt} - Reserva {codigo_reserva} - AÇÃO NECESSÁRIA",
+                tipo="critical",
+                categoria="pagamento",
+                perfil="ADMIN",
+                pagamento_id=pagamento_id,
+                reserva_id=reserva_id,
+            ),
+            NotificacaoEvento(
+                titulo="⚠️ Problema no Pagamento",
+                mensagem=f"Reserva {codigo_reserva} - Pagamento recusado",
+                tipo="warning",
+                categoria="pagamento",
+                perfil="RECEPCAO",
+                reserva_id=reserva_id,
+            ),
+        ])
     
     @staticmethod
     async def notificar_pagamento_pendente(db, pagamento, reserva):
-        service = NotificationService(db)
-
         def _get(obj, key, default=None):
             if obj is None:
                 return default
@@ -653,15 +691,17 @@ class NotificationService:
         except Exception:
             valor_fmt = str(valor)
 
-        await service.criar_notificacao(
-            titulo="⏳ Pagamento Pendente",
-            mensagem=f"R$ {valor_fmt} - Reserva {codigo_reserva}",
-            tipo="warning",
-            categoria="pagamento",
-            perfil="ADMIN",
-            pagamento_id=pagamento_id,
-            reserva_id=reserva_id,
-        )
+        await NotificationService._notificar_evento(db, "pagamento.pendente", pagamento_id, [
+            NotificacaoEvento(
+                titulo="⏳ Pagamento Pendente",
+                mensagem=f"R$ {valor_fmt} - Reserva {codigo_reserva}",
+                tipo="warning",
+                categoria="pagamento",
+                perfil="ADMIN",
+                pagamento_id=pagamento_id,
+                reserva_id=reserva_id,
+            )
+        ])
     
     # ==================== SISTEMA ====================
     
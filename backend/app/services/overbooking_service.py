@@ -1,46 +1,19 @@
 from datetime import datetime, date, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 from decimal import Decimal
+from sqlalchemy import and_, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import threading
 import time
 
 from app.models.reserva import Reserva
 from app.models.hotel import Quarto
 from app.core.enums import StatusReserva, StatusQuarto
 from app.utils.datetime_utils import now_utc
+from app.core.config import settings
 from app.core.exceptions import BusinessRuleViolation, ValidationError
-
-
-class OverbookingLock:
-    """
-    Controle de lock para prevenir overbooking
-    Implementa semáforo por quarto/período
-    """
-    _locks = {}  # Cache de locks por quarto
-    _lock = threading.RLock()  # Lock global para gerenciar locks individuais
-    
-    @classmethod
-    def acquire_quarto_lock(cls, quarto_id: int, timeout: float = 10.0) -> bool:
-        """Adquire lock exclusivo para um quarto específico"""
-        with cls._lock:
-            if quarto_id not in cls._locks:
-                cls._locks[quarto_id] = threading.RLock()
-        
-        try:
-            return cls._locks[quarto_id].acquire(timeout=timeout)
-        except:
-            return False
-    
-    @classmethod
-    def release_quarto_lock(cls, quarto_id: int):
-        """Libera lock do quarto"""
-        with cls._lock:
-            if quarto_id in cls._locks:
-                try:
-                    cls._locks[quarto_id].release()
-                except:
-                    pass  # Lock já foi liberado
+from app.core.locks import metricas_lock
+from app.services.reserva_lock_service import chaves_advisory_ordenadas
 
 
 class OverbookingService:
@@ -184,12 +157,11 @@ class OverbookingService:
         if isinstance(checkout_previsto, str):
             checkout_previsto = datetime.fromisoformat(checkout_previsto.replace('Z', '+00:00'))
         
-        # Adquirir lock exclusivo do quarto
-        if not OverbookingLock.acquire_quarto_lock(quarto_id, timeout=10.0):
-            raise BusinessRuleViolation(
-                "Sistema ocupado. Tente novamente em alguns segundos. "
-                "Outro usuário está reservando este quarto."
-            )
+        if settings.RESERVA_INSERCAO_OTIMISTA and not permitir_overbooking:
+            return self._reservar_otimista(dados_reserva, usuario_id, quarto_id, checkin_previsto, checkout_previsto)
+        
+        # Adquirir lock exclusivo do quarto/periodo (preso a esta transacao)
+        fencing_token = self._adquirir_lock_quarto(quarto_id, checkin_previsto, checkout_previsto)
         
         try:
             # Verificar disponibilidade dentro do lock
@@ -221,7 +193,8 @@ class OverbookingService:
                 "codigo_reserva": nova_reserva.codigo_reserva,
                 "overbooking_detectado": not disponibilidade["disponivel"],
                 "conflitos_superados": disponibilidade.get("conflitos", []),
-                "created_at": nova_reserva.created_at.isoformat()
+                "created_at": nova_reserva.created_at.isoformat(),
+                "fencing_token": fencing_token
             }
             
             # Log de segurança
@@ -233,10 +206,89 @@ class OverbookingService:
         except Exception as e:
             self.db.rollback()
             raise BusinessRuleViolation(f"Falha na reserva: {str(e)}")
+    
+    def _reservar_otimista(
+        self,
+        dados_reserva: Dict[str, Any],
+        usuario_id: int,
+        quarto_id: int,
+        checkin_previsto: datetime,
+        checkout_previsto: datetime
+    ) -> Dict[str, Any]:
+        """
+        INSERT direto, sem lock nem checagem previa: a constraint
+        reservas_quarto_periodo_no_overlap (migration 016) decide a disputa.
+        O relatório de conflito só é montado quando o INSERT é rejeitado.
+        """
+        try:
+            nova_reserva = self._criar_reserva_protegida(dados_reserva, usuario_id)
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            if "reservas_quarto_periodo_no_overlap" not in str(e):
+                raise BusinessRuleViolation(f"Falha na reserva: {str(e)}")
+            disponibilidade = self.verificar_disponibilidade(
+                quarto_id, checkin_previsto, checkout_previsto
+            )
+            relatorio_conflito = self._gerar_relatorio_conflito(
+                quarto_id, checkin_previsto, checkout_previsto, disponibilidade
+            )
+            raise BusinessRuleViolation(
+                f"Quarto indisponível no período solicitado. {relatorio_conflito}"
+            )
+        except Exception as e:
+            self.db.rollback()
+            raise BusinessRuleViolation(f"Falha na reserva: {str(e)}")
+        
+        return {
+            "sucesso": True,
+            "reserva_id": nova_reserva.id,
+            "codigo_reserva": nova_reserva.codigo_reserva,
+            "overbooking_detectado": False,
+            "conflitos_superados": [],
+            "created_at": nova_reserva.created_at.isoformat(),
+            "fencing_token": None
+        }
+    
+    def _adquirir_lock_quarto(
+        self,
+        quarto_id: int,
+        checkin_previsto: datetime,
+        checkout_previsto: datetime
+    ) -> Optional[int]:
+        """
+        Mesmas chaves advisory do backend "postgres" do ReservaLockService
+        (quarto + baldes de datas). NAO exclui o ReservaRepository em geral:
+        com RESERVA_LOCK_BACKEND=auto e Redis no ar ele trava chaves no Redis, e
+        com RESERVA_INSERCAO_OTIMISTA (padrao) nao trava nada. Entre os dois
+        caminhos o arbitro e a constraint reservas_quarto_periodo_no_overlap
+        (migration 016); este lock so serializa chamadas deste servico (e do
+        repositorio quando o backend e "postgres"). Liberado no commit/rollback
+        da sessao.
+        """
+        inicio = time.monotonic()
+        try:
+            self.db.execute(
+                text("SELECT set_config('lock_timeout', :timeout, true)"),
+                {"timeout": f"{int(settings.RESERVA_LOCK_TIMEOUT_SECONDS * 1000)}ms"}
+            )
+            for _, chave in chaves_advisory_ordenadas(quarto_id, checkin_previsto, checkout_previsto):
+                self.db.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {"chave": chave})
+            fencing_token = self.db.execute(text("SELECT txid_current()")).scalar()
+        except Exception as e:
+            self.db.rollback()
+            espera_ms = (time.monotonic() - inicio) * 1000
+            if "lock timeout" in str(e).lower():
+                metricas_lock.registrar("postgres", espera_ms, "timeouts")
+                raise BusinessRuleViolation(
+                    "Sistema ocupado. Tente novamente em alguns segundos. "
+                    "Outro usuário está reservando este quarto."
+                )
+            metricas_lock.registrar("postgres", espera_ms, "falhas")
+            raise
         
-        finally:
-            # Sempre liberar o lock
-            OverbookingLock.release_quarto_lock(quarto_id)
+        metricas_lock.registrar("postgres", (time.monotonic() - inicio) * 1000, "adquiridos")
+        return fencing_token
     
     def _verificar_lock_banco(
         self,
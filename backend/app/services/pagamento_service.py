@@ -1,57 +1,37 @@
 ﻿from typing import Dict, Any, List
 from contextlib import asynccontextmanager
 import asyncio
-import uuid
 from datetime import datetime
 from app.utils.datetime_utils import now_utc, to_utc
 from fastapi import HTTPException
 from app.schemas.pagamento_schema import PagamentoCreate, PagamentoResponse, CieloWebhook
 from app.repositories.pagamento_repo import PagamentoRepository
 from app.services.cielo_service import CieloAPI
-from app.services.tef_service import TefService
 from app.utils.cache import cache_result, invalidate_cache_pattern
 from app.services.integrate_notificacoes import (
     notificar_em_pagamento_aprovado,
     notificar_em_pagamento_recusado,
     notificar_em_pagamento_pendente
 )
-from app.core.cache import cache
+from app.core.locks import lock_distribuido
 
 
-_TEF_FINALIZATION_LOCKS: dict[str, asyncio.Lock] = {}
 _PAYMENT_SUCCESS_STATUSES = {"PAGO", "APROVADO", "CONFIRMADO", "CAPTURED", "AUTHORIZED"}
+# Lease curto renovado enquanto a finalizacao roda: worker que morre solta o
+# lock em segundos, nao no fim do timeout.
+_TEF_FINALIZATION_LOCK_TTL = 15
 
 
 @asynccontextmanager
 async def _tef_finalization_lock(key: str, timeout: int = 30):
-    lock_name = f"tef-finalizar:{key}"
-    lock_value = str(uuid.uuid4())
-
-    if getattr(cache, "redis", None):
-        acquired = False
-        for _ in range(timeout * 10):
-            acquired = await cache.redis.set(f"lock:{lock_name}", lock_value, ex=timeout + 15, nx=True)
-            if acquired:
-                break
-            await asyncio.sleep(0.1)
-
-        if not acquired:
-            raise TimeoutError(f"Nao foi possivel adquirir lock: {lock_name}")
-
-        try:
-            yield
-        finally:
-            try:
-                current = await cache.redis.get(f"lock:{lock_name}")
-                if current == lock_value:
-                    await cache.redis.delete(f"lock:{lock_name}")
-            except Exception as exc:
-                print(f"[TEF][lock] Erro ao liberar {lock_name}: {exc}")
-        return
-
-    local_lock = _TEF_FINALIZATION_LOCKS.setdefault(lock_name, asyncio.Lock())
-    async with local_lock:
-        yield
+    async with lock_distribuido(
+        f"tef-finalizar:{key}",
+        timeout_segundos=timeout,
+        ttl_segundos=_TEF_FINALIZATION_LOCK_TTL,
+        renovar=True,
+        nome="tef-finalizar",
+    ) as lock:
+        yield lock
 
 
 def _pagamento_replay_response(pagamento: Dict[str, Any]) -> Dict[str, Any]:
@@ -68,7 +48,19 @@ class PagamentoService:
         self.pagamento_repo = pagamento_repo
         self.reserva_repo = reserva_repo
         self.cielo_api = CieloAPI()
-        self.tef_service = TefService()
+        self._tef_service = None
+
+    @property
+    def tef_service(self):
+        # O cliente do agente TEF so e importado no primeiro uso (boot do worker mais leve)
+        if self._tef_service is None:
+            from app.services.tef_service import TefService
+            self._tef_service = TefService()
+        return self._tef_service
+
+    @tef_service.setter
+    def tef_service(self, valor):
+        self._tef_service = valor
 
     async def _valor_oficial_reserva(self, reserva_id: int, valor_recebido: float | None = None) -> float:
         valor_oficial = await self.pagamento_repo.obter_valor_esperado_reserva(reserva_id)
@@ -661,13 +653,16 @@ class PagamentoService:
         """Listar pagamentos de uma reserva"""
         return await self.pagamento_repo.list_by_reserva(reserva_id)
 
-    async def list_all(self) -> Dict[str, Any]:
-        """Listar todos os pagamentos"""
-        registros = await self.pagamento_repo.list_all()
-        return {
-            "total": len(registros),
-            "pagamentos": registros
-        }
+    async def listar(self, **filtros) -> Dict[str, Any]:
+        """Listar pagamentos paginados (ver PagamentoRepository.listar)"""
+        try:
+            resultado = await self.pagamento_repo.listar(**filtros)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        resposta = {"success": True, **resultado}
+        if "resumo" in resultado:
+            resposta["total"] = resultado["resumo"]["total"]
+        return resposta
     
     async def verificar_status_pix(self, pagamento_id: int) -> Dict[str, Any]:
         """Verificar status de pagamento PIX"""
@@ -689,7 +684,8 @@ class PagamentoService:
             # Em produÃ§Ã£o, consultar API Cielo
             cielo_payment_id = pagamento.get("cielo_payment_id")
             if cielo_payment_id:
-                cielo_status = self.cielo_api.consultar_pagamento(cielo_payment_id)
+                # requests bloqueante: fora do event loop
+                cielo_status = await asyncio.to_thread(self.cielo_api.consultar_pagamento, cielo_payment_id)
                 if cielo_status.get("success") and cielo_status.get("data"):
                     status_code = cielo_status["data"].get("Status")
                     if status_code == 2:  # Capturado/Pago
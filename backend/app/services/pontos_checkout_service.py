@@ -4,6 +4,7 @@ from typing import Any, Dict, Optional
 from app.repositories.pontos_repo import PontosRepository
 from app.services.programa_pontos_service import ProgramaPontosService
 from app.services.real_points_service import RealPointsService
+from app.services.saldo_snapshot_service import invalidar_snapshot_saldo
 from app.utils.datetime_utils import now_utc
 
 
@@ -531,6 +532,9 @@ async def creditar_bonus_promo_primeiros_no_checkout(
             _tx=transaction,
         )
 
+    # Depois do commit: o credito ja esta visivel para quem recarregar o snapshot.
+    await invalidar_snapshot_saldo(cliente_id)
+
     if result.get("idempotente"):
         return {"success": True, "creditado": False, "pontos": 0, "motivo": "Bonus da promo ja creditado", "transacao": result}
 
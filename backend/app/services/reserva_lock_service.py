@@ -0,0 +1,254 @@
+"""
+Lock distribuido por quarto/periodo para criar e alterar reservas.
+
+A chave do lock e (quarto, balde de datas): o periodo da reserva e quebrado em
+baldes de RESERVA_LOCK_BALDE_DIAS dias e a reserva trava todos os baldes que
+toca, sempre em ordem crescente (sem deadlock entre reservas longas). Duas
+reservas do mesmo quarto so disputam o lock se os periodos caem num balde em
+comum; quartos diferentes nunca se bloqueiam.
+
+Backends:
+- "redis": SET NX PX atomico de todas as chaves num script Lua (tudo ou nada),
+  valor aleatorio por dono e liberacao por compare-and-delete, que publica a
+  liberacao de cada chave (app.core.locks): quem espera acorda pelo aviso em
+  vez de repetir a tentativa em sleep. O token de fencing vem de um INCR no
+  mesmo script.
+- "postgres": pg_advisory_xact_lock numa transacao interativa (lock_timeout
+  limita a espera). As escritas protegidas rodam nessa mesma transacao
+  (`ReservaLock.db`): uma conexao so por reserva, e o lock cai no commit. O
+  token de fencing e o txid_current().
+
+O lock reduz a disputa e evita trabalho desperdicado; o arbitro final
+continua sendo a constraint de exclusao reservas_quarto_periodo_no_overlap
+(migration 016). Por isso, se o backend estiver fora do ar, a operacao segue
+sem lock em vez de falhar. Timeout de espera levanta ReservaLockTimeout.
+"""
+import hashlib
+import secrets
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.locks import (
+    LOCK_CANAL_PREFIXO,
+    aguardar_liberacao,
+    metricas_lock,
+    ouvinte_liberacao,
+)
+
+
+RESERVA_LOCK_PREFIXO = "lock:reserva:quarto"
+RESERVA_LOCK_FENCING_KEY = "lock:reserva:fencing"
+# Espera acima disso vira log: indica disputa real pelo mesmo quarto/periodo.
+RESERVA_LOCK_ESPERA_LENTA_MS = 1000
+
+# KEYS[1] = contador de fencing, KEYS[2..] = chaves do lock
+_ADQUIRIR_LUA = """
+for i = 2, #KEYS do
+  if redis.call('exists', KEYS[i]) == 1 then
+    return 0
+  end
+end
+for i = 2, #KEYS do
+  redis.call('set', KEYS[i], ARGV[1], 'PX', ARGV[2])
+end
+return redis.call('incr', KEYS[1])
+"""
+
+# ARGV = dono, prefixo do canal de liberacao (app.core.locks)
+_LIBERAR_LUA = """
+local liberadas = 0
+for i = 1, #KEYS do
+  if redis.call('get', KEYS[i]) == ARGV[1] then
+    liberadas = liberadas + redis.call('del', KEYS[i])
+    redis.call('publish', ARGV[2] .. KEYS[i], '1')
+  end
+end
+return liberadas
+"""
+
+
+class ReservaLockTimeout(TimeoutError):
+    """Outro processo segura o quarto/periodo alem do tempo de espera."""
+
+
+@dataclass
+class ReservaLock:
+    backend: str
+    chaves: List[str]
+    fencing_token: Optional[int] = None
+    valido_ate: Optional[float] = None
+    espera_ms: float = 0.0
+    # Cliente das leituras/escritas protegidas: a transacao que segura o lock
+    # no backend Postgres, o cliente normal nos demais.
+    db: Any = None
+
+    def ainda_valido(self) -> bool:
+        """False se o lease ja expirou (Redis): a escrita nao esta mais protegida."""
+        return self.valido_ate is None or time.monotonic() < self.valido_ate
+
+
+def _data(valor: Any) -> date:
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+
+def baldes_periodo(checkin: Any, checkout: Any, balde_dias: Optional[int] = None) -> List[int]:
+    dias = max(1, int(balde_dias or settings.RESERVA_LOCK_BALDE_DIAS))
+    inicio = _data(checkin).toordinal() // dias
+    fim = _data(checkout).toordinal() // dias
+    return list(range(inicio, max(inicio, fim) + 1))
+
+
+def chaves_lock(quarto_id: int, checkin: Any, checkout: Any, balde_dias: Optional[int] = None) -> List[str]:
+    return [
+        f"{RESERVA_LOCK_PREFIXO}:{int(quarto_id)}:{balde}"
+        for balde in baldes_periodo(checkin, checkout, balde_dias)
+    ]
+
+
+def chave_advisory(chave: str) -> int:
+    """bigint estavel (com sinal) para pg_advisory_xact_lock; igual em todo processo."""
+    digest = hashlib.blake2b(chave.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class ReservaLockService:
+    def __init__(
+        self,
+        db=None,
+        backend: Optional[str] = None,
+        timeout_segundos: Optional[float] = None,
+        ttl_segundos: Optional[float] = None,
+    ):
+        self.db = db
+        self.backend = (backend or settings.RESERVA_LOCK_BACKEND or "auto").lower()
+        self.timeout_segundos = float(timeout_segundos or settings.RESERVA_LOCK_TIMEOUT_SECONDS)
+        self.ttl_segundos = float(ttl_segundos or settings.RESERVA_LOCK_TTL_SECONDS)
+
+    def _resolver_backend(self) -> str:
+        if self.backend == "postgres":
+            return "postgres"
+        if self.backend == "redis" and cache.redis is not None:
+            return "redis"
+        return "redis" if self.backend == "auto" and cache.redis is not None else "postgres"
+
+    @asynccontextmanager
+    async def bloquear(self, quarto_id: int, checkin: Any, checkout: Any) -> AsyncIterator[ReservaLock]:
+        chaves = chaves_lock(quarto_id, checkin, checkout)
+        backend = self._resolver_backend()
+        inicio = time.monotonic()
+        pilha = AsyncExitStack()
+        adquirir = self._bloquear_redis if backend == "redis" else self._bloquear_postgres
+
+        try:
+            lock = await pilha.enter_async_context(adquirir(chaves))
+        except ReservaLockTimeout:
+            metricas_lock.registrar(backend, (time.monotonic() - inicio) * 1000, "timeouts")
+            print(f"[RESERVA LOCK] Timeout aguardando quarto {quarto_id} ({backend})")
+            raise
+        except Exception as exc:
+            metricas_lock.registrar(backend, (time.monotonic() - inicio) * 1000, "falhas")
+            print(f"[RESERVA LOCK] Backend {backend} indisponivel, seguindo sem lock: {exc}")
+            lock = ReservaLock(backend="nenhum", chaves=chaves, db=self.db)
+        else:
+            lock.espera_ms = (time.monotonic() - inicio) * 1000
+            metricas_lock.registrar(backend, lock.espera_ms, "adquiridos")
+            if lock.espera_ms >= RESERVA_LOCK_ESPERA_LENTA_MS:
+                print(f"[RESERVA LOCK] Quarto {quarto_id} aguardou {lock.espera_ms:.0f}ms ({backend})")
+
+        async with pilha:
+            yield lock
+
+    @asynccontextmanager
+    async def _bloquear_redis(self, chaves: List[str]) -> AsyncIterator[ReservaLock]:
+        dono = secrets.token_hex(16)
+        ttl_ms = int(self.ttl_segundos * 1000)
+        limite = time.monotonic() + self.timeout_segundos
+        evento = None
+
+        try:
+            while True:
+                tentativa = time.monotonic()
+                token = await cache.redis.eval(
+                    _ADQUIRIR_LUA, len(chaves) + 1, RESERVA_LOCK_FENCING_KEY, *chaves, dono, ttl_ms
+                )
+                if token:
+                    break
+                if time.monotonic() >= limite:
+                    raise ReservaLockTimeout(f"Lock ocupado: {chaves[0]}")
+                if evento is None:
+                    # Registrado antes da proxima tentativa: liberacao nenhuma escapa.
+                    evento = ouvinte_liberacao.registrar(chaves)
+                    continue
+                await aguardar_liberacao(evento, limite)
+        finally:
+            if evento is not None:
+                ouvinte_liberacao.remover(chaves, evento)
+
+        # Validade contada do envio do comando, com margem de drift (Redlock).
+        drift = ttl_ms * 0.01 / 1000 + 0.002
+        lock = ReservaLock(
+            backend="redis",
+            chaves=chaves,
+            fencing_token=int(token),
+            valido_ate=tentativa + self.ttl_segundos - drift,
+            db=self.db,
+        )
+        adquirido_em = time.monotonic()
+        try:
+            yield lock
+        finally:
+            perdido = False
+            try:
+                liberadas = await cache.redis.eval(_LIBERAR_LUA, len(chaves), *chaves, dono, LOCK_CANAL_PREFIXO)
+                if int(liberadas or 0) < len(chaves):
+                    perdido = True
+                    print(f"[RESERVA LOCK] Lease expirou antes da liberacao (token {lock.fencing_token})")
+                for chave in chaves:
+                    ouvinte_liberacao.avisar(chave)
+            except Exception as exc:
+                print(f"[RESERVA LOCK] Erro ao liberar {chaves}: {exc}")
+            metricas_lock.registrar_posse("redis", (time.monotonic() - adquirido_em) * 1000, perdido)
+
+    @asynccontextmanager
+    async def _bloquear_postgres(self, chaves: List[str]) -> AsyncIterator[ReservaLock]:
+        # As escritas da reserva vao nesta transacao (lock.db): segurar o lock
+        # numa conexao e escrever em outra prendia duas conexoes do pool por
+        # reserva. O timeout da transacao e o lease do lock.
+        inicio = time.monotonic()
+        async with self.db.tx(
+            max_wait=timedelta(seconds=self.timeout_segundos),
+            timeout=timedelta(seconds=self.ttl_segundos),
+        ) as transacao:
+            await transacao.execute_raw(
+                "SELECT set_config('lock_timeout', $1, true)",
+                f"{int(self.timeout_segundos * 1000)}ms",
+            )
+            try:
+                for chave in sorted(chaves):
+                    await transacao.execute_raw("SELECT pg_advisory_xact_lock($1::bigint)", chave_advisory(chave))
+            except Exception as exc:
+                if "lock timeout" in str(exc).lower():
+                    raise ReservaLockTimeout(f"Lock ocupado: {chaves[0]}") from exc
+                raise
+            rows = await transacao.query_raw("SELECT txid_current()::bigint AS token")
+            yield ReservaLock(
+                backend="postgres",
+                chaves=chaves,
+                fencing_token=int(rows[0]["token"]) if rows else None,
+                valido_ate=inicio + self.ttl_segundos,
+                db=transacao,
+            )
+
+
+def chaves_advisory_ordenadas(quarto_id: int, checkin: Any, checkout: Any) -> List[Tuple[str, int]]:
+    """Mesmas chaves do backend Postgres, para o caminho sincrono legado."""
+    return [(chave, chave_advisory(chave)) for chave in sorted(chaves_lock(quarto_id, checkin, checkout))]
@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 from app.utils.datetime_utils import now_utc, to_utc
 from fastapi import HTTPException
 from app.schemas.reserva_schema import ReservaCreate, ReservaResponse
-from app.repositories.reserva_repo import ReservaRepository
+from app.repositories.reserva_repo import ReservaConflito, ReservaRepository
 from app.repositories.cliente_repo import ClienteRepository
 from app.repositories.quarto_repo import QuartoRepository
 from app.core.validators import ReservaValidator
@@ -27,7 +27,9 @@ class ReservaService:
         checkin_fim: str = None,
         limit: int = 100,
         offset: int = 0,
-        order_by: str = None
+        order_by: str = None,
+        view: str = None,
+        fields: List[str] = None
     ) -> Dict[str, Any]:
         """
         Listar todas as reservas com filtros e busca
@@ -40,16 +42,23 @@ class ReservaService:
         - limit: Número máximo de registros por página
         - offset: Deslocamento para paginação
         - order_by: Ordenação no formato "campo:ordem" (ex: "data_criacao:desc")
+        - view: Perfil de campos (card, list, detail)
+        - fields: Campos específicos, sobrepõe o perfil
         """
-        return await self.reserva_repo.list_all(
-            search=search,
-            status=status,
-            checkin_inicio=checkin_inicio,
-            checkin_fim=checkin_fim,
-            limit=limit,
-            offset=offset,
-            order_by=order_by
-        )
+        try:
+            return await self.reserva_repo.list_all(
+                search=search,
+                status=status,
+                checkin_inicio=checkin_inicio,
+                checkin_fim=checkin_fim,
+                limit=limit,
+                offset=offset,
+                order_by=order_by,
+                view=view,
+                fields=fields
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
     async def create(self, dados: ReservaCreate, criado_por_funcionario_id: int = None) -> Dict[str, Any]:
         """Criar nova reserva com validações"""
@@ -60,6 +69,8 @@ class ReservaService:
                 criado_por_funcionario_id=criado_por_funcionario_id,
             )
             return reserva
+        except ReservaConflito as e:
+            raise HTTPException(status_code=409, detail=e.detalhes())
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
     
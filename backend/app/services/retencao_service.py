@@ -0,0 +1,190 @@
+"""
+Retencao de tabelas que so crescem: notificacoes, OTPs e logs da jornada.
+
+Cada PoliticaRetencao diz o que sai de uma tabela (filtro SQL com $1 = data
+limite) e se as linhas vao para arquivo antes de sair. O job agendado (Celery)
+aplica as politicas em lotes pequenos:
+
+- cada lote e um DELETE ... WHERE id IN (SELECT ... LIMIT n FOR UPDATE SKIP
+  LOCKED) RETURNING, numa transacao curta: nao segura lock nas tabelas quentes
+  (notificacoes e lida a cada poll das abas da equipe) e nao disputa linhas
+  com outro worker;
+- entre lotes ha uma pausa, e cada politica tem um teto de lotes por execucao:
+  o backlog antigo e drenado ao longo de alguns dias em vez de um DELETE
+  gigante, dando tempo para o autovacuum reaproveitar as paginas e sem
+  estourar WAL/replicacao;
+- politicas com `arquivar` gravam as linhas removidas em
+  RETENCAO_ARQUIVO_DIR/<tabela>/<tabela>-AAAAMMDD.jsonl.gz (um membro gzip
+  por lote) dentro da transacao do DELETE: se a gravacao falhar o lote volta.
+  As linhas de logs_jornada tem cliente, IP e user agent; se o diretorio cair
+  dentro do media/ servido em /media (app/main.py), a politica nao roda.
+
+Antes das politicas, OTPs pendentes com expira_em vencido viram `expired`:
+o conjunto `pending` fica pequeno e o UPDATE que OtpService faz a cada
+solicitacao (filtrado por status) toca poucas linhas.
+"""
+import asyncio
+import gzip
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.services.otp_service import OTP_STATUS_EXPIRED, OTP_STATUS_PENDING
+from app.utils.datetime_utils import now_utc
+
+
+RETENCAO_LOTE = 1000
+RETENCAO_MAX_LOTES = 50
+RETENCAO_PAUSA_SEGUNDOS = 0.2
+# Mesmo diretorio do app.mount("/media", StaticFiles(...)) em app/main.py
+DIRETORIO_ESTATICO = "media"
+
+
+@dataclass(frozen=True)
+class PoliticaRetencao:
+    nome: str
+    tabela: str
+    filtro: str
+    dias: int
+    arquivar: bool = False
+
+
+POLITICAS_RETENCAO = (
+    PoliticaRetencao("notificacoes_lidas", "notificacoes", "lida = true AND data_criacao < $1", dias=30),
+    # Nao lidas tambem expiram: alerta de 3 meses atras nao e mais acionavel.
+    PoliticaRetencao("notificacoes_antigas", "notificacoes", "data_criacao < $1", dias=90),
+    PoliticaRetencao("otp_verificacoes", "otp_verificacoes", "expira_em < $1", dias=7),
+    PoliticaRetencao("logs_jornada", "logs_jornada", "created_at < $1", dias=180, arquivar=True),
+)
+
+
+def diretorio_publico(diretorio: str) -> bool:
+    """True se `diretorio` fica dentro da arvore servida em /media."""
+    estatico = os.path.realpath(DIRETORIO_ESTATICO)
+    alvo = os.path.realpath(diretorio)
+    return os.path.commonpath([estatico, alvo]) == estatico
+
+
+def _gravar_arquivo(diretorio: str, tabela: str, linhas: List[Dict[str, Any]], agora: datetime) -> str:
+    pasta = os.path.join(diretorio, tabela)
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"{tabela}-{agora:%Y%m%d}.jsonl.gz")
+    corpo = "".join(json.dumps(linha, default=str, ensure_ascii=False) + "\n" for linha in linhas)
+    # "ab": cada lote vira um membro gzip; o arquivo continua legivel inteiro.
+    with gzip.open(caminho, "ab") as arquivo:
+        arquivo.write(corpo.encode("utf-8"))
+    return caminho
+
+
+class RetencaoService:
+    def __init__(
+        self,
+        db,
+        politicas: Iterable[PoliticaRetencao] = POLITICAS_RETENCAO,
+        diretorio_arquivo: Optional[str] = None,
+    ):
+        self.db = db
+        self.politicas = tuple(politicas)
+        self.diretorio_arquivo = diretorio_arquivo or settings.RETENCAO_ARQUIVO_DIR
+
+    async def aplicar(
+        self,
+        tamanho_lote: int = RETENCAO_LOTE,
+        max_lotes: int = RETENCAO_MAX_LOTES,
+        pausa_segundos: float = RETENCAO_PAUSA_SEGUNDOS,
+        agora: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Aplica todas as politicas; uma politica com erro nao impede as demais."""
+        agora = agora or now_utc()
+        resultado: Dict[str, Any] = {"success": True, "otps_expirados": await self._expirar_otps(agora)}
+        politicas: Dict[str, Any] = {}
+        for politica in self.politicas:
+            try:
+                politicas[politica.nome] = await self._aplicar_politica(
+                    politica, tamanho_lote, max_lotes, pausa_segundos, agora
+                )
+            except Exception as exc:
+                print(f"[RETENCAO] Erro na politica {politica.nome}: {exc}")
+                politicas[politica.nome] = {"erro": str(exc)}
+                resultado["success"] = False
+        resultado["politicas"] = politicas
+        return resultado
+
+    async def _expirar_otps(self, agora: datetime) -> int:
+        try:
+            return await self.db.execute_raw(
+                """
+                UPDATE otp_verificacoes
+                SET status = $1,
+                    updated_at = NOW()
+                WHERE status = $2
+                  AND expira_em < $3::timestamptz
+                """,
+                OTP_STATUS_EXPIRED,
+                OTP_STATUS_PENDING,
+                agora,
+            )
+        except Exception as exc:
+            print(f"[RETENCAO] Erro ao expirar OTPs vencidos: {exc}")
+            return 0
+
+    async def _aplicar_politica(
+        self,
+        politica: PoliticaRetencao,
+        tamanho_lote: int,
+        max_lotes: int,
+        pausa_segundos: float,
+        agora: datetime,
+    ) -> Dict[str, Any]:
+        if politica.arquivar and diretorio_publico(self.diretorio_arquivo):
+            # Sem apagar nada: arquivar ali publicaria os dados em /media.
+            raise ValueError(
+                f"RETENCAO_ARQUIVO_DIR ({self.diretorio_arquivo}) esta dentro de "
+                f"{DIRETORIO_ESTATICO}/, servido sem autenticacao"
+            )
+        limite_data = agora - timedelta(days=politica.dias)
+        lote = max(1, int(tamanho_lote))
+        removidos = 0
+        lotes = 0
+        completa = False
+        while lotes < max_lotes:
+            async with self.db.tx() as transaction:
+                linhas = await transaction.query_raw(
+                    f"""
+                    DELETE FROM {politica.tabela}
+                    WHERE id IN (
+                        SELECT id
+                        FROM {politica.tabela}
+                        WHERE {politica.filtro}
+                        ORDER BY id ASC
+                        LIMIT $2
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {"*" if politica.arquivar else "id"}
+                    """,
+                    limite_data,
+                    lote,
+                )
+                if linhas and politica.arquivar:
+                    await asyncio.to_thread(
+                        _gravar_arquivo, self.diretorio_arquivo, politica.tabela, linhas, agora
+                    )
+            lotes += 1
+            removidos += len(linhas)
+            if len(linhas) < lote:
+                completa = True
+                break
+            await asyncio.sleep(pausa_segundos)
+
+        if removidos:
+            print(f"[RETENCAO] {politica.nome}: {removidos} linhas removidas em {lotes} lotes")
+        return {
+            "removidos": removidos,
+            "arquivados": removidos if politica.arquivar else 0,
+            "lotes": lotes,
+            # False: backlog maior que max_lotes; o restante sai na proxima execucao.
+            "completa": completa,
+        }
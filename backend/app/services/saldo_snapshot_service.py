@@ -0,0 +1,81 @@
+"""
+Snapshot de saldo de pontos por cliente.
+
+A linha de usuarios_pontos guarda saldo (Pontos R), pontos_nivel (Pontos N) e
+os totais de creditos pendentes/bloqueados, mantidos na mesma transacao das
+escritas em transacoes_pontos (ver migration 035). Ler o saldo e um lookup por
+cliente_id, servido de um cache read-through no Redis; as escritas invalidam a
+chave do cliente depois de gravar.
+
+A leitura nunca cria a linha de usuarios_pontos: cliente sem linha tem
+snapshot zerado, e quem debita/credita cria a linha dentro da propria
+transacao.
+"""
+from typing import Any, Dict, Optional
+
+from app.core.cache import cache
+
+
+SALDO_SNAPSHOT_TTL_SEGUNDOS = 60
+
+
+def _snapshot_key(cliente_id: int) -> str:
+    return f"pontos:snapshot:{int(cliente_id)}"
+
+
+def _snapshot_vazio(cliente_id: int) -> Dict[str, Any]:
+    return {
+        "cliente_id": int(cliente_id),
+        "usuario_pontos_id": None,
+        "saldo": 0,
+        "pontos_nivel": 0,
+        "pendentes": 0,
+        "bloqueados": 0,
+    }
+
+
+async def invalidar_snapshot_saldo(*cliente_ids: Optional[int]) -> None:
+    for cliente_id in {int(c) for c in cliente_ids if c}:
+        await cache.delete(_snapshot_key(cliente_id))
+
+
+class SaldoSnapshotService:
+    def __init__(self, db):
+        self.db = db
+
+    async def obter(self, cliente_id: int) -> Dict[str, Any]:
+        chave = _snapshot_key(cliente_id)
+        em_cache = await cache.get(chave)
+        if isinstance(em_cache, dict):
+            return em_cache
+
+        snapshot = await self._carregar(cliente_id)
+        await cache.set(chave, snapshot, ttl=SALDO_SNAPSHOT_TTL_SEGUNDOS)
+        return snapshot
+
+    async def _carregar(self, cliente_id: int) -> Dict[str, Any]:
+        rows = await self.db.query_raw(
+            """
+            SELECT id,
+                   COALESCE(saldo, 0) AS saldo,
+                   COALESCE(pontos_nivel, 0) AS pontos_nivel,
+                   COALESCE(pontos_pendentes, 0) AS pontos_pendentes,
+                   COALESCE(pontos_bloqueados, 0) AS pontos_bloqueados
+            FROM usuarios_pontos
+            WHERE cliente_id = $1
+            LIMIT 1
+            """,
+            cliente_id,
+        )
+        if not rows:
+            return _snapshot_vazio(cliente_id)
+
+        row = rows[0]
+        return {
+            "cliente_id": int(cliente_id),
+            "usuario_pontos_id": int(row["id"]) if row.get("id") is not None else None,
+            "saldo": int(row.get("saldo") or 0),
+            "pontos_nivel": int(row.get("pontos_nivel") or 0),
+            "pendentes": int(row.get("pontos_pendentes") or 0),
+            "bloqueados": int(row.get("pontos_bloqueados") or 0),
+        }
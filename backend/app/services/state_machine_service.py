@@ -9,6 +9,7 @@ from app.models.pagamento import Pagamento
 from app.core.enums import StatusReserva, StatusPagamento, StatusFinanceiro
 from app.utils.datetime_utils import now_utc
 from app.core.exceptions import BusinessRuleViolation, ValidationError
+from app.core.transicoes_reserva import ESTADOS, eventos_disponiveis, proximo_estado
 
 
 class TransicaoEstado(str, Enum):
@@ -47,30 +48,14 @@ class StateMachineService:
     Implementa state machine com validações e auditoria completa
     """
     
-    # Definição da state machine - transições válidas
+    # Definição da state machine - derivada da tabela compilada
+    # (app/core/transicoes_reserva.py), fonte única das transições
     TRANSICOES_VALIDAS = {
-        StatusReserva.PENDENTE: {
-            TransicaoEstado.CONFIRMAR_PAGAMENTO: StatusReserva.CONFIRMADA,
-            TransicaoEstado.CANCELAR_RESERVA: StatusReserva.CANCELADO,
-            TransicaoEstado.MARCAR_NO_SHOW: StatusReserva.NO_SHOW
-        },
-        StatusReserva.CONFIRMADA: {
-            TransicaoEstado.REALIZAR_CHECKIN: StatusReserva.HOSPEDADO,
-            TransicaoEstado.CANCELAR_RESERVA: StatusReserva.CANCELADO,
-            TransicaoEstado.MARCAR_NO_SHOW: StatusReserva.NO_SHOW
-        },
-        StatusReserva.HOSPEDADO: {
-            TransicaoEstado.REALIZAR_CHECKOUT: StatusReserva.CHECKED_OUT
-        },
-        StatusReserva.CHECKED_OUT: {
-            # Estado final - sem transições
-        },
-        StatusReserva.CANCELADO: {
-            # Estado final - sem transições
-        },
-        StatusReserva.NO_SHOW: {
-            # Estado final - sem transições
+        StatusReserva[estado]: {
+            TransicaoEstado(evento): StatusReserva[destino]
+            for evento, destino, _ in eventos_disponiveis(estado)
         }
+        for estado in ESTADOS
     }
     
     # Condições necessárias para cada transição
@@ -116,25 +101,27 @@ class StateMachineService:
         estado_atual = reserva.status_reserva
         dados_contexto = dados_contexto or {}
         
-        # Verificar se transição é válida na state machine
-        if estado_atual not in self.TRANSICOES_VALIDAS:
+        # Verificar se transição é válida na state machine (lookup na tabela,
+        # aceita os status legados do banco)
+        eventos = eventos_disponiveis(estado_atual.value)
+        if not eventos:
             return {
                 "valida": False,
                 "motivo": f"Estado atual '{estado_atual.value}' não permite transições",
                 "codigo_erro": "ESTADO_FINAL"
             }
         
-        transicoes_permitidas = self.TRANSICOES_VALIDAS[estado_atual]
-        if transicao not in transicoes_permitidas:
+        destino = proximo_estado(estado_atual.value, transicao.value)
+        if destino is None:
             return {
                 "valida": False,
                 "motivo": f"Transição '{transicao.value}' não permitida a partir de '{estado_atual.value}'",
-                "transicoes_permitidas": [t.value for t in transicoes_permitidas.keys()],
+                "transicoes_permitidas": [evento for evento, _, _ in eventos],
                 "codigo_erro": "TRANSICAO_INVALIDA"
             }
         
         # Estado de destino
-        estado_destino = transicoes_permitidas[transicao]
+        estado_destino = StatusReserva[destino]
         
         # Validar condições específicas da transição
         resultado_condicoes = self._validar_condicoes_transicao(
@@ -453,38 +440,36 @@ class StateMachineService:
         
         return historico
     
-    def obter_proximas_transicoes(self, reserva_id: int) -> List[Dict[str, Any]]:
-        """Retorna transições válidas para o estado atual"""
+    def obter_proximas_transicoes(self, reserva_id: int, avaliar_guardas: bool = False) -> List[Dict[str, Any]]:
+        """
+        Retorna transições válidas para o estado atual.
+        
+        A lista vem da tabela (sem consultas por transição); as condições de
+        cada uma só são avaliadas com avaliar_guardas=True.
+        """
         reserva = self.db.query(Reserva).filter(Reserva.id == reserva_id).first()
         if not reserva:
             raise ValidationError("Reserva não encontrada")
         
-        estado_atual = reserva.status_reserva
-        
-        if estado_atual not in self.TRANSICOES_VALIDAS:
-            return []
-        
         transicoes_disponiveis = []
-        for transicao, estado_destino in self.TRANSICOES_VALIDAS[estado_atual].items():
-            # Validar se a transição é possível
-            try:
-                validacao = self.validar_transicao(reserva_id, transicao, 0)  # usuário 0 para teste
-                
-                transicoes_disponiveis.append({
-                    "transicao": transicao.value,
-                    "estado_destino": estado_destino.value,
-                    "disponivel": validacao["valida"],
-                    "motivo_bloqueio": validacao.get("motivo") if not validacao["valida"] else None,
-                    "descricao": self._obter_descricao_transicao(transicao)
-                })
-            except:
-                transicoes_disponiveis.append({
-                    "transicao": transicao.value,
-                    "estado_destino": estado_destino.value,
-                    "disponivel": False,
-                    "motivo_bloqueio": "Erro na validação",
-                    "descricao": self._obter_descricao_transicao(transicao)
-                })
+        for evento, destino, _ in eventos_disponiveis(reserva.status_reserva.value):
+            transicao = TransicaoEstado(evento)
+            item = {
+                "transicao": evento,
+                "estado_destino": StatusReserva[destino].value,
+                "disponivel": True,
+                "motivo_bloqueio": None,
+                "descricao": self._obter_descricao_transicao(transicao)
+            }
+            if avaliar_guardas:
+                try:
+                    condicoes = self._validar_condicoes_transicao(reserva, transicao, 0, {})
+                    item["disponivel"] = condicoes["valida"]
+                    item["motivo_bloqueio"] = condicoes.get("motivo") if not condicoes["valida"] else None
+                except Exception:
+                    item["disponivel"] = False
+                    item["motivo_bloqueio"] = "Erro na validação"
+            transicoes_disponiveis.append(item)
         
         return transicoes_disponiveis
     
@@ -0,0 +1,183 @@
+"""
+Calendario de tarifas por suite.
+
+Carrega todas as tarifas ativas de uma vez e responde "preco da diaria da
+suite X em cada noite de [checkin, checkout)" em memoria, sem consultar o
+banco por tipo/noite. Cada suite guarda seus intervalos ordenados por
+data_inicio; a busca de uma noite e um bisect seguido de, no maximo, alguns
+passos para tras (so quando existem tarifas legadas sobrepostas).
+
+Mesma regra do TarifaSuiteRepository.get_tarifa_ativa: entre as tarifas
+vigentes na data, vence a de data_inicio mais recente.
+"""
+import asyncio
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import cache
+
+
+TARIFA_CALENDARIO_VERSAO_KEY = "tarifas:calendario:versao"
+TARIFA_CALENDARIO_TTL_SEGUNDOS = 300
+
+
+def _normalizar_suite(suite_tipo: Any) -> str:
+    raw = getattr(suite_tipo, "value", suite_tipo)
+    texto = str(raw or "").upper().strip()
+    return texto.replace("TIPOSUITE.", "")
+
+
+def _para_data(valor: Any) -> Optional[date]:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return None
+
+
+def _serializar_tarifa(tarifa) -> Dict[str, Any]:
+    return {
+        "id": tarifa.id,
+        "suite_tipo": _normalizar_suite(tarifa.suiteTipo),
+        "temporada": tarifa.temporada,
+        "data_inicio": _para_data(tarifa.dataInicio),
+        "data_fim": _para_data(tarifa.dataFim),
+        "preco_diaria": float(tarifa.precoDiaria),
+        "ativo": tarifa.ativo,
+    }
+
+
+class _IntervalosSuite:
+    """Intervalos [data_inicio, data_fim] de uma suite, ordenados por inicio."""
+
+    def __init__(self, tarifas: List[Dict[str, Any]]):
+        ordenadas = sorted(tarifas, key=lambda t: (t["data_inicio"], t["id"]))
+        self.inicios = [t["data_inicio"] for t in ordenadas]
+        self.fins = [t["data_fim"] for t in ordenadas]
+        self.tarifas = ordenadas
+        # Maior data_fim ate a posicao i: permite parar a busca para tras
+        # assim que nenhum intervalo anterior alcanca a data consultada.
+        self.max_fim_ate: List[date] = []
+        maior = None
+        for fim in self.fins:
+            maior = fim if maior is None or fim > maior else maior
+            self.max_fim_ate.append(maior)
+
+    def tarifa_em(self, dia: date) -> Optional[Dict[str, Any]]:
+        i = bisect_right(self.inicios, dia) - 1
+        while i >= 0 and self.max_fim_ate[i] >= dia:
+            if self.fins[i] >= dia:
+                return self.tarifas[i]
+            i -= 1
+        return None
+
+
+class TarifaCalendario:
+    """Snapshot imutavel das tarifas ativas, indexado por suite."""
+
+    def __init__(self, tarifas: List[Dict[str, Any]]):
+        por_suite: Dict[str, List[Dict[str, Any]]] = {}
+        for tarifa in tarifas:
+            if not tarifa.get("suite_tipo") or not tarifa.get("data_inicio") or not tarifa.get("data_fim"):
+                continue
+            por_suite.setdefault(tarifa["suite_tipo"], []).append(tarifa)
+        self._por_suite = {suite: _IntervalosSuite(lista) for suite, lista in por_suite.items()}
+
+    def suites(self) -> List[str]:
+        return sorted(self._por_suite)
+
+    def tarifa_em(self, suite_tipo: Any, dia: date) -> Optional[Dict[str, Any]]:
+        intervalos = self._por_suite.get(_normalizar_suite(suite_tipo))
+        if not intervalos or not dia:
+            return None
+        tarifa = intervalos.tarifa_em(_para_data(dia))
+        return dict(tarifa) if tarifa else None
+
+    def precos_por_noite(self, suite_tipo: Any, checkin: date, checkout: date) -> Optional[List[Dict[str, Any]]]:
+        """Preco de cada noite em [checkin, checkout); None se alguma noite nao tem tarifa."""
+        intervalos = self._por_suite.get(_normalizar_suite(suite_tipo))
+        inicio = _para_data(checkin)
+        fim = _para_data(checkout)
+        if not intervalos or not inicio or not fim or fim <= inicio:
+            return None
+
+        noites = []
+        dia = inicio
+        while dia < fim:
+            tarifa = intervalos.tarifa_em(dia)
+            if not tarifa:
+                return None
+            noites.append({
+                "data": dia,
+                "preco_diaria": tarifa["preco_diaria"],
+                "tarifa_id": tarifa["id"],
+                "temporada": tarifa["temporada"],
+            })
+            dia += timedelta(days=1)
+        return noites
+
+    def cotar(self, suite_tipo: Any, checkin: date, checkout: date) -> Optional[Dict[str, Any]]:
+        noites = self.precos_por_noite(suite_tipo, checkin, checkout)
+        if not noites:
+            return None
+        return {
+            "suite_tipo": _normalizar_suite(suite_tipo),
+            "num_diarias": len(noites),
+            "preco_diaria": noites[0]["preco_diaria"],
+            "preco_total": round(sum(n["preco_diaria"] for n in noites), 2),
+            "tarifa_id": noites[0]["tarifa_id"],
+            "noites": noites,
+        }
+
+
+class TarifaCalendarioCache:
+    """
+    Mantem um TarifaCalendario por worker.
+
+    A versao em Redis e incrementada a cada escrita de tarifa, entao todos os
+    workers recarregam na proxima leitura; sem Redis vale so o TTL.
+    """
+
+    def __init__(self, ttl_segundos: int = TARIFA_CALENDARIO_TTL_SEGUNDOS):
+        self.ttl_segundos = ttl_segundos
+        self._calendario: Optional[TarifaCalendario] = None
+        self._versao: Optional[str] = None
+        self._carregado_em = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _versao_remota(self) -> Optional[str]:
+        if cache.redis is None:
+            return None
+        try:
+            return await cache.redis.get(TARIFA_CALENDARIO_VERSAO_KEY)
+        except Exception as exc:
+            print(f"[TARIFAS] Versao do calendario indisponivel: {exc}")
+            return None
+
+    def _valido(self, versao: Optional[str]) -> bool:
+        if self._calendario is None or versao != self._versao:
+            return False
+        return (time.monotonic() - self._carregado_em) < self.ttl_segundos
+
+    async def obter(self, db) -> TarifaCalendario:
+        versao = await self._versao_remota()
+        if self._valido(versao):
+            return self._calendario
+
+        async with self._lock:
+            if self._valido(versao):
+                return self._calendario
+            tarifas = await db.tarifasuite.find_many(where={"ativo": True})
+            self._calendario = TarifaCalendario([_serializar_tarifa(t) for t in tarifas])
+            self._versao = versao
+            self._carregado_em = time.monotonic()
+            return self._calendario
+
+    async def invalidar(self) -> None:
+        self._calendario = None
+        await cache.incr(TARIFA_CALENDARIO_VERSAO_KEY)
+
+
+tarifa_calendario = TarifaCalendarioCache()
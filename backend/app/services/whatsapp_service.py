@@ -8,14 +8,24 @@ import os
 from typing import Any, Dict, Optional
 from urllib.parse import quote
 
-try:
-    from twilio.base.exceptions import TwilioRestException
-    from twilio.rest import Client
-except ImportError:
-    class TwilioRestException(Exception):
-        pass
+class TwilioRestException(Exception):
+    """Substituta enquanto o SDK do Twilio nao foi carregado (ou nao esta instalado)."""
+
+
+def _carregar_twilio():
+    """
+    Importa o SDK do Twilio so quando o servico e criado habilitado, e nao
+    no import do modulo: todo worker importa este modulo no boot.
+    """
+    global TwilioRestException
+    try:
+        from twilio.base.exceptions import TwilioRestException as _TwilioRestException
+        from twilio.rest import Client
+    except ImportError:
+        return None
+    TwilioRestException = _TwilioRestException
+    return Client
 
-    Client = None
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +80,7 @@ class WhatsAppService:
         self.enabled = os.getenv("TWILIO_WHATSAPP_ENABLED", "true").lower() == "true"
         self.frontend_base_url = (os.getenv("FRONTEND_BASE_URL") or "").strip().rstrip("/")
 
+        Client = _carregar_twilio() if self.enabled else None
         if not self.enabled:
             logger.warning("Twilio WhatsApp desabilitado por configuracao")
             self.client = None
@@ -0,0 +1,24 @@
+from app.core.celery_app import celery_app
+from app.tasks.jornada_tasks import _run_async, _run_with_db
+
+
+@celery_app.task(name="antifraude.recalcular_marcados")
+def recalcular_marcados_task(limit: int = 1000):
+    # Clientes marcados por eventos de reserva / pagamento recusado.
+    from app.services.antifraude_score_service import AntifraudeScoreService
+
+    async def _fn(db):
+        return await AntifraudeScoreService(db).recalcular_marcados(limite=limit)
+
+    return _run_async(_run_with_db(_fn))
+
+
+@celery_app.task(name="antifraude.recalcular_todos")
+def recalcular_todos_task(lote: int = 1000):
+    # Envelhece a janela de 7 dias e cobre eventos perdidos.
+    from app.services.antifraude_score_service import AntifraudeScoreService
+
+    async def _fn(db):
+        return await AntifraudeScoreService(db).recalcular_todos(lote=lote)
+
+    return _run_async(_run_with_db(_fn))
@@ -0,0 +1,13 @@
+from app.core.celery_app import celery_app
+from app.tasks.jornada_tasks import _run_async, _run_with_db
+
+
+@celery_app.task(name="calendario.reconstruir")
+def reconstruir_calendario_task():
+    # Avanca a base dos bitsets e cobre mudancas de status fora dos hooks.
+    from app.services.calendario_service import CalendarioService
+
+    async def _fn(db):
+        return await CalendarioService(db).reconstruir()
+
+    return _run_async(_run_with_db(_fn))
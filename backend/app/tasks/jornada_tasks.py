@@ -5,9 +5,9 @@ from typing import Callable, Awaitable, Any
 from app.core.celery_app import celery_app
 
 try:
-    from celery.signals import worker_process_shutdown
+    from celery.signals import worker_process_init, worker_process_shutdown
 except ImportError:  # ambiente de teste sem celery instalado
-    worker_process_shutdown = None
+    worker_process_init = worker_process_shutdown = None
 
 
 logger = logging.getLogger(__name__)
@@ -64,6 +64,17 @@ async def _run_with_db(fn: Callable) -> Any:
         return resultado
 
 
+if worker_process_init is not None:
+    @worker_process_init.connect
+    def _conectar_cache_no_worker(**kwargs):
+        """O cache (Redis) tambem nunca e conectado no worker; sem ele as
+        invalidacoes de snapshot e a fila de check-outs viram no-op. Conecta
+        no loop persistente do processo, o mesmo que as tasks usam."""
+        from app.core.cache import cache
+
+        _run_async(cache.connect())
+
+
 if worker_process_shutdown is not None:
     @worker_process_shutdown.connect
     def _fechar_prisma_no_shutdown(**kwargs):
@@ -83,7 +94,7 @@ if worker_process_shutdown is not None:
 
 
 @celery_app.task(name="jornada.liberar_pontos_pendentes")
-def liberar_pontos_pendentes_task(limit: int = 100):
+def liberar_pontos_pendentes_task(limit: int = 1000):
     from app.services.pontos_checkout_service import liberar_pontos_pendentes
 
     async def _fn(db):
@@ -93,7 +104,7 @@ def liberar_pontos_pendentes_task(limit: int = 100):
 
 
 @celery_app.task(name="jornada.retentar_estornos_pendentes")
-def retentar_estornos_pendentes_task(limit: int = 100):
+def retentar_estornos_pendentes_task(limit: int = 1000):
     from app.services.pontos_checkout_service import retentar_estornos_pendentes
 
     async def _fn(db):
@@ -131,3 +142,25 @@ def notificar_premios_proximos_task(limit: int = 100):
         return await NotificationService.varrer_premios_proximos(db, limit=limit)
 
     return _run_async(_run_with_db(_fn))
+
+
+@celery_app.task(name="jornada.detectar_checkouts_vencidos")
+def detectar_checkouts_vencidos_task(limit: int = 100):
+    # A listagem de /checkout-alerts so le os alertas ja disparados; quem
+    # dispara e esta task, a partir da fila ordenada por checkout_previsto.
+    from app.services.checkout_alert_service import CheckoutAlertService
+
+    async def _fn(db):
+        return await CheckoutAlertService(db).detectar_vencidos(limite=limit)
+
+    return _run_async(_run_with_db(_fn))
+
+
+@celery_app.task(name="jornada.reconciliar_fila_checkouts")
+def reconciliar_fila_checkouts_task():
+    from app.services.checkout_alert_service import CheckoutAlertService
+
+    async def _fn(db):
+        return await CheckoutAlertService(db).reconciliar_fila()
+
+    return _run_async(_run_with_db(_fn))
@@ -0,0 +1,26 @@
+from app.core.celery_app import celery_app
+from app.tasks.jornada_tasks import _run_async, _run_with_db
+
+
+@celery_app.task(name="limpeza.varrer_reservas")
+def varrer_reservas_task(limit: int = 5000):
+    # Holds nao pagos vencidos -> CANCELADO, confirmadas sem check-in -> NO_SHOW;
+    # libera o inventario que STATUS_RESERVA_BLOQUEIA_DISPONIBILIDADE segurava.
+    from app.services.limpeza_reservas_service import LimpezaReservasService
+
+    async def _fn(db):
+        return await LimpezaReservasService(db).varrer(limite=limit)
+
+    return _run_async(_run_with_db(_fn))
+
+
+@celery_app.task(name="limpeza.aplicar_retencao")
+def aplicar_retencao_task():
+    # Notificacoes, OTPs e logs_jornada em lotes pequenos com pausa; o que
+    # passar do teto por execucao sai na noite seguinte.
+    from app.services.retencao_service import RetencaoService
+
+    async def _fn(db):
+        return await RetencaoService(db).aplicar()
+
+    return _run_async(_run_with_db(_fn))
@@ -0,0 +1,23 @@
+from app.core.celery_app import celery_app
+from app.tasks.jornada_tasks import _run_async, _run_with_db
+
+
+@celery_app.task(name="notificacoes.reconciliar_contadores")
+def reconciliar_contadores_task():
+    # Corrige o que mudou `lida` por fora dos hooks (retencao, SQL manual)
+    # e recria os contadores depois de um restart do Redis.
+    from app.services.notificacao_contador_service import reconciliar_contadores
+
+    return _run_async(_run_with_db(reconciliar_contadores))
+
+
+@celery_app.task(name="notificacoes.entregar_evento")
+def entregar_evento_task(evento: str, dados: dict):
+    # Email/WhatsApp de um evento ja gravado; um job por evento, enfileirado
+    # pelo fan-out de notificacoes.
+    from app.services.notification_service import NotificationService
+
+    async def _fn(db):
+        return await NotificationService.entregar_evento(db, evento, dados)
+
+    return _run_async(_run_with_db(_fn))
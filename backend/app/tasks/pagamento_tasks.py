@@ -0,0 +1,23 @@
+from app.core.celery_app import celery_app
+from app.tasks.jornada_tasks import _run_async, _run_with_db
+
+
+@celery_app.task(name="pagamentos.conciliar_gateway")
+def conciliar_gateway_task(limit: int = 50):
+    # PIX/cartao pendentes na Cielo: confirma sem depender da tela consultar.
+    from app.services.conciliacao_pagamento_service import ConciliacaoPagamentoService
+
+    async def _fn(db):
+        return await ConciliacaoPagamentoService(db).processar(limite=limit)
+
+    return _run_async(_run_with_db(_fn))
+
+
+@celery_app.task(name="pagamentos.reconciliar_fila_conciliacao")
+def reconciliar_fila_conciliacao_task():
+    from app.services.conciliacao_pagamento_service import ConciliacaoPagamentoService
+
+    async def _fn(db):
+        return await ConciliacaoPagamentoService(db).reconciliar_fila()
+
+    return _run_async(_run_with_db(_fn))
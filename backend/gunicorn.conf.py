@@ -0,0 +1,26 @@
+"""
+Configuracao do gunicorn de producao (docker-compose.production.yml).
+
+Os workers sao UvicornWorker: o aquecimento (app/core/warmup.py) roda no
+lifespan de cada worker e o uvicorn so abre o socket depois dele, entao um
+worker novo (deploy ou reciclagem) nao recebe trafego ainda frio. O timeout
+precisa cobrir WARMUP_TIMEOUT_SECONDS com folga.
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+keepalive = 5
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Cada worker cria seu proprio query engine do Prisma e sua conexao Redis
+    # no lifespan; nada e herdado do master (sem --preload).
+    worker.log.info("[WARMUP] Worker %s iniciado; aquecendo antes de aceitar trafego", worker.pid)
+
+
+def worker_exit(server, worker):
+    worker.log.info("[WARMUP] Worker %s encerrado", worker.pid)
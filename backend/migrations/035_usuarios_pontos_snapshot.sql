@@ -0,0 +1,31 @@
+-- 035_usuarios_pontos_snapshot.sql
+-- usuarios_pontos passa a ser o snapshot de saldo do cliente: alem de saldo
+-- (Pontos R) e pontos_nivel (Pontos N), guarda os totais de creditos
+-- 'pendente' e 'bloqueado'. Ate aqui esses totais eram um SUM sobre todo o
+-- historico de transacoes_pontos do cliente a cada dashboard; agora sao
+-- mantidos na mesma transacao que cria/libera a transacao de pontos
+-- (PontosRepository.criar_transacao_pontos e liberar_pontos_pendentes) e a
+-- leitura vira um lookup por cliente_id.
+--
+-- Mesma regra do SUM antigo: so entram creditos (pontos > 0). Estornos
+-- pendentes (pontos negativos) nao afetam os totais.
+--
+-- Idempotente: ADD COLUMN IF NOT EXISTS + backfill que recalcula a partir de
+-- transacoes_pontos (seguro para rodar de novo; o resultado e o mesmo).
+
+ALTER TABLE usuarios_pontos ADD COLUMN IF NOT EXISTS pontos_pendentes INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE usuarios_pontos ADD COLUMN IF NOT EXISTS pontos_bloqueados INTEGER NOT NULL DEFAULT 0;
+
+UPDATE usuarios_pontos up
+SET pontos_pendentes = COALESCE(totais.pendentes, 0),
+    pontos_bloqueados = COALESCE(totais.bloqueados, 0)
+FROM (
+    SELECT usuario_pontos_id,
+           SUM(pontos) FILTER (WHERE status = 'pendente') AS pendentes,
+           SUM(pontos) FILTER (WHERE status = 'bloqueado') AS bloqueados
+    FROM transacoes_pontos
+    WHERE pontos > 0
+      AND status IN ('pendente', 'bloqueado')
+    GROUP BY usuario_pontos_id
+) totais
+WHERE totais.usuario_pontos_id = up.id;
@@ -0,0 +1,29 @@
+-- 036_clientes_risco.sql
+-- Features e score antifraude por cliente, pre-calculados.
+--
+-- Ate aqui a lista de clientes suspeitos analisava TODOS os clientes a cada
+-- acesso (~5 consultas por cliente). Agora AntifraudeScoreService calcula as
+-- features de um lote de clientes em uma unica consulta agregada, pontua em
+-- memoria e grava aqui; a lista vira ORDER BY score DESC LIMIT n no indice.
+--
+-- Atualizacao: incremental pelos eventos de reserva e de pagamento recusado
+-- (tasks/antifraude_tasks.py) e recalculo completo diario, que tambem
+-- envelhece a janela de 7 dias de reservas recentes.
+--
+-- Idempotente: CREATE ... IF NOT EXISTS. A tabela nasce vazia; o primeiro
+-- recalculo completo (task antifraude.recalcular_todos) a preenche.
+
+CREATE TABLE IF NOT EXISTS clientes_risco (
+    cliente_id INTEGER PRIMARY KEY REFERENCES clientes(id) ON DELETE CASCADE,
+    reservas_7_dias INTEGER NOT NULL DEFAULT 0,
+    total_reservas INTEGER NOT NULL DEFAULT 0,
+    reservas_canceladas INTEGER NOT NULL DEFAULT 0,
+    pagamentos_recusados INTEGER NOT NULL DEFAULT 0,
+    cancelamentos_consecutivos INTEGER NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 0,
+    risco VARCHAR(10) NOT NULL DEFAULT 'BAIXO',
+    alertas JSONB NOT NULL DEFAULT '[]'::jsonb,
+    atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_clientes_risco_score ON clientes_risco (score DESC);
@@ -0,0 +1,22 @@
+-- 037_pagamentos_listagem.sql
+-- Indices da listagem paginada de pagamentos (PagamentoRepository.listar).
+--
+-- A tela de pagamentos carregava todo o historico com cliente, reserva,
+-- operacoes antifraude e comprovantes. Agora pagina por id (keyset, mais
+-- recentes primeiro) com filtros de status/metodo/periodo/reserva e um resumo
+-- por status em GROUP BY. Os indices abaixo cobrem esses caminhos; reserva_id
+-- e cliente_id ja tem indice (029).
+--
+-- Idempotente: CREATE INDEX IF NOT EXISTS.
+
+-- Filtro por status + ORDER BY id DESC LIMIT n
+CREATE INDEX IF NOT EXISTS idx_pagamentos_status_id
+    ON pagamentos (status_pagamento, id DESC);
+
+-- Filtro por periodo (data_inicio/data_fim)
+CREATE INDEX IF NOT EXISTS idx_pagamentos_created_at
+    ON pagamentos (created_at);
+
+-- risk_score da operacao antifraude mais recente de cada pagamento da pagina
+CREATE INDEX IF NOT EXISTS idx_operacoes_antifraude_pagamento_recente
+    ON operacoes_antifraude (pagamento_id, created_at DESC);
@@ -0,0 +1,18 @@
+-- 038_notificacoes_chave_evento.sql
+-- Chave de idempotencia das notificacoes de evento.
+--
+-- NotificationService consultava se a reserva ja tinha notificacao
+-- (find_first) antes de cada notificar_*, e criava uma linha por perfil em
+-- INSERTs separados. Agora o fan-out (notificacao_fanout_service) grava
+-- todas as linhas do evento em um INSERT ... ON CONFLICT (chave_evento) DO
+-- NOTHING: a chave e "<evento>:<id>|<perfil>" e o indice unico substitui a
+-- consulta previa. Notificacoes avulsas (criar_notificacao) ficam com a chave
+-- NULL, que nao conflita.
+--
+-- Idempotente: ADD COLUMN / CREATE INDEX IF NOT EXISTS. Linhas antigas ficam
+-- sem chave; um evento antigo reprocessado pode notificar de novo uma vez.
+
+ALTER TABLE notificacoes ADD COLUMN IF NOT EXISTS chave_evento TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_notificacoes_chave_evento
+    ON notificacoes (chave_evento);
@@ -0,0 +1,121 @@
+"""
+Microbenchmark da pilha de middlewares: BaseHTTPMiddleware x ASGI puro.
+
+Monta dois apps FastAPI com uma rota trivial (GET /ping) e mede requests/s
+chamando-os em processo via httpx.ASGITransport (sem rede):
+
+- antes: CORSMiddleware + security headers em `@app.middleware("http")`
+  (+ auditoria no mesmo estilo com --auditoria), como era o main.py;
+- depois: `instalar_middlewares`, a pilha atual em ASGI puro.
+
+Exemplo:
+    python scripts/benchmark_middlewares.py --requests 5000 --paralelos 1,16
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.middlewares.pilha import instalar_middlewares
+from app.middlewares.security_headers import SECURITY_HEADERS
+
+ORIGEM = "http://localhost:8080"
+
+
+def _rota_trivial(app: FastAPI) -> FastAPI:
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def app_antes(auditoria: bool) -> FastAPI:
+    app = _rota_trivial(FastAPI())
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[ORIGEM],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.middleware("http")
+    async def add_security_headers(request: Request, call_next):
+        response = await call_next(request)
+        for nome, valor in SECURITY_HEADERS:
+            response.headers[nome.decode()] = valor.decode()
+        return response
+
+    if auditoria:
+        @app.middleware("http")
+        async def audit_logging(request: Request, call_next):
+            start = time.time()
+            print(f"[SECURITY] {request.method} {request.url.path} from {request.client.host}")
+            response = await call_next(request)
+            if time.time() - start > 5.0:
+                print(f"[SECURITY] Slow request: {request.url.path}")
+            return response
+
+    return app
+
+
+def app_depois(auditoria: bool) -> FastAPI:
+    app = _rota_trivial(FastAPI())
+    instalar_middlewares(app, allow_origins=[ORIGEM], allow_credentials=True, auditoria=auditoria)
+    return app
+
+
+async def _medir(app: FastAPI, total: int, paralelos: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # aquecimento (rotas, validacao, caches do Starlette)
+        for _ in range(50):
+            await client.get("/ping", headers={"Origin": ORIGEM})
+
+        restantes = total
+
+        async def _paralelo():
+            nonlocal restantes
+            while restantes > 0:
+                restantes -= 1
+                resposta = await client.get("/ping", headers={"Origin": ORIGEM})
+                assert resposta.status_code == 200
+                assert resposta.headers["x-frame-options"] == "DENY"
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_paralelo() for _ in range(paralelos)))
+        return total / (time.perf_counter() - inicio)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--paralelos", default="1,16")
+    parser.add_argument("--auditoria", action="store_true", help="inclui o middleware de auditoria nos dois lados")
+    args = parser.parse_args()
+
+    niveis = [int(p) for p in args.paralelos.split(",") if p.strip()]
+    print(f"{'pilha':>8} {'paralelos':>9} {'req/s':>10}")
+    for paralelos in niveis:
+        for nome, fabrica in (("antes", app_antes), ("depois", app_depois)):
+            # os prints da auditoria nao entram na medida
+            with contextlib.redirect_stdout(io.StringIO()):
+                taxa = await _medir(fabrica(args.auditoria), args.requests, paralelos)
+            print(f"{nome:>8} {paralelos:>9} {taxa:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
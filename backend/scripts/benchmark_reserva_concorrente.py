@@ -0,0 +1,124 @@
+"""
+Benchmark de criacao concorrente de reservas: INSERT otimista x checagem previa.
+
+Para cada nivel de paralelismo, roda os dois modos do ReservaRepository.create
+(RESERVA_INSERCAO_OTIMISTA ligado e desligado) e mede reservas/segundo,
+conflitos (por codigo de ReservaConflito) e latencia p50/p99. Com --disputa todos os paralelos tentam os mesmos
+periodos do mesmo quarto (so um vence cada periodo); sem ela cada paralelo usa
+periodos proprios. Usa o banco configurado em DATABASE_URL; rode apenas em
+homologacao. As reservas criadas sao apagadas ao final de cada rodada.
+
+Exemplo:
+    python scripts/benchmark_reserva_concorrente.py --quarto 101 --tipo-suite LUXO \
+        --cliente-ids 11,12,13,14,15,16,17,18 --paralelos 1,4,16 --reservas 20 --disputa
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.core.config import settings
+from app.core.database import connect_db, disconnect_db, get_db
+from app.repositories.reserva_repo import ReservaConflito, ReservaRepository
+from app.schemas.reserva_schema import ReservaCreate
+from app.utils.datetime_utils import now_utc
+
+
+class ReservaRepositoryBenchmark(ReservaRepository):
+    async def _publicar_evento_reserva(self, *args, **kwargs):
+        return None
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def _rodada(repo, args, cliente_ids, paralelos, base):
+    latencias = []
+    criadas = []
+    conflitos = Counter()
+
+    async def _paralelo(indice):
+        cliente_id = cliente_ids[indice % len(cliente_ids)]
+        for k in range(args.reservas):
+            slot = k if args.disputa else indice * args.reservas + k
+            checkin = base + timedelta(days=slot * 2)
+            reserva = ReservaCreate(
+                cliente_id=cliente_id,
+                quarto_numero=args.quarto,
+                tipo_suite=args.tipo_suite,
+                checkin_previsto=checkin,
+                checkout_previsto=checkin + timedelta(days=1),
+                num_diarias=1,
+                observacoes="benchmark_reserva_concorrente",
+            )
+            inicio = time.perf_counter()
+            try:
+                resultado = await repo.create(reserva, notificar=False)
+                criadas.append(resultado["id"])
+            except ReservaConflito as exc:
+                conflitos[exc.codigo] += 1
+            except ValueError:
+                conflitos["OUTRO"] += 1
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_paralelo(i) for i in range(paralelos)))
+    duracao = time.perf_counter() - inicio
+    return criadas, conflitos, duracao, latencias
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quarto", required=True, help="numero do quarto disputado")
+    parser.add_argument("--tipo-suite", required=True)
+    parser.add_argument("--cliente-ids", required=True, help="ids separados por virgula")
+    parser.add_argument("--paralelos", default="1,4,16")
+    parser.add_argument("--reservas", type=int, default=10, help="tentativas por paralelo em cada rodada")
+    parser.add_argument("--disputa", action="store_true", help="todos os paralelos disputam os mesmos periodos")
+    parser.add_argument("--dias-a-frente", type=int, default=400, help="inicio dos periodos usados")
+    args = parser.parse_args()
+
+    cliente_ids = [int(c) for c in args.cliente_ids.split(",") if c.strip()]
+    niveis = [int(p) for p in args.paralelos.split(",") if p.strip()]
+    base = now_utc().replace(hour=14, minute=0, second=0, microsecond=0) + timedelta(days=args.dias_a_frente)
+    modo_original = settings.RESERVA_INSERCAO_OTIMISTA
+
+    await connect_db()
+    db = get_db()
+    repo = ReservaRepositoryBenchmark(db)
+
+    try:
+        print(
+            f"{'modo':>10} {'paralelos':>9} {'criadas':>8} {'conflitos':>9} {'reservas/s':>11} "
+            f"{'p50 ms':>8} {'p99 ms':>8}  por codigo"
+        )
+        for paralelos in niveis:
+            for modo, otimista in (("checagem", False), ("otimista", True)):
+                settings.RESERVA_INSERCAO_OTIMISTA = otimista
+                criadas, conflitos, duracao, latencias = await _rodada(repo, args, cliente_ids, paralelos, base)
+                if criadas:
+                    await db.execute_raw("DELETE FROM reservas WHERE id = ANY($1::int[])", criadas)
+                taxa = len(criadas) / duracao if duracao else 0.0
+                print(
+                    f"{modo:>10} {paralelos:>9} {len(criadas):>8} {sum(conflitos.values()):>9} {taxa:>11.1f} "
+                    f"{_percentil(latencias, 50):>8.1f} {_percentil(latencias, 99):>8.1f}  {dict(conflitos)}"
+                )
+    finally:
+        settings.RESERVA_INSERCAO_OTIMISTA = modo_original
+        await disconnect_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
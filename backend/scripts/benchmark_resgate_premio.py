@@ -0,0 +1,88 @@
+"""
+Benchmark de resgates concorrentes de um mesmo premio.
+
+Mede resgates/segundo por numero de clientes em paralelo, todos disputando o
+mesmo premio. Usa o banco configurado em DATABASE_URL; rode apenas em
+homologacao: cada resgate debita pontos e cria codigo de resgate de verdade.
+O estoque do premio e restaurado ao final.
+
+Exemplo:
+    python scripts/benchmark_resgate_premio.py --premio-id 3 \
+        --cliente-ids 11,12,13,14,15,16,17,18 --paralelos 1,2,4,8 --resgates 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.core.database import connect_db, disconnect_db, get_db
+from app.repositories.premio_repo_atomic import PremioRepositoryAtomic
+
+
+class PremioRepositoryBenchmark(PremioRepositoryAtomic):
+    async def _notificar_resgate(self, *args, **kwargs):
+        return None
+
+
+async def _rodada(repo, premio_id, cliente_ids, paralelos, resgates_por_cliente):
+    falhas = 0
+
+    async def _cliente(cliente_id):
+        nonlocal falhas
+        for _ in range(resgates_por_cliente):
+            result = await repo.resgatar_atomic(premio_id=premio_id, cliente_id=cliente_id)
+            if not result.get("success"):
+                falhas += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_cliente(cliente_ids[i % len(cliente_ids)]) for i in range(paralelos)))
+    duracao = time.perf_counter() - inicio
+    total = paralelos * resgates_por_cliente
+    return total, falhas, duracao
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--premio-id", type=int, required=True)
+    parser.add_argument("--cliente-ids", required=True, help="ids separados por virgula")
+    parser.add_argument("--paralelos", default="1,2,4,8,16")
+    parser.add_argument("--resgates", type=int, default=10, help="resgates por cliente em cada rodada")
+    args = parser.parse_args()
+
+    cliente_ids = [int(c) for c in args.cliente_ids.split(",") if c.strip()]
+    niveis = [int(p) for p in args.paralelos.split(",") if p.strip()]
+
+    await connect_db()
+    db = get_db()
+    repo = PremioRepositoryBenchmark(db)
+
+    estoque_raw = await db.query_raw("SELECT estoque FROM premios WHERE id = $1", args.premio_id)
+    if not estoque_raw:
+        print(f"[BENCHMARK] Premio {args.premio_id} nao encontrado")
+        await disconnect_db()
+        return
+    estoque_original = estoque_raw[0].get("estoque")
+
+    try:
+        print(f"{'paralelos':>9} {'resgates':>9} {'falhas':>7} {'segundos':>9} {'resgates/s':>11}")
+        for paralelos in niveis:
+            total, falhas, duracao = await _rodada(repo, args.premio_id, cliente_ids, paralelos, args.resgates)
+            taxa = (total - falhas) / duracao if duracao else 0.0
+            print(f"{paralelos:>9} {total:>9} {falhas:>7} {duracao:>9.2f} {taxa:>11.1f}")
+    finally:
+        await db.execute_raw(
+            "UPDATE premios SET estoque = $1, updated_at = NOW() WHERE id = $2",
+            estoque_original,
+            args.premio_id,
+        )
+        await disconnect_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
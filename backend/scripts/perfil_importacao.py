@@ -0,0 +1,135 @@
+"""
+Perfil de tempo de import do boot do worker (relatorio de `-X importtime`).
+
+Roda `python -X importtime -c "import <modulo>"` num processo novo (imports
+frios, como um worker do gunicorn recem-criado), le o relatorio do stderr e
+mostra:
+
+- tempo total do import do modulo;
+- os modulos mais caros por tempo proprio e por tempo acumulado;
+- o custo agrupado por pacote de topo (fastapi, sqlalchemy, reportlab, app...),
+  com os pacotes do app separados por subpacote (app.api.v1, app.services...).
+
+Com --json imprime o relatorio estruturado, para comparar antes/depois de um
+deploy. Use --repeticoes para tirar a mediana de varias rodadas.
+
+Exemplo:
+    python scripts/perfil_importacao.py --modulo app.main --top 20
+    python scripts/perfil_importacao.py --json > perfil_boot.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_LINHA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def coletar(modulo: str) -> List[Dict]:
+    """Uma rodada: lista de {modulo, proprio_us, acumulado_us, nivel} na ordem do relatorio."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if processo.returncode != 0:
+        raise SystemExit(f"Falha ao importar {modulo}:\n{processo.stderr[-2000:]}")
+
+    registros = []
+    for linha in processo.stderr.splitlines():
+        casamento = _LINHA.match(linha)
+        if not casamento:
+            continue
+        proprio, acumulado, recuo, nome = casamento.groups()
+        registros.append({
+            "modulo": nome,
+            "proprio_us": int(proprio),
+            "acumulado_us": int(acumulado),
+            "nivel": (len(recuo) - 1) // 2,
+        })
+    return registros
+
+
+def _grupo(nome: str) -> str:
+    partes = nome.split(".")
+    if partes[0] == "app" and len(partes) > 1:
+        return ".".join(partes[:3]) if partes[1] == "api" else ".".join(partes[:2])
+    return partes[0]
+
+
+def montar_relatorio(rodadas: List[List[Dict]], modulo: str, top: int) -> Dict:
+    proprio: Dict[str, List[int]] = {}
+    acumulado: Dict[str, List[int]] = {}
+    for registros in rodadas:
+        for registro in registros:
+            proprio.setdefault(registro["modulo"], []).append(registro["proprio_us"])
+            acumulado.setdefault(registro["modulo"], []).append(registro["acumulado_us"])
+
+    proprio_med = {nome: statistics.median(v) for nome, v in proprio.items()}
+    acumulado_med = {nome: statistics.median(v) for nome, v in acumulado.items()}
+
+    grupos: Dict[str, float] = {}
+    for nome, tempo in proprio_med.items():
+        grupos[_grupo(nome)] = grupos.get(_grupo(nome), 0) + tempo
+
+    def _ms(us: float) -> float:
+        return round(us / 1000, 1)
+
+    def _ranking(valores: Dict[str, float]):
+        return [
+            {"modulo": nome, "ms": _ms(tempo)}
+            for nome, tempo in sorted(valores.items(), key=lambda item: item[1], reverse=True)[:top]
+        ]
+
+    return {
+        "modulo": modulo,
+        "repeticoes": len(rodadas),
+        "total_ms": _ms(acumulado_med.get(modulo, sum(proprio_med.values()))),
+        "modulos_importados": len(proprio_med),
+        "por_pacote": _ranking(grupos),
+        "por_tempo_proprio": _ranking(proprio_med),
+        "por_tempo_acumulado": _ranking(acumulado_med),
+    }
+
+
+def _imprimir(relatorio: Dict) -> None:
+    print(
+        f"import {relatorio['modulo']}: {relatorio['total_ms']} ms, "
+        f"{relatorio['modulos_importados']} modulos (mediana de {relatorio['repeticoes']})"
+    )
+    for titulo, chave in (
+        ("Por pacote (tempo proprio somado)", "por_pacote"),
+        ("Por modulo (tempo proprio)", "por_tempo_proprio"),
+        ("Por modulo (acumulado, inclui dependencias)", "por_tempo_acumulado"),
+    ):
+        print(f"\n{titulo}")
+        for item in relatorio[chave]:
+            print(f"  {item['ms']:>9.1f} ms  {item['modulo']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulo", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="imprime o relatorio em JSON")
+    args = parser.parse_args()
+
+    rodadas = [coletar(args.modulo) for _ in range(max(1, args.repeticoes))]
+    relatorio = montar_relatorio(rodadas, args.modulo, args.top)
+    if args.json:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    else:
+        _imprimir(relatorio)
+
+
+if __name__ == "__main__":
+    main()
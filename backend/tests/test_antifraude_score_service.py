@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from app.core.cache import cache
+from app.services.antifraude_score_service import (
+    ANTIFRAUDE_REANALISE_KEY,
+    AntifraudeScoreService,
+    marcar_cliente_para_reanalise,
+    pontuar_features,
+)
+
+
+class FakeRedisSet:
+    def __init__(self):
+        self.sets = {}
+
+    async def sadd(self, nome, *membros):
+        self.sets.setdefault(nome, set()).update(membros)
+
+    async def spop(self, nome, count):
+        conjunto = self.sets.get(nome, set())
+        retirados = sorted(conjunto)[:count]
+        conjunto.difference_update(retirados)
+        return retirados
+
+
+class FakeDbAntifraude:
+    def __init__(self, features):
+        self.features = features
+        self.consultas = []
+        self.upserts = []
+
+    async def query_raw(self, sql, *args):
+        self.consultas.append((sql, args))
+        return [f for f in self.features if f["cliente_id"] in args[0]]
+
+    async def execute_raw(self, sql, *args):
+        self.upserts.append((sql, args))
+        return len(args) // 9
+
+
+def test_pontuar_features_aplica_as_quatro_regras():
+    analise = pontuar_features({
+        "cliente_id": 5,
+        "documento": "123",
+        "reservas_7_dias": 4,
+        "total_reservas": 6,
+        "reservas_canceladas": 4,
+        "pagamentos_recusados": 3,
+        "ultimas_canceladas": [True, True, False],
+    })
+
+    assert analise["score"] == 30 + 40 + 30 + 25
+    assert analise["risco"] == "ALTO"
+    assert analise["taxa_cancelamento"] == 66.7
+    assert analise["cancelamentos_consecutivos"] == 2
+    assert len(analise["alertas"]) == 4
+
+    limpo = pontuar_features({"cliente_id": 6, "ultimas_canceladas": [False, True]})
+    assert (limpo["score"], limpo["risco"], limpo["alertas"]) == (0, "BAIXO", [])
+
+
+@pytest.mark.asyncio
+async def test_atualizar_calcula_lote_em_uma_consulta_e_um_upsert():
+    db = FakeDbAntifraude([
+        {"cliente_id": 1, "documento": "a", "total_reservas": 2, "reservas_canceladas": 2,
+         "ultimas_canceladas": [True, True]},
+        {"cliente_id": 2, "documento": "b", "total_reservas": 1},
+    ])
+
+    atualizados = await AntifraudeScoreService(db).atualizar([1, 2])
+
+    assert atualizados == 2
+    assert len(db.consultas) == 1
+    assert len(db.upserts) == 1
+    sql, params = db.upserts[0]
+    assert "ON CONFLICT (cliente_id) DO UPDATE" in sql
+    assert (params[0], params[6], params[7]) == (1, 65, "MÉDIO")
+    assert json.loads(params[8]) == ["🚨 Alta taxa de cancelamento: 100.0%", "📉 2 cancelamentos consecutivos"]
+    assert (params[9], params[15]) == (2, 0)
+
+
+@pytest.mark.asyncio
+async def test_recalcular_marcados_so_processa_clientes_dos_eventos(monkeypatch):
+    redis = FakeRedisSet()
+    monkeypatch.setattr(cache, "redis", redis)
+    db = FakeDbAntifraude([{"cliente_id": 7, "documento": "x"}, {"cliente_id": 8, "documento": "y"}])
+
+    await marcar_cliente_para_reanalise(7, None, 7)
+    resultado = await AntifraudeScoreService(db).recalcular_marcados()
+
+    assert resultado == {"success": True, "atualizados": 1}
+    assert db.consultas[0][1][0] == [7]
+    assert redis.sets[ANTIFRAUDE_REANALISE_KEY] == set()
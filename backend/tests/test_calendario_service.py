@@ -0,0 +1,112 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.core.cache import cache
+from app.services import calendario_service as calendario_module
+from app.services.calendario_service import CalendarioService, contar_por_noite, marcar_noites
+
+
+HOJE = date(2026, 5, 1)
+
+
+def _checkin(dia: int) -> datetime:
+    # 14h locais (UTC-3) do dia
+    return datetime(2026, 5, dia, 17, 0, tzinfo=timezone.utc)
+
+
+class FakeDbCalendario:
+    def __init__(self, quartos, reservas):
+        self.quartos = quartos
+        self.reservas = reservas
+        self.consultas = []
+
+    async def query_raw(self, sql, numeros, status, inicio, fim):
+        self.consultas.append(numeros)
+        rows = []
+        for numero, tipo, status_quarto in self.quartos:
+            if numeros is not None and numero not in numeros:
+                continue
+            doquarto = [r for r in self.reservas if r[0] == numero]
+            for _, checkin, checkout in doquarto or [(numero, None, None)]:
+                rows.append({
+                    "numero": numero,
+                    "tipo_suite": tipo,
+                    "status": status_quarto,
+                    "checkin_previsto": checkin,
+                    "checkout_previsto": checkout,
+                })
+        return rows
+
+
+@pytest.fixture(autouse=True)
+def calendario_local(monkeypatch):
+    monkeypatch.setattr(cache, "redis", None)
+    monkeypatch.setattr(calendario_module, "_hoje", lambda: HOJE)
+    calendario_module._calendario_local.clear()
+    yield
+    calendario_module._calendario_local.clear()
+
+
+def test_contar_por_noite_soma_bitsets_coluna_a_coluna():
+    gerador = random.Random(7)
+    bitsets = [gerador.getrandbits(40) for _ in range(23)]
+
+    esperado = [sum((b >> n) & 1 for b in bitsets) for n in range(40)]
+
+    assert contar_por_noite(bitsets, 40) == esperado
+    assert contar_por_noite([], 3) == [0, 0, 0]
+
+
+def test_marcar_noites_usa_data_local_e_exclui_dia_do_checkout():
+    base = HOJE.toordinal()
+    ocupado = marcar_noites(0, base, _checkin(3), _checkin(5) - timedelta(hours=2))
+
+    assert ocupado == 0b1100
+    # Check-in 22h locais ainda e a noite do proprio dia.
+    assert marcar_noites(0, base, datetime(2026, 5, 2, 1, 0, tzinfo=timezone.utc), _checkin(2)) == 0b1
+
+
+@pytest.mark.asyncio
+async def test_consultar_conta_livres_por_tipo_e_atualiza_so_o_quarto_alterado():
+    db = FakeDbCalendario(
+        quartos=[("101", "LUXO", "LIVRE"), ("102", "LUXO", "LIVRE"), ("201", "MASTER", "LIVRE"),
+                 ("202", "MASTER", "MANUTENCAO")],
+        reservas=[("101", _checkin(2), _checkin(4)), ("201", _checkin(1), _checkin(3))],
+    )
+    service = CalendarioService(db)
+
+    calendario = await service.consultar(date(2026, 5, 1), date(2026, 5, 5))
+
+    assert calendario["quartos_por_tipo"] == {"LUXO": 2, "MASTER": 1}
+    assert [d["livres"] for d in calendario["dias"]] == [
+        {"LUXO": 2, "MASTER": 0},
+        {"LUXO": 1, "MASTER": 0},
+        {"LUXO": 1, "MASTER": 1},
+        {"LUXO": 2, "MASTER": 1},
+    ]
+
+    db.reservas.append(("102", _checkin(1), _checkin(2)))
+    await service.atualizar_quartos(["102"])
+    luxo = await service.consultar(date(2026, 5, 1), date(2026, 5, 3), tipo="LUXO")
+
+    assert db.consultas == [None, ["102"]]
+    assert [d["total_livres"] for d in luxo["dias"]] == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_calendario_sem_quartos_fica_construido_e_nao_reconstroi():
+    db = FakeDbCalendario(quartos=[], reservas=[])
+    service = CalendarioService(db)
+
+    # Worker que nao ganhou o guard de startup: nao reconstroi.
+    vazio = await service.consultar(date(2026, 5, 1), date(2026, 5, 3), reconstruir_ausente=False)
+    assert db.consultas == [] and vazio["quartos_por_tipo"] == {}
+
+    await service.consultar(date(2026, 5, 1), date(2026, 5, 3))
+    calendario = await service.consultar(date(2026, 5, 1), date(2026, 5, 3))
+
+    # Construido e vazio: a segunda consulta nao volta ao banco.
+    assert db.consultas == [None]
+    assert [d["total_livres"] for d in calendario["dias"]] == [0, 0]
@@ -1,8 +1,16 @@
+from datetime import timedelta
 from types import SimpleNamespace
 
 import pytest
 
-from app.services.checkout_alert_service import CheckoutAlertService
+from app.core.cache import cache
+from app.services.checkout_alert_service import (
+    CHECKOUT_ALERTAS_KEY,
+    CHECKOUT_FILA_KEY,
+    CheckoutAlertService,
+    agendar_checkout,
+    remover_checkout,
+)
 from app.utils.datetime_utils import now_utc
 
 
@@ -36,6 +44,11 @@ class FakeDbCheckoutAlerts:
         self.mark_seen = False
 
     async def query_raw(self, query, *args):
+        if "INSERT INTO notificacoes" in query:
+            colunas = ("chave_evento", "titulo", "mensagem", "tipo", "categoria", "perfil", "url_acao", "reserva_id")
+            novas = [dict(zip(colunas, linha)) for linha in zip(*args[1:9])]
+            self.notificacao.created.extend(novas)
+            return [{**n, "id": 44, "lida": False} for n in novas]
         if "UPDATE notificacoes" in query:
             self.mark_seen = True
             return [{"id": 44}]
@@ -80,3 +93,104 @@ async def test_checkout_alert_marcar_visto():
     assert result["notifications_marked"] == 1
     assert db.mark_seen is True
 
+
+
+class FakeRedisCheckout:
+    def __init__(self):
+        self.zsets = {}
+        self.hashes = {}
+
+    async def zadd(self, nome, mapping):
+        self.zsets.setdefault(nome, {}).update(mapping)
+
+    async def zrangebyscore(self, nome, minimo, maximo, start=None, num=None):
+        itens = sorted(self.zsets.get(nome, {}).items(), key=lambda item: item[1])
+        return [membro for membro, score in itens if score <= maximo][:num]
+
+    async def zrem(self, nome, *membros):
+        zset = self.zsets.get(nome, {})
+        return sum(1 for membro in membros if zset.pop(membro, None) is not None)
+
+    async def hset(self, nome, campo, valor):
+        self.hashes.setdefault(nome, {})[campo] = valor
+
+    async def hvals(self, nome):
+        return list(self.hashes.get(nome, {}).values())
+
+    async def hkeys(self, nome):
+        return list(self.hashes.get(nome, {}).keys())
+
+    async def hdel(self, nome, *campos):
+        for campo in campos:
+            self.hashes.get(nome, {}).pop(campo, None)
+
+    async def xadd(self, *args, **kwargs):
+        return "1-1"
+
+    async def publish(self, *args, **kwargs):
+        return 0
+
+
+class FakeDbDetector(FakeDbCheckoutAlerts):
+    def __init__(self):
+        super().__init__()
+        self.consultas = []
+
+    async def query_raw(self, query, *args):
+        if "INSERT INTO notificacoes" in query:
+            return await super().query_raw(query, *args)
+        self.consultas.append(query)
+        if "ANY($1::int[])" in query:
+            return [{
+                "id": reserva_id,
+                "codigo_reserva": f"RES-{reserva_id}",
+                "cliente_nome": "Joao Silva",
+                "quarto_numero": "201",
+                "checkout_previsto": now_utc() - timedelta(minutes=5),
+                "notificacao_id": None,
+                "visto": False,
+            } for reserva_id in args[0]]
+        return await super().query_raw(query, *args)
+
+
+@pytest.fixture
+def redis_checkout(monkeypatch):
+    redis = FakeRedisCheckout()
+    monkeypatch.setattr(cache, "redis", redis)
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_detector_dispara_alerta_vencido_uma_unica_vez(redis_checkout):
+    await agendar_checkout(10, now_utc() - timedelta(minutes=5))
+    await agendar_checkout(11, now_utc() + timedelta(hours=2))
+    db = FakeDbDetector()
+    service = CheckoutAlertService(db)
+
+    primeiro = await service.detectar_vencidos()
+    segundo = await service.detectar_vencidos()
+
+    assert primeiro["disparados"] == 1
+    assert segundo["disparados"] == 0
+    assert len(db.notificacao.created) == 1
+    assert list(redis_checkout.zsets[CHECKOUT_FILA_KEY]) == ["11"]
+
+    listagem = await service.listar_pendentes(limit=20)
+    assert [a["reservation_id"] for a in listagem["alerts"]] == [10]
+    assert len(db.consultas) == 1  # listagem le o hash, nao o banco
+
+
+@pytest.mark.asyncio
+async def test_checkout_e_visto_removem_da_fila_e_dos_alertas(redis_checkout):
+    await agendar_checkout(10, now_utc() - timedelta(minutes=5))
+    await agendar_checkout(12, now_utc() + timedelta(hours=1))
+    db = FakeDbDetector()
+    service = CheckoutAlertService(db)
+    await service.detectar_vencidos()
+
+    await remover_checkout(12)
+    await service.marcar_visto(10)
+
+    assert redis_checkout.zsets[CHECKOUT_FILA_KEY] == {}
+    assert redis_checkout.hashes[CHECKOUT_ALERTAS_KEY] == {}
+    assert (await service.listar_pendentes())["total"] == 0
@@ -0,0 +1,193 @@
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import cache
+from app.services import conciliacao_pagamento_service as conciliacao
+from app.services.conciliacao_pagamento_service import (
+    CONCILIACAO_FILA_KEY,
+    ConciliacaoPagamentoService,
+    atualizar_fila_conciliacao,
+    intervalo_conciliacao,
+    status_cielo,
+)
+from app.utils.datetime_utils import now_utc
+
+
+class FakeRedisFila:
+    def __init__(self):
+        self.zsets = {}
+
+    async def zadd(self, nome, mapping, nx=False):
+        zset = self.zsets.setdefault(nome, {})
+        for membro, score in mapping.items():
+            if not (nx and membro in zset):
+                zset[membro] = score
+
+    async def zrangebyscore(self, nome, minimo, maximo, start=None, num=None):
+        itens = sorted(self.zsets.get(nome, {}).items(), key=lambda item: item[1])
+        return [membro for membro, score in itens if score <= maximo][:num]
+
+    async def zrem(self, nome, *membros):
+        zset = self.zsets.get(nome, {})
+        return sum(1 for membro in membros if zset.pop(membro, None) is not None)
+
+
+class FakeCielo:
+    mode = "production"
+
+    def __init__(self, status_por_payment):
+        self.status_por_payment = status_por_payment
+        self.simultaneas = 0
+        self.pico = 0
+        self.threads = set()
+        self._trava = threading.Lock()
+
+    def consultar_pagamento(self, payment_id):
+        with self._trava:
+            self.simultaneas += 1
+            self.pico = max(self.pico, self.simultaneas)
+        self.threads.add(threading.get_ident())
+        threading.Event().wait(0.02)
+        with self._trava:
+            self.simultaneas -= 1
+        status = self.status_por_payment[payment_id]
+        if status is None:
+            raise TimeoutError("cielo fora do ar")
+        # Corpo do GET /1/sales/{PaymentId}: status dentro de Payment
+        return {"success": True, "data": {"MerchantOrderId": "RCF-1", "Payment": {"PaymentId": payment_id, "Status": status}}}
+
+
+class FakePagamentoRepo:
+    def __init__(self):
+        self.atualizacoes = []
+
+    async def update_status(self, pagamento_id, status):
+        self.atualizacoes.append((pagamento_id, status))
+
+
+class FakeReservaRepo:
+    def __init__(self):
+        self.confirmadas = []
+
+    async def confirmar(self, reserva_id):
+        self.confirmadas.append(reserva_id)
+
+
+class FakeDbConciliacao:
+    def __init__(self, pagamentos):
+        self.pagamentos = pagamentos
+
+    async def query_raw(self, sql, *params):
+        ids = set(params[0])
+        return [p for p in self.pagamentos if p["id"] in ids]
+
+
+@pytest.fixture
+def redis_fila(monkeypatch):
+    redis = FakeRedisFila()
+    monkeypatch.setattr(cache, "redis", redis)
+    return redis
+
+
+@pytest.fixture
+def eventos(monkeypatch):
+    publicados = []
+
+    async def publicar(tipo, dados=None, perfis=None):
+        publicados.append((tipo, dados))
+
+    monkeypatch.setattr(conciliacao.event_hub, "publicar", publicar)
+    return publicados
+
+
+def _pagamento(pagamento_id, payment_id, idade):
+    return {
+        "id": pagamento_id,
+        "reserva_id": 100 + pagamento_id,
+        "metodo": "pix",
+        "status_pagamento": "PENDENTE",
+        "cielo_payment_id": payment_id,
+        "created_at": now_utc() - idade,
+    }
+
+
+def test_intervalo_cresce_com_a_idade_e_desiste_depois_do_limite():
+    agora = now_utc()
+
+    assert intervalo_conciliacao(agora - timedelta(minutes=1), agora) == timedelta(seconds=15)
+    assert intervalo_conciliacao(agora - timedelta(hours=1), agora) == timedelta(minutes=5)
+    assert intervalo_conciliacao(agora - timedelta(hours=30), agora) == timedelta(hours=2)
+    assert intervalo_conciliacao(agora - timedelta(hours=49), agora) is None
+
+
+@pytest.mark.asyncio
+async def test_update_status_agenda_pendente_do_gateway_e_remove_finalizado(redis_fila):
+    pendente = SimpleNamespace(
+        id=7, statusPagamento="PENDENTE", metodo="pix", cieloPaymentId="tx-7", createdAt=now_utc()
+    )
+    manual = SimpleNamespace(id=8, statusPagamento="PENDENTE", metodo="dinheiro", cieloPaymentId=None, createdAt=now_utc())
+
+    await atualizar_fila_conciliacao(pendente)
+    await atualizar_fila_conciliacao(manual)
+    assert list(redis_fila.zsets[CONCILIACAO_FILA_KEY]) == ["7"]
+
+    pendente.statusPagamento = "PAGO"
+    await atualizar_fila_conciliacao(pendente)
+    assert redis_fila.zsets[CONCILIACAO_FILA_KEY] == {}
+
+
+@pytest.mark.asyncio
+async def test_processar_consulta_em_paralelo_limitado_e_aplica_transicoes(redis_fila, eventos):
+    pagamentos = [
+        _pagamento(1, "tx-1", timedelta(minutes=2)),   # pago
+        _pagamento(2, "tx-2", timedelta(minutes=40)),  # autorizado sem captura: segue pendente
+        _pagamento(3, "tx-3", timedelta(minutes=1)),   # Cielo falhou
+        _pagamento(4, "tx-4", timedelta(hours=47, minutes=59, seconds=59)),  # negado
+    ]
+    cielo = FakeCielo({"tx-1": 2, "tx-2": 1, "tx-3": None, "tx-4": 3})
+    pagamento_repo, reserva_repo = FakePagamentoRepo(), FakeReservaRepo()
+    vencido = now_utc().timestamp() - 1
+    redis_fila.zsets[CONCILIACAO_FILA_KEY] = {str(p["id"]): vencido for p in pagamentos}
+    redis_fila.zsets[CONCILIACAO_FILA_KEY]["9"] = vencido + 3600  # ainda nao venceu
+
+    service = ConciliacaoPagamentoService(
+        FakeDbConciliacao(pagamentos), cielo_api=cielo, pagamento_repo=pagamento_repo, reserva_repo=reserva_repo
+    )
+    resultado = await service.processar(concorrencia=2)
+
+    assert resultado == {"success": True, "consultados": 4, "atualizados": 2, "reagendados": 2, "descartados": 0}
+    assert cielo.pico == 2
+    assert threading.get_ident() not in cielo.threads
+    assert sorted(pagamento_repo.atualizacoes) == [(1, "APROVADO"), (4, "RECUSADO")]
+    assert reserva_repo.confirmadas == [101]
+    assert sorted((dados["id"], dados["status"]) for _, dados in eventos) == [(1, "APROVADO"), (4, "RECUSADO")]
+
+    fila = redis_fila.zsets[CONCILIACAO_FILA_KEY]
+    agora = now_utc().timestamp()
+    assert set(fila) == {"2", "3", "9"}
+    assert fila["3"] - agora == pytest.approx(15, abs=2)
+    assert fila["2"] - agora == pytest.approx(300, abs=2)
+
+
+@pytest.mark.asyncio
+async def test_processar_nao_roda_em_sandbox(redis_fila):
+    cielo = FakeCielo({})
+    cielo.mode = "sandbox"
+    redis_fila.zsets[CONCILIACAO_FILA_KEY] = {"1": 0}
+
+    resultado = await ConciliacaoPagamentoService(
+        FakeDbConciliacao([]), cielo_api=cielo, pagamento_repo=FakePagamentoRepo(), reserva_repo=FakeReservaRepo()
+    ).processar()
+
+    assert resultado["motivo"] == "sandbox"
+    assert redis_fila.zsets[CONCILIACAO_FILA_KEY] == {"1": 0}
+
+
+def test_status_cielo_le_payment_status_e_mock_plano_do_sandbox():
+    assert status_cielo({"success": True, "data": {"Payment": {"Status": 2}}}) == 2
+    assert status_cielo({"success": True, "data": {"PaymentId": "tx", "Status": 2}}) == 2
+    assert status_cielo({"success": False, "data": {"Payment": {"Status": 2}}}) is None
+    assert status_cielo(None) is None
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import cache
+from app.services.disponibilidade_publica_service import DisponibilidadePublicaCache
+
+
+class FakeRedisDisponibilidade:
+    def __init__(self):
+        self.valores = {}
+        self.sets = []
+
+    async def mget(self, *chaves):
+        return [self.valores.get(c) for c in chaves]
+
+    async def get(self, chave):
+        return self.valores.get(chave)
+
+    async def set(self, chave, valor, ex=None, nx=False):
+        if nx and chave in self.valores:
+            return None
+        self.sets.append(chave)
+        self.valores[chave] = valor
+        return True
+
+    async def delete(self, chave):
+        self.valores.pop(chave, None)
+
+    async def incr(self, chave):
+        self.valores[chave] = str(int(self.valores.get(chave) or 0) + 1)
+        return int(self.valores[chave])
+
+
+@pytest.mark.asyncio
+async def test_consultas_simultaneas_iguais_fazem_uma_unica_leitura_do_banco(monkeypatch):
+    monkeypatch.setattr(cache, "redis", None)
+    micro_cache = DisponibilidadePublicaCache(ttl_segundos=10)
+    chamadas = []
+
+    async def loader():
+        chamadas.append(1)
+        await asyncio.sleep(0.01)
+        return {"success": True, "total_quartos_disponiveis": 3}
+
+    respostas = await asyncio.gather(*(micro_cache.obter("2026-05-01:2026-05-03", loader) for _ in range(20)))
+
+    assert len(chamadas) == 1
+    assert len({etag for _, etag in respostas}) == 1
+    assert respostas[0][0] == '{"success":true,"total_quartos_disponiveis":3}'
+
+    await micro_cache.obter("2026-05-01:2026-05-03", loader)
+    assert len(chamadas) == 1
+
+
+@pytest.mark.asyncio
+async def test_worker_reaproveita_resultado_do_redis_e_invalidacao_troca_a_chave(monkeypatch):
+    redis = FakeRedisDisponibilidade()
+    monkeypatch.setattr(cache, "redis", redis)
+    outro_worker = DisponibilidadePublicaCache(ttl_segundos=10)
+    este_worker = DisponibilidadePublicaCache(ttl_segundos=10)
+    livres = {"n": 3}
+    chamadas = []
+
+    async def loader():
+        chamadas.append(livres["n"])
+        return {"livres": livres["n"]}
+
+    corpo_outro, etag_outro = await outro_worker.obter("2026-05-01:2026-05-03", loader)
+    corpo, etag = await este_worker.obter("2026-05-01:2026-05-03", loader)
+
+    assert chamadas == [3]
+    assert (corpo, etag) == (corpo_outro, etag_outro)
+    assert not any(chave.endswith(":calculo") for chave in redis.valores)
+
+    livres["n"] = 2
+    await outro_worker.invalidar()
+    este_worker._versao_checada_em = None  # passou a janela de checagem da versao
+    corpo, novo_etag = await este_worker.obter("2026-05-01:2026-05-03", loader)
+
+    assert chamadas == [3, 2]
+    assert corpo == '{"livres":2}'
+    assert novo_etag != etag
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core import event_hub as event_hub_module
+from app.core.cache import cache
+from app.core.event_hub import EventHub, perfis_destino
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.mensagens = asyncio.Queue()
+
+    async def psubscribe(self, padrao):
+        self.redis.pubsubs.append(self)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        try:
+            return await asyncio.wait_for(self.mensagens.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        self.redis.pubsubs.remove(self)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.streams = {}
+        self.pubsubs = []
+        self.seq = 0
+
+    async def xadd(self, nome, campos, maxlen=None, approximate=True):
+        self.seq += 1
+        evento_id = f"1000-{self.seq}"
+        self.streams.setdefault(nome, []).append((evento_id, dict(campos)))
+        return evento_id
+
+    async def publish(self, canal, mensagem):
+        for pubsub in self.pubsubs:
+            pubsub.mensagens.put_nowait({"type": "pmessage", "channel": canal, "data": mensagem})
+
+    async def xread(self, streams, count=None):
+        resposta = []
+        for nome, ultimo in streams.items():
+            ultimo_seq = int(ultimo.split("-")[1])
+            entradas = [e for e in self.streams.get(nome, []) if int(e[0].split("-")[1]) > ultimo_seq]
+            if entradas:
+                resposta.append((nome, entradas[:count]))
+        return resposta
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+@pytest.fixture
+def redis_fake(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "redis", redis)
+    return redis
+
+
+def test_perfis_destino_normaliza_alias_e_padrao_equipe():
+    assert perfis_destino(None) == ["ADMIN", "GERENTE", "RECEPCAO"]
+    assert perfis_destino("ADMIN,RECEPCIONISTA") == ["ADMIN", "RECEPCAO"]
+    assert perfis_destino(["recepcao", "RECEPCAO"]) == ["RECEPCAO"]
+
+
+@pytest.mark.asyncio
+async def test_publicar_grava_stream_por_perfil(redis_fake):
+    hub = EventHub()
+
+    await hub.publicar("notificacao.criada", {"id": 7}, perfis="ADMIN,RECEPCAO")
+
+    assert set(redis_fake.streams) == {"eventos:perfil:ADMIN", "eventos:perfil:RECEPCAO"}
+    _, campos = redis_fake.streams["eventos:perfil:ADMIN"][0]
+    assert json.loads(campos["evento"]) == {"tipo": "notificacao.criada", "dados": {"id": 7}}
+
+
+@pytest.mark.asyncio
+async def test_publicar_sem_redis_nao_levanta(monkeypatch):
+    class RedisQuebrado(FakeRedis):
+        async def xadd(self, *args, **kwargs):
+            raise ConnectionError("redis fora")
+
+    monkeypatch.setattr(cache, "redis", RedisQuebrado())
+
+    await EventHub().publicar("reserva.criada", {"id": 1})
+
+
+@pytest.mark.asyncio
+async def test_assinar_reenvia_perdidos_e_entrega_ao_vivo_sem_duplicar(redis_fake):
+    hub = EventHub()
+    await hub.publicar("reserva.criada", {"id": 1}, perfis="RECEPCAO")
+    await hub.publicar("reserva.checkin", {"id": 1}, perfis="RECEPCAO")
+    await hub.publicar("reserva.criada", {"id": 2}, perfis="ADMIN")
+
+    stream = hub.assinar("RECEPCIONISTA", ultimo_id="1000-1", heartbeat_segundos=0.05)
+    reenviado = await stream.__anext__()
+    assert (reenviado["id"], reenviado["tipo"]) == ("1000-2", "reserva.checkin")
+
+    while not redis_fake.pubsubs:
+        await asyncio.sleep(0)
+    await hub.publicar("reserva.checkout", {"id": 1}, perfis="RECEPCAO")
+
+    recebidos = []
+    while len(recebidos) < 1:
+        evento = await stream.__anext__()
+        if evento is not None:
+            recebidos.append(evento)
+    assert [e["tipo"] for e in recebidos] == ["reserva.checkout"]
+    assert recebidos[0]["dados"] == {"id": 1}
+
+    await stream.aclose()
+    assert hub._assinantes == {}
+    await asyncio.wait_for(hub._ouvinte, timeout=2)
+    assert redis_fake.pubsubs == []
+
+
+@pytest.mark.asyncio
+async def test_fila_lotada_encerra_conexao_para_reconectar(redis_fake, monkeypatch):
+    monkeypatch.setattr(event_hub_module, "EVENTOS_FILA_MAX", 2)
+    hub = EventHub()
+    stream = hub.assinar("ADMIN", heartbeat_segundos=0.05)
+    primeiro = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+    fila = next(iter(hub._assinantes["ADMIN"]))
+
+    for seq in range(1, 4):
+        hub._despachar({
+            "channel": "eventos:perfil:ADMIN",
+            "data": json.dumps({"id": f"1000-{seq}", "evento": json.dumps({"tipo": "x", "dados": {}})}),
+        })
+
+    assert fila.qsize() == 1
+    with pytest.raises(StopAsyncIteration):
+        await primeiro
+    await asyncio.wait_for(hub._ouvinte, timeout=2)
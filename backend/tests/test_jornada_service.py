@@ -1,8 +1,19 @@
+import asyncio
+
 import pytest
 
+from app.core.local_cache import local_cache
+from app.services import jornada_service as jornada_module
 from app.services.jornada_service import JornadaService
 
 
+@pytest.fixture(autouse=True)
+def limpar_cache_local():
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
 class FakeDbJornada:
     async def query_raw(self, sql, *args):
         if "regexp_replace(documento" in sql or "FROM clientes" in sql:
@@ -15,10 +26,7 @@ class FakeDbJornada:
             }]
 
         if "FROM usuarios_pontos" in sql:
-            return [{"saldo": 72}]
-
-        if "SUM(pontos)" in sql:
-            return [{"total": 0}]
+            return [{"id": 3, "saldo": 72, "pontos_nivel": 72, "pontos_pendentes": 12, "pontos_bloqueados": 4}]
 
         if "FROM niveis_fidelidade" in sql:
             return [
@@ -74,3 +82,39 @@ async def test_consulta_jornada_por_cpf_retorna_dashboard():
     assert dashboard["success"] is True
     assert dashboard["cliente"]["id"] == 10
     assert dashboard["nivel"]["codigo"] == "experiencia"
+
+
+class FakeDbJornadaContada(FakeDbJornada):
+    def __init__(self):
+        self.consultas = []
+        self.em_andamento = 0
+        self.pico = 0
+
+    async def query_raw(self, sql, *args):
+        self.consultas.append(sql)
+        self.em_andamento += 1
+        self.pico = max(self.pico, self.em_andamento)
+        try:
+            await asyncio.sleep(0)
+            return await super().query_raw(sql, *args)
+        finally:
+            self.em_andamento -= 1
+
+
+@pytest.mark.asyncio
+async def test_dashboard_le_snapshot_e_reaproveita_dados_de_referencia(monkeypatch):
+    monkeypatch.setattr(jornada_module, "DASHBOARD_MAX_CONSULTAS_SIMULTANEAS", 2)
+    db = FakeDbJornadaContada()
+    service = JornadaService(db)
+
+    dashboard = await service.montar_dashboard_jornada(10)
+    assert dashboard["pontos"] == {"saldo": 72, "pendentes": 12, "bloqueados": 4}
+    assert not [sql for sql in db.consultas if "SUM(" in sql]
+    assert len([sql for sql in db.consultas if "FROM usuarios_pontos" in sql]) == 1
+    assert db.pico <= 2
+
+    db.consultas.clear()
+    await service.montar_dashboard_jornada(10)
+    assert not [sql for sql in db.consultas if "FROM niveis_fidelidade" in sql]
+    assert not [sql for sql in db.consultas if "FROM premios p" in sql]
+    assert not [sql for sql in db.consultas if "FROM beneficios_nivel" in sql]
@@ -0,0 +1,175 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services import limpeza_reservas_service as limpeza
+from app.services.limpeza_reservas_service import LimpezaReservasService
+
+
+AGORA = datetime(2026, 7, 2, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeDbLimpeza:
+    """Interpreta apenas o SQL da varredura; o filtro SQL e emulado pelos campos `candidata`."""
+
+    def __init__(self, reservas):
+        self.reservas = {r["id"]: dict(r) for r in reservas}
+        self.lotes = 0
+        self.updates = []
+        self.notificacoes = []
+        self.claims = []
+
+    @asynccontextmanager
+    async def tx(self):
+        self.lotes += 1
+        yield self
+
+    async def query_raw(self, sql, *args):
+        if "INSERT INTO notificacoes" in sql:
+            assert "ON CONFLICT (chave_evento) DO NOTHING" in sql
+            self.notificacoes.append(list(zip(args[8], args[5])))
+            return [
+                {"id": i, "chave_evento": chave, "perfil": perfil}
+                for i, (chave, perfil) in enumerate(zip(args[1], args[6]))
+            ]
+        assert "FOR UPDATE OF r SKIP LOCKED" in sql
+        self.claims.append(args)
+        ultimo_id, limite = args[0], args[8]
+        hold, no_show = args[1], args[5]
+        aprovados, pendentes, metodos, desde = args[4], args[9], args[10], args[11]
+
+        def pagamento_segura(p):
+            return p["status"] in aprovados or (
+                p["status"] in pendentes and p["metodo"] in metodos and p["created_at"] >= desde
+            )
+
+        linhas = []
+        for r in sorted(self.reservas.values(), key=lambda r: r["id"]):
+            if r["id"] <= ultimo_id or not r.get("candidata"):
+                continue
+            if r["status"] in hold:
+                if any(pagamento_segura(p) for p in r.get("pagamentos", [])):
+                    continue
+                linhas.append({**r, "tipo": "hold"})
+            elif r["status"] in no_show:
+                linhas.append({**r, "tipo": "no_show"})
+        return linhas[:limite]
+
+    async def execute_raw(self, sql, *args):
+        if "UPDATE reservas" in sql:
+            destino, _, ids = args
+            self.updates.append((destino, list(ids)))
+            for reserva_id in ids:
+                self.reservas[reserva_id].update(status=destino, candidata=False)
+        return 1
+
+
+@pytest.fixture
+def efeitos(monkeypatch):
+    registro = {"calendario": [], "checkout": [], "antifraude": [], "eventos": []}
+
+    async def calendario(db, *numeros):
+        registro["calendario"].append(numeros)
+
+    async def checkout(*ids):
+        registro["checkout"].append(ids)
+
+    async def antifraude(*ids):
+        registro["antifraude"].append(set(ids))
+
+    async def publicar(tipo, dados=None, perfis=None):
+        registro["eventos"].append((tipo, dados))
+
+    monkeypatch.setattr(limpeza, "atualizar_calendario_quartos", calendario)
+    monkeypatch.setattr(limpeza, "remover_checkout", checkout)
+    monkeypatch.setattr(limpeza, "marcar_cliente_para_reanalise", antifraude)
+    monkeypatch.setattr(limpeza.event_hub, "publicar", publicar)
+    return registro
+
+
+def _reserva(id, status, checkin, hospedagem="NAO_INICIADA", candidata=True):
+    return {
+        "id": id,
+        "codigo_reserva": f"RCF-{id}",
+        "cliente_id": 500 + id,
+        "cliente_nome": f"Cliente {id}",
+        "quarto_numero": f"{100 + id}",
+        "status": status,
+        "checkin_previsto": checkin,
+        "status_hospedagem": hospedagem,
+        "candidata": candidata,
+    }
+
+
+@pytest.mark.asyncio
+async def test_varrer_expira_holds_e_marca_no_show_em_lotes(efeitos):
+    ontem = AGORA - timedelta(days=1)
+    db = FakeDbLimpeza([
+        _reserva(1, "PENDENTE", AGORA + timedelta(days=5)),           # hold vencido
+        _reserva(2, "AGUARDANDO_PAGAMENTO", ontem),                   # hold com check-in passado
+        _reserva(3, "CONFIRMADA", ontem),                             # no-show
+        _reserva(4, "CONFIRMADA", AGORA - timedelta(hours=2)),        # dia do check-in nao acabou
+        _reserva(5, "CHECKIN_LIBERADO", ontem, hospedagem="CHECKIN_REALIZADO"),
+        _reserva(6, "PENDENTE", AGORA + timedelta(days=1), candidata=False),  # pago / dentro do prazo
+    ])
+
+    resultado = await LimpezaReservasService(db).varrer(tamanho_lote=2, agora=AGORA)
+
+    assert resultado == {
+        "success": True,
+        "avaliadas": 5,
+        "expiradas": 2,
+        "no_show": 1,
+        "ignoradas": 2,
+        "quartos_liberados": 3,
+    }
+    assert db.lotes == 3  # 2 + 2 + 1: o ultimo lote veio incompleto, sem consulta extra
+    # Holds legitimos ficam de fora no SQL: prazo das settings, pagamento na
+    # chegada, pagamento pendente e CHK de dinheiro aguardando o gerente.
+    _, _, prazo, _, aprovados, _, formas, approval, _, pendentes, metodos, desde = db.claims[0]
+    assert prazo == AGORA - timedelta(hours=24)
+    assert "PENDENTE" not in aprovados and "PENDENTE" in pendentes and "pix" in metodos
+    assert desde == AGORA - timedelta(hours=48)
+    assert "na_chegada" in formas and approval == "pending"
+    assert db.updates == [("CANCELADO", [1, 2]), ("NO_SHOW", [3])]
+    assert {r["id"]: r["status"] for r in db.reservas.values()} == {
+        1: "CANCELADO", 2: "CANCELADO", 3: "NO_SHOW", 4: "CONFIRMADA", 5: "CHECKIN_LIBERADO", 6: "PENDENTE",
+    }
+    assert [n for lote in db.notificacoes for n in lote] == [
+        (1, "reserva_expirada"), (2, "reserva_expirada"), (3, "reserva_no_show"),
+    ]
+    assert efeitos["calendario"] == [("101", "102"), ("103",)]
+    assert efeitos["checkout"] == [(), (3,)]
+    assert [tipo for tipo, _ in efeitos["eventos"]] == ["reservas.varridas", "reservas.varridas"]
+    assert efeitos["eventos"][1][1]["no_show"] == [
+        {"id": 3, "codigo": "RCF-3", "status_anterior": "CONFIRMADA", "quarto": "103"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_varrer_sem_candidatas_nao_dispara_efeitos(efeitos):
+    db = FakeDbLimpeza([_reserva(1, "PENDENTE", AGORA, candidata=False)])
+
+    resultado = await LimpezaReservasService(db).varrer(agora=AGORA)
+
+    assert resultado["avaliadas"] == 0 and db.lotes == 1
+    assert db.updates == [] and db.notificacoes == []
+    assert efeitos == {"calendario": [], "checkout": [], "antifraude": [], "eventos": []}
+
+
+@pytest.mark.asyncio
+async def test_pix_abandonado_nao_segura_o_hold(efeitos):
+    def pix(idade_horas, status="PENDENTE"):
+        return {"status": status, "metodo": "pix", "created_at": AGORA - timedelta(hours=idade_horas)}
+
+    db = FakeDbLimpeza([
+        {**_reserva(1, "PENDENTE", AGORA + timedelta(days=5)), "pagamentos": [pix(72)]},   # QR gerado e abandonado
+        {**_reserva(2, "PENDENTE", AGORA + timedelta(days=5)), "pagamentos": [pix(30)]},   # ainda em conciliacao
+        {**_reserva(3, "PENDENTE", AGORA + timedelta(days=5)), "pagamentos": [pix(72, "APROVADO")]},
+    ])
+
+    resultado = await LimpezaReservasService(db).varrer(agora=AGORA)
+
+    assert resultado["expiradas"] == 1
+    assert db.updates == [("CANCELADO", [1])]
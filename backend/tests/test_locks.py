@@ -0,0 +1,174 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import locks
+from app.core.cache import cache
+from app.core.locks import LockTimeout, executar_uma_vez, lock_distribuido, metricas_lock
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.fila = asyncio.Queue()
+
+    async def psubscribe(self, padrao):
+        self.redis.assinantes.append(self)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        self.redis.assinantes.remove(self)
+
+
+class FakeRedisLocks:
+    """Executa os scripts de app.core.locks em memoria; TTL em tempo monotonic."""
+
+    def __init__(self):
+        self.valores = {}
+        self.expira = {}
+        self.assinantes = []
+        self.publicados = []
+        self.scripts = []
+
+    def _vivo(self, chave):
+        if chave in self.expira and time.monotonic() >= self.expira[chave]:
+            self.valores.pop(chave, None)
+            self.expira.pop(chave, None)
+        return self.valores.get(chave)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def eval(self, script, numkeys, *args):
+        chave, argv = args[0], list(args[numkeys:])
+        self.scripts.append(script)
+        atual = self._vivo(chave)
+        if script == locks._ADQUIRIR_LUA:
+            if atual is not None:
+                return [0, int((self.expira[chave] - time.monotonic()) * 1000)]
+            self.valores[chave] = argv[0]
+            self.expira[chave] = time.monotonic() + int(argv[1]) / 1000
+            return [1, 0]
+        if atual != argv[0]:
+            return 0
+        if script == locks._RENOVAR_LUA:
+            self.expira[chave] = time.monotonic() + int(argv[1]) / 1000
+            return 1
+        del self.valores[chave]
+        self.expira.pop(chave, None)
+        self.publicados.append(argv[1])
+        for assinante in self.assinantes:
+            assinante.fila.put_nowait({"type": "pmessage", "channel": argv[1], "data": "1"})
+        return 1
+
+    async def set(self, chave, valor, ex=None, nx=False):
+        if nx and self._vivo(chave) is not None:
+            return None
+        self.valores[chave] = valor
+        return True
+
+
+@pytest.fixture(autouse=True)
+def metricas_limpas():
+    metricas_lock.reset()
+    yield
+    metricas_lock.reset()
+
+
+@pytest.fixture
+def redis_locks(monkeypatch):
+    redis = FakeRedisLocks()
+    monkeypatch.setattr(cache, "redis", redis)
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_waiter_acorda_pela_liberacao_publicada(redis_locks):
+    ordem = []
+
+    async def segundo():
+        async with lock_distribuido("tef-finalizar:s1", timeout_segundos=5, ttl_segundos=30) as lock:
+            ordem.append(("segundo", lock.espera_ms))
+
+    async with lock_distribuido("tef-finalizar:s1", timeout_segundos=5, ttl_segundos=30) as primeiro:
+        assert primeiro.backend == "redis"
+        tarefa = asyncio.create_task(segundo())
+        await asyncio.sleep(0.3)
+        ordem.append(("primeiro", None))
+    await tarefa
+
+    assert [nome for nome, _ in ordem] == ["primeiro", "segundo"]
+    # Acordou pela liberacao, sem esperar o lease de 30s nem o teto de espera.
+    assert ordem[1][1] < 1000
+    assert redis_locks.publicados == [
+        "lock:liberado:lock:tef-finalizar:s1",
+        "lock:liberado:lock:tef-finalizar:s1",
+    ]
+    assert redis_locks.valores == {}
+    metricas = metricas_lock.snapshot()["tef-finalizar"]
+    assert (metricas["adquiridos"], metricas["liberados"], metricas["leases_perdidos"]) == (2, 2, 0)
+    assert metricas["posse_max_ms"] >= 300
+
+
+@pytest.mark.asyncio
+async def test_timeout_e_liberacao_so_pelo_dono(redis_locks):
+    async with lock_distribuido("pendencias", timeout_segundos=5, ttl_segundos=30):
+        with pytest.raises(LockTimeout):
+            async with lock_distribuido("pendencias", timeout_segundos=0.05, ttl_segundos=30):
+                pass
+        assert redis_locks.valores["lock:pendencias"]
+
+    assert redis_locks.valores == {}
+    assert metricas_lock.snapshot()["pendencias"]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lease_renovado_e_lease_perdido(redis_locks):
+    async with lock_distribuido("tef-finalizar:s2", ttl_segundos=0.15, renovar=True) as lock:
+        await asyncio.sleep(0.4)
+        assert redis_locks._vivo("lock:tef-finalizar:s2") == lock.token
+    assert not lock.perdido and locks._RENOVAR_LUA in redis_locks.scripts
+
+    async with lock_distribuido("tef-finalizar:s3", ttl_segundos=0.05) as expirado:
+        await asyncio.sleep(0.1)
+        # Outro dono assume depois do lease vencido; a liberacao nao o apaga.
+        async with lock_distribuido("tef-finalizar:s3", timeout_segundos=0.1, ttl_segundos=30):
+            pass
+        redis_locks.valores["lock:tef-finalizar:s3"] = "outro"
+    assert expirado.perdido
+    assert redis_locks.valores["lock:tef-finalizar:s3"] == "outro"
+    assert metricas_lock.snapshot()["tef-finalizar"]["leases_perdidos"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sem_redis_usa_lock_local_e_guard_libera(monkeypatch):
+    monkeypatch.setattr(cache, "redis", None)
+    ordem = []
+
+    async def tarefa(nome):
+        async with lock_distribuido("calendario", timeout_segundos=1) as lock:
+            assert lock.backend == "local"
+            ordem.append(f"{nome}:entrou")
+            await asyncio.sleep(0.02)
+            ordem.append(f"{nome}:saiu")
+
+    await asyncio.gather(tarefa("a"), tarefa("b"))
+
+    assert ordem == ["a:entrou", "a:saiu", "b:entrou", "b:saiu"]
+    assert "calendario" not in locks._LOCKS_LOCAIS
+    assert await executar_uma_vez("calendario:startup-guard", 60) is True
+
+
+@pytest.mark.asyncio
+async def test_executar_uma_vez_so_o_primeiro_worker(redis_locks):
+    assert await executar_uma_vez("tef:pendencias:startup-guard", 120) is True
+    assert await executar_uma_vez("tef:pendencias:startup-guard", 120) is False
+
+    metricas = metricas_lock.snapshot()["tef"]
+    assert (metricas["adquiridos"], metricas["ocupados"]) == (1, 1)
@@ -0,0 +1,72 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.core.cache import cache
+from app.middlewares.pilha import instalar_middlewares
+
+
+class FakeRedisIdempotencia:
+    def __init__(self):
+        self.valores = {}
+
+    async def get(self, chave):
+        return self.valores.get(chave)
+
+    async def setex(self, chave, ttl, valor):
+        self.valores[chave] = valor
+
+
+def _app(**opcoes):
+    app = FastAPI()
+    chamadas = []
+
+    @app.get("/stream")
+    async def stream():
+        async def partes():
+            for parte in (b"a", b"b", b"c"):
+                yield parte
+
+        return StreamingResponse(partes(), media_type="text/plain")
+
+    @app.post("/api/v1/reservas")
+    async def criar_reserva():
+        chamadas.append(1)
+        return {"id": len(chamadas)}
+
+    instalar_middlewares(app, allow_origins=["http://localhost:8080"], allow_credentials=True, **opcoes)
+    return app, chamadas
+
+
+def _cliente(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste")
+
+
+@pytest.mark.asyncio
+async def test_pilha_asgi_aplica_security_headers_e_cors_sem_quebrar_streaming():
+    app, _ = _app(auditoria=True)
+
+    async with _cliente(app) as client:
+        resposta = await client.get("/stream", headers={"Origin": "http://localhost:8080"})
+
+    assert resposta.text == "abc"
+    assert resposta.headers["x-frame-options"] == "DENY"
+    assert resposta.headers["access-control-allow-origin"] == "http://localhost:8080"
+
+
+@pytest.mark.asyncio
+async def test_idempotencia_asgi_reaproveita_resposta_e_exige_key_em_pagamentos(monkeypatch):
+    monkeypatch.setattr(cache, "redis", FakeRedisIdempotencia())
+    app, chamadas = _app(idempotencia=True)
+
+    async with _cliente(app) as client:
+        primeira = await client.post("/api/v1/reservas", headers={"Idempotency-Key": "k1"})
+        repetida = await client.post("/api/v1/reservas", headers={"Idempotency-Key": "k1"})
+        pagamento = await client.post("/api/v1/pagamentos")
+
+    assert chamadas == [1]
+    assert primeira.json() == repetida.json() == {"id": 1}
+    assert repetida.headers["content-length"] == str(len(repetida.content))
+    assert pagamento.status_code == 400
+    assert pagamento.json()["error_code"] == "IDEMPOTENCY_KEY_REQUIRED"
@@ -0,0 +1,193 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import cache
+from app.repositories.notificacao_repo import NotificacaoRepository
+from app.services.notificacao_contador_service import (
+    NAO_LIDAS_KEY,
+    NAO_LIDAS_PRONTO,
+    reconciliar_contadores,
+)
+
+
+class FakeRedisContadores:
+    def __init__(self):
+        self.hashes = {}
+        # Ajuste concorrente que chega logo depois de uma leitura do hash
+        self.apos_leitura = None
+
+    async def hincrby(self, nome, campo, delta):
+        hash_ = self.hashes.setdefault(nome, {})
+        hash_[campo] = str(int(hash_.get(campo, 0)) + delta)
+
+    async def hgetall(self, nome):
+        lido = dict(self.hashes.get(nome, {}))
+        if self.apos_leitura:
+            ajuste, self.apos_leitura = self.apos_leitura, None
+            await ajuste()
+        return lido
+
+    async def hset(self, nome, mapping):
+        self.hashes.setdefault(nome, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def delete(self, nome):
+        self.hashes.pop(nome, None)
+
+    async def eval(self, script, numkeys, nome, pronto, *pares):
+        # _CORRIGIR_LUA: HINCRBY por destino, HDEL no que zera, marca pronto
+        for destino, correcao in zip(pares[::2], pares[1::2]):
+            await self.hincrby(nome, destino, correcao)
+            if self.hashes[nome][destino] == "0":
+                del self.hashes[nome][destino]
+        self.hashes.setdefault(nome, {})[pronto] = "1"
+
+
+def _atende(notif, where):
+    for campo, valor in where.items():
+        if campo == "OR":
+            if not any(_atende(notif, condicao) for condicao in valor):
+                return False
+        elif isinstance(valor, dict) and "in" in valor:
+            if getattr(notif, campo) not in valor["in"]:
+                return False
+        elif isinstance(valor, dict) and "contains" in valor:
+            if not getattr(notif, campo) or valor["contains"] not in getattr(notif, campo):
+                return False
+        elif getattr(notif, campo) != valor:
+            return False
+    return True
+
+
+class FakeNotificacaoTable:
+    def __init__(self):
+        self.linhas = {}
+        self.counts = 0
+
+    async def create(self, data):
+        notif = SimpleNamespace(
+            id=len(self.linhas) + 1, perfil=None, lida=False, reservaId=None, pagamentoId=None,
+            urlAcao=None, tipo=None, categoria=None, titulo=None, mensagem=None, dataCriacao=None,
+        )
+        for campo, valor in data.items():
+            setattr(notif, campo, valor)
+        self.linhas[notif.id] = notif
+        return notif
+
+    async def find_unique(self, where):
+        return self.linhas.get(where["id"])
+
+    async def find_many(self, where):
+        return [n for n in self.linhas.values() if _atende(n, where)]
+
+    async def count(self, where):
+        self.counts += 1
+        return len(await self.find_many(where))
+
+    async def update_many(self, where, data):
+        alvo = await self.find_many(where)
+        for notif in alvo:
+            notif.lida = data["lida"]
+        return len(alvo)
+
+    async def delete(self, where):
+        return self.linhas.pop(where["id"])
+
+
+class FakeDbNotificacoes:
+    def __init__(self):
+        self.notificacao = FakeNotificacaoTable()
+
+    async def query_raw(self, sql, todos):
+        assert "GROUP BY" in sql
+        totais = {}
+        for notif in self.notificacao.linhas.values():
+            if not notif.lida:
+                destino = notif.perfil or todos
+                totais[destino] = totais.get(destino, 0) + 1
+        return [{"destino": destino, "total": total} for destino, total in totais.items()]
+
+
+@pytest.fixture
+def redis_contadores(monkeypatch):
+    redis = FakeRedisContadores()
+    monkeypatch.setattr(cache, "redis", redis)
+    return redis
+
+
+async def _criar(repo, perfil, lida=False):
+    return await repo.create({"titulo": "t", "mensagem": "m", "tipo": "info", "categoria": "sistema", "perfil": perfil, "lida": lida})
+
+
+@pytest.mark.asyncio
+async def test_contadores_acompanham_criacao_leitura_e_exclusao(redis_contadores):
+    db = FakeDbNotificacoes()
+    repo = NotificacaoRepository(db)
+
+    await _criar(repo, None)
+    await _criar(repo, "ADMIN")
+    await _criar(repo, "RECEPCAO")
+    multi = await _criar(repo, "ADMIN,RECEPCIONISTA")
+    await _criar(repo, "GERENTE", lida=True)
+
+    # Antes da primeira reconciliacao a contagem vem do banco.
+    assert await repo.count_nao_lidas(1, "RECEPCAO") == 3
+    assert db.notificacao.counts == 1
+
+    await reconciliar_contadores(db)
+    assert await repo.count_nao_lidas(1, "RECEPCAO") == 3
+    assert await repo.count_nao_lidas(1, "ADMIN") == 3
+    assert await repo.count_nao_lidas(1, None) == 1
+    assert db.notificacao.counts == 1
+
+    assert await repo.mark_as_read(multi["id"]) is True
+    assert await repo.count_nao_lidas(1, "ADMIN") == 2
+    assert await repo.mark_all_as_read(1, "RECEPCIONISTA") == 2
+    assert await repo.count_nao_lidas(1, "ADMIN") == 1
+    assert await repo.count_nao_lidas(1, "RECEPCAO") == 0
+
+    nova = await _criar(repo, "RECEPCAO")
+    assert await repo.count_nao_lidas(1, "RECEPCIONISTA") == 1
+    assert await repo.delete_by_id(nova["id"]) is True
+    assert await repo.count_nao_lidas(1, "RECEPCAO") == 0
+    assert db.notificacao.counts == 1
+
+
+@pytest.mark.asyncio
+async def test_reconciliar_corrige_deriva(redis_contadores):
+    db = FakeDbNotificacoes()
+    repo = NotificacaoRepository(db)
+    await _criar(repo, "ADMIN")
+    await reconciliar_contadores(db)
+
+    # Alteracao por fora dos hooks (ex.: retencao apagando nao lidas).
+    db.notificacao.linhas.clear()
+    redis_contadores.hashes[NAO_LIDAS_KEY]["RECEPCAO"] = "-2"
+    assert await repo.count_nao_lidas(1, "ADMIN") == 1
+
+    resultado = await reconciliar_contadores(db)
+
+    assert resultado["corrigidos"] == ["ADMIN", "RECEPCAO"]
+    assert redis_contadores.hashes[NAO_LIDAS_KEY] == {NAO_LIDAS_PRONTO: "1"}
+    assert await repo.count_nao_lidas(1, "ADMIN") == 0
+
+
+@pytest.mark.asyncio
+async def test_reconciliar_preserva_ajuste_concorrente(redis_contadores):
+    db = FakeDbNotificacoes()
+    repo = NotificacaoRepository(db)
+    await _criar(repo, "ADMIN")
+    await reconciliar_contadores(db)
+
+    # Deriva a corrigir, e uma notificacao nova criada entre o GROUP BY e a correcao.
+    redis_contadores.hashes[NAO_LIDAS_KEY]["ADMIN"] = "5"
+
+    async def nova_durante_reconciliacao():
+        await _criar(repo, "RECEPCAO")
+
+    redis_contadores.apos_leitura = nova_durante_reconciliacao
+    resultado = await reconciliar_contadores(db)
+
+    assert resultado["corrigidos"] == ["ADMIN"]
+    assert await repo.count_nao_lidas(1, "ADMIN") == 1
+    assert await repo.count_nao_lidas(1, "RECEPCAO") == 1
@@ -0,0 +1,143 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.celery_app import celery_app
+from app.services import notification_service
+from app.services.notificacao_fanout_service import ENTREGA_TASK
+from app.services.notification_service import NotificationService
+from app.utils.datetime_utils import now_utc
+
+
+class FakeDbFanout:
+    """Emula o INSERT ... ON CONFLICT (chave_evento) DO NOTHING do fan-out."""
+
+    def __init__(self):
+        self.linhas = {}
+        self.consultas = []
+        self.cupomuso = SimpleNamespace(find_first=self._sem_cupom)
+        self.cliente = SimpleNamespace(find_unique=self._cliente)
+
+    async def _sem_cupom(self, where):
+        return None
+
+    async def _cliente(self, where):
+        return SimpleNamespace(nomeCompleto="Joao Silva", documento="111", email="j@x.com", telefone="+5522999990000")
+
+    async def query_raw(self, sql, *args):
+        if sql.lstrip().startswith("SELECT"):
+            # Releitura das chaves que conflitaram
+            return [self.linhas[chave] for chave in args[0] if chave in self.linhas]
+        assert "ON CONFLICT (chave_evento) DO NOTHING" in sql
+        self.consultas.append(sql)
+        colunas = ("chave_evento", "titulo", "mensagem", "tipo", "categoria", "perfil", "url_acao", "reserva_id", "pagamento_id")
+        novas = []
+        for linha in zip(*args[1:10]):
+            dados = dict(zip(colunas, linha))
+            chave = dados["chave_evento"]
+            if chave is not None and chave in self.linhas:
+                continue
+            registro = {**dados, "id": len(self.linhas) + 1, "lida": False, "data_criacao": now_utc()}
+            self.linhas[chave or f"sem-chave-{registro['id']}"] = registro
+            novas.append(registro)
+        return novas
+
+
+class FakeWhatsAppReserva:
+    def __init__(self):
+        self.calls = []
+
+    async def enviar_confirmacao_reserva_cliente(self, **kwargs):
+        self.calls.append(("cliente", kwargs))
+
+    async def enviar_notificacao_nova_reserva_admin(self, **kwargs):
+        self.calls.append(("admin", kwargs))
+
+
+class FakeEmailService:
+    calls = []
+
+    async def enviar_notificacao_nova_reserva(self, reserva, cliente):
+        self.calls.append((reserva, cliente))
+
+
+RESERVA = {
+    "id": 10,
+    "codigoReserva": "RCF-10",
+    "clienteId": 5,
+    "clienteNome": "Joao Silva",
+    "quartoNumero": "201",
+    "valorDiaria": 1200,
+    "numDiarias": 2,
+}
+
+
+@pytest.mark.asyncio
+async def test_nova_reserva_grava_em_um_insert_e_enfileira_um_job(monkeypatch):
+    enfileirados = []
+    monkeypatch.setattr(celery_app, "send_task", lambda nome, kwargs, retry: enfileirados.append((nome, kwargs)))
+    db = FakeDbFanout()
+
+    await NotificationService.notificar_nova_reserva(db, RESERVA)
+    await NotificationService.notificar_nova_reserva(db, RESERVA)  # retry do mesmo evento
+
+    assert len(db.consultas) == 2
+    assert sorted(db.linhas) == ["reserva.nova:10|ADMIN,FINANCEIRO", "reserva.nova:10|ADMIN,RECEPCAO"]
+    assert [nome for nome, _ in enfileirados] == [ENTREGA_TASK]
+    assert enfileirados[0][1]["evento"] == "reserva.nova"
+    assert enfileirados[0][1]["dados"]["valor_total"] == 2400.0
+
+
+@pytest.mark.asyncio
+async def test_sem_broker_a_entrega_roda_no_request(monkeypatch):
+    def broker_fora(*args, **kwargs):
+        raise ConnectionError("broker fora")
+
+    whatsapp = FakeWhatsAppReserva()
+    FakeEmailService.calls = []
+    monkeypatch.setattr(celery_app, "send_task", broker_fora)
+    monkeypatch.setattr(notification_service, "get_whatsapp_service", lambda: whatsapp)
+    monkeypatch.setattr(notification_service, "EmailService", FakeEmailService)
+    db = FakeDbFanout()
+
+    await NotificationService.notificar_nova_reserva(db, RESERVA)
+
+    assert [destino for destino, _ in whatsapp.calls] == ["cliente", "admin"]
+    assert whatsapp.calls[0][1]["cliente_telefone"] == "+5522999990000"
+    assert FakeEmailService.calls[0][0]["codigo_reserva"] == "RCF-10"
+
+
+@pytest.mark.asyncio
+async def test_pagamento_recusado_notifica_dois_perfis_com_uma_consulta():
+    db = FakeDbFanout()
+    pagamento = {"id": 7, "valor": 350}
+    reserva = {"id": 10, "codigoReserva": "RCF-10"}
+
+    await NotificationService.notificar_pagamento_recusado(db, pagamento, reserva)
+    await NotificationService.notificar_pagamento_recusado(db, pagamento, reserva)
+
+    assert len(db.consultas) == 2
+    assert sorted(db.linhas) == ["pagamento.recusado:7|ADMIN", "pagamento.recusado:7|RECEPCAO"]
+
+
+class FakeDbConcorrente(FakeDbFanout):
+    """O INSERT perde para um concorrente que commitou depois do snapshot."""
+
+    async def query_raw(self, sql, *args):
+        if "ON CONFLICT" in sql:
+            self.consultas.append(sql)
+            for chave in args[1]:
+                self.linhas[chave] = {"id": 99, "chave_evento": chave, "perfil": "RECEPCAO", "lida": True}
+            return []
+        return await super().query_raw(sql, *args)
+
+
+@pytest.mark.asyncio
+async def test_perdedor_da_corrida_devolve_a_notificacao_do_vencedor():
+    db = FakeDbConcorrente()
+
+    notificacao = await NotificationService.notificar_checkout_pendente(
+        db, {"id": 10, "quarto_numero": "201", "cliente_nome": "Joao Silva"}
+    )
+
+    assert notificacao["id"] == 99 and notificacao["lida"] is True
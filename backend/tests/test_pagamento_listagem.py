@@ -0,0 +1,81 @@
+import pytest
+from fastapi import HTTPException
+
+from app.repositories.pagamento_repo import PagamentoRepository
+from app.services.pagamento_service import PagamentoService
+
+
+class FakeDbListagem:
+    def __init__(self, linhas, resumo=None):
+        self.linhas = linhas
+        self.resumo = resumo or []
+        self.consultas = []
+
+    async def query_raw(self, sql, *params):
+        self.consultas.append((sql, params))
+        if "GROUP BY" in sql:
+            return self.resumo
+        return self.linhas[: params[-1]]
+
+
+def _service(db):
+    service = PagamentoService.__new__(PagamentoService)
+    service.pagamento_repo = PagamentoRepository(db)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_listagem_padrao_nao_faz_join_e_devolve_cursor_da_proxima_pagina():
+    linhas = [{"id": i, "status": "APROVADO", "valor": 10.0} for i in (9, 8, 7)]
+    db = FakeDbListagem(linhas)
+
+    resultado = await PagamentoRepository(db).listar(
+        status=["aprovado"], cursor=10, limite=2, campos=["status", "valor"], com_resumo=False
+    )
+
+    sql, params = db.consultas[0]
+    assert "JOIN" not in sql
+    assert "p.id < $2" in sql and "ORDER BY p.id DESC" in sql
+    assert params == (["APROVADO"], 10, 3)
+    assert resultado == {
+        "pagamentos": [
+            {"id": 9, "status": "APROVADO", "valor": 10.0},
+            {"id": 8, "status": "APROVADO", "valor": 10.0},
+        ],
+        "proximo_cursor": 8,
+    }
+    assert len(db.consultas) == 1
+
+
+@pytest.mark.asyncio
+async def test_listagem_so_faz_join_da_relacao_pedida_e_resume_por_status_em_sql():
+    db = FakeDbListagem(
+        [{"id": 1, "cliente_nome": "Ana"}],
+        resumo=[
+            {"status": "APROVADO", "quantidade": 3, "valor": 300.5},
+            {"status": "PENDENTE", "quantidade": 1, "valor": 50},
+        ],
+    )
+
+    resultado = await _service(db).listar(campos=["cliente_nome"], cliente_id=5)
+
+    sql_pagina, _ = db.consultas[0]
+    sql_resumo, params_resumo = db.consultas[1]
+    assert "LEFT JOIN clientes c" in sql_pagina and "JOIN reservas" not in sql_pagina
+    assert "GROUP BY p.status_pagamento" in sql_resumo and "LIMIT" not in sql_resumo
+    assert params_resumo == (5,)
+    assert resultado["proximo_cursor"] is None
+    assert resultado["total"] == 4
+    assert resultado["resumo"]["valor_total"] == 350.5
+    assert resultado["resumo"]["por_status"]["PENDENTE"] == {"quantidade": 1, "valor": 50.0}
+
+
+@pytest.mark.asyncio
+async def test_listagem_rejeita_campo_desconhecido_sem_consultar_o_banco():
+    db = FakeDbListagem([])
+
+    with pytest.raises(HTTPException) as erro:
+        await _service(db).listar(campos=["id", "senha"])
+
+    assert erro.value.status_code == 400
+    assert db.consultas == []
@@ -0,0 +1,146 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.repositories.pontos_repo import PontosRepository
+
+
+AGORA = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeDbLiberacao:
+    """Interpreta apenas o SQL usado pela liberacao em lote."""
+
+    def __init__(self, transacoes, saldos):
+        self.transacoes = {t["id"]: dict(t) for t in transacoes}
+        self.saldos = {s["id"]: dict(s) for s in saldos}
+        self.updates_saldo = 0
+        self.lotes = 0
+
+    @asynccontextmanager
+    async def tx(self):
+        self.lotes += 1
+        yield self
+
+    async def query_raw(self, sql, *args):
+        if "FROM transacoes_pontos" in sql and "SKIP LOCKED" in sql:
+            if "ESTORNO" in sql:
+                ultimo_id, limite = args
+                linhas = [
+                    t for t in sorted(self.transacoes.values(), key=lambda t: t["id"])
+                    if t["tipo"] == "ESTORNO" and t["status"] == "pendente" and t["id"] > ultimo_id
+                ]
+            else:
+                agora, limite, ultimo_id = args
+                linhas = [
+                    t for t in sorted(self.transacoes.values(), key=lambda t: t["id"])
+                    if t["status"] == "pendente" and t["liberar_em"] and t["liberar_em"] <= agora
+                    and t["id"] > ultimo_id
+                ]
+            return [dict(t) for t in linhas[:limite]]
+        if "FROM usuarios_pontos" in sql:
+            return [dict(self.saldos[i]) for i in sorted(args) if i in self.saldos]
+        if "FROM logs_jornada" in sql:
+            return [{"id": 1}]
+        return []
+
+    async def execute_raw(self, sql, *args):
+        if "UPDATE usuarios_pontos" in sql:
+            self.updates_saldo += 1
+            for i in range(0, len(args), 4):
+                saldo = self.saldos[args[i]]
+                saldo["saldo"] += args[i + 1]
+                saldo["pontos_nivel"] += args[i + 2]
+                saldo["pontos_pendentes"] = max(0, saldo["pontos_pendentes"] + args[i + 3])
+        elif "UPDATE transacoes_pontos" in sql and "FROM (VALUES" in sql:
+            status, valores = args[0], args[1:]
+            for i in range(0, len(valores), 3):
+                transacao = self.transacoes[valores[i]]
+                transacao.update(status=status, saldo_anterior=valores[i + 1], saldo_posterior=valores[i + 2])
+        elif "UPDATE transacoes_pontos" in sql:
+            status, ids = args[0], args[1:]
+            for transacao_id in ids:
+                self.transacoes[transacao_id]["status"] = status
+        return 1
+
+
+def _transacao(id, usuario_pontos_id, pontos, tipo="CREDITO", origem="PROMO", liberar_em=AGORA - timedelta(hours=1)):
+    return {
+        "id": id,
+        "cliente_id": usuario_pontos_id * 10,
+        "usuario_pontos_id": usuario_pontos_id,
+        "reserva_id": None,
+        "tipo": tipo,
+        "origem": origem,
+        "pontos": pontos,
+        "status": "pendente",
+        "liberar_em": liberar_em,
+        "metadata": None,
+        "created_at": AGORA - timedelta(days=2),
+    }
+
+
+@pytest.mark.asyncio
+async def test_liberacao_agrega_creditos_por_cliente_em_lotes():
+    db = FakeDbLiberacao(
+        transacoes=[
+            _transacao(1, 1, 10),
+            _transacao(2, 1, 5),
+            _transacao(3, 2, 7),
+            _transacao(4, 2, 0),
+            _transacao(5, 1, 9, liberar_em=AGORA + timedelta(hours=1)),
+        ],
+        saldos=[
+            {"id": 1, "saldo": 100, "pontos_nivel": 100, "pontos_pendentes": 24},
+            {"id": 2, "saldo": 0, "pontos_nivel": 0, "pontos_pendentes": 7},
+        ],
+    )
+
+    resultado = await PontosRepository(db).liberar_pontos_pendentes(limit=10, agora=AGORA, tamanho_lote=2)
+
+    assert resultado["total_liberadas"] == 3
+    assert db.saldos[1]["saldo"] == 115 and db.saldos[1]["pontos_nivel"] == 115
+    assert db.saldos[2]["saldo"] == 7
+    assert db.saldos[1]["pontos_pendentes"] == 9
+    assert db.saldos[2]["pontos_pendentes"] == 0
+    assert (db.transacoes[1]["saldo_anterior"], db.transacoes[1]["saldo_posterior"]) == (100, 110)
+    assert (db.transacoes[2]["saldo_anterior"], db.transacoes[2]["saldo_posterior"]) == (110, 115)
+    assert db.transacoes[4]["status"] == "bloqueado"
+    assert db.transacoes[5]["status"] == "pendente"
+    assert db.updates_saldo == db.lotes - 1
+
+
+@pytest.mark.asyncio
+async def test_liberacao_avanca_cursor_apos_creditos_sem_saldo():
+    recente = _transacao(1, 9, 10)
+    recente["created_at"] = AGORA - timedelta(hours=2)  # sem usuarios_pontos, ainda dentro das 24h
+    db = FakeDbLiberacao(
+        transacoes=[recente, dict(_transacao(2, 9, 5), created_at=recente["created_at"]), _transacao(3, 1, 7)],
+        saldos=[{"id": 1, "saldo": 0, "pontos_nivel": 0, "pontos_pendentes": 7}],
+    )
+
+    resultado = await PontosRepository(db).liberar_pontos_pendentes(limit=10, agora=AGORA, tamanho_lote=2)
+
+    assert [t["transacao_id"] for t in resultado["transacoes"]] == [3]
+    assert db.transacoes[1]["status"] == db.transacoes[2]["status"] == "pendente"
+    assert db.lotes == 2
+
+
+@pytest.mark.asyncio
+async def test_estornos_em_lote_aplicam_enquanto_ha_saldo():
+    db = FakeDbLiberacao(
+        transacoes=[
+            _transacao(1, 1, -30, tipo="ESTORNO", liberar_em=None),
+            _transacao(2, 1, -30, tipo="ESTORNO", liberar_em=None),
+        ],
+        saldos=[{"id": 1, "saldo": 40, "pontos_nivel": 80, "pontos_pendentes": 0}],
+    )
+
+    resultado = await PontosRepository(db).retentar_estornos_pendentes(limit=10, agora=AGORA)
+
+    assert resultado["total_aplicados"] == 1
+    assert db.saldos[1]["saldo"] == 10
+    assert db.saldos[1]["pontos_nivel"] == 80
+    assert db.transacoes[1]["status"] == "estornado"
+    assert db.transacoes[2]["status"] == "pendente"
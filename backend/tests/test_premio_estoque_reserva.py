@@ -0,0 +1,150 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.repositories.premio_repo_atomic import PremioRepositoryAtomic
+
+
+class FakeModelCreate:
+    def __init__(self, id, **extra):
+        self.id = id
+        self.extra = extra
+
+    async def create(self, data):
+        return SimpleNamespace(id=self.id, **{**data, **self.extra})
+
+
+class FakeTxResgate:
+    def __init__(self, db):
+        self.db = db
+        self.queries = []
+        self.transacaopontos = FakeModelCreate(10)
+        self.resgatepremio = FakeModelCreate(20)
+        self.codigoresgate = FakeModelCreate(30)
+
+    async def __aenter__(self):
+        self.db.em_transacao = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.db.em_transacao = False
+        return False
+
+    async def query_raw(self, query, *args):
+        self.queries.append(query)
+        if "FROM usuarios_pontos" in query:
+            return [{"id": 7, "saldo": self.db.saldo}]
+        return []
+
+    async def execute_raw(self, query, *args):
+        self.queries.append(query)
+        if "UPDATE usuarios_pontos" in query:
+            self.db.saldo = args[0]
+        return 1
+
+
+class FakeDbEstoque:
+    def __init__(self, estoque, saldo):
+        self.estoque = estoque
+        self.saldo = saldo
+        self.em_transacao = False
+        self.reservas_em_transacao = 0
+        self._tx = FakeTxResgate(self)
+
+    def tx(self):
+        return self._tx
+
+    async def query_raw(self, query, *args):
+        if "FROM clientes" in query:
+            return [{"id": args[0], "nomeCompleto": "Ana", "telefone": None, "enderecoCompleto": None}]
+        if "UPDATE premios" in query:
+            if self.em_transacao:
+                self.reservas_em_transacao += 1
+            if self.estoque is None or self.estoque <= 0:
+                return []
+            self.estoque -= 1
+            return [{"estoque": self.estoque}]
+        if "FROM premios" in query:
+            return [{
+                "id": args[0],
+                "nome": "Cafe colonial",
+                "ativo": True,
+                "estoque": self.estoque,
+                "preco_em_pontos": 50,
+                "categoria": "Gastronomia",
+                "categoria_id": None,
+            }]
+        return []
+
+    async def execute_raw(self, query, *args):
+        if "UPDATE premios" in query and "estoque + 1" in query:
+            self.estoque += 1
+        return 1
+
+
+@pytest.fixture
+def repo_sem_notificacao(monkeypatch):
+    async def _sem_notificacao(self, *args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PremioRepositoryAtomic, "_notificar_resgate", _sem_notificacao)
+    monkeypatch.setattr(PremioRepositoryAtomic, "_gerar_codigo_resgate", lambda self, tx: _codigo())
+
+
+async def _codigo():
+    return "ABC-123"
+
+
+@pytest.mark.asyncio
+async def test_resgate_reserva_estoque_fora_da_transacao(repo_sem_notificacao):
+    db = FakeDbEstoque(estoque=3, saldo=80)
+
+    result = await PremioRepositoryAtomic(db)._resgatar_atomic_tx(1, 5, None, None)
+
+    assert result["success"] is True
+    assert result["novo_saldo"] == 30
+    assert db.estoque == 2
+    assert db.reservas_em_transacao == 0
+    assert not any("FROM premios" in q for q in db._tx.queries)
+
+
+@pytest.mark.asyncio
+async def test_resgate_sem_saldo_devolve_estoque_reservado(repo_sem_notificacao):
+    db = FakeDbEstoque(estoque=1, saldo=10)
+
+    result = await PremioRepositoryAtomic(db)._resgatar_atomic_tx(1, 5, None, None)
+
+    assert result["success"] is False
+    assert "Saldo insuficiente" in result["error"]
+    assert db.estoque == 1
+
+
+@pytest.mark.asyncio
+async def test_resgate_devolve_estoque_quando_transacao_falha(repo_sem_notificacao, monkeypatch):
+    db = FakeDbEstoque(estoque=2, saldo=80)
+
+    async def _falha(*args, **kwargs):
+        raise RuntimeError("conexao perdida")
+
+    monkeypatch.setattr(db._tx.resgatepremio, "create", _falha)
+
+    with pytest.raises(RuntimeError):
+        await PremioRepositoryAtomic(db)._resgatar_atomic_tx(1, 5, None, None)
+
+    assert db.estoque == 2
+
+
+@pytest.mark.asyncio
+async def test_resgate_perde_corrida_pelo_ultimo_item(repo_sem_notificacao):
+    db = FakeDbEstoque(estoque=1, saldo=80)
+    repo = PremioRepositoryAtomic(db)
+
+    async def _outro_cliente_levou(premio_id):
+        db.estoque = 0
+        return False
+
+    repo._reservar_estoque = _outro_cliente_levou
+    result = await repo._resgatar_atomic_tx(1, 5, None, None)
+
+    assert result == {"success": False, "error": "Premio sem estoque disponivel"}
+    assert db.saldo == 80
@@ -177,7 +177,8 @@ async def test_transacao_pendente_nao_altera_saldo_imediatamente():
     assert resultado["status"] == "pendente"
     assert resultado["saldo_anterior"] == 72
     assert resultado["saldo_posterior"] == 72
-    assert db._tx.execute_calls == []
+    assert not [call for call in db._tx.execute_calls if "SET saldo" in call[0]]
+    assert [call[1:] for call in db._tx.execute_calls if "pontos_pendentes" in call[0]] == [(6, 7)]
     assert db._tx.transacaopontos.created_data["status"] == "pendente"
 
 
@@ -0,0 +1,201 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.repositories.reserva_repo import (
+    CONFLITO_CLIENTE_RESERVA_ATIVA,
+    CONFLITO_QUARTO_INDISPONIVEL,
+    ReservaConflito,
+    ReservaRepository,
+)
+from app.schemas.reserva_schema import ReservaCreate
+
+
+CHECKIN = datetime(2026, 5, 10, 14, 0)
+CHECKOUT = CHECKIN + timedelta(days=2)
+
+
+class _FakeTabela:
+    def __init__(self, **metodos):
+        for nome, metodo in metodos.items():
+            setattr(self, nome, metodo)
+
+
+class _FakeDbReserva:
+    def __init__(self):
+        self.chamadas = []
+        conflito = SimpleNamespace(
+            id=3,
+            codigoReserva="RCF-OCUPADA",
+            clienteNome="Hospede Antigo",
+            quartoNumero="101",
+            checkinPrevisto=CHECKIN,
+            checkoutPrevisto=CHECKOUT,
+            statusReserva="CONFIRMADA",
+        )
+
+        async def cliente_find_unique(where):
+            return SimpleNamespace(id=1, nomeCompleto="Cliente Novo")
+
+        async def quarto_find_unique(where):
+            self.chamadas.append("quarto.find_unique")
+            return SimpleNamespace(id=5, numero=where["numero"], status="LIVRE", tipoSuite="LUXO")
+
+        async def quarto_find_many(where=None):
+            self.chamadas.append("alternativas")
+            return [SimpleNamespace(id=5, numero="101", status="LIVRE", tipoSuite="LUXO"),
+                    SimpleNamespace(id=6, numero="102", status="LIVRE", tipoSuite="LUXO")]
+
+        async def reserva_find_many(where=None, include=None):
+            if "clienteId" in where:
+                return []
+            self.chamadas.append("conflitos")
+            return [conflito]
+
+        async def reserva_create(data):
+            self.chamadas.append("insert")
+            raise Exception('violates exclusion constraint "reservas_quarto_periodo_no_overlap"')
+
+        self.cliente = _FakeTabela(find_unique=cliente_find_unique)
+        self.quarto = _FakeTabela(find_unique=quarto_find_unique, find_many=quarto_find_many)
+        self.reserva = _FakeTabela(find_many=reserva_find_many, create=reserva_create)
+
+
+def _repo(db):
+    repo = ReservaRepository(db)
+
+    async def tarifa(*args):
+        return 350.0, None
+
+    repo._obter_tarifa_diaria = tarifa
+    return repo
+
+
+def _reserva():
+    return ReservaCreate(
+        cliente_id=1,
+        quarto_numero="101",
+        tipo_suite="LUXO",
+        checkin_previsto=CHECKIN,
+        checkout_previsto=CHECKOUT,
+        num_diarias=2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_insercao_otimista_vai_direto_ao_insert_e_monta_conflito_na_falha(monkeypatch):
+    monkeypatch.setattr(settings, "RESERVA_INSERCAO_OTIMISTA", True)
+    db = _FakeDbReserva()
+
+    with pytest.raises(ReservaConflito) as erro:
+        await _repo(db).create(_reserva(), notificar=False)
+
+    # Quarto carregado uma vez; conflitos e alternativas consultados juntos.
+    assert db.chamadas == ["quarto.find_unique", "insert", "conflitos", "alternativas", "conflitos"]
+    mensagem = str(erro.value)
+    assert "RCF-OCUPADA" in mensagem
+    assert "Quarto 102" in mensagem
+    detalhes = erro.value.detalhes()
+    assert detalhes["codigo"] == CONFLITO_QUARTO_INDISPONIVEL
+    assert [c["codigo"] for c in detalhes["conflitos"]] == ["RCF-OCUPADA"]
+    assert detalhes["alternativas"] == [{"numero": "102", "tipo_suite": "LUXO"}]
+    assert "conflitos" not in erro.value.detalhes(publico=True)
+
+
+@pytest.mark.asyncio
+async def test_checagem_previa_rejeita_sem_tentar_insert(monkeypatch):
+    monkeypatch.setattr(settings, "RESERVA_INSERCAO_OTIMISTA", False)
+    monkeypatch.setattr(cache, "redis", None)
+    db = _FakeDbReserva()
+
+    with pytest.raises(ValueError) as erro:
+        await _repo(db).create(_reserva(), notificar=False)
+
+    assert "insert" not in db.chamadas
+    assert "RCF-OCUPADA" in str(erro.value)
+
+
+@pytest.mark.asyncio
+async def test_leituras_independentes_em_paralelo_e_conflito_do_cliente_estruturado(monkeypatch):
+    monkeypatch.setattr(settings, "RESERVA_INSERCAO_OTIMISTA", True)
+    db = _FakeDbReserva()
+    em_voo = {"atual": 0, "pico": 0}
+    ativa = SimpleNamespace(
+        id=8,
+        codigoReserva="RCF-DOCLIENTE",
+        quartoNumero="204",
+        checkinPrevisto=CHECKIN + timedelta(days=1),
+        checkoutPrevisto=CHECKOUT + timedelta(days=1),
+        statusReserva="CONFIRMADA",
+    )
+
+    def lenta(resultado):
+        async def consulta(*args, **kwargs):
+            em_voo["atual"] += 1
+            em_voo["pico"] = max(em_voo["pico"], em_voo["atual"])
+            await asyncio.sleep(0.01)
+            em_voo["atual"] -= 1
+            return resultado
+        return consulta
+
+    db.cliente.find_unique = lenta(SimpleNamespace(id=1, nomeCompleto="Cliente Novo"))
+    db.reserva.find_many = lenta([ativa])
+    db.quarto.find_unique = lenta(SimpleNamespace(id=5, numero="101", status="LIVRE", tipoSuite="LUXO"))
+    repo = _repo(db)
+    repo._obter_tarifa_diaria = lenta((350.0, None))
+
+    with pytest.raises(ReservaConflito) as erro:
+        await repo.create(_reserva(), notificar=False)
+
+    assert em_voo["pico"] == 4
+    assert erro.value.codigo == CONFLITO_CLIENTE_RESERVA_ATIVA
+    assert erro.value.conflitos[0]["codigo"] == "RCF-DOCLIENTE"
+    assert "insert" not in db.chamadas
+
+
+@pytest.mark.asyncio
+async def test_lock_postgres_checa_e_insere_na_transacao_do_lock(monkeypatch):
+    monkeypatch.setattr(settings, "RESERVA_INSERCAO_OTIMISTA", False)
+    monkeypatch.setattr(cache, "redis", None)
+    db = _FakeDbReserva()
+    comandos = []
+
+    async def execute_raw(sql, *args):
+        comandos.append(sql)
+
+    async def query_raw(sql, *args):
+        return [{"token": 1}]
+
+    async def tx_find_many(where=None, include=None):
+        db.chamadas.append("tx.conflitos")
+        return []
+
+    async def tx_create(data):
+        db.chamadas.append("tx.insert")
+        raise Exception('violates exclusion constraint "reservas_quarto_periodo_no_overlap"')
+
+    transacao = SimpleNamespace(
+        execute_raw=execute_raw,
+        query_raw=query_raw,
+        reserva=_FakeTabela(find_many=tx_find_many, create=tx_create),
+    )
+
+    @asynccontextmanager
+    async def tx(max_wait=None, timeout=None):
+        yield transacao
+
+    db.tx = tx
+
+    with pytest.raises(ReservaConflito):
+        await _repo(db).create(_reserva(), notificar=False)
+
+    # Uma conexao so: checagem e INSERT na transacao que segura o advisory lock.
+    assert db.chamadas[:3] == ["quarto.find_unique", "tx.conflitos", "tx.insert"]
+    assert "insert" not in db.chamadas
+    assert any("pg_advisory_xact_lock" in sql for sql in comandos)
+    assert "SAVEPOINT reserva_codigo" in comandos
@@ -0,0 +1,133 @@
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from app.core.cache import cache
+from app.services import reserva_lock_service as lock_module
+from app.services.reserva_lock_service import (
+    ReservaLockService,
+    ReservaLockTimeout,
+    chave_advisory,
+    chaves_lock,
+    metricas_lock,
+)
+
+
+class FakeRedisLock:
+    def __init__(self):
+        self.valores = {}
+
+    async def eval(self, script, numkeys, *args):
+        chaves, argv = list(args[:numkeys]), list(args[numkeys:])
+        if script == lock_module._ADQUIRIR_LUA:
+            fencing, travas = chaves[0], chaves[1:]
+            if any(chave in self.valores for chave in travas):
+                return 0
+            for chave in travas:
+                self.valores[chave] = argv[0]
+            self.valores[fencing] = int(self.valores.get(fencing, 0)) + 1
+            return self.valores[fencing]
+        liberadas = 0
+        for chave in chaves:
+            if self.valores.get(chave) == argv[0]:
+                del self.valores[chave]
+                liberadas += 1
+        return liberadas
+
+
+class FakeTransacao:
+    def __init__(self, erro_lock=None):
+        self.erro_lock = erro_lock
+        self.comandos = []
+
+    async def execute_raw(self, sql, *args):
+        self.comandos.append((sql, args))
+        if "pg_advisory_xact_lock" in sql and self.erro_lock:
+            raise self.erro_lock
+        return 1
+
+    async def query_raw(self, sql, *args):
+        return [{"token": 9001}]
+
+
+class FakeDbLock:
+    def __init__(self, erro_lock=None):
+        self.transacao = FakeTransacao(erro_lock)
+
+    @asynccontextmanager
+    async def tx(self, max_wait=None, timeout=None):
+        yield self.transacao
+
+
+@pytest.fixture(autouse=True)
+def metricas_limpas():
+    metricas_lock.reset()
+    yield
+    metricas_lock.reset()
+
+
+def test_chaves_por_quarto_e_balde_de_datas():
+    semana = chaves_lock(12, datetime(2026, 3, 2), datetime(2026, 3, 4), balde_dias=7)
+    longa = chaves_lock(12, datetime(2026, 3, 3), datetime(2026, 3, 20), balde_dias=7)
+
+    assert len(semana) == 1
+    assert semana[0] in longa and len(longa) == 3
+    assert not set(semana) & set(chaves_lock(13, datetime(2026, 3, 2), datetime(2026, 3, 4), balde_dias=7))
+    assert chave_advisory(semana[0]) == chave_advisory(semana[0])
+    assert -(2 ** 63) <= chave_advisory(semana[0]) < 2 ** 63
+
+
+@pytest.mark.asyncio
+async def test_redis_exclui_periodo_sobreposto_e_fencing_cresce(monkeypatch):
+    redis = FakeRedisLock()
+    monkeypatch.setattr(cache, "redis", redis)
+    service = ReservaLockService(backend="redis", timeout_segundos=0.05, ttl_segundos=10)
+    checkin, checkout = datetime(2026, 3, 2), datetime(2026, 3, 4)
+
+    async with service.bloquear(12, checkin, checkout) as primeiro:
+        assert primeiro.backend == "redis" and primeiro.ainda_valido()
+        with pytest.raises(ReservaLockTimeout):
+            async with service.bloquear(12, checkin, checkout):
+                pass
+        async with service.bloquear(13, checkin, checkout) as outro_quarto:
+            assert outro_quarto.fencing_token > primeiro.fencing_token
+
+    async with service.bloquear(12, checkin, checkout) as depois:
+        assert depois.fencing_token > primeiro.fencing_token
+
+    assert set(redis.valores) == {lock_module.RESERVA_LOCK_FENCING_KEY}
+    metricas = metricas_lock.snapshot()["redis"]
+    assert (metricas["adquiridos"], metricas["timeouts"]) == (3, 1)
+
+
+@pytest.mark.asyncio
+async def test_postgres_usa_advisory_xact_lock_e_traduz_lock_timeout(monkeypatch):
+    monkeypatch.setattr(cache, "redis", None)
+    db = FakeDbLock()
+    checkin, checkout = datetime(2026, 3, 2), datetime(2026, 3, 20)
+
+    async with ReservaLockService(db, backend="auto").bloquear(12, checkin, checkout) as lock:
+        assert (lock.backend, lock.fencing_token) == ("postgres", 9001)
+        # Escritas protegidas vao na mesma transacao que segura o lock.
+        assert lock.db is db.transacao and lock.ainda_valido()
+
+    travas = [args[0] for sql, args in db.transacao.comandos if "pg_advisory_xact_lock" in sql]
+    assert len(travas) == 3
+    assert travas == [chave_advisory(c) for c in sorted(chaves_lock(12, checkin, checkout))]
+
+    ocupado = FakeDbLock(erro_lock=Exception("canceling statement due to lock timeout"))
+    with pytest.raises(ReservaLockTimeout):
+        async with ReservaLockService(ocupado, backend="postgres").bloquear(12, checkin, checkout):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_backend_fora_do_ar_segue_sem_lock(monkeypatch):
+    monkeypatch.setattr(cache, "redis", None)
+
+    async with ReservaLockService(object(), backend="postgres").bloquear(1, "2026-03-02", "2026-03-03") as lock:
+        assert lock.backend == "nenhum" and lock.ainda_valido()
+        assert lock.db is not None
+
+    assert metricas_lock.snapshot()["postgres"]["falhas"] == 1
@@ -0,0 +1,101 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.repositories.reserva_repo import CAMPOS_RESERVA, CAMPOS_RESERVA_CARD, ReservaRepository
+
+
+def _reserva(reserva_id, hospedagem=None):
+    return SimpleNamespace(
+        id=reserva_id,
+        codigoReserva=f"RCF-{reserva_id}",
+        clienteId=1,
+        clienteNome="Ana",
+        quartoNumero="101",
+        tipoSuite="LUXO",
+        checkinPrevisto=datetime(2026, 5, 10, 14),
+        checkoutPrevisto=datetime(2026, 5, 12, 12),
+        checkinReal=None,
+        checkoutReal=None,
+        valorDiaria=100,
+        numDiarias=2,
+        valorTotal=200,
+        statusReserva="HOSPEDADO",
+        pagamentos=[],
+        hospedagem=hospedagem,
+        cupomUso=None,
+        createdAt=datetime(2026, 5, 1),
+        updatedAt=None,
+    )
+
+
+class _FakeDbViews:
+    def __init__(self):
+        self.includes = []
+        self.consultas_raw = []
+        assinada = SimpleNamespace(
+            id=9, statusHospedagem="EM_ANDAMENTO", assinaturaCheckin="data:image/png;base64," + "A" * 5000,
+            checkinDados={"hospedes": []},
+        )
+        self.registros = [_reserva(2, hospedagem=assinada), _reserva(1)]
+
+        async def count(where=None):
+            return len(self.registros)
+
+        async def find_many(where=None, include=None, order=None, skip=None, take=None):
+            self.includes.append(include)
+            return self.registros
+
+        self.reserva = SimpleNamespace(count=count, find_many=find_many)
+
+    async def query_raw(self, sql, *params):
+        self.consultas_raw.append((sql, params))
+        return [{"reserva_id": 2, "id": 9, "status_hospedagem": "EM_ANDAMENTO"}]
+
+
+@pytest.mark.asyncio
+async def test_view_list_resume_hospedagem_sem_carregar_assinaturas():
+    db = _FakeDbViews()
+
+    resultado = await ReservaRepository(db).list_all(view="list")
+
+    assert "hospedagem" not in db.includes[0]
+    assert db.includes[0]["pagamentos"] is True
+    sql, params = db.consultas_raw[0]
+    assert "assinatura" not in sql and params == ([2, 1],)
+    reserva = resultado["reservas"][0]
+    assert set(reserva) == set(CAMPOS_RESERVA)
+    assert reserva["hospedagem"]["status_hospedagem"] == "EM_ANDAMENTO"
+    assert "assinatura_checkin" not in reserva["hospedagem"]
+    assert resultado["reservas"][1]["hospedagem"] is None
+
+
+@pytest.mark.asyncio
+async def test_view_card_e_fields_cortam_include_e_campos():
+    db = _FakeDbViews()
+    repo = ReservaRepository(db)
+
+    card = await repo.list_all(view="card")
+    so_status = await repo.list_all(fields=["status", "cupom_uso"])
+
+    assert db.includes[0] is None
+    assert db.consultas_raw == []
+    assert tuple(card["reservas"][0]) == CAMPOS_RESERVA_CARD
+    assert db.includes[1] == {"cupomUso": {"include": {"cupom": True}}}
+    assert so_status["reservas"][0] == {"id": 2, "status": "HOSPEDADO", "cupom_uso": None}
+
+
+@pytest.mark.asyncio
+async def test_view_detail_mantem_hospedagem_completa_e_view_invalida_falha():
+    db = _FakeDbViews()
+    repo = ReservaRepository(db)
+
+    detalhe = await repo.list_all()
+
+    assert db.includes[0] == repo._default_include()
+    assert detalhe["reservas"][0]["hospedagem"]["assinatura_checkin"].startswith("data:image")
+    with pytest.raises(ValueError):
+        await repo.list_all(view="completo")
+    with pytest.raises(ValueError):
+        await repo.list_all(fields=["senha"])
@@ -0,0 +1,121 @@
+import gzip
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.services.retencao_service import (
+    DIRETORIO_ESTATICO,
+    PoliticaRetencao,
+    RetencaoService,
+    diretorio_publico,
+)
+
+
+AGORA = datetime(2026, 7, 2, 4, 15, tzinfo=timezone.utc)
+
+
+class FakeDbRetencao:
+    """Cada tabela e uma lista de dicts com `data`; o filtro das politicas vira `data < limite`."""
+
+    def __init__(self, tabelas):
+        self.tabelas = {nome: [dict(l) for l in linhas] for nome, linhas in tabelas.items()}
+        self.deletes = []
+        self.updates = []
+
+    @asynccontextmanager
+    async def tx(self):
+        copia = {nome: list(linhas) for nome, linhas in self.tabelas.items()}
+        try:
+            yield self
+        except Exception:
+            self.tabelas = copia
+            raise
+
+    async def execute_raw(self, sql, *args):
+        self.updates.append(args)
+        return 2
+
+    async def query_raw(self, sql, *args):
+        assert "FOR UPDATE SKIP LOCKED" in sql and "RETURNING" in sql
+        tabela = sql.split("DELETE FROM", 1)[1].split()[0]
+        limite_data, lote = args
+        alvo = sorted((l for l in self.tabelas[tabela] if l["data"] < limite_data), key=lambda l: l["id"])[:lote]
+        ids = {l["id"] for l in alvo}
+        self.tabelas[tabela] = [l for l in self.tabelas[tabela] if l["id"] not in ids]
+        self.deletes.append((tabela, len(alvo)))
+        return alvo if "RETURNING *" in sql else [{"id": l["id"]} for l in alvo]
+
+
+def _linhas(quantidade, idade_dias):
+    return [{"id": i, "data": AGORA - timedelta(days=idade_dias), "acao": "otp_generate"} for i in range(1, quantidade + 1)]
+
+
+@pytest.mark.asyncio
+async def test_retencao_remove_em_lotes_com_teto_e_arquiva(tmp_path):
+    db = FakeDbRetencao({
+        "notificacoes": _linhas(5, 40) + [{"id": 99, "data": AGORA, "acao": None}],
+        "logs_jornada": _linhas(3, 200),
+    })
+    politicas = (
+        PoliticaRetencao("notificacoes_lidas", "notificacoes", "data < $1", dias=30),
+        PoliticaRetencao("logs_jornada", "logs_jornada", "data < $1", dias=180, arquivar=True),
+    )
+
+    resultado = await RetencaoService(db, politicas, diretorio_arquivo=str(tmp_path)).aplicar(
+        tamanho_lote=2, max_lotes=2, pausa_segundos=0, agora=AGORA
+    )
+
+    assert resultado["success"] is True and resultado["otps_expirados"] == 2
+    assert resultado["politicas"]["notificacoes_lidas"] == {
+        "removidos": 4, "arquivados": 0, "lotes": 2, "completa": False,
+    }
+    assert resultado["politicas"]["logs_jornada"] == {"removidos": 3, "arquivados": 3, "lotes": 2, "completa": True}
+    assert [l["id"] for l in db.tabelas["notificacoes"]] == [5, 99]
+    assert db.tabelas["logs_jornada"] == []
+
+    with gzip.open(tmp_path / "logs_jornada" / "logs_jornada-20260702.jsonl.gz", "rt", encoding="utf-8") as arquivo:
+        arquivadas = [json.loads(linha) for linha in arquivo]
+    assert [l["id"] for l in arquivadas] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_retencao_arquivo_com_erro_desfaz_o_lote_e_segue(tmp_path):
+    bloqueio = tmp_path / "logs_jornada"
+    bloqueio.write_text("arquivo no lugar do diretorio")
+    db = FakeDbRetencao({"logs_jornada": _linhas(2, 200), "otp_verificacoes": _linhas(2, 10)})
+    politicas = (
+        PoliticaRetencao("logs_jornada", "logs_jornada", "data < $1", dias=180, arquivar=True),
+        PoliticaRetencao("otp_verificacoes", "otp_verificacoes", "data < $1", dias=7),
+    )
+
+    resultado = await RetencaoService(db, politicas, diretorio_arquivo=str(tmp_path)).aplicar(
+        pausa_segundos=0, agora=AGORA
+    )
+
+    assert resultado["success"] is False
+    assert "erro" in resultado["politicas"]["logs_jornada"]
+    assert len(db.tabelas["logs_jornada"]) == 2
+    assert resultado["politicas"]["otp_verificacoes"]["removidos"] == 2
+
+
+@pytest.mark.asyncio
+async def test_arquivo_fora_do_media_servido(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert not diretorio_publico(settings.RETENCAO_ARQUIVO_DIR)
+    assert diretorio_publico(os.path.join(DIRETORIO_ESTATICO, "arquivo"))
+
+    db = FakeDbRetencao({"logs_jornada": _linhas(2, 200)})
+    politicas = (PoliticaRetencao("logs_jornada", "logs_jornada", "data < $1", dias=180, arquivar=True),)
+
+    resultado = await RetencaoService(db, politicas, diretorio_arquivo="media/arquivo").aplicar(
+        pausa_segundos=0, agora=AGORA
+    )
+
+    # Nada apagado nem gravado sob /media.
+    assert "erro" in resultado["politicas"]["logs_jornada"]
+    assert len(db.tabelas["logs_jornada"]) == 2 and db.deletes == []
+    assert not (tmp_path / "media").exists()
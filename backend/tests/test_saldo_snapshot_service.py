@@ -0,0 +1,136 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.cache import cache
+from app.services.saldo_snapshot_service import SaldoSnapshotService, invalidar_snapshot_saldo
+
+
+class FakeRedis:
+    def __init__(self):
+        self.valores = {}
+
+    async def get(self, key):
+        return self.valores.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.valores[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.valores.pop(key, None)
+
+
+class FakeDbSnapshot:
+    def __init__(self, rows):
+        self.rows = rows
+        self.consultas = []
+
+    async def query_raw(self, sql, *args):
+        self.consultas.append((sql, args))
+        return self.rows
+
+
+@pytest.fixture
+def redis_fake(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "redis", redis)
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_snapshot_le_uma_vez_e_recarrega_apos_invalidar(redis_fake):
+    db = FakeDbSnapshot([{"id": 3, "saldo": 40, "pontos_nivel": 90, "pontos_pendentes": 12, "pontos_bloqueados": 5}])
+    service = SaldoSnapshotService(db)
+
+    primeiro = await service.obter(10)
+    segundo = await service.obter(10)
+
+    assert primeiro == segundo == {
+        "cliente_id": 10,
+        "usuario_pontos_id": 3,
+        "saldo": 40,
+        "pontos_nivel": 90,
+        "pendentes": 12,
+        "bloqueados": 5,
+    }
+    assert len(db.consultas) == 1
+    assert "SUM(" not in db.consultas[0][0]
+
+    db.rows = [{"id": 3, "saldo": 52, "pontos_nivel": 102, "pontos_pendentes": 0, "pontos_bloqueados": 5}]
+    await invalidar_snapshot_saldo(10)
+
+    assert (await service.obter(10))["saldo"] == 52
+    assert len(db.consultas) == 2
+
+
+@pytest.mark.asyncio
+async def test_snapshot_de_cliente_sem_pontos_nao_cria_linha(redis_fake):
+    db = FakeDbSnapshot([])
+
+    snapshot = await SaldoSnapshotService(db).obter(11)
+
+    assert snapshot["usuario_pontos_id"] is None
+    assert snapshot["saldo"] == snapshot["pendentes"] == snapshot["bloqueados"] == 0
+    assert json.loads(redis_fake.valores["pontos:snapshot:11"])["saldo"] == 0
+
+
+class FakeTxPontos:
+    def __init__(self):
+        self.transacaopontos = self
+
+    async def query_raw(self, sql, *args):
+        return [{"id": 3, "saldo": 40, "pontos_nivel": 90}]
+
+    async def execute_raw(self, sql, *args):
+        return 1
+
+    async def create(self, data):
+        return type("Transacao", (), {"id": 99})()
+
+
+@pytest.mark.asyncio
+async def test_transacao_com_tx_do_chamador_nao_invalida_antes_do_commit(redis_fake):
+    from app.repositories.pontos_repo import PontosRepository
+
+    redis_fake.valores["pontos:snapshot:10"] = json.dumps({"saldo": 40})
+
+    resultado = await PontosRepository(db=None).criar_transacao_pontos(
+        cliente_id=10, pontos=5, tipo="CREDITO", origem="PROMO", _tx=FakeTxPontos()
+    )
+
+    assert resultado["saldo_posterior"] == 45
+    # Quem abriu a transacao invalida depois do commit.
+    assert "pontos:snapshot:10" in redis_fake.valores
+
+
+@pytest.mark.asyncio
+async def test_rota_saldo_de_cliente_sem_linha_de_pontos(redis_fake):
+    import httpx
+    from fastapi import FastAPI
+
+    from app.api.v1 import pontos_routes
+    from app.middleware.auth_middleware import get_current_active_user
+    from app.repositories.pontos_repo import PontosRepository
+    from app.services.pontos_service import PontosService
+
+    class FakeDbClienteSemPontos(FakeDbSnapshot):
+        def __init__(self):
+            super().__init__([])
+            self.cliente = self
+
+        async def find_first(self, where):
+            return SimpleNamespace(id=where["id"], nomeCompleto="Cliente Novo")
+
+    app = FastAPI()
+    app.include_router(pontos_routes.router)
+    service = PontosService(PontosRepository(FakeDbClienteSemPontos()), None, None)
+    app.dependency_overrides[pontos_routes.get_pontos_service] = lambda: service
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=1)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste") as cliente:
+        resposta = await cliente.get("/pontos/saldo/77")
+
+    assert resposta.status_code == 200
+    assert resposta.json() == {"success": True, "saldo": 0, "usuario_pontos_id": 0, "error": None}
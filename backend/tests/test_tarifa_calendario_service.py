@@ -0,0 +1,85 @@
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.tarifa_calendario_service import TarifaCalendario, TarifaCalendarioCache, _serializar_tarifa
+
+
+def _tarifa(id, suite, inicio, fim, preco, temporada="Temporada"):
+    return SimpleNamespace(
+        id=id,
+        suiteTipo=suite,
+        temporada=temporada,
+        dataInicio=datetime(inicio.year, inicio.month, inicio.day, tzinfo=timezone.utc),
+        dataFim=datetime(fim.year, fim.month, fim.day, tzinfo=timezone.utc),
+        precoDiaria=preco,
+        ativo=True,
+    )
+
+
+class FakeTarifas:
+    def __init__(self, values):
+        self.values = values
+        self.chamadas = 0
+
+    async def find_many(self, **kwargs):
+        self.chamadas += 1
+        return self.values
+
+
+def _calendario(tarifas):
+    return TarifaCalendario([_serializar_tarifa(t) for t in tarifas])
+
+
+def test_cotacao_cruzando_temporadas_soma_cada_noite():
+    calendario = _calendario([
+        _tarifa(1, "LUXO", date(2026, 12, 1), date(2026, 12, 19), 300, "Baixa"),
+        _tarifa(2, "LUXO", date(2026, 12, 20), date(2027, 1, 5), 500, "Alta"),
+    ])
+
+    cotacao = calendario.cotar("luxo", date(2026, 12, 18), date(2026, 12, 22))
+
+    assert [n["preco_diaria"] for n in cotacao["noites"]] == [300, 300, 500, 500]
+    assert cotacao["preco_total"] == 1600
+    assert cotacao["preco_diaria"] == 300
+    assert cotacao["num_diarias"] == 4
+
+
+def test_noite_sem_tarifa_invalida_a_cotacao():
+    calendario = _calendario([
+        _tarifa(1, "MASTER", date(2026, 1, 1), date(2026, 1, 10), 400),
+    ])
+
+    assert calendario.cotar("MASTER", date(2026, 1, 9), date(2026, 1, 12)) is None
+    assert calendario.cotar("REAL", date(2026, 1, 2), date(2026, 1, 3)) is None
+
+
+def test_sobreposicao_legada_prefere_inicio_mais_recente():
+    calendario = _calendario([
+        _tarifa(1, "DUPLA", date(2026, 1, 1), date(2026, 12, 31), 200, "Ano"),
+        _tarifa(2, "DUPLA", date(2026, 7, 1), date(2026, 7, 31), 350, "Julho"),
+    ])
+
+    assert calendario.tarifa_em("DUPLA", date(2026, 7, 15))["id"] == 2
+    assert calendario.tarifa_em("DUPLA", date(2026, 8, 1))["id"] == 1
+    assert calendario.tarifa_em("DUPLA", date(2027, 1, 1)) is None
+
+
+@pytest.mark.asyncio
+async def test_cache_carrega_uma_vez_e_recarrega_apos_invalidar():
+    tarifas = FakeTarifas([_tarifa(1, "LUXO", date(2026, 1, 1), date(2026, 12, 31), 300)])
+    db = SimpleNamespace(tarifasuite=tarifas)
+    cache_calendario = TarifaCalendarioCache()
+
+    primeiro = await cache_calendario.obter(db)
+    segundo = await cache_calendario.obter(db)
+    assert primeiro is segundo
+    assert tarifas.chamadas == 1
+
+    tarifas.values = [_tarifa(1, "LUXO", date(2026, 1, 1), date(2026, 12, 31), 350)]
+    await cache_calendario.invalidar()
+    recarregado = await cache_calendario.obter(db)
+
+    assert tarifas.chamadas == 2
+    assert recarregado.tarifa_em("LUXO", date(2026, 3, 1))["preco_diaria"] == 350
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core import transicoes_reserva
+from app.core.transicoes_reserva import (
+    CANCELAR_RESERVA,
+    ESTADOS_FINAIS,
+    MARCAR_NO_SHOW,
+    REALIZAR_CHECKIN,
+    estado_canonico,
+    eventos_disponiveis,
+    mudanca_permitida,
+    validar_lote,
+    validar_transicao,
+)
+
+
+def test_tabela_compilada_aceita_status_legados():
+    assert estado_canonico("paga_aprovada") == "CONFIRMADA"
+    assert estado_canonico("CHECKIN_REALIZADO") == "HOSPEDADO"
+    assert estado_canonico("QUALQUER") is None
+    assert ESTADOS_FINAIS == {"CHECKED_OUT", "CANCELADO", "NO_SHOW"}
+
+    assert validar_transicao("AGUARDANDO_PAGAMENTO", "CONFIRMAR_PAGAMENTO") == (True, "CONFIRMADA")
+    assert validar_transicao("CANCELADA", CANCELAR_RESERVA) == (False, "Reserva já está cancelada")
+    assert validar_transicao("EM_ANALISE", REALIZAR_CHECKIN) == (
+        False,
+        "Reserva deve estar CONFIRMADA (atual: EM_ANALISE)",
+    )
+    assert mudanca_permitida("PENDENTE_PAGAMENTO", "NO_SHOW")
+    assert not mudanca_permitida("CHECKOUT_REALIZADO", "CANCELADA")
+    assert [evento for evento, _, _ in eventos_disponiveis("HOSPEDADO")] == ["REALIZAR_CHECKOUT", "CANCELAR_RESERVA"]
+    with pytest.raises(ValueError):
+        validar_transicao("PENDENTE", "TELEPORTAR")
+
+
+def test_guardas_so_rodam_com_contexto_e_celula_permitida(monkeypatch):
+    chamadas = []
+    original = transicoes_reserva.GUARDAS
+
+    def _contando(nome):
+        def guarda(ctx):
+            chamadas.append(nome)
+            return original[nome](ctx)
+        return guarda
+
+    monkeypatch.setattr(transicoes_reserva, "GUARDAS", {nome: _contando(nome) for nome in original})
+
+    assert validar_transicao("CONFIRMADA", REALIZAR_CHECKIN) == (True, "HOSPEDADO")
+    assert validar_transicao("PENDENTE", REALIZAR_CHECKIN, {"status_pagamento": "PAGO"})[0] is False
+    assert chamadas == []
+
+    pode, motivo = validar_transicao(
+        "CONFIRMADA", REALIZAR_CHECKIN, {"status_pagamento": "PENDENTE", "status_hospedagem": "NAO_INICIADA"}
+    )
+    assert (pode, motivo) == (False, "Pagamento deve estar CONFIRMADO (atual: PENDENTE)")
+    # A primeira guarda que falha interrompe a avaliacao.
+    assert chamadas == ["pagamento_aprovado"]
+
+
+def test_validar_lote_no_show_respeita_estado_e_prazo():
+    agora = datetime(2026, 3, 10, 15, 0, tzinfo=timezone.utc)
+    ontem = agora - timedelta(days=1)
+    reservas = [
+        {"id": 1, "status": "CONFIRMADA", "checkin_previsto": ontem, "status_hospedagem": "NAO_INICIADA"},
+        {"id": 2, "status": "PENDENTE_PAGAMENTO", "checkin_previsto": ontem},
+        {"id": 3, "status": "CONFIRMADA", "checkin_previsto": agora, "status_hospedagem": "NAO_INICIADA"},
+        {"id": 4, "status": "CHECKIN_REALIZADO", "checkin_previsto": ontem},
+        {"id": 5, "status": "CONFIRMADA", "checkin_previsto": ontem, "status_hospedagem": "CHECKIN_REALIZADO"},
+    ]
+
+    resultado = validar_lote(reservas, MARCAR_NO_SHOW, agora=agora)
+
+    assert resultado["validas"] == [1, 2]
+    assert resultado["destinos"] == {1: "NO_SHOW", 2: "NO_SHOW"}
+    assert resultado["invalidas"][3].startswith("Muito cedo para no-show")
+    assert resultado["invalidas"][4].startswith("No-show so se aplica")
+    assert resultado["invalidas"][5] == "Check-in já foi realizado (hospedagem: CHECKIN_REALIZADO)"
+
+    sem_guardas = validar_lote(reservas, MARCAR_NO_SHOW, avaliar_guardas=False, agora=agora)
+    assert sem_guardas["validas"] == [1, 2, 3, 5]
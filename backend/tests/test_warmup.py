@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.core import warmup
+from app.core.cache import cache
+from app.core.config import settings
+
+_sleep_real = asyncio.sleep
+
+
+class FakeDbWarmup:
+    def __init__(self, falhas_conexao=0):
+        self.falhas_conexao = falhas_conexao
+        self.conectado = False
+        self.simultaneas = 0
+        self.pico = 0
+
+    def is_connected(self):
+        return self.conectado
+
+    async def query_raw(self, sql, *args):
+        self.simultaneas += 1
+        self.pico = max(self.pico, self.simultaneas)
+        await _sleep_real(0)
+        self.simultaneas -= 1
+        return [{"?column?": 1}]
+
+
+@pytest.fixture(autouse=True)
+def sem_redis(monkeypatch):
+    monkeypatch.setattr(cache, "redis", None)
+
+    async def conectar_redis():
+        return None
+
+    monkeypatch.setattr(cache, "connect", conectar_redis)
+    monkeypatch.setenv("PRISMA_CONNECTION_LIMIT", "4")
+    monkeypatch.setattr(warmup.random, "uniform", lambda a, b: 0)
+    yield
+    warmup.estado_worker.reset()
+
+
+def _init_db_fake(db):
+    async def init_db():
+        if db.falhas_conexao:
+            db.falhas_conexao -= 1
+            raise TimeoutError("connect_timeout")
+        db.conectado = True
+
+    return init_db
+
+
+@pytest.mark.asyncio
+async def test_aquecer_worker_reconecta_abre_o_pool_e_so_entao_fica_pronto(monkeypatch):
+    db = FakeDbWarmup(falhas_conexao=2)
+    esperas = []
+    carregados = []
+
+    async def dormir(segundos):
+        esperas.append(segundos)
+
+    monkeypatch.setattr("app.core.database.init_db", _init_db_fake(db))
+    monkeypatch.setattr(warmup.asyncio, "sleep", dormir)
+
+    async def carregar(nome):
+        assert not warmup.estado_worker.pronto
+        carregados.append(nome)
+
+    monkeypatch.setattr(warmup, "_aquecer_quartos", lambda _db: carregar("quartos"))
+    monkeypatch.setattr(warmup, "_aquecer_tarifas", lambda _db: carregar("tarifas"))
+    monkeypatch.setattr(warmup, "_aquecer_jornada", lambda _db: carregar("jornada"))
+
+    resumo = await warmup.aquecer_worker(db)
+
+    assert esperas == [0.5, 1.0]
+    assert db.pico == 4
+    assert carregados == ["quartos", "tarifas", "jornada"]
+    assert warmup.estado_worker.pronto
+    assert resumo["fase"] == "pronto"
+    assert all(etapa["ok"] for etapa in resumo["etapas"].values())
+
+
+@pytest.mark.asyncio
+async def test_falha_de_cache_nao_segura_o_worker_mas_fica_registrada(monkeypatch):
+    db = FakeDbWarmup()
+    monkeypatch.setattr("app.core.database.init_db", _init_db_fake(db))
+
+    async def quebrado(_db):
+        raise RuntimeError("tarifas indisponiveis")
+
+    async def lento(_db):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(warmup, "_aquecer_quartos", quebrado)
+    monkeypatch.setattr(warmup, "_aquecer_tarifas", lento)
+    monkeypatch.setattr(settings, "WARMUP_TIMEOUT_SECONDS", 0.05)
+
+    resumo = await warmup.aquecer_worker(db)
+
+    assert warmup.estado_worker.pronto
+    assert resumo["etapas"]["quartos"] == {"ok": False, "ms": resumo["etapas"]["quartos"]["ms"], "erro": "tarifas indisponiveis"}
+    assert resumo["etapas"]["timeout"]["ok"] is False
+    assert "niveis_premios" not in resumo["etapas"]
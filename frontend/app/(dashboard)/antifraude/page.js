@@ -2,6 +2,26 @@
 import { useEffect, useState } from 'react'
 import { api } from '../../../lib/api'
 
+// Colunas usadas nas abas de pagamentos/transacoes; o backend pagina e projeta
+const PARAMS_PAGAMENTOS = {
+  campos: 'id,status,valor,metodo,cliente_id,cliente_nome,reserva_codigo,cielo_payment_id,risk_score,data_criacao',
+  limite: 200,
+}
+
+// Todas as paginas (cursor = proximo_cursor); o resumo so e pedido na primeira
+const carregarTodosPagamentos = async (params) => {
+  const pagamentos = []
+  let cursor = null
+  do {
+    const res = await api.get('/pagamentos', {
+      params: { ...params, ...(cursor ? { cursor, resumo: false } : {}) }
+    })
+    pagamentos.push(...(res.data.pagamentos || []))
+    cursor = res.data.proximo_cursor ?? null
+  } while (cursor)
+  return pagamentos
+}
+
 export default function Antifraude() {
   const [activeTab, setActiveTab] = useState('antifraude')
   const [operacoes, setOperacoes] = useState([])
@@ -79,16 +99,19 @@ export default function Antifraude() {
 
   const loadPagamentos = async () => {
     try {
-      const res = await api.get('/pagamentos')
+      const res = await api.get('/pagamentos', { params: PARAMS_PAGAMENTOS })
       const pags = res.data.pagamentos || []
       setPagamentos(pags)
       
-      // Calcular estatísticas
+      // Estatísticas do resumo (GROUP BY no backend), não só da página carregada
+      const resumo = res.data.resumo || {}
+      const porStatus = resumo.por_status || {}
+      const quantidade = (status) => porStatus[status]?.quantidade || 0
       setPagamentoStats({
-        total: pags.length,
-        pendentes: pags.filter(p => p.status === 'PENDING').length,
-        aprovados: pags.filter(p => p.status === 'APPROVED').length,
-        rejeitados: pags.filter(p => p.status === 'REJECTED' || p.status === 'CHARGEBACK').length
+        total: resumo.total || 0,
+        pendentes: quantidade('PENDING'),
+        aprovados: quantidade('APPROVED'),
+        rejeitados: quantidade('REJECTED') + quantidade('CHARGEBACK')
       })
     } catch (error) {
       console.error('Erro ao carregar pagamentos:', error)
@@ -98,17 +121,16 @@ export default function Antifraude() {
   const loadTransacoes = async () => {
     try {
       // Agrupar transações por cliente com dados de merchant
-      const res = await api.get('/pagamentos')
-      const pags = res.data.pagamentos || []
+      const pags = await carregarTodosPagamentos(PARAMS_PAGAMENTOS)
       
       // Agrupar por cliente e calcular totais
       const transacoesAgrupadas = {}
       pags.forEach(pag => {
-        const clienteKey = pag.cliente_nome || `Cliente #${pag.clienteId}`
+        const clienteKey = pag.cliente_nome || `Cliente #${pag.cliente_id}`
         if (!transacoesAgrupadas[clienteKey]) {
           transacoesAgrupadas[clienteKey] = {
             cliente: clienteKey,
-            clienteId: pag.clienteId,
+            clienteId: pag.cliente_id,
             totalTransacoes: 0,
             valorTotal: 0,
             aprovadas: 0,
@@ -130,8 +152,8 @@ export default function Antifraude() {
         
         trans.riscoMedio += pag.risk_score || 0
         
-        if (!trans.ultimaTransacao || new Date(pag.dataCriacao) > new Date(trans.ultimaTransacao)) {
-          trans.ultimaTransacao = pag.dataCriacao
+        if (!trans.ultimaTransacao || new Date(pag.data_criacao) > new Date(trans.ultimaTransacao)) {
+          trans.ultimaTransacao = pag.data_criacao
         }
       })
       
@@ -622,7 +644,7 @@ export default function Antifraude() {
                   pagamentos.map((pag) => (
                     <tr key={pag.id} className="border-b hover:bg-gray-50">
                       <td className="p-3">#{pag.id}</td>
-                      <td className="p-3 text-xs text-gray-600">{pag.cieloPaymentId}</td>
+                      <td className="p-3 text-xs text-gray-600">{pag.cielo_payment_id}</td>
                       <td className="p-3">{pag.cliente_nome}</td>
                       <td className="p-3">{pag.reserva_codigo}</td>
                       <td className="p-3 font-semibold">R$ {pag.valor?.toFixed(2)}</td>
@@ -647,7 +669,7 @@ export default function Antifraude() {
                         </span>
                       </td>
                       <td className="p-3 text-sm text-gray-600">
-                        {new Date(pag.dataCriacao).toLocaleDateString('pt-BR')}
+                        {new Date(pag.data_criacao).toLocaleDateString('pt-BR')}
                       </td>
                     </tr>
                   ))
@@ -150,7 +150,7 @@ export default function Dashboard() {
         return
       }
 
-      const res = await api.get('/reservas')
+      const res = await api.get('/reservas', { params: { view: 'card' } })
       if (res.data.reservas) {
         const latest = res.data.reservas.slice(0, 5)
         apiCache.set('dashboard:reservas', { all: res.data.reservas, latest })
@@ -171,14 +171,13 @@ export default function Dashboard() {
         return
       }
 
-      const res = await api.get('/pagamentos')
-      if (res.data.success && res.data.pagamentos) {
-        const total = res.data.pagamentos
-          .filter(p => p.status === 'APROVADO')
-          .reduce((acc, p) => acc + p.valor, 0)
-        const pendente = res.data.pagamentos
-          .filter(p => p.status === 'PENDENTE' || p.status === 'AGUARDANDO')
-          .reduce((acc, p) => acc + p.valor, 0)
+      // So o resumo (somas por status no backend); nenhuma linha e necessaria
+      const res = await api.get('/pagamentos', { params: { campos: 'id', limite: 1 } })
+      if (res.data.success && res.data.resumo) {
+        const porStatus = res.data.resumo.por_status || {}
+        const valor = (status) => porStatus[status]?.valor || 0
+        const total = valor('APROVADO')
+        const pendente = valor('PENDENTE') + valor('AGUARDANDO')
         const pagData = { total, pendente }
         apiCache.set('dashboard:pagamentos', pagData)
         setPagamentos(pagData)
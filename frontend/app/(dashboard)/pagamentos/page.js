@@ -11,12 +11,32 @@ import {
   isPagamentoNegado
 } from '../../../lib/constants/enums'
 import ModalTefGerencial from '../../../components/ModalTefGerencial'
+import { useEventosStaff } from '../../../hooks/useEventosStaff'
 
 const formatCurrency = (value) => {
   const numero = Number(value || 0)
   return numero.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' })
 }
 
+// Colunas que a tabela renderiza; o backend projeta so estas (sem JOINs extras).
+const CAMPOS_LISTAGEM = [
+  'id',
+  'status',
+  'valor',
+  'metodo',
+  'cliente_id',
+  'cliente_nome',
+  'cliente_email',
+  'reserva_id',
+  'reserva_codigo',
+  'quarto_numero',
+  'cartao_final',
+  'cielo_payment_id',
+  'risk_score',
+  'data_criacao',
+].join(',')
+const LIMITE_PAGINA = 50
+
 const formatDate = (dateString) => {
   if (!dateString) return '-'
   return new Date(dateString).toLocaleString('pt-BR')
@@ -30,6 +50,8 @@ export default function PagamentosPage() {
   const [pagamentoDetalhes, setPagamentoDetalhes] = useState(null)
   const [showTefGerencial, setShowTefGerencial] = useState(false)
   const [pendenciaStatus, setPendenciaStatus] = useState('')
+  const [proximoCursor, setProximoCursor] = useState(null)
+  const [carregandoMais, setCarregandoMais] = useState(false)
   const [stats, setStats] = useState({
     total: 0,
     pendentes: 0,
@@ -42,15 +64,23 @@ export default function PagamentosPage() {
     try {
       setLoading(true)
       setError('')
-      const res = await api.get('/pagamentos')
+      const res = await api.get('/pagamentos', {
+        params: { campos: CAMPOS_LISTAGEM, limite: LIMITE_PAGINA },
+      })
       const lista = res.data?.pagamentos || []
       setPagamentos(lista)
+      setProximoCursor(res.data?.proximo_cursor ?? null)
+
+      // Contagens vem do resumo (GROUP BY no backend), nao so da pagina exibida
+      const porStatus = Object.entries(res.data?.resumo?.por_status || {})
+      const contar = (filtro) =>
+        porStatus.filter(([status]) => filtro(status)).reduce((acc, [, item]) => acc + item.quantidade, 0)
       setStats({
-        total: res.data?.total || lista.length,
-        pendentes: lista.filter((p) => p.status === StatusPagamento.PENDENTE).length,
-        aprovados: lista.filter((p) => isPagamentoAprovado(p.status)).length,
-        rejeitados: lista.filter((p) => isPagamentoNegado(p.status)).length,
-        processando: lista.filter((p) => p.status === StatusPagamento.PROCESSANDO).length,
+        total: res.data?.total ?? lista.length,
+        pendentes: contar((s) => s === StatusPagamento.PENDENTE),
+        aprovados: contar(isPagamentoAprovado),
+        rejeitados: contar(isPagamentoNegado),
+        processando: contar((s) => s === StatusPagamento.PROCESSANDO),
       })
     } catch (err) {
       console.error('Erro ao carregar pagamentos:', err)
@@ -60,6 +90,26 @@ export default function PagamentosPage() {
     }
   }
 
+  const carregarMais = async () => {
+    if (!proximoCursor) return
+    try {
+      setCarregandoMais(true)
+      const res = await api.get('/pagamentos', {
+        params: { campos: CAMPOS_LISTAGEM, limite: LIMITE_PAGINA, cursor: proximoCursor, resumo: false },
+      })
+      setPagamentos((atuais) => [...atuais, ...(res.data?.pagamentos || [])])
+      setProximoCursor(res.data?.proximo_cursor ?? null)
+    } catch (err) {
+      console.error('Erro ao carregar mais pagamentos:', err)
+      toast.error(err.response?.data?.detail || 'Falha ao carregar mais pagamentos')
+    } finally {
+      setCarregandoMais(false)
+    }
+  }
+
+  // PIX/cartao confirmado pela conciliacao do backend: atualiza sem esperar o usuario
+  useEventosStaff(['pagamento.conciliado'], () => loadPagamentos())
+
   const handleViewPagamentoDetails = async (pagamento) => {
     setLoading(true)
     try {
@@ -186,7 +236,9 @@ export default function PagamentosPage() {
               Últimas movimentações sincronizadas com reservas e antifraude
             </p>
           </div>
-          <span className="text-sm text-gray-500">Total exibido: {pagamentos.length}</span>
+          <span className="text-sm text-gray-500">
+            Exibindo {pagamentos.length} de {stats.total}
+          </span>
         </div>
         <div className="overflow-x-auto">
           <table className="w-full text-sm">
@@ -282,6 +334,17 @@ export default function PagamentosPage() {
             </tbody>
           </table>
         </div>
+        {proximoCursor && !loading && (
+          <div className="px-6 py-4 border-t border-gray-200 text-center">
+            <button
+              onClick={carregarMais}
+              className="text-sm font-medium text-real-blue hover:underline disabled:opacity-50"
+              disabled={carregandoMais}
+            >
+              {carregandoMais ? 'Carregando...' : 'Carregar mais'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Modal de Detalhes do Pagamento */}
@@ -310,7 +310,8 @@ export default function Reservas() {
   const loadReservas = async () => {
     try {
       setLoading(true)
-      const res = await api.get('/reservas')
+      // Perfil "list": hospedagem resumida, sem assinaturas e dados de check-in/out
+      const res = await api.get('/reservas', { params: { view: 'list' } })
       const reservas = res.data.reservas || []
       setReservas(reservas)
       setTotalReservas(reservas.length)
@@ -92,6 +92,7 @@ export default function Reservar() {
   const getApiErrorMessage = (error, fallback) => {
     const detail = error?.response?.data?.detail
     if (Array.isArray(detail)) return detail[0]?.msg || fallback
+    if (detail?.mensagem) return detail.mensagem
     return detail || error?.message || fallback
   }
 
@@ -438,6 +439,16 @@ export default function Reservar() {
         toast.error('❌ Autenticação expirada ou CPF divergente. Valide o código novamente.')
         auth.resetOtp()
         setStep(3)
+      } else if (error.response?.status === 409 && error.response.data?.detail?.codigo) {
+        const { codigo, alternativas = [] } = error.response.data.detail
+        if (codigo === 'CLIENTE_COM_RESERVA_ATIVA') {
+          toast.error('❌ Você já possui uma reserva ativa para este período. Verifique suas reservas existentes.')
+        } else {
+          const sugestao = alternativas.length
+            ? ` Quartos disponíveis: ${alternativas.map((alt) => alt.numero).join(', ')}.`
+            : ''
+          toast.error(`❌ Este quarto não está mais disponível para o período selecionado.${sugestao}`)
+        }
       } else if (error.response?.status === 400) {
         toast.error('❌ Dados inválidos. Verifique as informações e tente novamente.')
       } else if (error.response?.status === 500) {
@@ -4,6 +4,7 @@ import { useEffect, useMemo, useRef, useState } from 'react'
 import { Banknote, Camera, CheckCircle, Clock, RefreshCw, XCircle } from 'lucide-react'
 import { toast } from 'react-toastify'
 import { api } from '../lib/api'
+import { INTERVALO_COM_EVENTOS_MS, useEventosStaff } from '../hooks/useEventosStaff'
 
 const ACTIVE_RESERVATION_STATUSES = new Set([
   'PENDENTE',
@@ -70,11 +71,19 @@ export default function CheckinCashApprovalPanel({ reservas = [], onRefreshReser
   const pendingApprovals = approvals.filter((approval) => approval.status === 'pending')
   const historyApprovals = approvals.filter((approval) => approval.status !== 'pending').slice(0, 8)
 
+  const eventosConectados = useEventosStaff(
+    ['checkin_cash.solicitado', 'checkin_cash.aprovado', 'checkin_cash.recusado'],
+    () => loadApprovals({ silent: true })
+  )
+
   useEffect(() => {
     loadApprovals({ silent: true })
-    const intervalId = setInterval(() => loadApprovals({ silent: true }), 30000)
+    const intervalId = setInterval(
+      () => loadApprovals({ silent: true }),
+      eventosConectados ? INTERVALO_COM_EVENTOS_MS : 30000
+    )
     return () => clearInterval(intervalId)
-  }, [])
+  }, [eventosConectados])
 
   useEffect(() => {
     if (!selectedReservationId) {
@@ -2,6 +2,7 @@
 import { useEffect, useState } from 'react'
 import { api } from '../lib/api'
 import { useRouter } from 'next/navigation'
+import { INTERVALO_COM_EVENTOS_MS, useEventosStaff } from '../hooks/useEventosStaff'
 
 export default function NotificationBell() {
   const [count, setCount] = useState(0)
@@ -9,18 +10,19 @@ export default function NotificationBell() {
   const [showDropdown, setShowDropdown] = useState(false)
   const [loading, setLoading] = useState(false)
   const router = useRouter()
+  const eventosConectados = useEventosStaff(['notificacao.criada'], () => loadCount())
 
   useEffect(() => {
     // Carregar contagem inicial
     loadCount()
 
-    // Polling: atualizar a cada 30 segundos
+    // Polling: a cada 30 segundos, ou so de seguranca com o stream de eventos ativo
     const interval = setInterval(() => {
       loadCount()
-    }, 30000)
+    }, eventosConectados ? INTERVALO_COM_EVENTOS_MS : 30000)
 
     return () => clearInterval(interval)
-  }, [])
+  }, [eventosConectados])
 
   const loadCount = async () => {
     try {
@@ -2,6 +2,7 @@
 import { useState, useEffect, useCallback, useRef } from 'react'
 import { useToast } from '../contexts/ToastContext'
 import { api } from '../lib/api'
+import { INTERVALO_COM_EVENTOS_MS, useEventosStaff } from '../hooks/useEventosStaff'
 import { playCheckoutDueSound, playNotificationSound } from '../sounds/notification-sound'
 
 export default function ReservaNotificationManager() {
@@ -194,6 +195,20 @@ export default function ReservaNotificationManager() {
     }
   }, [addToast, isPollingEnabled])
 
+  // Eventos da equipe (SSE): verifica na hora em vez de esperar o próximo ciclo
+  const eventosConectados = useEventosStaff(
+    [
+      'notificacao.criada',
+      'reserva.criada',
+      'checkout_alerta.pendente',
+    ],
+    (_dados, tipo) => {
+      if (tipo === 'notificacao.criada') checkServerNotifications()
+      else if (tipo === 'reserva.criada') checkNewReservations()
+      else checkCheckoutAlerts()
+    }
+  )
+
   // Configurar os intervalos de verificação
   useEffect(() => {
     // Limpar intervalos existentes antes de criar novos
@@ -214,12 +229,16 @@ export default function ReservaNotificationManager() {
     
     // Configurar intervalos apenas se polling estiver habilitado
     if (isPollingEnabled) {
+      // Com o stream de eventos ativo o polling vira só verificação de segurança
+      const intervaloNotificacoes = eventosConectados ? INTERVALO_COM_EVENTOS_MS : 120000
+      const intervaloReservas = eventosConectados ? INTERVALO_COM_EVENTOS_MS : 60000
+
       // Verificar notificações do servidor a cada 2 minutos (aumentado de 1 minuto)
-      intervalsRef.current.notification = setInterval(checkServerNotifications, 120000)
+      intervalsRef.current.notification = setInterval(checkServerNotifications, intervaloNotificacoes)
       
       // Verificar reservas a cada 1 minuto (aumentado de 30 segundos)
-      intervalsRef.current.reservation = setInterval(checkNewReservations, 60000)
-      intervalsRef.current.checkout = setInterval(checkCheckoutAlerts, 60000)
+      intervalsRef.current.reservation = setInterval(checkNewReservations, intervaloReservas)
+      intervalsRef.current.checkout = setInterval(checkCheckoutAlerts, intervaloReservas)
     }
     
     // Limpar intervalos ao desmontar
@@ -234,7 +253,7 @@ export default function ReservaNotificationManager() {
         clearInterval(intervalsRef.current.checkout)
       }
     }
-  }, [isPollingEnabled])
+  }, [isPollingEnabled, eventosConectados])
 
   return null // Este componente não renderiza nada
 }
@@ -2,6 +2,7 @@
 import { createContext, useContext, useState, useEffect, useCallback } from 'react'
 import { api } from '../lib/api'
 import ToastNotification from '../components/ToastNotification'
+import { INTERVALO_COM_EVENTOS_MS, useEventosStaff } from '../hooks/useEventosStaff'
 
 const ToastContext = createContext()
 
@@ -91,16 +92,19 @@ export function ToastProvider({ children }) {
     }
   }, [userProfile, isLoading, lastCheck, lastNotificationId])
 
+  // Notificação nova chega pelo stream de eventos da equipe
+  const eventosConectados = useEventosStaff(['notificacao.criada'], () => checkServerNotifications())
+
   // Configurar polling para notificações
   useEffect(() => {
-    // Verificar a cada 30 segundos
-    const interval = setInterval(checkServerNotifications, 30000)
+    // Verificar a cada 30 segundos (só verificação de segurança com o stream ativo)
+    const interval = setInterval(checkServerNotifications, eventosConectados ? INTERVALO_COM_EVENTOS_MS : 30000)
     
     // Verificar imediatamente ao montar
     checkServerNotifications()
     
     return () => clearInterval(interval)
-  }, [checkServerNotifications])
+  }, [checkServerNotifications, eventosConectados])
 
   // Função para tocar som de notificação
   const playNotificationSound = (tipo) => {
@@ -0,0 +1,98 @@
+import { useEffect, useRef, useState } from 'react'
+
+const baseURL = process.env.NEXT_PUBLIC_API_URL || '/api/v1'
+
+// Polling de seguranca enquanto o stream SSE esta conectado: os eventos
+// chegam em tempo real e o intervalo longo so cobre algum evento perdido.
+export const INTERVALO_COM_EVENTOS_MS = 5 * 60 * 1000
+
+/**
+ * Uma unica conexao EventSource por aba, compartilhada por todos os
+ * componentes. O navegador reconecta sozinho reenviando Last-Event-ID e o
+ * backend reenvia os eventos perdidos. A autenticacao vai pelo cookie de
+ * sessao (EventSource nao envia header Authorization).
+ */
+const ouvintes = new Map() // tipo -> Set(callback)
+const ouvintesConexao = new Set()
+let fonte = null
+let tiposNaFonte = new Set()
+let conectado = false
+
+function definirConectado(valor) {
+  conectado = valor
+  ouvintesConexao.forEach((cb) => cb(valor))
+}
+
+function registrarTipoNaFonte(tipo) {
+  if (!fonte || tiposNaFonte.has(tipo)) return
+  tiposNaFonte.add(tipo)
+  fonte.addEventListener(tipo, (event) => {
+    let dados = {}
+    try {
+      dados = JSON.parse(event.data || '{}')
+    } catch (error) {
+      return
+    }
+    ;(ouvintes.get(tipo) || []).forEach((cb) => cb(dados, tipo))
+  })
+}
+
+function abrirFonte() {
+  if (fonte || typeof window === 'undefined' || typeof EventSource === 'undefined') return
+  fonte = new EventSource(`${baseURL}/eventos/stream`, { withCredentials: true })
+  tiposNaFonte = new Set()
+  fonte.onopen = () => definirConectado(true)
+  fonte.onerror = () => {
+    definirConectado(false)
+    // 401/403 fecham o stream (readyState CLOSED): volta ao polling normal.
+    if (fonte?.readyState === EventSource.CLOSED) {
+      fonte = null
+    }
+  }
+  ouvintes.forEach((_, tipo) => registrarTipoNaFonte(tipo))
+}
+
+function fecharFonteSemOuvintes() {
+  if (fonte && ouvintes.size === 0) {
+    fonte.close()
+    fonte = null
+    definirConectado(false)
+  }
+}
+
+/**
+ * Assina eventos da equipe pelo tipo (ex.: 'notificacao.criada').
+ * Retorna `conectado` para o componente alongar o proprio polling.
+ */
+export function useEventosStaff(tipos, onEvento) {
+  const [estaConectado, setEstaConectado] = useState(conectado)
+  const callbackRef = useRef(onEvento)
+  callbackRef.current = onEvento
+  const chaveTipos = (tipos || []).join(',')
+
+  useEffect(() => {
+    const lista = chaveTipos ? chaveTipos.split(',') : []
+    const handler = (dados, tipo) => callbackRef.current?.(dados, tipo)
+
+    abrirFonte()
+    lista.forEach((tipo) => {
+      if (!ouvintes.has(tipo)) ouvintes.set(tipo, new Set())
+      ouvintes.get(tipo).add(handler)
+      registrarTipoNaFonte(tipo)
+    })
+    ouvintesConexao.add(setEstaConectado)
+    setEstaConectado(conectado)
+
+    return () => {
+      lista.forEach((tipo) => {
+        const set = ouvintes.get(tipo)
+        set?.delete(handler)
+        if (set && set.size === 0) ouvintes.delete(tipo)
+      })
+      ouvintesConexao.delete(setEstaConectado)
+      fecharFonteSemOuvintes()
+    }
+  }, [chaveTipos])
+
+  return estaConectado
+}
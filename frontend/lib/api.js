@@ -9,6 +9,8 @@ function extrairMensagemErro(error) {
 
   const { detail } = error.response.data || {}
   if (typeof detail === 'string' && detail.trim()) return detail
+  // Conflitos estruturados (409): { codigo, mensagem, conflitos, alternativas }
+  if (typeof detail?.mensagem === 'string' && detail.mensagem.trim()) return detail.mensagem
   if (Array.isArray(detail) && detail.length > 0) {
     // Erros de validacao do FastAPI (422): lista de {loc, msg, ...}
     return detail.map((d) => d.msg || JSON.stringify(d)).join('; ')
@@ -5,6 +5,7 @@
   const data = error?.response?.data
 
   if (typeof data === 'string' && data.trim()) return data
+  if (data?.detail?.mensagem) return String(data.detail.mensagem)
   if (data?.detail) return String(data.detail)
   if (data?.message) return String(data.message)
   if (error?.message) return String(error.message)